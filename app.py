@@ -28,6 +28,15 @@ def create_app():
         "pool_pre_ping": True,
     }
     app.config["MAX_CONTENT_LENGTH"] = 500 * 1024 * 1024  # 500MB max file size
+    app.config["CSV_CHUNK_SIZE"] = int(os.environ.get("CSV_CHUNK_SIZE", 50000))  # rows per streamed chunk
+    app.config["CSV_STREAMING_THRESHOLD"] = int(os.environ.get("CSV_STREAMING_THRESHOLD", 20 * 1024 * 1024))  # stream CSVs above 20MB
+    app.config["PARSED_CACHE_FOLDER"] = os.environ.get("PARSED_CACHE_FOLDER", os.path.join("cache", "parsed_datasets"))
+    app.config["PARSED_CACHE_MAX_BYTES"] = int(os.environ.get("PARSED_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))  # 2GB
+    app.config["PARSED_CACHE_MAX_AGE_SECONDS"] = int(os.environ.get("PARSED_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+    app.config["REPORT_CACHE_MAX_ENTRIES"] = int(os.environ.get("REPORT_CACHE_MAX_ENTRIES", 256))
+    app.config["REPORT_CACHE_MAX_BYTES"] = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 1024 * 1024 * 1024))  # 1GB of rendered files
+    app.config["REPORT_DOWNLOAD_TOKEN_SECONDS"] = int(os.environ.get("REPORT_DOWNLOAD_TOKEN_SECONDS", 60 * 60))
+    app.config["REPORT_EXPORT_WORKERS"] = int(os.environ.get("REPORT_EXPORT_WORKERS", os.cpu_count() or 1))
     app.config["UPLOAD_FOLDER"] = "uploads"
     app.config["REPORTS_FOLDER"] = "reports"
     
@@ -57,8 +66,14 @@ def create_app():
     with app.app_context():
         import models  # Import models to register them
         import permissions_models  # Import permissions models
+        import services.ledger_version  # Register the journal change listener behind report caching
+        import services.ledger_balance_service  # Register the listener that moves edited lines through period balances
         db.create_all()
         logging.info("Database tables created successfully")
+        
+        # Bring existing databases up to date (indexes etc. that create_all skips)
+        from services.schema_migration_service import SchemaMigrationService
+        SchemaMigrationService().apply_pending()
     
     return app
 
@@ -0,0 +1,30 @@
+-- Composite indexes for the report and dashboard hot paths
+-- Portable between PostgreSQL and SQLite; every statement is idempotent
+
+-- Per-account statement totals: company + account + posted + date range, covering the amounts
+CREATE INDEX IF NOT EXISTS idx_journal_company_account_posted_date
+    ON journal_entries(company_id, account_id, is_posted, entry_date, debit_amount, credit_amount);
+
+-- Journal report and date-range scans
+CREATE INDEX IF NOT EXISTS idx_journal_company_date ON journal_entries(company_id, entry_date);
+
+-- Dashboards ordering recent entries
+CREATE INDEX IF NOT EXISTS idx_journal_company_created ON journal_entries(company_id, created_at);
+
+-- Chart of accounts lookups by company and code
+CREATE INDEX IF NOT EXISTS idx_chart_company_code ON chart_of_accounts(company_id, account_code);
+
+-- Audit trail listings
+CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user_timestamp ON audit_logs(user_id, timestamp);
+
+-- Upload dashboards
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_user_status ON uploaded_files(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_user_created ON uploaded_files(user_id, created_at);
+
+-- Manual journal workflow queues
+CREATE INDEX IF NOT EXISTS idx_manual_journal_company_status_created
+    ON manual_journal_headers(company_id, status, created_at);
+
+-- Receivables ageing
+CREATE INDEX IF NOT EXISTS idx_invoices_status_due ON invoices(status, due_date);
@@ -0,0 +1,19 @@
+"""
+Backfill account_period_balances from journal_entries
+
+Journal lines posted before the period aggregate existed were never folded
+into it, and statements read whole months from the aggregate. Rebuilding is
+idempotent, so the migration can also repair a drifted aggregate.
+"""
+
+from sqlalchemy import select
+
+from models import JournalEntry
+from services.ledger_balance_service import LedgerBalanceService
+
+def upgrade(session):
+    company_ids = session.execute(
+        select(JournalEntry.company_id).where(JournalEntry.is_posted == True).distinct()
+    ).scalars().all()
+    for company_id in company_ids:
+        LedgerBalanceService(company_id).rebuild()
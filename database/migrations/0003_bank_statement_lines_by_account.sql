@@ -0,0 +1,7 @@
+-- Statement lines are looked up by transaction id within one bank account
+-- Portable between PostgreSQL and SQLite; every statement is idempotent
+
+CREATE INDEX IF NOT EXISTS idx_bank_statement_lines_account_transaction
+    ON bank_statement_lines(company_id, bank_account, transaction_id);
+
+DROP INDEX IF EXISTS idx_bank_statement_lines_transaction;
@@ -218,6 +218,28 @@ CREATE TABLE IF NOT EXISTS journal_entries (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Posted totals per account and fiscal month, maintained alongside journal posting
+CREATE TABLE IF NOT EXISTS account_period_balances (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    account_id INTEGER NOT NULL REFERENCES chart_of_accounts(id),
+    period_year INTEGER NOT NULL,
+    period_month INTEGER NOT NULL CHECK (period_month BETWEEN 1 AND 12),
+    debit_total DECIMAL(15,2) DEFAULT 0.00,
+    credit_total DECIMAL(15,2) DEFAULT 0.00,
+    entry_count INTEGER DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    
+    CONSTRAINT uq_account_period_balance UNIQUE(company_id, account_id, period_year, period_month)
+);
+
+-- Per-company counter bumped in the transaction of every journal or chart change (report cache key)
+CREATE TABLE IF NOT EXISTS ledger_versions (
+    company_id INTEGER PRIMARY KEY REFERENCES companies(id),
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Manual journal headers for complex entries
 CREATE TABLE IF NOT EXISTS manual_journal_headers (
     id SERIAL PRIMARY KEY,
@@ -314,6 +336,178 @@ CREATE TABLE IF NOT EXISTS audit_logs (
     timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Applied database/migrations versions, written by SchemaMigrationService
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(20) PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+);
+
+-- Upload pipeline jobs and chunk progress; uploaded_files itself is created by the application
+CREATE TABLE IF NOT EXISTS processing_jobs (
+    id SERIAL PRIMARY KEY,
+    uploaded_file_id INTEGER NOT NULL,
+    stage VARCHAR(30) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    payload TEXT,
+    result TEXT,
+    progress_percent DOUBLE PRECISION DEFAULT 0,
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    last_error TEXT,
+    run_after TIMESTAMP,
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS file_ingestion_progress (
+    id SERIAL PRIMARY KEY,
+    uploaded_file_id INTEGER NOT NULL UNIQUE,
+    stage VARCHAR(30) DEFAULT 'validating',
+    bytes_total INTEGER DEFAULT 0,
+    bytes_read INTEGER DEFAULT 0,
+    rows_read INTEGER DEFAULT 0,
+    rows_posted INTEGER DEFAULT 0,
+    rows_rejected INTEGER DEFAULT 0,
+    chunks_completed INTEGER DEFAULT 0,
+    started_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+-- Queued report renders, shared by identical requests through request_key
+CREATE TABLE IF NOT EXISTS report_render_jobs (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    requested_by INTEGER NOT NULL REFERENCES users(id),
+    report_type VARCHAR(50) NOT NULL,
+    format_type VARCHAR(10) NOT NULL,
+    parameters TEXT,
+    request_key VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    progress_percent DOUBLE PRECISION DEFAULT 0,
+    progress_message VARCHAR(200),
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 2,
+    last_error TEXT,
+    file_path VARCHAR(500),
+    download_name VARCHAR(255),
+    mimetype VARCHAR(100),
+    run_after TIMESTAMP,
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Precomputed match keys per vendor/customer name
+CREATE TABLE IF NOT EXISTS party_name_keys (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER REFERENCES companies(id),
+    party_name VARCHAR(200) NOT NULL,
+    stripped_name VARCHAR(200) NOT NULL,
+    acronyms VARCHAR(100) DEFAULT '',
+    soundex_keys VARCHAR(200) DEFAULT '',
+    metaphone_keys VARCHAR(200) DEFAULT '',
+    key_version INTEGER NOT NULL,
+    updated_at TIMESTAMP,
+    
+    CONSTRAINT uq_party_name_keys_company_party UNIQUE(company_id, party_name)
+);
+
+-- Bank reconciliation runs and the statement lines they reconciled
+CREATE TABLE IF NOT EXISTS reconciliation_runs (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    bank_account VARCHAR(50) DEFAULT '',
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    statement_lines INTEGER DEFAULT 0,
+    new_lines INTEGER DEFAULT 0,
+    rescored_lines INTEGER DEFAULT 0,
+    skipped_lines INTEGER DEFAULT 0,
+    new_ledger_entries INTEGER DEFAULT 0,
+    matched_count INTEGER DEFAULT 0,
+    partial_count INTEGER DEFAULT 0,
+    unmatched_count INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS reconciliation_ledger_entries (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    bank_account VARCHAR(50) DEFAULT '',
+    entry_id VARCHAR(100) NOT NULL,
+    first_run_id INTEGER NOT NULL REFERENCES reconciliation_runs(id),
+    
+    CONSTRAINT uq_reconciliation_ledger_entry UNIQUE(company_id, bank_account, entry_id)
+);
+
+CREATE TABLE IF NOT EXISTS bank_statement_lines (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    bank_account VARCHAR(50) DEFAULT '',
+    line_key VARCHAR(64) NOT NULL,
+    transaction_id VARCHAR(100),
+    transaction_date TIMESTAMP,
+    description TEXT,
+    amount DOUBLE PRECISION DEFAULT 0,
+    reference VARCHAR(100),
+    status VARCHAR(20) DEFAULT 'unmatched',
+    confidence DOUBLE PRECISION DEFAULT 0,
+    matched_entry_id VARCHAR(100),
+    candidates TEXT,
+    first_run_id INTEGER REFERENCES reconciliation_runs(id),
+    last_run_id INTEGER REFERENCES reconciliation_runs(id),
+    reconciled_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    
+    CONSTRAINT uq_bank_statement_line_key UNIQUE(company_id, bank_account, line_key)
+);
+
+CREATE TABLE IF NOT EXISTS bank_reconciliation_matches (
+    id SERIAL PRIMARY KEY,
+    statement_line_id INTEGER NOT NULL REFERENCES bank_statement_lines(id),
+    run_id INTEGER REFERENCES reconciliation_runs(id),
+    entry_id VARCHAR(100) NOT NULL,
+    confidence DOUBLE PRECISION DEFAULT 0,
+    is_manual BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bank_manual_mappings (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    transaction_id VARCHAR(100) NOT NULL,
+    statement_line_id INTEGER REFERENCES bank_statement_lines(id),
+    description TEXT,
+    amount DOUBLE PRECISION DEFAULT 0,
+    mapped_account_code VARCHAR(20),
+    journal_entry_id VARCHAR(100),
+    mapped_by INTEGER REFERENCES users(id),
+    mapped_at TIMESTAMP,
+    status VARCHAR(20) DEFAULT 'completed'
+);
+
+-- How often a description signature was mapped to an account by hand
+CREATE TABLE IF NOT EXISTS mapping_memory (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    direction VARCHAR(3) NOT NULL,
+    tokens VARCHAR(255) DEFAULT '',
+    counterparty VARCHAR(200) DEFAULT '',
+    amount_band INTEGER DEFAULT 0,
+    account_code VARCHAR(20) NOT NULL,
+    account_name VARCHAR(200) DEFAULT '',
+    times_used INTEGER DEFAULT 0,
+    last_used_at TIMESTAMP,
+    
+    CONSTRAINT uq_mapping_memory_signature_account
+        UNIQUE(company_id, direction, tokens, counterparty, amount_band, account_code)
+);
+
 -- Performance indexes
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
@@ -341,6 +535,23 @@ CREATE INDEX IF NOT EXISTS idx_journal_date ON journal_entries(entry_date);
 CREATE INDEX IF NOT EXISTS idx_journal_status ON journal_entries(status);
 CREATE INDEX IF NOT EXISTS idx_journal_created_by ON journal_entries(created_by);
 
+CREATE INDEX IF NOT EXISTS idx_processing_jobs_status_run_after ON processing_jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS idx_processing_jobs_file_stage ON processing_jobs(uploaded_file_id, stage);
+CREATE INDEX IF NOT EXISTS idx_report_render_jobs_status_run_after ON report_render_jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS idx_report_render_jobs_request_key ON report_render_jobs(request_key);
+
+CREATE INDEX IF NOT EXISTS ix_party_name_keys_company_id ON party_name_keys(company_id);
+CREATE INDEX IF NOT EXISTS idx_reconciliation_runs_company_account
+    ON reconciliation_runs(company_id, bank_account, completed_at);
+CREATE INDEX IF NOT EXISTS idx_bank_statement_lines_account_transaction
+    ON bank_statement_lines(company_id, bank_account, transaction_id);
+CREATE INDEX IF NOT EXISTS ix_bank_reconciliation_matches_statement_line_id
+    ON bank_reconciliation_matches(statement_line_id);
+CREATE INDEX IF NOT EXISTS idx_bank_manual_mappings_company_transaction
+    ON bank_manual_mappings(company_id, transaction_id);
+CREATE INDEX IF NOT EXISTS idx_mapping_memory_tokens ON mapping_memory(company_id, direction, tokens);
+CREATE INDEX IF NOT EXISTS idx_mapping_memory_counterparty ON mapping_memory(company_id, direction, counterparty);
+
 CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_logs(timestamp);
 CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_logs(action);
@@ -230,6 +230,10 @@ class ChartOfAccount(db.Model):
     company = relationship("Company", back_populates="chart_of_accounts")
     parent_account = relationship("ChartOfAccount", remote_side=[id])
     journal_entries = relationship("JournalEntry", back_populates="account")
+    
+    __table_args__ = (
+        db.Index('idx_chart_company_code', 'company_id', 'account_code'),
+    )
 
 class UploadedFile(db.Model):
     __tablename__ = 'uploaded_files'
@@ -241,7 +245,7 @@ class UploadedFile(db.Model):
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
     file_type = Column(String(50), nullable=False)  # excel, csv
-    status = Column(String(50), default='uploaded')  # uploaded, processing, validated, processed, error
+    status = Column(String(50), default='uploaded')  # see UploadStateMachine.TRANSITIONS
     validation_errors = Column(Text)
     processed_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -249,6 +253,13 @@ class UploadedFile(db.Model):
     # Relationships
     user = relationship("User", back_populates="uploaded_files")
     processing_results = relationship("ProcessingResult", back_populates="uploaded_file")
+    ingestion_progress = relationship("FileIngestionProgress", back_populates="uploaded_file", uselist=False)
+    processing_jobs = relationship("ProcessingJob", back_populates="uploaded_file", order_by="ProcessingJob.id")
+    
+    __table_args__ = (
+        db.Index('idx_uploaded_files_user_status', 'user_id', 'status'),
+        db.Index('idx_uploaded_files_user_created', 'user_id', 'created_at'),
+    )
 
 class ProcessingResult(db.Model):
     __tablename__ = 'processing_results'
@@ -264,6 +275,150 @@ class ProcessingResult(db.Model):
     # Relationships
     uploaded_file = relationship("UploadedFile", back_populates="processing_results")
 
+class FileIngestionProgress(db.Model):
+    """Chunk-level progress of a streamed CSV validation or import.
+
+    Updated and committed after every chunk so /api/upload-status can report
+    progress while the file is still being read.
+    """
+    __tablename__ = 'file_ingestion_progress'
+
+    id = Column(Integer, primary_key=True)
+    uploaded_file_id = Column(Integer, ForeignKey('uploaded_files.id'), nullable=False, unique=True)
+    stage = Column(String(30), default='validating')  # validating, posting, completed, failed
+    bytes_total = Column(Integer, default=0)
+    bytes_read = Column(Integer, default=0)
+    rows_read = Column(Integer, default=0)
+    rows_posted = Column(Integer, default=0)
+    rows_rejected = Column(Integer, default=0)
+    chunks_completed = Column(Integer, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    uploaded_file = relationship("UploadedFile", back_populates="ingestion_progress")
+
+    @property
+    def percent_complete(self) -> float:
+        if self.stage == 'completed':
+            return 100.0
+        if not self.bytes_total:
+            return 0.0
+        return round(min(self.bytes_read / self.bytes_total, 1.0) * 100, 1)
+
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'percent_complete': self.percent_complete,
+            'bytes_read': self.bytes_read,
+            'bytes_total': self.bytes_total,
+            'rows_read': self.rows_read,
+            'rows_posted': self.rows_posted,
+            'rows_rejected': self.rows_rejected,
+            'chunks_completed': self.chunks_completed,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ProcessingJob(db.Model):
+    """Queued pipeline stage (validate, process, report) for an uploaded file.
+
+    Web requests only insert rows here; worker processes claim them with a
+    conditional UPDATE, so any number of workers can share the table.
+    """
+    __tablename__ = 'processing_jobs'
+
+    id = Column(Integer, primary_key=True)
+    uploaded_file_id = Column(Integer, ForeignKey('uploaded_files.id'), nullable=False)
+    stage = Column(String(30), nullable=False)  # validate, process, report
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    payload = Column(Text)  # JSON
+    result = Column(Text)  # JSON written by the stage handler
+    progress_percent = Column(Float, default=0.0)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    last_error = Column(Text)
+    run_after = Column(DateTime, default=datetime.utcnow)  # retry backoff
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime)  # refreshed on progress, used to detect dead workers
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    # Relationships
+    uploaded_file = relationship("UploadedFile", back_populates="processing_jobs")
+
+    __table_args__ = (
+        db.Index('idx_processing_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('idx_processing_jobs_file_stage', 'uploaded_file_id', 'stage'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'stage': self.stage,
+            'status': self.status,
+            'progress_percent': self.progress_percent,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ReportRenderJob(db.Model):
+    """Queued rendering of a report file (statement export or report package).
+
+    Identical requests share one job through request_key, which covers the
+    company, report, format, parameters and ledger version. Workers claim jobs
+    like processing jobs and store the rendered file for a token download.
+    """
+    __tablename__ = 'report_render_jobs'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
+    requested_by = Column(Integer, ForeignKey('users.id'), nullable=False)
+    report_type = Column(String(50), nullable=False)  # journal ... shareholders_equity, all_reports, financial_package
+    format_type = Column(String(10), nullable=False)  # excel, word, pdf, zip (all_reports in every format)
+    parameters = Column(Text)  # JSON
+    request_key = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    progress_percent = Column(Float, default=0.0)
+    progress_message = Column(String(200))
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=2)
+    last_error = Column(Text)
+    file_path = Column(String(500))
+    download_name = Column(String(255))
+    mimetype = Column(String(100))
+    run_after = Column(DateTime, default=datetime.utcnow)
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        db.Index('idx_report_render_jobs_status_run_after', 'status', 'run_after'),
+        db.Index('idx_report_render_jobs_request_key', 'request_key'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'format_type': self.format_type,
+            'status': self.status,
+            'progress_percent': self.progress_percent,
+            'progress_message': self.progress_message,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
 class JournalEntryStatus(enum.Enum):
     DRAFT = "draft"
     PENDING_REVIEW = "pending_review"
@@ -310,6 +465,54 @@ class JournalEntry(db.Model):
     reviewed_by_user = relationship("User", foreign_keys=[reviewed_by])
     approved_by_user = relationship("User", foreign_keys=[approved_by])
     rejected_by_user = relationship("User", foreign_keys=[rejected_by])
+    
+    # Report hot paths (see database/migrations/0001_journal_hot_path_indexes.sql)
+    __table_args__ = (
+        db.Index('idx_journal_company_account_posted_date', 'company_id', 'account_id', 'is_posted',
+                 'entry_date', 'debit_amount', 'credit_amount'),
+        db.Index('idx_journal_company_date', 'company_id', 'entry_date'),
+        db.Index('idx_journal_company_created', 'company_id', 'created_at'),
+    )
+
+class AccountPeriodBalance(db.Model):
+    """Posted debit/credit totals per company, account and fiscal month.
+
+    Maintained incrementally by LedgerBalanceService inside the same transaction
+    as every journal post, so statements read one row per account-month instead
+    of re-reading journal_entries.
+    """
+    __tablename__ = 'account_period_balances'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
+    account_id = Column(Integer, ForeignKey('chart_of_accounts.id'), nullable=False)
+    period_year = Column(Integer, nullable=False)
+    period_month = Column(Integer, nullable=False)  # 1-12, month of entry_date
+    debit_total = Column(Float, default=0.0)
+    credit_total = Column(Float, default=0.0)
+    entry_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    company = relationship("Company")
+    account = relationship("ChartOfAccount")
+
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'account_id', 'period_year', 'period_month',
+                            name='uq_account_period_balance'),
+    )
+
+class LedgerVersion(db.Model):
+    """Per-company counter bumped whenever journal lines or the chart of accounts change.
+
+    services.ledger_version increments it in the same transaction as the change,
+    so a report generated at version n stays valid until the counter moves on.
+    """
+    __tablename__ = 'ledger_versions'
+
+    company_id = Column(Integer, ForeignKey('companies.id'), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class ManualJournalHeader(db.Model):
     __tablename__ = 'manual_journal_headers'
@@ -358,6 +561,10 @@ class ManualJournalHeader(db.Model):
     posted_by_user = relationship("User", foreign_keys=[posted_by])
     rejected_by_user = relationship("User", foreign_keys=[rejected_by])
     journal_lines = relationship("ManualJournalLine", back_populates="journal_header", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        db.Index('idx_manual_journal_company_status_created', 'company_id', 'status', 'created_at'),
+    )
 
 class ManualJournalLine(db.Model):
     __tablename__ = 'manual_journal_lines'
@@ -397,6 +604,10 @@ class Invoice(db.Model):
     
     # Relationships
     invoice_items = relationship("InvoiceItem", back_populates="invoice")
+    
+    __table_args__ = (
+        db.Index('idx_invoices_status_due', 'status', 'due_date'),
+    )
 
 class InvoiceItem(db.Model):
     __tablename__ = 'invoice_items'
@@ -428,6 +639,190 @@ class InventoryItem(db.Model):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class PartyNameKey(db.Model):
+    """Precomputed match keys for a vendor/customer name.
+
+    Written by PartyNameStore.for_parties() the first time a party name is seen
+    (or when the key algorithms change), so reconciliation runs load keys
+    instead of recomputing them. Keys are space-separated lists.
+    """
+    __tablename__ = 'party_name_keys'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), index=True)
+    party_name = Column(String(200), nullable=False)  # normalized: lower-case words, single spaced
+    stripped_name = Column(String(200), nullable=False)
+    acronyms = Column(String(100), default='')
+    soundex_keys = Column(String(200), default='')
+    metaphone_keys = Column(String(200), default='')
+    key_version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'party_name', name='uq_party_name_keys_company_party'),
+    )
+
+    def to_keys(self):
+        from services.party_name_store import PartyKeys
+        return PartyKeys(
+            party_name=self.party_name,
+            stripped_name=self.stripped_name,
+            acronyms=(self.acronyms or '').split(),
+            soundex_keys=(self.soundex_keys or '').split(),
+            metaphone_keys=(self.metaphone_keys or '').split(),
+            key_version=self.key_version
+        )
+
+    def update_from(self, keys):
+        self.stripped_name = keys.stripped_name
+        self.acronyms = ' '.join(keys.acronyms)
+        self.soundex_keys = ' '.join(keys.soundex_keys)
+        self.metaphone_keys = ' '.join(keys.metaphone_keys)
+        self.key_version = keys.key_version
+
+class ReconciliationRun(db.Model):
+    """One reconciliation of a bank statement against the ledger.
+
+    Run ids only grow, so they double as the high-water mark of the ledger a
+    run saw: the next run that sees one of its open lines only scores that line
+    against entries first seen after it (ReconciliationLedgerEntry).
+    """
+    __tablename__ = 'reconciliation_runs'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
+    bank_account = Column(String(50), default='')
+    started_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    statement_lines = Column(Integer, default=0)
+    new_lines = Column(Integer, default=0)
+    rescored_lines = Column(Integer, default=0)  # open lines scored against new ledger entries only
+    skipped_lines = Column(Integer, default=0)  # reconciled, or open with nothing new to score against
+    new_ledger_entries = Column(Integer, default=0)
+    matched_count = Column(Integer, default=0)
+    partial_count = Column(Integer, default=0)
+    unmatched_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        db.Index('idx_reconciliation_runs_company_account', 'company_id', 'bank_account', 'completed_at'),
+    )
+
+class ReconciliationLedgerEntry(db.Model):
+    """A ledger entry (or invoice) reconciliation of a bank account has met, and the run that first met it"""
+    __tablename__ = 'reconciliation_ledger_entries'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
+    bank_account = Column(String(50), default='')
+    entry_id = Column(String(100), nullable=False)
+    first_run_id = Column(Integer, ForeignKey('reconciliation_runs.id'), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'bank_account', 'entry_id', name='uq_reconciliation_ledger_entry'),
+    )
+
+class BankStatementLine(db.Model):
+    """A bank statement line as last reconciled.
+
+    line_key identifies the line across uploads of overlapping statements
+    (date, amount, narration and reference, plus its occurrence number for
+    identical lines). candidates holds the best ledger matches found so far as
+    JSON [[entry_id, confidence], ...], best first; for a grouped line (one
+    payment settling several invoices) it holds the whole group.
+    """
+    __tablename__ = 'bank_statement_lines'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
+    bank_account = Column(String(50), default='')
+    line_key = Column(String(64), nullable=False)
+    transaction_id = Column(String(100))  # as given by the latest upload
+    transaction_date = Column(DateTime)
+    description = Column(Text)
+    amount = Column(Float, default=0.0)
+    reference = Column(String(100))
+    status = Column(String(20), default='unmatched')  # matched, grouped, partial, unmatched, manual, ignored
+    confidence = Column(Float, default=0.0)
+    matched_entry_id = Column(String(100), nullable=True)
+    candidates = Column(Text)  # JSON
+    first_run_id = Column(Integer, ForeignKey('reconciliation_runs.id'))
+    last_run_id = Column(Integer, ForeignKey('reconciliation_runs.id'))  # last run that scored the line
+    reconciled_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'bank_account', 'line_key', name='uq_bank_statement_line_key'),
+        db.Index('idx_bank_statement_lines_account_transaction', 'company_id', 'bank_account', 'transaction_id'),
+    )
+
+class BankReconciliationMatch(db.Model):
+    """A statement line reconciled to a ledger entry or invoice, automatically or by hand"""
+    __tablename__ = 'bank_reconciliation_matches'
+
+    id = Column(Integer, primary_key=True)
+    statement_line_id = Column(Integer, ForeignKey('bank_statement_lines.id'), nullable=False, index=True)
+    run_id = Column(Integer, ForeignKey('reconciliation_runs.id'), nullable=True)
+    entry_id = Column(String(100), nullable=False)
+    confidence = Column(Float, default=0.0)
+    is_manual = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class BankManualMapping(db.Model):
+    """A bank transaction mapped to a ledger account by a user"""
+    __tablename__ = 'bank_manual_mappings'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
+    transaction_id = Column(String(100), nullable=False)
+    statement_line_id = Column(Integer, ForeignKey('bank_statement_lines.id'), nullable=True)
+    description = Column(Text)
+    amount = Column(Float, default=0.0)
+    mapped_account_code = Column(String(20))
+    journal_entry_id = Column(String(100))
+    mapped_by = Column(Integer, ForeignKey('users.id'), nullable=True)
+    mapped_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(String(20), default='completed')  # completed, pending
+
+    __table_args__ = (
+        db.Index('idx_bank_manual_mappings_company_transaction', 'company_id', 'transaction_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'transaction_id': self.transaction_id,
+            'mapped_at': self.mapped_at.isoformat() if self.mapped_at else None,
+            'mapped_by': self.mapped_by,
+            'journal_entry_id': self.journal_entry_id,
+            'mapped_account_code': self.mapped_account_code,
+            'status': self.status
+        }
+
+class MappingMemoryEntry(db.Model):
+    """How often transactions with one description signature were mapped to an account.
+
+    Written by MappingMemory.record() on every manual bank mapping; suggestions
+    are looked up by (direction, tokens) and (direction, counterparty).
+    """
+    __tablename__ = 'mapping_memory'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
+    direction = Column(String(3), nullable=False)  # in, out
+    tokens = Column(String(255), default='')  # sorted significant narration words, space-separated
+    counterparty = Column(String(200), default='')
+    amount_band = Column(Integer, default=0)  # quarter decades of the absolute amount
+    account_code = Column(String(20), nullable=False)
+    account_name = Column(String(200), default='')
+    times_used = Column(Integer, default=0)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'direction', 'tokens', 'counterparty', 'amount_band', 'account_code',
+                            name='uq_mapping_memory_signature_account'),
+        db.Index('idx_mapping_memory_tokens', 'company_id', 'direction', 'tokens'),
+        db.Index('idx_mapping_memory_counterparty', 'company_id', 'direction', 'counterparty'),
+    )
+
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
     
@@ -444,6 +839,11 @@ class AuditLog(db.Model):
     
     # Relationships
     user = relationship("User")
+    
+    __table_args__ = (
+        db.Index('idx_audit_logs_timestamp', 'timestamp'),
+        db.Index('idx_audit_logs_user_timestamp', 'user_id', 'timestamp'),
+    )
 
 class GSTRecord(db.Model):
     __tablename__ = 'gst_records'
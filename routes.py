@@ -6,7 +6,7 @@ import logging
 import json
 from datetime import datetime, timedelta
 from app import db
-from models import User, UploadedFile, ProcessingResult, JournalEntry, Invoice, InventoryItem, AuditLog, GSTRecord, FinancialReport, Company, UserCompanyAccess, UserCategory
+from models import User, UploadedFile, ProcessingResult, JournalEntry, Invoice, InventoryItem, AuditLog, GSTRecord, FinancialReport, Company, UserCompanyAccess, UserCategory, ReportRenderJob
 from services.file_processor import FileProcessor
 from services.accounting_engine import AccountingEngine
 from services.report_generator import ReportGenerator
@@ -17,9 +17,14 @@ from openpyxl import Workbook
 from services.automated_accounting_engine import AutomatedAccountingEngine
 from services.bank_reconciliation_engine import BankReconciliationEngine
 from services.bank_reconciliation_service import BankReconciliationService
+from services.mapping_memory import MappingMemory
 from services.manual_journal_service import ManualJournalService
 from services.manual_journal_integration import ManualJournalIntegrationService
 from services.report_export_service import ReportExportService
+from services.parsed_dataset_cache import ParsedDatasetCache
+from services.report_cache import ReportCache, parameters_digest
+from services.report_render_service import ReportRenderService, ExpiredDownloadToken
+from services.upload_pipeline_service import UploadPipelineService
 from validation_dashboard import ValidationDashboard
 from services.kyc_template_service import (
     create_kyc_mapped_excel_templates,
@@ -333,6 +338,9 @@ def process_file():
             db.session.add(audit_entry)
             db.session.commit()
             
+            # Hand validation to the pipeline workers; the request returns immediately
+            UploadPipelineService().enqueue_validation(uploaded_file)
+            
             flash('File uploaded successfully to secure cloud storage! Processing will begin shortly.', 'success')
             return redirect(url_for('main.validate_data', file_id=uploaded_file.id))
             
@@ -354,21 +362,24 @@ def validate_data(file_id):
         flash('Access denied.', 'error')
         return redirect(url_for('main.dashboard'))
     
-    # Validate the file
+    # Validation runs in the pipeline workers; this view only queues it and shows the outcome
     try:
-        validator = ValidationEngine()
-        validation_result = validator.validate_file(uploaded_file.file_path)
+        pipeline = UploadPipelineService()
+        job = pipeline.latest_job(uploaded_file, 'validate')
+        
+        if job is None or (job.status == 'failed' and request.args.get('retry')):
+            job = pipeline.enqueue_validation(uploaded_file)
+        
+        if job.status != 'succeeded':
+            return render_template('pipeline_progress.html', uploaded_file=uploaded_file, job=job,
+                                   stage_title='Data Validation')
         
-        if validation_result['is_valid']:
-            uploaded_file.status = 'validated'
+        validation_result = pipeline.job_result(job) or {}
+        if validation_result.get('is_valid'):
             flash('File validation successful!', 'success')
         else:
-            uploaded_file.status = 'validation_error'
-            uploaded_file.validation_errors = str(validation_result['errors'])
             flash('File validation failed. Please check the errors below.', 'error')
         
-        db.session.commit()
-        
         return render_template('data_validation.html', 
                              uploaded_file=uploaded_file, 
                              validation_result=validation_result)
@@ -388,44 +399,30 @@ def process_accounting(file_id):
         flash('Access denied.', 'error')
         return redirect(url_for('main.dashboard'))
     
-    if uploaded_file.status != 'validated':
+    if uploaded_file.status == 'processed':
+        flash('File processed successfully!', 'success')
+        return redirect(url_for('main.generate_reports', file_id=file_id))
+    
+    if uploaded_file.status not in ('validated', 'processing', 'processing_error'):
         flash('File must be validated before processing.', 'error')
         return redirect(url_for('main.validate_data', file_id=file_id))
     
     try:
-        # Process the file
-        processor = FileProcessor()
-        accounting_engine = AccountingEngine()
-        
-        # Extract data from file
-        data = processor.extract_data(uploaded_file.file_path)
-        
-        # Process accounting entries
-        processing_result = accounting_engine.process_entries(data)
-        
-        # Update file status
-        uploaded_file.status = 'processed'
-        uploaded_file.processed_at = datetime.utcnow()
-        
-        # Create processing result record
-        result = ProcessingResult(
-            uploaded_file_id=uploaded_file.id,
-            total_records=processing_result['total_records'],
-            processed_records=processing_result['processed_records'],
-            error_records=processing_result['error_records'],
-            processing_log=str(processing_result['log'])
-        )
+        pipeline = UploadPipelineService()
+        if uploaded_file.status == 'validated':
+            job = pipeline.enqueue_processing(uploaded_file)
+        else:
+            job = pipeline.latest_job(uploaded_file, 'process')
         
-        db.session.add(result)
-        db.session.commit()
+        if job is None:
+            flash('File processing failed. Please try again.', 'error')
+            return redirect(url_for('main.dashboard'))
         
-        flash('File processed successfully!', 'success')
-        return redirect(url_for('main.generate_reports', file_id=file_id))
+        return render_template('pipeline_progress.html', uploaded_file=uploaded_file, job=job,
+                               stage_title='Accounting Processing')
         
     except Exception as e:
         logging.error(f"File processing error: {str(e)}")
-        uploaded_file.status = 'processing_error'
-        db.session.commit()
         flash('File processing failed. Please try again.', 'error')
         return redirect(url_for('main.dashboard'))
 
@@ -444,20 +441,26 @@ def generate_reports(file_id):
         return redirect(url_for('main.process_accounting', file_id=file_id))
     
     try:
-        report_generator = ReportGenerator()
+        pipeline = UploadPipelineService()
+        job = pipeline.latest_job(uploaded_file, 'report')
+        
+        if job is None or (job.status == 'failed' and request.args.get('retry')) or request.args.get('refresh'):
+            job = pipeline.enqueue_reports(uploaded_file)
         
-        # Generate all standard reports
-        reports = report_generator.generate_all_reports(file_id)
+        if job.status != 'succeeded':
+            return render_template('pipeline_progress.html', uploaded_file=uploaded_file, job=job,
+                                   stage_title='Report Generation')
         
         return render_template('financial_reports.html', 
                              uploaded_file=uploaded_file, 
-                             reports=reports)
+                             reports=pipeline.job_result(job) or {})
         
     except Exception as e:
         logging.error(f"Report generation error: {str(e)}")
         flash('Report generation failed. Please try again.', 'error')
         return redirect(url_for('main.dashboard'))
 
+
 @main_bp.route('/download-report/<int:report_id>')
 @login_required
 def download_report(report_id):
@@ -484,10 +487,15 @@ def upload_status(file_id):
     if uploaded_file.user_id != current_user.id:
         return jsonify({'error': 'Access denied'}), 403
     
+    pipeline_status = UploadPipelineService().status(uploaded_file)
+    
     return jsonify({
         'status': uploaded_file.status,
         'processed_at': uploaded_file.processed_at.isoformat() if uploaded_file.processed_at else None,
-        'validation_errors': uploaded_file.validation_errors
+        'validation_errors': uploaded_file.validation_errors,
+        'progress': uploaded_file.ingestion_progress.to_dict() if uploaded_file.ingestion_progress else None,
+        'stages': pipeline_status['stages'],
+        'active': pipeline_status['active']
     })
 
 @main_bp.route('/api/dashboard-stats')
@@ -1203,6 +1211,7 @@ def api_map_transaction():
         account_code = data.get('account_code')
         mapping_type = data.get('mapping_type', 'manual')
         notes = data.get('notes', '')
+        bank_account_code = data.get('bank_account_code', '')
         
         if not transaction_id or not account_code:
             return jsonify({'error': 'Transaction ID and account code required'}), 400
@@ -1211,7 +1220,8 @@ def api_map_transaction():
         user_id = current_user.id
         
         bank_engine = BankReconciliationEngine(company_id, user_id)
-        success = bank_engine.create_manual_mapping(transaction_id, account_code, mapping_type, notes)
+        success = bank_engine.create_manual_mapping(transaction_id, account_code, mapping_type, notes,
+                                                  bank_account_code)
         
         if success:
             return jsonify({'success': True, 'message': 'Transaction mapped successfully'})
@@ -1348,8 +1358,19 @@ def api_suggest_mapping():
         if not transaction_id or not description:
             return jsonify({'error': 'Transaction ID and description required'}), 400
         
+        # Earlier manual mappings of similar transactions; a habit is returned as is
+        mapping_memory = MappingMemory(1)  # Default company
+        suggestions = [dict(suggestion, confidence=round(suggestion['confidence'] * 100))
+                       for suggestion in mapping_memory.suggest(description, amount)]
+        if suggestions and suggestions[0]['confidence'] >= mapping_memory.resolve_confidence * 100:
+            return jsonify({
+                'success': True,
+                'suggestions': suggestions,
+                'transaction_id': transaction_id,
+                'resolved_from_memory': True
+            })
+        
         # AI-powered mapping suggestions based on description analysis
-        suggestions = []
         
         # Expense pattern matching
         if 'office' in description or 'supplies' in description or 'staples' in description:
@@ -1457,6 +1478,10 @@ def api_manual_map():
         # 3. Update reconciliation status
         # 4. Send to general ledger
         
+        # Remember the choice for suggestions on similar transactions
+        if data.get('description'):
+            MappingMemory(1).record(data['description'], data.get('amount', 0), account_code)  # Default company
+        
         # For demo purposes, simulate successful mapping
         mapping_result = {
             'mapping_id': f'MAP-{transaction_id}-{account_code}',
@@ -1503,6 +1528,19 @@ def api_mapping_stats():
 @main_bp.route('/api/secure-download/<token>')
 def secure_download(token):
     """Secure file download using signed tokens"""
+    # Rendered reports: token signed by ReportRenderService
+    try:
+        render_job = ReportRenderService().resolve_download_token(token)
+    except ExpiredDownloadToken as e:
+        return jsonify({'error': str(e)}), 403
+    if render_job:
+        return send_file(
+            render_job.file_path,
+            as_attachment=True,
+            download_name=render_job.download_name,
+            mimetype=render_job.mimetype
+        )
+
     try:
         import base64
         import time
@@ -1836,6 +1874,62 @@ def download_accounting_report():
 
 # Duplicate function removed - keeping the first implementation
 
+def _report_company_ids():
+    """Companies whose report jobs the current user may request and follow"""
+    return [company.id for company in current_user.get_accessible_companies()]
+
+@main_bp.route('/api/report-jobs', methods=['POST'])
+@login_required
+def api_request_report_render():
+    """Queue a report for rendering; poll the returned job for progress and the download link"""
+    try:
+        data = request.get_json(silent=True) or {}
+        report_type = data.get('report_type', 'all_reports')
+        format_type = data.get('format', 'excel')
+        company_ids = _report_company_ids()
+        # The first company the user can access unless the request names another
+        company_id = int(data['company_id']) if data.get('company_id') is not None else next(iter(company_ids), None)
+        if company_id not in company_ids:
+            return jsonify({'error': 'You do not have access to this company'}), 403
+
+        parameters = {}
+        if report_type == 'financial_package':
+            parameters['company_info'] = {
+                'company_name': getattr(current_user, 'company_name', 'AccuFin360 Technologies Pvt Ltd'),
+                'address': getattr(current_user, 'address', '123 Business District, Mumbai, Maharashtra 400001'),
+                'phone': getattr(current_user, 'phone', '+91 22 1234 5678'),
+                'email': getattr(current_user, 'email', 'info@accufin360.com'),
+                'reporting_period': 'Financial Year 2024-25',
+                'reporting_date': datetime.now().strftime('%B %d, %Y')
+            }
+
+        render_service = ReportRenderService()
+        job = render_service.request_render(company_id, current_user.id, report_type, format_type, parameters)
+        return jsonify({'success': True, 'job': render_service.status(job)}), 202
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Error queueing report: {str(e)}'}), 500
+
+@main_bp.route('/api/report-jobs/<int:job_id>')
+@login_required
+def api_report_render_status(job_id):
+    """Progress of a queued report render, with a download link once it is ready"""
+    try:
+        # Identical requests share a job, so any user of the company may follow it
+        job = ReportRenderJob.query.filter(
+            ReportRenderJob.id == job_id,
+            ReportRenderJob.company_id.in_(_report_company_ids())
+        ).first()
+        if not job:
+            return jsonify({'error': 'Report job not found'}), 404
+        return jsonify({'success': True, 'job': ReportRenderService().status(job)})
+
+    except Exception as e:
+        return jsonify({'error': f'Error reading report job: {str(e)}'}), 500
+
 @main_bp.route('/api/automated-accounting/individual-report', methods=['POST'])
 @login_required
 def generate_individual_report():
@@ -1865,7 +1959,7 @@ def generate_individual_report():
             return jsonify({'error': 'Uploaded file not found'}), 404
         
         # Process the file and generate specific report
-        df = pd.read_excel(file_path) if file_path.endswith('.xlsx') else pd.read_csv(file_path)
+        df = ParsedDatasetCache().read(file_path)
         
         # Process transactions first
         accounting_engine.process_transactions(df)
@@ -1928,15 +2022,22 @@ def download_individual_report(report_type, format):
         
         # Generate file based on format
         if format == 'excel':
-            file_path = kyc_service.create_individual_report_excel(report_data, report_type, user_info)
+            create_file = kyc_service.create_individual_report_excel
             mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         elif format == 'pdf':
-            file_path = kyc_service.create_individual_report_pdf(report_data, report_type, user_info)
+            create_file = kyc_service.create_individual_report_pdf
             mimetype = 'application/pdf'
         else:  # word
-            file_path = kyc_service.create_individual_report_word(report_data, report_type, user_info)
+            create_file = kyc_service.create_individual_report_word
             mimetype = 'application/msword'
         
+        # The same report data rendered for the same user is served from the cache
+        file_path = ReportCache().get_file(
+            1, f'individual:{report_type}',
+            lambda: create_file(report_data, report_type, user_info),
+            parameters={'format': format, 'user_id': current_user.id, 'data': parameters_digest(report_data)}
+        )
+        
         filename = f"{report_type}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
         
         return send_file(
@@ -1979,18 +2080,23 @@ def download_report_format(format_type, report_type):
         if format_type not in ['excel', 'word', 'pdf']:
             return jsonify({'error': 'Invalid format type'}), 400
         
-        # Generate report data
-        report_data = report_methods[report_type]()
+        # Generate report data, reused until the next journal change
+        report_cache = ReportCache()
+        report_data = report_cache.get_report(company_id, report_type, report_methods[report_type])
         
         if not report_data:
             return jsonify({'error': 'No data available for report'}), 404
         
         # Export to specified format
-        file_path = export_service.export_report(
-            report_data=report_data,
-            report_name=report_type,
-            format_type=format_type,
-            company_name="F-AI Accountant"
+        file_path = report_cache.get_file(
+            company_id, report_type,
+            lambda: export_service.export_report(
+                report_data=report_data,
+                report_name=report_type,
+                format_type=format_type,
+                company_name="F-AI Accountant"
+            ),
+            parameters={'format': format_type, 'report_name': report_type}
         )
         
         # Determine MIME type based on format
@@ -2024,18 +2130,23 @@ def download_all_reports_format(format_type):
         if format_type not in ['excel', 'word', 'pdf']:
             return jsonify({'error': 'Invalid format type'}), 400
         
-        # Generate all reports
-        all_reports = accounting_engine.generate_all_reports()
+        # Generate all reports, reused until the next journal change
+        report_cache = ReportCache()
+        all_reports = report_cache.get_report(company_id, 'all_reports', accounting_engine.generate_all_reports)
         
         if not all_reports:
             return jsonify({'error': 'No data available for reports'}), 404
         
         # Export to specified format
-        file_path = export_service.export_report(
-            report_data=all_reports,
-            report_name="Complete_Financial_Reports",
-            format_type=format_type,
-            company_name="F-AI Accountant"
+        file_path = report_cache.get_file(
+            company_id, 'all_reports',
+            lambda: export_service.export_report(
+                report_data=all_reports,
+                report_name="Complete_Financial_Reports",
+                format_type=format_type,
+                company_name="F-AI Accountant"
+            ),
+            parameters={'format': format_type, 'report_name': 'Complete_Financial_Reports'}
         )
         
         # Determine MIME type based on format
@@ -1,13 +1,21 @@
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Callable
 from decimal import Decimal, ROUND_HALF_UP
 from app import db
 from models import JournalEntry, ChartOfAccount, Company
+from services.ledger_balance_service import LedgerBalanceService
+from services.journal_bulk_writer import JournalBulkWriter, BulkWriteStats
+
+class UnbalancedJournalError(ValueError):
+    """Raised when a streamed import holds more unbalanced rows than any journal may have"""
 
 class AccountingEngine:
     """Core accounting processing engine with double-entry bookkeeping"""
     
+    MAX_REPORTED_ERRORS = 500  # streaming imports count every error but keep only this many messages
+    MAX_OPEN_JOURNAL_ROWS = 10000  # streaming imports hold at most this many rows of an unbalanced journal
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.company_id = 1  # Default company ID
@@ -36,13 +44,14 @@ class AccountingEngine:
             
             # Save to database if validation passes
             if validation_result['is_valid']:
-                saved_entries = self._save_journal_entries(processed_entries)
+                save_stats = self._save_journal_entries(processed_entries)
                 
                 result = {
                     'total_records': len(entries),
                     'processed_records': len(processed_entries),
                     'error_records': len(errors),
-                    'saved_entries': len(saved_entries),
+                    'saved_entries': save_stats.rows_written,
+                    'rows_per_second': round(save_stats.rows_per_second, 1),
                     'validation_result': validation_result,
                     'errors': errors,
                     'log': f"Successfully processed {len(processed_entries)} entries"
@@ -64,6 +73,114 @@ class AccountingEngine:
             self.logger.error(f"Error in process_entries: {str(e)}")
             raise
     
+    def process_entry_chunks(self, chunks: Iterable[Dict[str, Any]],
+                             progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Validate and post entries chunk by chunk (streaming counterpart of process_entries)
+
+        Each chunk is validated row by row and posted before the next one is pulled
+        from the iterator. A journal may straddle a chunk boundary, so only the longest
+        prefix whose debits and credits net to zero is posted; the open tail is carried
+        into the next chunk. Whatever is still open at the end of the file is rejected.
+
+        An unbalanced row makes every later prefix unbalanced too, so once more than
+        MAX_OPEN_JOURNAL_ROWS rows are open the import stops with UnbalancedJournalError
+        rather than holding the rest of the file in memory. Journals before the
+        offending row have been posted by then.
+
+        Args:
+            chunks: iterable of dicts with 'entries' (see FileProcessor.iter_csv_chunks)
+            progress_callback: called after every chunk with the running counters
+
+        Returns:
+            Same keys as process_entries, errors capped at MAX_REPORTED_ERRORS
+        """
+        progress = {
+            'chunks_completed': 0,
+            'rows_read': 0,
+            'rows_posted': 0,
+            'rows_rejected': 0,
+            'bytes_read': 0,
+            'bytes_total': 0
+        }
+        errors = []
+        carried = []
+        rows_per_second = []
+
+        def record_error(message: str):
+            if len(errors) < self.MAX_REPORTED_ERRORS:
+                errors.append(message)
+
+        try:
+            for chunk in chunks:
+                entries = chunk['entries']
+                progress['rows_read'] += len(entries)
+
+                for entry in entries:
+                    try:
+                        processed_entry = self._process_single_entry(entry)
+                        if processed_entry:
+                            carried.append(processed_entry)
+                    except Exception as e:
+                        progress['rows_rejected'] += 1
+                        record_error(f"Error processing row {entry.get('row_number', 'unknown')}: {str(e)}")
+
+                balanced = self._balanced_prefix_length(carried)
+                if balanced:
+                    save_stats = self._save_journal_entries(carried[:balanced])
+                    progress['rows_posted'] += save_stats.rows_written
+                    rows_per_second.append(save_stats.rows_per_second)
+                    carried = carried[balanced:]
+
+                if len(carried) > self.MAX_OPEN_JOURNAL_ROWS:
+                    raise UnbalancedJournalError(
+                        f"Rows {carried[0].get('row_number', 'unknown')} to {carried[-1].get('row_number', 'unknown')} "
+                        f"do not balance within {self.MAX_OPEN_JOURNAL_ROWS} rows; import stopped after posting "
+                        f"{progress['rows_posted']} rows. Fix the journal starting at row "
+                        f"{carried[0].get('row_number', 'unknown')} and upload the remaining rows."
+                    )
+
+                progress['chunks_completed'] += 1
+                progress['bytes_read'] = chunk.get('bytes_read', progress['bytes_read'])
+                progress['bytes_total'] = chunk.get('bytes_total', progress['bytes_total'])
+                if progress_callback:
+                    progress_callback(dict(progress))
+
+            if carried:
+                progress['rows_rejected'] += len(carried)
+                validation_result = self._validate_double_entry(carried)
+                record_error(f"{len(carried)} entries from row {carried[0].get('row_number', 'unknown')} onwards "
+                             f"were not posted: " + '; '.join(validation_result['errors']))
+
+            self.logger.info(f"Streamed {progress['rows_read']} rows in {progress['chunks_completed']} chunks: "
+                             f"{progress['rows_posted']} posted, {progress['rows_rejected']} rejected")
+
+            return {
+                'total_records': progress['rows_read'],
+                'processed_records': progress['rows_posted'],
+                'error_records': progress['rows_rejected'],
+                'saved_entries': progress['rows_posted'],
+                'rows_per_second': round(sum(rows_per_second) / len(rows_per_second), 1) if rows_per_second else 0.0,
+                'chunks_completed': progress['chunks_completed'],
+                'errors': errors,
+                'log': f"Streamed {progress['rows_posted']} entries in {progress['chunks_completed']} chunks"
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error in process_entry_chunks: {str(e)}")
+            raise
+
+    @staticmethod
+    def _balanced_prefix_length(entries: List[Dict[str, Any]]) -> int:
+        """Length of the longest prefix whose debits equal its credits"""
+        running_balance = Decimal('0.00')
+        balanced = 0
+        for index, entry in enumerate(entries, start=1):
+            running_balance += entry['debit_amount'] - entry['credit_amount']
+            if running_balance == 0:
+                balanced = index
+        return balanced
+
     def _process_single_entry(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Process a single accounting entry"""
         try:
@@ -234,62 +351,40 @@ class AccountingEngine:
                 'entry_count': len(entries)
             }
     
-    def _save_journal_entries(self, entries: List[Dict[str, Any]]) -> List[JournalEntry]:
-        """Save journal entries to database"""
+    def _save_journal_entries(self, entries: List[Dict[str, Any]]) -> BulkWriteStats:
+        """Save journal entries to database in bulk"""
         try:
-            saved_entries = []
+            lines = [
+                {
+                    'account_code': entry['account'],
+                    'account_name': entry['account'],
+                    'account_type': 'Assets',  # Default type for new accounts
+                    'entry_date': entry['entry_date'],
+                    'description': entry['description'],
+                    'reference_number': entry['reference_number'],
+                    'debit_amount': float(entry['debit_amount']),
+                    'credit_amount': float(entry['credit_amount']),
+                    'currency': 'USD',
+                    'is_posted': True,
+                    'source_type': 'import'
+                }
+                for entry in entries
+            ]
             
-            for entry in entries:
-                # Get or create account
-                account = self._get_or_create_account(entry['account'])
-                
-                journal_entry = JournalEntry(
-                    company_id=self.company_id,
-                    account_id=account.id,
-                    created_by=1,  # TODO: Get from current user
-                    entry_date=entry['entry_date'],
-                    description=entry['description'],
-                    reference_number=entry['reference_number'],
-                    debit_amount=float(entry['debit_amount']),
-                    credit_amount=float(entry['credit_amount']),
-                    currency='USD',
-                    is_posted=True
-                )
-                
-                db.session.add(journal_entry)
-                saved_entries.append(journal_entry)
+            # One account lookup, one batch insert; period balances follow in the same transaction
+            stats = JournalBulkWriter(self.company_id, user_id=1).write_lines(lines)  # TODO: Get from current user
             
             db.session.commit()
             
-            self.logger.info(f"Successfully saved {len(saved_entries)} journal entries")
-            return saved_entries
+            self.logger.info(f"Successfully saved {stats.rows_written} journal entries "
+                             f"({stats.rows_per_second:,.0f} rows/sec)")
+            return stats
             
         except Exception as e:
             db.session.rollback()
             self.logger.error(f"Error saving journal entries: {str(e)}")
             raise
     
-    def _get_or_create_account(self, account_code: str) -> ChartOfAccount:
-        """Get existing account or create new one"""
-        account = ChartOfAccount.query.filter_by(
-            account_code=account_code,
-            company_id=self.company_id
-        ).first()
-        
-        if not account:
-            # Create new account
-            account = ChartOfAccount(
-                company_id=self.company_id,
-                account_code=account_code,
-                account_name=account_code,
-                account_type='Assets',  # Default type
-                is_active=True
-            )
-            db.session.add(account)
-            db.session.flush()  # Get ID without committing
-        
-        return account
-    
     def _get_default_accounts(self) -> Dict[str, str]:
         """Get default account mappings"""
         return {
@@ -315,30 +410,18 @@ class AccountingEngine:
             if not date_to:
                 date_to = datetime.now()
             
-            # Get all journal entries in date range
-            entries = JournalEntry.query.filter(
-                JournalEntry.entry_date >= date_from,
-                JournalEntry.entry_date <= date_to,
-                JournalEntry.is_posted == True
-            ).all()
+            # Per-account totals from the period balance table
+            account_totals = LedgerBalanceService(self.company_id).get_account_totals(date_from, date_to)
             
-            # Calculate balances by account
             account_balances = {}
-            for entry in entries:
-                account_code = entry.account.account_code
-                account_name = entry.account.account_name
-                
-                if account_code not in account_balances:
-                    account_balances[account_code] = {
-                        'account_code': account_code,
-                        'account_name': account_name,
-                        'debit_total': 0.0,
-                        'credit_total': 0.0,
-                        'balance': 0.0
-                    }
-                
-                account_balances[account_code]['debit_total'] += entry.debit_amount
-                account_balances[account_code]['credit_total'] += entry.credit_amount
+            for totals in sorted(account_totals.values(), key=lambda t: t['account_code'] or ''):
+                account_balances[totals['account_code']] = {
+                    'account_code': totals['account_code'],
+                    'account_name': totals['account_name'],
+                    'debit_total': totals['debit_total'],
+                    'credit_total': totals['credit_total'],
+                    'balance': 0.0
+                }
             
             # Calculate net balances
             total_debits = 0.0
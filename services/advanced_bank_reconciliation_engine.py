@@ -4,6 +4,7 @@ Professional-grade bank reconciliation with automatic invoice mapping and intell
 """
 
 import pandas as pd
+import numpy as np
 import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any
@@ -12,6 +13,12 @@ import logging
 from dataclasses import dataclass
 from enum import Enum
 
+from services.reconciliation_candidate_index import CandidateBlockingIndex
+from services.reconciliation_description_index import DescriptionIndex
+from services.party_name_store import PartyNameStore
+from services.reconciliation_assignment import SparseScoreMatrix, solve_assignment
+from services.reconciliation_score_matrix import to_datetime64, day_difference
+
 class MatchConfidence(Enum):
     PERFECT = "PERFECT"
     HIGH = "HIGH"
@@ -61,12 +68,16 @@ class AdvancedBankReconciliationEngine:
     Advanced bank reconciliation engine with professional invoice mapping capabilities
     """
     
+    GST_RATES = [0.18, 0.12, 0.05, 0.28]  # Common GST rates
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.bank_transactions: List[BankTransaction] = []
         self.invoices: List[Invoice] = []
         self.matches: List[TransactionMatch] = []
         self.reconciliation_summary = {}
+        self.description_index = DescriptionIndex([])
+        self.party_store = PartyNameStore()
         
         # Professional mapping weights
         self.mapping_weights = {
@@ -77,6 +88,11 @@ class AdvancedBankReconciliationEngine:
             'description_similarity': 0.05
         }
         
+        # 'global' assigns invoices one-to-one across the whole statement; 'greedy' lets
+        # each transaction take its best unmatched invoice in statement order
+        self.assignment_mode = 'global'
+        self.matching_stats = {}
+        
         # Account mapping rules
         self.account_mapping_rules = {
             'sales_receipt': '1100',  # Bank Account (Asset)
@@ -133,6 +149,7 @@ class AdvancedBankReconciliationEngine:
                 )
                 self.invoices.append(invoice)
             
+            self.description_index = DescriptionIndex([invoice.description for invoice in self.invoices])
             self.logger.info(f"Loaded {len(self.invoices)} invoices")
             return True
             
@@ -142,48 +159,39 @@ class AdvancedBankReconciliationEngine:
     
     def calculate_amount_match_score(self, bank_amount: float, invoice_amount: float) -> float:
         """Calculate amount matching score with GST consideration"""
-        # Direct amount match
-        if abs(bank_amount - invoice_amount) < 0.01:
-            return 1.0
-        
-        # Check for GST inclusive/exclusive matching
-        gst_rates = [0.18, 0.12, 0.05, 0.28]  # Common GST rates
-        
-        for rate in gst_rates:
-            # Bank amount might be GST inclusive
-            gst_exclusive = bank_amount / (1 + rate)
-            if abs(gst_exclusive - invoice_amount) < 0.01:
-                return 0.95
-            
-            # Invoice amount might be GST exclusive
-            gst_inclusive = invoice_amount * (1 + rate)
-            if abs(bank_amount - gst_inclusive) < 0.01:
-                return 0.95
+        return float(self.calculate_amount_match_scores(np.array([bank_amount]), np.array([invoice_amount]))[0])
+    
+    def calculate_amount_match_scores(self, bank_amounts: np.ndarray, invoice_amounts: np.ndarray) -> np.ndarray:
+        """Amount matching scores for many pairs at once (element-wise over the two arrays)"""
+        difference = np.abs(bank_amounts - invoice_amounts)
         
         # Percentage difference calculation
-        max_amount = max(abs(bank_amount), abs(invoice_amount))
-        if max_amount > 0:
-            difference_percent = abs(bank_amount - invoice_amount) / max_amount
-            return max(0, 1 - difference_percent)
+        max_amount = np.maximum(np.abs(bank_amounts), np.abs(invoice_amounts))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = np.where(max_amount > 0, np.maximum(0, 1 - difference / max_amount), 0.0)
         
-        return 0.0
+        # GST inclusive/exclusive matching: either side may include the tax
+        gst_match = np.zeros(len(difference), dtype=bool)
+        for rate in self.GST_RATES:
+            gst_match |= np.abs(bank_amounts / (1 + rate) - invoice_amounts) < 0.01
+            gst_match |= np.abs(bank_amounts - invoice_amounts * (1 + rate)) < 0.01
+        scores = np.where(gst_match, 0.95, scores)
+        
+        # Direct amount match
+        return np.where(difference < 0.01, 1.0, scores)
     
     def calculate_date_proximity_score(self, bank_date: datetime, invoice_date: datetime) -> float:
         """Calculate date proximity score"""
-        days_diff = abs((bank_date - invoice_date).days)
-        
-        if days_diff == 0:
-            return 1.0
-        elif days_diff <= 3:
-            return 0.9
-        elif days_diff <= 7:
-            return 0.7
-        elif days_diff <= 15:
-            return 0.5
-        elif days_diff <= 30:
-            return 0.3
-        else:
-            return 0.1
+        return float(self.calculate_date_proximity_scores(to_datetime64([bank_date]), to_datetime64([invoice_date]))[0])
+    
+    def calculate_date_proximity_scores(self, bank_dates: np.ndarray, invoice_dates: np.ndarray) -> np.ndarray:
+        """Date proximity scores for many pairs at once (datetime64 arrays)"""
+        days_diff = np.abs(day_difference(bank_dates, invoice_dates))
+        return np.select(
+            [days_diff == 0, days_diff <= 3, days_diff <= 7, days_diff <= 15, days_diff <= 30],
+            [1.0, 0.9, 0.7, 0.5, 0.3],
+            0.1
+        )
     
     def calculate_reference_match_score(self, bank_ref: str, invoice_number: str) -> float:
         """Calculate reference matching score"""
@@ -215,114 +223,144 @@ class AdvancedBankReconciliationEngine:
         if not bank_desc or not party_name:
             return 0.0
         
-        # Clean names
-        bank_desc_clean = re.sub(r'[^a-zA-Z0-9\s]', '', bank_desc.upper())
-        party_clean = re.sub(r'[^a-zA-Z0-9\s]', '', party_name.upper())
-        
-        # Split into words
-        bank_words = set(bank_desc_clean.split())
-        party_words = set(party_clean.split())
-        
-        # Remove common words
-        common_words = {'LTD', 'LIMITED', 'PVT', 'PRIVATE', 'CO', 'COMPANY', 'INC', 'INCORPORATED'}
-        bank_words -= common_words
-        party_words -= common_words
-        
-        if not party_words:
-            return 0.0
-        
-        # Calculate word matching percentage
-        matching_words = bank_words & party_words
-        return len(matching_words) / len(party_words)
+        # Share of the name's words (legal suffixes removed) present in the description
+        return self.party_store.party_match(bank_desc, party_name).core_words
     
     def calculate_description_similarity(self, bank_desc: str, invoice_desc: str) -> float:
-        """Calculate description similarity score"""
+        """TF-IDF cosine similarity of the descriptions, weighted by the loaded invoices' vocabulary"""
         if not bank_desc or not invoice_desc:
             return 0.0
         
-        # Common business transaction keywords
-        keywords = ['SOFTWARE', 'DEVELOPMENT', 'SERVICES', 'PAYMENT', 'INVOICE', 
-                   'CONSULTING', 'DESIGN', 'MARKETING', 'OFFICE', 'SUPPLIES']
-        
-        bank_desc_upper = bank_desc.upper()
-        invoice_desc_upper = invoice_desc.upper()
-        
-        matching_keywords = 0
-        for keyword in keywords:
-            if keyword in bank_desc_upper and keyword in invoice_desc_upper:
-                matching_keywords += 1
+        return self.description_index.similarity(bank_desc, invoice_desc)
+    
+    def score_match(self, bank_transaction: BankTransaction, invoice: Invoice) -> Tuple[float, Dict[str, float]]:
+        """Weighted score and per-factor scores for one bank transaction / invoice pair"""
+        return self.score_pairs([(bank_transaction, invoice)])[0]
+    
+    def score_pairs(self, pairs: List[Tuple[BankTransaction, Invoice]]) -> List[Tuple[float, Dict[str, float]]]:
+        """
+        Weighted scores for many (bank transaction, invoice) pairs
+        
+        Amount and date scores are computed for all pairs in one vectorized pass;
+        only the reference, party and description factors are scored per pair.
+        """
+        amount_scores = self.calculate_amount_match_scores(
+            np.array([abs(bank_transaction.amount) for bank_transaction, _ in pairs], dtype=float),
+            np.array([invoice.amount for _, invoice in pairs], dtype=float)
+        )
+        date_scores = self.calculate_date_proximity_scores(
+            to_datetime64([bank_transaction.date for bank_transaction, _ in pairs]),
+            to_datetime64([invoice.date for _, invoice in pairs])
+        )
+        
+        scored = []
+        for (bank_transaction, invoice), amount_score, date_score in zip(pairs, amount_scores.tolist(), date_scores.tolist()):
+            factors = {
+                'amount_match': amount_score,
+                'date_proximity': date_score,
+                'reference_match': self.calculate_reference_match_score(
+                    bank_transaction.reference, invoice.invoice_number
+                ),
+                'party_name_match': self.calculate_party_name_match_score(
+                    bank_transaction.description, invoice.party_name
+                ),
+                'description_similarity': self.calculate_description_similarity(
+                    bank_transaction.description, invoice.description
+                )
+            }
+            
+            # Calculate weighted total score
+            total_score = sum(score * self.mapping_weights[factor] for factor, score in factors.items())
+            scored.append((total_score, factors))
         
-        return matching_keywords / len(keywords) if keywords else 0.0
+        return scored
+    
+    @staticmethod
+    def confidence_level_for(total_score: float) -> MatchConfidence:
+        if total_score >= 0.95:
+            return MatchConfidence.PERFECT
+        elif total_score >= 0.80:
+            return MatchConfidence.HIGH
+        elif total_score >= 0.60:
+            return MatchConfidence.MODERATE
+        elif total_score >= 0.40:
+            return MatchConfidence.LOW
+        return MatchConfidence.UNMAPPED
+    
+    def build_match(self, bank_transaction: BankTransaction, invoice: Invoice,
+                    total_score: float, factors: Dict[str, float]) -> TransactionMatch:
+        return TransactionMatch(
+            bank_transaction_id=bank_transaction.transaction_id,
+            invoice_id=invoice.invoice_id,
+            confidence_level=self.confidence_level_for(total_score),
+            confidence_score=total_score,
+            mapping_factors=factors,
+            manual_review_required=total_score < 0.80,
+            suggested_account=self.get_suggested_account(bank_transaction, invoice),
+            notes=f"Auto-mapped with {total_score:.2%} confidence"
+        )
     
     def find_best_match(self, bank_transaction: BankTransaction) -> Optional[TransactionMatch]:
         """Find the best matching invoice for a bank transaction"""
         best_match = None
         best_score = 0.0
         
-        for invoice in self.invoices:
-            if invoice.matched:
-                continue
-            
-            # Calculate individual factor scores
-            amount_score = self.calculate_amount_match_score(
-                abs(bank_transaction.amount), invoice.amount
-            )
-            date_score = self.calculate_date_proximity_score(
-                bank_transaction.date, invoice.date
-            )
-            reference_score = self.calculate_reference_match_score(
-                bank_transaction.reference, invoice.invoice_number
-            )
-            party_score = self.calculate_party_name_match_score(
-                bank_transaction.description, invoice.party_name
-            )
-            description_score = self.calculate_description_similarity(
-                bank_transaction.description, invoice.description
-            )
-            
-            # Calculate weighted total score
-            total_score = (
-                amount_score * self.mapping_weights['amount_match'] +
-                date_score * self.mapping_weights['date_proximity'] +
-                reference_score * self.mapping_weights['reference_match'] +
-                party_score * self.mapping_weights['party_name_match'] +
-                description_score * self.mapping_weights['description_similarity']
-            )
-            
+        open_invoices = [invoice for invoice in self.invoices if not invoice.matched]
+        scored = self.score_pairs([(bank_transaction, invoice) for invoice in open_invoices])
+        
+        for invoice, (total_score, factors) in zip(open_invoices, scored):
             if total_score > best_score:
                 best_score = total_score
-                
-                # Determine confidence level
-                if total_score >= 0.95:
-                    confidence_level = MatchConfidence.PERFECT
-                elif total_score >= 0.80:
-                    confidence_level = MatchConfidence.HIGH
-                elif total_score >= 0.60:
-                    confidence_level = MatchConfidence.MODERATE
-                elif total_score >= 0.40:
-                    confidence_level = MatchConfidence.LOW
-                else:
-                    confidence_level = MatchConfidence.UNMAPPED
-                
-                best_match = TransactionMatch(
-                    bank_transaction_id=bank_transaction.transaction_id,
-                    invoice_id=invoice.invoice_id,
-                    confidence_level=confidence_level,
-                    confidence_score=total_score,
-                    mapping_factors={
-                        'amount_match': amount_score,
-                        'date_proximity': date_score,
-                        'reference_match': reference_score,
-                        'party_name_match': party_score,
-                        'description_similarity': description_score
-                    },
-                    manual_review_required=total_score < 0.80,
-                    suggested_account=self.get_suggested_account(bank_transaction, invoice),
-                    notes=f"Auto-mapped with {total_score:.2%} confidence"
-                )
+                best_match = self.build_match(bank_transaction, invoice, total_score, factors)
         
         return best_match
     
+    def find_assigned_matches(self) -> Dict[str, TransactionMatch]:
+        """
+        Best one-to-one pairing of unmatched transactions and invoices
+        
+        Candidates are blocked by amount (including the GST-inclusive and exclusive
+        amounts) and by invoice number / party tokens, scored, and solved as a
+        maximum-weight assignment over pairs of at least LOW confidence.
+        """
+        open_invoices = [invoice for invoice in self.invoices if not invoice.matched]
+        index = CandidateBlockingIndex([
+            {'amount': invoice.amount, 'date': invoice.date, 'invoice_number': invoice.invoice_number,
+             'party_name': invoice.party_name}
+            for invoice in open_invoices
+        ], amount_ratios=[1.0] + [1 / (1 + rate) for rate in self.GST_RATES])
+        
+        candidate_pairs = []
+        for bank_transaction in self.bank_transactions:
+            if bank_transaction.matched:
+                continue
+            text = f"{bank_transaction.description} {bank_transaction.reference}"
+            for position in index.candidates(abs(bank_transaction.amount), bank_transaction.date, text):
+                candidate_pairs.append((bank_transaction, position))
+        
+        scores = SparseScoreMatrix()
+        scored = {}
+        pair_scores = self.score_pairs([(bank_transaction, open_invoices[position])
+                                        for bank_transaction, position in candidate_pairs])
+        for (bank_transaction, position), (total_score, factors) in zip(candidate_pairs, pair_scores):
+            scores.add(bank_transaction.transaction_id, position, total_score)
+            scored[(bank_transaction.transaction_id, position)] = factors
+        
+        assignment = solve_assignment(scores, min_score=0.40)
+        transactions = {bt.transaction_id: bt for bt in self.bank_transactions}
+        
+        self.matching_stats = {
+            'blocking': index.stats.to_dict(),
+            'scored_pairs': len(scores),
+            'assigned': len(assignment)
+        }
+        
+        return {
+            transaction_id: self.build_match(transactions[transaction_id], open_invoices[position],
+                                             total_score, scored[(transaction_id, position)])
+            for transaction_id, (position, total_score) in assignment.items()
+        }
+    
     def get_suggested_account(self, bank_transaction: BankTransaction, invoice: Invoice) -> str:
         """Get suggested account code based on transaction type"""
         if bank_transaction.transaction_type == 'credit':
@@ -345,11 +383,16 @@ class AdvancedBankReconciliationEngine:
             'unmapped_transactions': []
         }
         
+        assigned = self.find_assigned_matches() if self.assignment_mode == 'global' else None
+        
         for bank_transaction in self.bank_transactions:
             if bank_transaction.matched:
                 continue
             
-            best_match = self.find_best_match(bank_transaction)
+            if assigned is not None:
+                best_match = assigned.get(bank_transaction.transaction_id)
+            else:
+                best_match = self.find_best_match(bank_transaction)
             
             if best_match:
                 if best_match.confidence_level in [MatchConfidence.PERFECT, MatchConfidence.HIGH]:
@@ -18,6 +18,8 @@ import os
 import json
 from collections import defaultdict
 
+from services.invoice_reference_scanner import InvoiceReferenceScanner, PatternScanner
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -117,6 +119,11 @@ class ARAPManagementService:
         self.customers = {}
         self.reconciliation_rules = []
         
+        # Open invoice numbers and party names, scanned for in bank narrations
+        self.reference_scanner = InvoiceReferenceScanner()
+        self.party_scanner = PatternScanner()
+        self._invoice_order = {}
+        
         # AI Configuration
         self.ai_categorization_enabled = True
         self.fraud_detection_enabled = True
@@ -685,6 +692,7 @@ class ARAPManagementService:
         try:
             matched_payments = []
             unmatched_transactions = []
+            self._sync_reference_scanners()
             
             for transaction in bank_transactions:
                 # Try to match with outstanding invoices
@@ -712,26 +720,40 @@ class ARAPManagementService:
             logger.error(f"Error in bank reconciliation integration: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def _sync_reference_scanners(self):
+        """Index the invoice numbers and party names of every open invoice"""
+        open_invoices = {invoice_id: invoice for invoice_id, invoice in self.invoices.items()
+                         if invoice.outstanding_amount != 0}
+        self.reference_scanner.sync({invoice_id: invoice.invoice_number
+                                     for invoice_id, invoice in open_invoices.items()})
+        self.party_scanner.sync({invoice_id: invoice.party_name
+                                 for invoice_id, invoice in open_invoices.items()})
+        self._invoice_order = {invoice_id: position for position, invoice_id in enumerate(self.invoices)}
+    
     def _match_transaction_to_invoice(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
         """Match bank transaction to outstanding invoice"""
         transaction_amount = abs(float(transaction.get('amount', 0)))
-        transaction_desc = transaction.get('description', '').lower()
+        transaction_desc = transaction.get('description', '')
+        
+        if len(self._invoice_order) != len(self.invoices):
+            self._sync_reference_scanners()
+        
+        # Only invoices whose number or party the narration mentions
+        mentioned = set(self.reference_scanner.scan(transaction_desc))
+        mentioned.update(self.party_scanner.scan(transaction_desc))
         
-        # Search for matching invoices
-        for invoice in self.invoices.values():
-            if invoice.outstanding_amount == 0:
+        for invoice_id in sorted(mentioned, key=lambda key: self._invoice_order.get(key, len(self._invoice_order))):
+            invoice = self.invoices.get(invoice_id)
+            if invoice is None or invoice.outstanding_amount == 0:
                 continue
             
             # Amount matching
             if abs(float(invoice.outstanding_amount) - transaction_amount) < 0.01:
-                # Check description matching
-                if (invoice.invoice_number.lower() in transaction_desc or
-                    invoice.party_name.lower() in transaction_desc):
-                    return {
-                        'matched': True,
-                        'invoice': invoice,
-                        'confidence': 0.95
-                    }
+                return {
+                    'matched': True,
+                    'invoice': invoice,
+                    'confidence': 0.95
+                }
         
         return {'matched': False}
     
@@ -757,6 +779,8 @@ class ARAPManagementService:
         
         if invoice.outstanding_amount <= 0:
             invoice.status = InvoiceStatus.PAID
+            self.reference_scanner.remove(invoice.invoice_id)
+            self.party_scanner.remove(invoice.invoice_id)
         else:
             invoice.status = InvoiceStatus.PARTIALLY_PAID
         
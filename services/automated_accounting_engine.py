@@ -13,12 +13,18 @@ from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from enum import Enum
 import uuid
+import time
 
 from app import db
 from models import *
 from services.validation_engine import ValidationEngine
 from services.report_generator import ReportGenerator
 from services.mis_report_service import MISReportService
+from services.ledger_balance_service import LedgerBalanceService
+from services.ledger_query_service import LedgerQueryService
+from services.ledger_aggregate import LedgerAggregate
+from services.journal_bulk_writer import JournalBulkWriter
+from services.parsed_dataset_cache import ParsedDatasetCache
 from utils.template_generator import TemplateGenerator
 
 # Configure logging
@@ -445,8 +451,8 @@ class AutomatedAccountingEngine:
         try:
             logger.info(f"Processing template file: {file_path}, Type: {template_type}")
             
-            # Read and validate template
-            df = pd.read_excel(file_path) if file_path.endswith('.xlsx') else pd.read_csv(file_path)
+            # Read and validate template (parsed once per upload)
+            df = ParsedDatasetCache().read(file_path)
             
             # Validate template structure
             validation_result = self._validate_template_structure(df, template_type)
@@ -474,14 +480,17 @@ class AutomatedAccountingEngine:
             reports = self._generate_all_reports(journal_entries)
             
             # Save to database
-            self._save_journal_entries(journal_entries)
+            save_stats = self._save_journal_entries(journal_entries)
             
             return ProcessingResult(
                 success=True,
                 total_entries=len(journal_entries),
                 journal_entries=journal_entries,
                 validation_errors=[],
-                processing_log=["Processing completed successfully"],
+                processing_log=[
+                    "Processing completed successfully",
+                    f"Saved {save_stats.rows_written} journal lines ({save_stats.rows_per_second:,.0f} rows/sec)"
+                ],
                 generated_reports=reports,
                 balance_verification=balance_check
             )
@@ -525,7 +534,27 @@ class AutomatedAccountingEngine:
         return {"valid": True, "errors": []}
     
     def _process_merged_template(self, df: pd.DataFrame) -> List[AccountingEntry]:
-        """Process merged template with multiple transaction types"""
+        """Process merged template with multiple transaction types (column-wise per type)"""
+        from services.columnar_journal_builder import ColumnarJournalBuilder
+        
+        try:
+            return ColumnarJournalBuilder(self).build(df, "merged")
+        except Exception as e:
+            logger.error(f"Columnar conversion failed, falling back to row-wise processing: {str(e)}")
+            return self._process_merged_template_rows(df)
+    
+    def _process_specific_template(self, df: pd.DataFrame, template_type: str) -> List[AccountingEntry]:
+        """Process specific template type (column-wise)"""
+        from services.columnar_journal_builder import ColumnarJournalBuilder
+        
+        try:
+            return ColumnarJournalBuilder(self).build(df, template_type)
+        except Exception as e:
+            logger.error(f"Columnar conversion failed, falling back to row-wise processing: {str(e)}")
+            return self._process_specific_template_rows(df, template_type)
+    
+    def _process_merged_template_rows(self, df: pd.DataFrame) -> List[AccountingEntry]:
+        """Row-wise reference implementation of merged template processing"""
         journal_entries = []
         
         for _, row in df.iterrows():
@@ -555,8 +584,8 @@ class AutomatedAccountingEngine:
         
         return journal_entries
     
-    def _process_specific_template(self, df: pd.DataFrame, template_type: str) -> List[AccountingEntry]:
-        """Process specific template type"""
+    def _process_specific_template_rows(self, df: pd.DataFrame, template_type: str) -> List[AccountingEntry]:
+        """Row-wise reference implementation of specific template processing"""
         journal_entries = []
         
         for _, row in df.iterrows():
@@ -1376,41 +1405,29 @@ class AutomatedAccountingEngine:
         return output_path
     
     def _save_journal_entries(self, journal_entries: List[AccountingEntry]):
-        """Save journal entries to database"""
+        """Save journal entries to database in bulk"""
         try:
-            for entry in journal_entries:
-                # Find or create account
-                account = ChartOfAccount.query.filter_by(
-                    company_id=self.company_id,
-                    account_code=entry.account_code
-                ).first()
-                
-                if not account:
-                    account = ChartOfAccount(
-                        company_id=self.company_id,
-                        account_code=entry.account_code,
-                        account_name=entry.account_name,
-                        account_type=entry.transaction_type.value
-                    )
-                    db.session.add(account)
-                    db.session.flush()
-                
-                # Create journal entry
-                journal_entry = JournalEntry(
-                    company_id=self.company_id,
-                    account_id=account.id,
-                    created_by=self.user_id,
-                    entry_date=entry.transaction_date,
-                    description=entry.description,
-                    reference_number=entry.reference,
-                    debit_amount=float(entry.debit_amount),
-                    credit_amount=float(entry.credit_amount),
-                    is_posted=True
-                )
-                db.session.add(journal_entry)
+            lines = [
+                {
+                    'account_code': entry.account_code,
+                    'account_name': entry.account_name,
+                    'account_type': entry.transaction_type.value,
+                    'entry_date': entry.transaction_date,
+                    'description': entry.description,
+                    'reference_number': entry.reference,
+                    'debit_amount': float(entry.debit_amount),
+                    'credit_amount': float(entry.credit_amount),
+                    'is_posted': True,
+                    'source_type': 'automated'
+                }
+                for entry in journal_entries
+            ]
             
+            stats = JournalBulkWriter(self.company_id, self.user_id).write_lines(lines)
             db.session.commit()
-            logger.info(f"Saved {len(journal_entries)} journal entries to database")
+            logger.info(f"Saved {stats.rows_written} journal entries to database "
+                        f"({stats.rows_per_second:,.0f} rows/sec, {stats.accounts_created} new accounts)")
+            return stats
             
         except Exception as e:
             db.session.rollback()
@@ -1428,6 +1445,7 @@ class AutomatedAccountingEngine:
                 raise ValueError("Journal entry is not balanced")
             
             # Create journal entries
+            posted_entries = []
             for entry_data in entries:
                 account = ChartOfAccount.query.filter_by(
                     company_id=self.company_id,
@@ -1449,7 +1467,9 @@ class AutomatedAccountingEngine:
                     is_posted=True
                 )
                 db.session.add(journal_entry)
+                posted_entries.append(journal_entry)
             
+            LedgerBalanceService(self.company_id).record_entries(posted_entries)
             db.session.commit()
             return True
             
@@ -1512,27 +1532,44 @@ class AutomatedAccountingEngine:
             logger.error(f"Error setting up chart of accounts: {str(e)}")
             raise
     
-    def generate_all_reports(self) -> Dict[str, Any]:
+    def generate_all_reports(self, date_from: datetime = None, date_to: datetime = None) -> Dict[str, Any]:
         """
         Generate comprehensive financial reports package including MIS analysis
+
+        The period's account totals are loaded once into a LedgerAggregate from
+        account_period_balances, and every statement built on totals reads
+        them from it; only the journal and ledger stream individual lines.
+        metadata['timings'] gives the seconds spent loading, on each statement
+        and on the MIS report.
         """
         try:
             logger.info("Starting comprehensive financial reports generation")
-            
-            # Generate individual financial reports
-            reports_data = {
-                'journal': self.generate_journal_report(),
-                'ledger': self.generate_ledger_report(), 
-                'trial_balance': self.generate_trial_balance(),
-                'profit_loss': self.generate_profit_loss_statement(),
-                'balance_sheet': self.generate_balance_sheet(),
-                'cash_flow': self.generate_cash_flow_statement(),
-                'shareholders_equity': self.generate_shareholders_equity_statement()
+            started = time.perf_counter()
+            ledger = LedgerAggregate.load(self.company_id, date_from, date_to)
+            timings = {'ledger_load': round(time.perf_counter() - started, 4)}
+            
+            # Generate individual financial reports from the shared aggregate
+            generators = {
+                'journal': self.generate_journal_report,
+                'ledger': self.generate_ledger_report,
+                'trial_balance': self.generate_trial_balance,
+                'profit_loss': self.generate_profit_loss_statement,
+                'balance_sheet': self.generate_balance_sheet,
+                'cash_flow': self.generate_cash_flow_statement,
+                'shareholders_equity': self.generate_shareholders_equity_statement
             }
+            reports_data = {}
+            for report_name, generator in generators.items():
+                report_started = time.perf_counter()
+                reports_data[report_name] = generator(ledger)
+                timings[report_name] = round(time.perf_counter() - report_started, 4)
             
             # Generate MIS Report with accounting validation and ratio analysis
+            report_started = time.perf_counter()
             mis_service = MISReportService(self.company_id, self.user_id)
             reports_data['mis_report'] = mis_service.generate_mis_report(reports_data)
+            timings['mis_report'] = round(time.perf_counter() - report_started, 4)
+            timings['total'] = round(time.perf_counter() - started, 4)
             
             # Add generation metadata
             reports_data['metadata'] = {
@@ -1540,93 +1577,95 @@ class AutomatedAccountingEngine:
                 'company_id': self.company_id,
                 'user_id': self.user_id,
                 'total_reports': len(reports_data) - 1,  # Excluding metadata
-                'includes_mis': True
+                'includes_mis': True,
+                'period': {
+                    'date_from': date_from.isoformat() if date_from else None,
+                    'date_to': date_to.isoformat() if date_to else None
+                },
+                'journal_lines': reports_data['journal'].get('summary', {}).get('total_entries', 0),
+                'timings': timings
             }
             
-            logger.info("All financial reports generated successfully")
+            logger.info(f"All financial reports generated successfully in {timings['total']:.3f}s")
             return reports_data
             
         except Exception as e:
             logger.error(f"Error generating comprehensive reports: {str(e)}")
             raise
     
-    def generate_journal_report(self) -> Dict[str, Any]:
+    def generate_journal_report(self, ledger=None) -> Dict[str, Any]:
         """Generate journal entries report"""
         try:
-            entries = JournalEntry.query.filter_by(company_id=self.company_id).all()
+            lines = (ledger or LedgerQueryService(self.company_id)).journal_lines()
             
             journal_data = {
                 'report_title': 'Journal Entries Report',
                 'generation_date': datetime.now().isoformat(),
                 'entries': [],
                 'summary': {
-                    'total_entries': len(entries),
+                    'total_entries': 0,
                     'total_debits': 0,
                     'total_credits': 0
                 }
             }
             
-            for entry in entries:
+            for line in lines:
                 entry_data = {
-                    'entry_id': entry.id,
-                    'date': entry.transaction_date.isoformat() if entry.transaction_date else '',
-                    'description': entry.description or '',
-                    'account_code': entry.account_code or '',
-                    'account_name': entry.account_name or '',
-                    'debit_amount': float(entry.debit_amount or 0),
-                    'credit_amount': float(entry.credit_amount or 0),
-                    'transaction_type': entry.transaction_type or ''
+                    'entry_id': line['entry_id'],
+                    'date': line['entry_date'].isoformat() if line['entry_date'] else '',
+                    'description': line['description'],
+                    'account_code': line['account_code'],
+                    'account_name': line['account_name'],
+                    'debit_amount': line['debit_amount'],
+                    'credit_amount': line['credit_amount'],
+                    'transaction_type': line['source_type']
                 }
                 journal_data['entries'].append(entry_data)
                 journal_data['summary']['total_debits'] += entry_data['debit_amount']
                 journal_data['summary']['total_credits'] += entry_data['credit_amount']
             
+            journal_data['summary']['total_entries'] = len(journal_data['entries'])
             return journal_data
             
         except Exception as e:
             logger.error(f"Error generating journal report: {str(e)}")
             return {'error': str(e)}
     
-    def generate_ledger_report(self) -> Dict[str, Any]:
+    def generate_ledger_report(self, ledger=None) -> Dict[str, Any]:
         """Generate ledger accounts report"""
         try:
-            accounts = ChartOfAccount.query.filter_by(company_id=self.company_id).all()
             ledger_data = {
                 'report_title': 'Ledger Accounts Report',
                 'generation_date': datetime.now().isoformat(),
                 'accounts': []
             }
             
-            for account in accounts:
-                # Get all entries for this account
-                entries = JournalEntry.query.filter_by(
-                    company_id=self.company_id,
-                    account_code=account.account_code
-                ).all()
-                
-                balance = 0
-                account_entries = []
+            # One windowed query: lines arrive grouped by account with running balances
+            ledger_accounts = {}
+            for line in (ledger or LedgerQueryService(self.company_id)).ledger_lines():
+                account = ledger_accounts.get(line['account_id'])
+                if account is None:
+                    account = {
+                        'account_code': line['account_code'],
+                        'account_name': line['account_name'],
+                        'account_type': line['account_type'],
+                        'closing_balance': 0,
+                        'entries': []
+                    }
+                    ledger_accounts[line['account_id']] = account
+                    ledger_data['accounts'].append(account)
                 
-                for entry in entries:
-                    debit = float(entry.debit_amount or 0)
-                    credit = float(entry.credit_amount or 0)
-                    balance += debit - credit
-                    
-                    account_entries.append({
-                        'date': entry.transaction_date.isoformat() if entry.transaction_date else '',
-                        'description': entry.description or '',
-                        'debit': debit,
-                        'credit': credit,
-                        'balance': balance
-                    })
+                if line['entry_id'] is None:
+                    continue
                 
-                ledger_data['accounts'].append({
-                    'account_code': account.account_code,
-                    'account_name': account.account_name,
-                    'account_type': account.account_type,
-                    'closing_balance': balance,
-                    'entries': account_entries
+                account['entries'].append({
+                    'date': line['entry_date'].isoformat() if line['entry_date'] else '',
+                    'description': line['description'],
+                    'debit': line['debit_amount'],
+                    'credit': line['credit_amount'],
+                    'balance': line['running_balance']
                 })
+                account['closing_balance'] = line['running_balance']
             
             return ledger_data
             
@@ -1634,10 +1673,9 @@ class AutomatedAccountingEngine:
             logger.error(f"Error generating ledger report: {str(e)}")
             return {'error': str(e)}
     
-    def generate_trial_balance(self) -> Dict[str, Any]:
+    def generate_trial_balance(self, ledger=None) -> Dict[str, Any]:
         """Generate trial balance"""
         try:
-            accounts = ChartOfAccount.query.filter_by(company_id=self.company_id).all()
             trial_balance_data = {
                 'report_title': 'Trial Balance',
                 'generation_date': datetime.now().isoformat(),
@@ -1648,24 +1686,16 @@ class AutomatedAccountingEngine:
                 }
             }
             
-            for account in accounts:
-                # Calculate balance for each account
-                entries = JournalEntry.query.filter_by(
-                    company_id=self.company_id,
-                    account_code=account.account_code
-                ).all()
-                
-                total_debits = sum(float(e.debit_amount or 0) for e in entries)
-                total_credits = sum(float(e.credit_amount or 0) for e in entries)
-                net_balance = total_debits - total_credits
+            for account in (ledger or LedgerQueryService(self.company_id)).account_balances():
+                net_balance = account['net_balance']
                 
                 debit_balance = net_balance if net_balance > 0 else 0
                 credit_balance = abs(net_balance) if net_balance < 0 else 0
                 
                 trial_balance_data['accounts'].append({
-                    'account_code': account.account_code,
-                    'account_name': account.account_name,
-                    'account_type': account.account_type,
+                    'account_code': account['account_code'],
+                    'account_name': account['account_name'],
+                    'account_type': account['account_type'],
                     'debit_balance': debit_balance,
                     'credit_balance': credit_balance
                 })
@@ -1679,12 +1709,9 @@ class AutomatedAccountingEngine:
             logger.error(f"Error generating trial balance: {str(e)}")
             return {'error': str(e)}
     
-    def generate_profit_loss_statement(self) -> Dict[str, Any]:
+    def generate_profit_loss_statement(self, ledger=None) -> Dict[str, Any]:
         """Generate profit and loss statement"""
         try:
-            # Get revenue and expense accounts
-            accounts = ChartOfAccount.query.filter_by(company_id=self.company_id).all()
-            
             pl_data = {
                 'report_title': 'Profit & Loss Statement',
                 'generation_date': datetime.now().isoformat(),
@@ -1695,32 +1722,23 @@ class AutomatedAccountingEngine:
                 'net_profit': 0
             }
             
+            # Get revenue and expense accounts
+            accounts = (ledger or LedgerQueryService(self.company_id)).account_balances(account_types=['revenue', 'expenses'])
+            
             for account in accounts:
-                entries = JournalEntry.query.filter_by(
-                    company_id=self.company_id,
-                    account_code=account.account_code
-                ).all()
-                
-                total_debits = sum(float(e.debit_amount or 0) for e in entries)
-                total_credits = sum(float(e.credit_amount or 0) for e in entries)
-                
-                if account.account_type == 'revenue':
-                    balance = total_credits - total_debits
-                    pl_data['revenue']['accounts'].append({
-                        'account_code': account.account_code,
-                        'account_name': account.account_name,
-                        'amount': balance
-                    })
-                    pl_data['revenue']['total'] += balance
+                if account['account_type'].lower() == 'revenue':
+                    balance = account['credit_total'] - account['debit_total']
+                    section = pl_data['revenue']
+                else:
+                    balance = account['debit_total'] - account['credit_total']
+                    section = pl_data['expenses']
                 
-                elif account.account_type == 'expenses':
-                    balance = total_debits - total_credits
-                    pl_data['expenses']['accounts'].append({
-                        'account_code': account.account_code,
-                        'account_name': account.account_name,
-                        'amount': balance
-                    })
-                    pl_data['expenses']['total'] += balance
+                section['accounts'].append({
+                    'account_code': account['account_code'],
+                    'account_name': account['account_name'],
+                    'amount': balance
+                })
+                section['total'] += balance
             
             pl_data['gross_profit'] = pl_data['revenue']['total'] - pl_data['cost_of_goods_sold']
             pl_data['net_profit'] = pl_data['revenue']['total'] - pl_data['expenses']['total']
@@ -1731,11 +1749,9 @@ class AutomatedAccountingEngine:
             logger.error(f"Error generating P&L statement: {str(e)}")
             return {'error': str(e)}
     
-    def generate_balance_sheet(self) -> Dict[str, Any]:
+    def generate_balance_sheet(self, ledger=None) -> Dict[str, Any]:
         """Generate balance sheet"""
         try:
-            accounts = ChartOfAccount.query.filter_by(company_id=self.company_id).all()
-            
             balance_sheet_data = {
                 'report_title': 'Balance Sheet',
                 'generation_date': datetime.now().isoformat(),
@@ -1744,25 +1760,24 @@ class AutomatedAccountingEngine:
                 'equity': {'accounts': [], 'total': 0}
             }
             
+            accounts = (ledger or LedgerQueryService(self.company_id)).account_balances(
+                account_types=['assets', 'liabilities', 'equity']
+            )
+            
             for account in accounts:
-                entries = JournalEntry.query.filter_by(
-                    company_id=self.company_id,
-                    account_code=account.account_code
-                ).all()
+                account_type = account['account_type'].lower()
+                account_name = (account['account_name'] or '').lower()
                 
-                total_debits = sum(float(e.debit_amount or 0) for e in entries)
-                total_credits = sum(float(e.credit_amount or 0) for e in entries)
-                
-                if account.account_type == 'assets':
-                    balance = total_debits - total_credits
+                if account_type == 'assets':
+                    balance = account['debit_total'] - account['credit_total']
                     asset_info = {
-                        'account_code': account.account_code,
-                        'account_name': account.account_name,
+                        'account_code': account['account_code'],
+                        'account_name': account['account_name'],
                         'amount': balance
                     }
                     
                     # Categorize as current or fixed assets (simple logic)
-                    if 'cash' in account.account_name.lower() or 'receivable' in account.account_name.lower():
+                    if 'cash' in account_name or 'receivable' in account_name:
                         balance_sheet_data['assets']['current_assets']['accounts'].append(asset_info)
                         balance_sheet_data['assets']['current_assets']['total'] += balance
                     else:
@@ -1771,16 +1786,16 @@ class AutomatedAccountingEngine:
                     
                     balance_sheet_data['assets']['total'] += balance
                 
-                elif account.account_type == 'liabilities':
-                    balance = total_credits - total_debits
+                elif account_type == 'liabilities':
+                    balance = account['credit_total'] - account['debit_total']
                     liability_info = {
-                        'account_code': account.account_code,
-                        'account_name': account.account_name,
+                        'account_code': account['account_code'],
+                        'account_name': account['account_name'],
                         'amount': balance
                     }
                     
                     # Categorize as current or long-term liabilities
-                    if 'payable' in account.account_name.lower() or 'accrued' in account.account_name.lower():
+                    if 'payable' in account_name or 'accrued' in account_name:
                         balance_sheet_data['liabilities']['current_liabilities']['accounts'].append(liability_info)
                         balance_sheet_data['liabilities']['current_liabilities']['total'] += balance
                     else:
@@ -1789,11 +1804,11 @@ class AutomatedAccountingEngine:
                     
                     balance_sheet_data['liabilities']['total'] += balance
                 
-                elif account.account_type == 'equity':
-                    balance = total_credits - total_debits
+                else:
+                    balance = account['credit_total'] - account['debit_total']
                     balance_sheet_data['equity']['accounts'].append({
-                        'account_code': account.account_code,
-                        'account_name': account.account_name,
+                        'account_code': account['account_code'],
+                        'account_name': account['account_name'],
                         'amount': balance
                     })
                     balance_sheet_data['equity']['total'] += balance
@@ -1804,7 +1819,7 @@ class AutomatedAccountingEngine:
             logger.error(f"Error generating balance sheet: {str(e)}")
             return {'error': str(e)}
     
-    def generate_cash_flow_statement(self) -> Dict[str, Any]:
+    def generate_cash_flow_statement(self, ledger=None) -> Dict[str, Any]:
         """Generate cash flow statement"""
         try:
             cash_flow_data = {
@@ -1817,23 +1832,23 @@ class AutomatedAccountingEngine:
             }
             
             # Get cash-related entries
-            cash_entries = JournalEntry.query.filter(
-                JournalEntry.company_id == self.company_id,
-                JournalEntry.account_name.ilike('%cash%')
-            ).all()
+            cash_entries = (ledger or LedgerQueryService(self.company_id)).ledger_lines(
+                include_empty_accounts=False, account_name_like='%cash%'
+            )
             
             for entry in cash_entries:
                 activity = {
-                    'description': entry.description or '',
-                    'amount': float(entry.debit_amount or 0) - float(entry.credit_amount or 0),
-                    'date': entry.transaction_date.isoformat() if entry.transaction_date else ''
+                    'description': entry['description'],
+                    'amount': entry['debit_amount'] - entry['credit_amount'],
+                    'date': entry['entry_date'].isoformat() if entry['entry_date'] else ''
                 }
+                description = entry['description'].lower()
                 
                 # Simple categorization logic
-                if any(word in entry.description.lower() for word in ['sale', 'revenue', 'collection', 'payment'] if entry.description):
+                if any(word in description for word in ['sale', 'revenue', 'collection', 'payment']):
                     cash_flow_data['operating']['activities'].append(activity)
                     cash_flow_data['operating']['net_cash'] += activity['amount']
-                elif any(word in entry.description.lower() for word in ['asset', 'equipment', 'investment'] if entry.description):
+                elif any(word in description for word in ['asset', 'equipment', 'investment']):
                     cash_flow_data['investing']['activities'].append(activity)
                     cash_flow_data['investing']['net_cash'] += activity['amount']
                 else:
@@ -1852,13 +1867,10 @@ class AutomatedAccountingEngine:
             logger.error(f"Error generating cash flow statement: {str(e)}")
             return {'error': str(e)}
     
-    def generate_shareholders_equity_statement(self) -> Dict[str, Any]:
+    def generate_shareholders_equity_statement(self, ledger=None) -> Dict[str, Any]:
         """Generate shareholders' equity statement"""
         try:
-            equity_accounts = ChartOfAccount.query.filter_by(
-                company_id=self.company_id,
-                account_type='equity'
-            ).all()
+            equity_accounts = (ledger or LedgerQueryService(self.company_id)).account_balances(account_types=['equity'])
             
             equity_data = {
                 'report_title': 'Statement of Shareholders\' Equity',
@@ -1871,16 +1883,11 @@ class AutomatedAccountingEngine:
             total_equity = 0
             
             for account in equity_accounts:
-                entries = JournalEntry.query.filter_by(
-                    company_id=self.company_id,
-                    account_code=account.account_code
-                ).all()
-                
-                account_balance = sum(float(e.credit_amount or 0) - float(e.debit_amount or 0) for e in entries)
+                account_balance = account['credit_total'] - account['debit_total']
                 total_equity += account_balance
                 
                 equity_data['movements'].append({
-                    'account_name': account.account_name,
+                    'account_name': account['account_name'],
                     'amount': account_balance,
                     'type': 'Equity Contribution' if account_balance > 0 else 'Equity Distribution'
                 })
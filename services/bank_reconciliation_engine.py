@@ -15,6 +15,15 @@ from enum import Enum
 import uuid
 import re
 
+from services.parsed_dataset_cache import ParsedDatasetCache
+from services.reconciliation_candidate_index import CandidateBlockingIndex
+from services.reconciliation_assignment import SparseScoreMatrix, solve_assignment
+from services.invoice_reference_scanner import InvoiceReferenceScanner, PatternScanner
+from services.reconciliation_state_store import ReconciliationStateStore, ReconciliationPlan
+from services.mapping_memory import MappingMemory
+from services.parallel_reconciliation import score_in_shards
+from services.split_payment_matcher import SplitPaymentMatcher, SplitCandidate, SplitMatch
+
 # Import moved to avoid circular import
 from typing import TYPE_CHECKING
 
@@ -71,6 +80,7 @@ class ReconciliationMatch:
     match_type: TransactionMapping
     match_notes: str
     is_manual: bool = False
+    match_group: Optional[str] = None  # shared by the matches of one split or aggregated payment
 
 @dataclass
 class ReconciliationResult:
@@ -108,6 +118,27 @@ class BankReconciliationEngine:
         # Initialize matching patterns and rules
         self.matching_patterns = self._initialize_matching_patterns()
         self.confidence_weights = self._initialize_confidence_weights()
+        self.match_threshold = 0.7
+        
+        # 'global' solves a one-to-one assignment over the whole statement; 'greedy' keeps
+        # each line's own best match, so one invoice can be claimed by several lines
+        self.assignment_mode = 'global'
+        self.matching_stats = {}
+        # 'parallel' scores shards of the statement in forked worker processes (None: one per CPU)
+        self.execution_mode = 'serial'
+        self.parallel_workers = None
+        
+        # Open invoice numbers, kept in step with the outstanding invoices between runs
+        self.reference_scanner = InvoiceReferenceScanner()
+        self._transaction_references: Dict[str, Tuple[Dict[Any, float], Dict[Any, float]]] = {}
+        
+        # Accounts users mapped similar transactions to, by description signature
+        self.mapping_memory = MappingMemory(company_id)
+        
+        # Lines left unmatched are searched for groups of same-party invoices adding up to them
+        self.split_matching = True
+        self.split_matcher = SplitPaymentMatcher()
+        self.party_scanner = PatternScanner()
     
     def _initialize_matching_patterns(self) -> Dict[str, List[str]]:
         """Initialize patterns for transaction matching"""
@@ -180,16 +211,34 @@ class BankReconciliationEngine:
             # Get outstanding invoices
             outstanding_invoices = self._get_outstanding_invoices()
             
+            # Lines reconciled by an earlier run keep their match, and what they
+            # matched is not offered to the remaining lines
+            state_store = ReconciliationStateStore(self.company_id, bank_account_code)
+            plan = state_store.plan_run(
+                bank_transactions,
+                [f"entry:{entry['id']}" for entry in ledger_entries] +
+                [f"invoice:{invoice['id']}" for invoice in outstanding_invoices],
+                still_held=self._existing_match_ids
+            )
+            reconciled = {entry_id for line in plan.lines if line.scope == 'skip' for entry_id in line.matched_entry_ids}
+            open_transactions = [txn for txn, line in zip(bank_transactions, plan.lines) if line.scope != 'skip']
+            
             # Perform automated matching
             matches = self._perform_automated_matching(
-                bank_transactions, ledger_entries, outstanding_invoices
+                open_transactions,
+                [entry for entry in ledger_entries if f"entry:{entry['id']}" not in reconciled],
+                [invoice for invoice in outstanding_invoices if f"invoice:{invoice['id']}" not in reconciled]
             )
             
             # Identify unmatched transactions
             unmatched_transactions = self._identify_unmatched_transactions(
-                bank_transactions, matches
+                open_transactions, matches
             )
             
+            # Save reconciliation results
+            self._save_reconciliation_results(state_store, plan, matches)
+            matches = self._restored_matches(bank_transactions, plan, outstanding_invoices) + matches
+            
             # Generate suggested mappings for unmatched transactions
             suggested_mappings = self._generate_suggested_mappings(unmatched_transactions)
             
@@ -198,12 +247,9 @@ class BankReconciliationEngine:
                 bank_transactions, matches, unmatched_transactions
             )
             
-            # Save reconciliation results
-            self._save_reconciliation_results(matches, unmatched_transactions)
-            
             return ReconciliationResult(
                 total_transactions=len(bank_transactions),
-                matched_transactions=len(matches),
+                matched_transactions=len({match.bank_transaction_id for match in matches}),
                 unmatched_transactions=len(unmatched_transactions),
                 disputed_transactions=0,  # Will be updated with manual review
                 matches=matches,
@@ -219,11 +265,8 @@ class BankReconciliationEngine:
     def _read_bank_statement(self, file_path: str) -> List[BankTransaction]:
         """Read and parse bank statement file"""
         
-        # Determine file type and read accordingly
-        if file_path.endswith('.xlsx'):
-            df = pd.read_excel(file_path)
-        else:
-            df = pd.read_csv(file_path)
+        # Parsed once per upload and shared with the other pipeline stages
+        df = ParsedDatasetCache().read(file_path)
         
         # Standardize column names (handle different bank formats)
         column_mapping = {
@@ -382,6 +425,29 @@ class BankReconciliationEngine:
     ) -> List[ReconciliationMatch]:
         """Perform automated matching using various algorithms"""
         
+        # Scan every narration once for all open invoice numbers
+        self.reference_scanner.sync({invoice['id']: invoice['invoice_number'] for invoice in outstanding_invoices})
+        self._transaction_references = {}
+        
+        if self.assignment_mode == 'global':
+            matches = self._perform_global_matching(bank_transactions, ledger_entries, outstanding_invoices)
+        else:
+            matches = self._perform_greedy_matching(bank_transactions, ledger_entries, outstanding_invoices)
+        
+        # What is left may settle several invoices of one party at once, or share one
+        if self.split_matching:
+            matches.extend(self._match_split_payments(bank_transactions, outstanding_invoices, matches))
+        
+        return matches
+    
+    def _perform_greedy_matching(
+        self,
+        bank_transactions: List[BankTransaction],
+        ledger_entries: List[Dict[str, Any]],
+        outstanding_invoices: List[Dict[str, Any]]
+    ) -> List[ReconciliationMatch]:
+        """Each bank line takes its own best match"""
+        
         matches = []
         
         for bank_txn in bank_transactions:
@@ -401,13 +467,170 @@ class BankReconciliationEngine:
                 best_confidence = ledger_match.match_confidence
             
             # Only accept matches above confidence threshold
-            if best_match and best_confidence > 0.7:
+            if best_match and best_confidence > self.match_threshold:
                 matches.append(best_match)
                 bank_txn.status = ReconciliationStatus.MATCHED
                 bank_txn.confidence_score = best_confidence
         
         return matches
     
+    def _perform_global_matching(
+        self,
+        bank_transactions: List[BankTransaction],
+        ledger_entries: List[Dict[str, Any]],
+        outstanding_invoices: List[Dict[str, Any]]
+    ) -> List[ReconciliationMatch]:
+        """
+        One-to-one matching that maximises total confidence across the statement
+        
+        Every bank line is scored only against its blocked invoice and ledger
+        candidates; the sparse score matrix is then solved as a maximum-weight
+        assignment, so no invoice or ledger entry is claimed twice and the result
+        does not depend on statement order.
+        """
+        
+        invoice_index = CandidateBlockingIndex([
+            {'amount': invoice['total_amount'], 'date': invoice['invoice_date'],
+             'invoice_number': invoice['invoice_number'], 'party_name': invoice['customer_name']}
+            for invoice in outstanding_invoices
+        ])
+        ledger_index = CandidateBlockingIndex([
+            {'amount': self._ledger_entry_amount(entry), 'date': entry['date'], 'reference': entry['reference']}
+            for entry in ledger_entries
+        ])
+        
+        invoice_positions = {invoice['id']: position for position, invoice in enumerate(outstanding_invoices)}
+        
+        candidates = []
+        for bank_txn in bank_transactions:
+            text = f"{bank_txn.description} {bank_txn.reference}"
+            # Invoices the narration references are candidates whatever their amount
+            referenced = [invoice_positions[invoice_id] for hits in self._invoice_references(bank_txn)
+                          for invoice_id in hits if invoice_id in invoice_positions]
+            candidates.append(
+                [('invoice', position) for position in
+                 sorted(set(invoice_index.candidates(bank_txn.amount, bank_txn.date, text)).union(referenced))] +
+                [('ledger', position) for position in ledger_index.candidates(bank_txn.amount, bank_txn.date, text)]
+            )
+        
+        # Shards score their lines' candidates; merged in statement order, before assignment
+        context = {
+            'transactions': bank_transactions,
+            'candidates': candidates,
+            'invoices': outstanding_invoices,
+            'ledger_entries': ledger_entries
+        }
+        lines = range(len(bank_transactions))
+        if self.execution_mode == 'parallel':
+            line_scores = score_in_shards(self._score_candidate_shard, context, lines, self.parallel_workers)
+        else:
+            line_scores = self._score_candidate_shard(context, lines)
+        
+        scores = SparseScoreMatrix()
+        for bank_txn, keys, pair_scores in zip(bank_transactions, candidates, line_scores):
+            for key, score in zip(keys, pair_scores):
+                scores.add(bank_txn.transaction_id, key, score)
+        
+        # Scores equal to the threshold are rejected, as in greedy mode
+        assignment = solve_assignment(scores, min_score=self.match_threshold + 1e-9)
+        
+        matches = []
+        for bank_txn in bank_transactions:
+            if bank_txn.transaction_id not in assignment:
+                continue
+            (kind, position), confidence = assignment[bank_txn.transaction_id]
+            if kind == 'invoice':
+                match = self._invoice_match(bank_txn, outstanding_invoices[position], confidence)
+            else:
+                match = self._ledger_match(bank_txn, ledger_entries[position], confidence)
+            matches.append(match)
+            bank_txn.status = ReconciliationStatus.MATCHED
+            bank_txn.confidence_score = confidence
+        
+        self.matching_stats = {
+            'invoice_blocking': invoice_index.stats.to_dict(),
+            'ledger_blocking': ledger_index.stats.to_dict(),
+            'scored_pairs': len(scores),
+            'assigned': len(matches)
+        }
+        
+        return matches
+    
+    def _score_candidate_shard(self, context: Dict[str, Any], lines: List[int]) -> List[List[float]]:
+        """Scores of a shard of bank lines against their blocked candidates, in candidate order"""
+        
+        line_scores = []
+        for line in lines:
+            bank_txn = context['transactions'][line]
+            line_scores.append([
+                self._score_invoice_match(bank_txn, context['invoices'][position]) if kind == 'invoice'
+                else self._score_ledger_match(bank_txn, context['ledger_entries'][position])
+                for kind, position in context['candidates'][line]
+            ])
+        return line_scores
+    
+    def _score_invoice_match(self, bank_txn: BankTransaction, invoice: Dict[str, Any]) -> float:
+        """Confidence that a bank transaction settles an outstanding invoice"""
+        
+        confidence = 0.0
+        
+        # Amount matching (most important)
+        if abs(float(bank_txn.amount) - invoice['total_amount']) < 0.01:
+            confidence += self.confidence_weights['exact_amount_match']
+        elif abs(float(bank_txn.amount) - invoice['total_amount']) < invoice['total_amount'] * 0.05:
+            confidence += self.confidence_weights['exact_amount_match'] * 0.5
+        
+        # Date proximity
+        days_diff = abs((pd.to_datetime(bank_txn.date) - pd.to_datetime(invoice['invoice_date'])).days)
+        if days_diff <= 5:
+            confidence += self.confidence_weights['date_proximity']
+        elif days_diff <= 30:
+            confidence += self.confidence_weights['date_proximity'] * 0.5
+        
+        # Reference matching
+        description_hits, reference_hits = self._invoice_references(bank_txn, invoice)
+        if invoice['id'] in description_hits:
+            confidence += self.confidence_weights['reference_match'] * description_hits[invoice['id']]
+        elif invoice['id'] in reference_hits:
+            confidence += self.confidence_weights['reference_match'] * 0.8 * reference_hits[invoice['id']]
+        
+        # Customer name matching
+        if invoice['customer_name'].lower() in bank_txn.description.lower():
+            confidence += self.confidence_weights['description_similarity']
+        
+        return confidence
+    
+    def _invoice_references(
+        self,
+        bank_txn: BankTransaction,
+        invoice: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[Any, float], Dict[Any, float]]:
+        """Open invoices named in the description and in the reference, with hit strengths"""
+        
+        if invoice is not None and invoice['id'] not in self.reference_scanner:
+            # Scored outside a matching run: index the invoice and rescan
+            self.reference_scanner.add(invoice['id'], invoice['invoice_number'])
+            self._transaction_references = {}
+        
+        references = self._transaction_references.get(bank_txn.transaction_id)
+        if references is None:
+            references = (self.reference_scanner.scan(bank_txn.description),
+                          self.reference_scanner.scan(bank_txn.reference))
+            self._transaction_references[bank_txn.transaction_id] = references
+        return references
+    
+    def _invoice_match(self, bank_txn: BankTransaction, invoice: Dict[str, Any], confidence: float) -> ReconciliationMatch:
+        return ReconciliationMatch(
+            bank_transaction_id=bank_txn.transaction_id,
+            ledger_entry_id=None,
+            invoice_id=invoice['id'],
+            match_amount=bank_txn.amount,
+            match_confidence=confidence,
+            match_type=TransactionMapping.INVOICE,
+            match_notes=f"Matched with invoice {invoice['invoice_number']}",
+            is_manual=False
+        )
+    
     def _match_with_invoices(
         self, 
         bank_txn: BankTransaction, 
@@ -419,46 +642,66 @@ class BankReconciliationEngine:
         best_confidence = 0.0
         
         for invoice in outstanding_invoices:
-            confidence = 0.0
-            
-            # Amount matching (most important)
-            if abs(float(bank_txn.amount) - invoice['total_amount']) < 0.01:
-                confidence += self.confidence_weights['exact_amount_match']
-            elif abs(float(bank_txn.amount) - invoice['total_amount']) < invoice['total_amount'] * 0.05:
-                confidence += self.confidence_weights['exact_amount_match'] * 0.5
-            
-            # Date proximity
-            days_diff = abs((bank_txn.date - invoice['invoice_date']).days)
-            if days_diff <= 5:
-                confidence += self.confidence_weights['date_proximity']
-            elif days_diff <= 30:
-                confidence += self.confidence_weights['date_proximity'] * 0.5
-            
-            # Reference matching
-            if invoice['invoice_number'].lower() in bank_txn.description.lower():
-                confidence += self.confidence_weights['reference_match']
-            elif invoice['invoice_number'].lower() in bank_txn.reference.lower():
-                confidence += self.confidence_weights['reference_match'] * 0.8
-            
-            # Customer name matching
-            if invoice['customer_name'].lower() in bank_txn.description.lower():
-                confidence += self.confidence_weights['description_similarity']
+            confidence = self._score_invoice_match(bank_txn, invoice)
             
             if confidence > best_confidence:
                 best_confidence = confidence
-                best_match = ReconciliationMatch(
-                    bank_transaction_id=bank_txn.transaction_id,
-                    ledger_entry_id=None,
-                    invoice_id=invoice['id'],
-                    match_amount=bank_txn.amount,
-                    match_confidence=confidence,
-                    match_type=TransactionMapping.INVOICE,
-                    match_notes=f"Matched with invoice {invoice['invoice_number']}",
-                    is_manual=False
-                )
+                best_match = self._invoice_match(bank_txn, invoice, confidence)
         
         return best_match
     
+    @staticmethod
+    def _ledger_entry_amount(entry: Dict[str, Any]) -> float:
+        """Signed amount of a ledger entry (debit positive, credit negative)"""
+        if 'debit_amount' in entry:
+            return entry['debit_amount'] if entry['debit_amount'] > 0 else -entry['credit_amount']
+        return float(entry.get('amount', 0))
+    
+    def _score_ledger_match(self, bank_txn: BankTransaction, entry: Dict[str, Any]) -> float:
+        """Confidence that a bank transaction corresponds to a ledger entry"""
+        
+        confidence = 0.0
+        
+        # Determine entry amount (debit or credit)
+        entry_amount = self._ledger_entry_amount(entry)
+        
+        # Amount matching
+        if abs(float(bank_txn.amount) - entry_amount) < 0.01:
+            confidence += self.confidence_weights['exact_amount_match']
+        elif abs(float(bank_txn.amount) - entry_amount) < abs(entry_amount) * 0.05:
+            confidence += self.confidence_weights['exact_amount_match'] * 0.5
+        
+        # Date proximity
+        days_diff = abs((pd.to_datetime(bank_txn.date) - pd.to_datetime(entry['date'])).days)
+        if days_diff <= 2:
+            confidence += self.confidence_weights['date_proximity']
+        elif days_diff <= 7:
+            confidence += self.confidence_weights['date_proximity'] * 0.5
+        
+        # Reference matching
+        if entry['reference'] and entry['reference'].lower() in bank_txn.reference.lower():
+            confidence += self.confidence_weights['reference_match']
+        
+        # Description similarity
+        description_similarity = self._calculate_description_similarity(
+            bank_txn.description, entry['description']
+        )
+        confidence += self.confidence_weights['description_similarity'] * description_similarity
+        
+        return confidence
+    
+    def _ledger_match(self, bank_txn: BankTransaction, entry: Dict[str, Any], confidence: float) -> ReconciliationMatch:
+        return ReconciliationMatch(
+            bank_transaction_id=bank_txn.transaction_id,
+            ledger_entry_id=entry['id'],
+            invoice_id=None,
+            match_amount=bank_txn.amount,
+            match_confidence=confidence,
+            match_type=self._determine_transaction_type(entry['description']),
+            match_notes=f"Matched with ledger entry {entry['reference']}",
+            is_manual=False
+        )
+    
     def _match_with_ledger(
         self, 
         bank_txn: BankTransaction, 
@@ -470,49 +713,88 @@ class BankReconciliationEngine:
         best_confidence = 0.0
         
         for entry in ledger_entries:
-            confidence = 0.0
-            
-            # Determine entry amount (debit or credit)
-            entry_amount = entry['debit_amount'] if entry['debit_amount'] > 0 else -entry['credit_amount']
-            
-            # Amount matching
-            if abs(float(bank_txn.amount) - entry_amount) < 0.01:
-                confidence += self.confidence_weights['exact_amount_match']
-            elif abs(float(bank_txn.amount) - entry_amount) < abs(entry_amount) * 0.05:
-                confidence += self.confidence_weights['exact_amount_match'] * 0.5
-            
-            # Date proximity
-            days_diff = abs((bank_txn.date - entry['date']).days)
-            if days_diff <= 2:
-                confidence += self.confidence_weights['date_proximity']
-            elif days_diff <= 7:
-                confidence += self.confidence_weights['date_proximity'] * 0.5
-            
-            # Reference matching
-            if entry['reference'] and entry['reference'].lower() in bank_txn.reference.lower():
-                confidence += self.confidence_weights['reference_match']
-            
-            # Description similarity
-            description_similarity = self._calculate_description_similarity(
-                bank_txn.description, entry['description']
-            )
-            confidence += self.confidence_weights['description_similarity'] * description_similarity
+            confidence = self._score_ledger_match(bank_txn, entry)
             
             if confidence > best_confidence:
                 best_confidence = confidence
-                best_match = ReconciliationMatch(
-                    bank_transaction_id=bank_txn.transaction_id,
-                    ledger_entry_id=entry['id'],
-                    invoice_id=None,
-                    match_amount=bank_txn.amount,
-                    match_confidence=confidence,
-                    match_type=self._determine_transaction_type(entry['description']),
-                    match_notes=f"Matched with ledger entry {entry['reference']}",
-                    is_manual=False
-                )
+                best_match = self._ledger_match(bank_txn, entry, confidence)
         
         return best_match
     
+    def _match_split_payments(
+        self,
+        bank_transactions: List[BankTransaction],
+        outstanding_invoices: List[Dict[str, Any]],
+        matches: List[ReconciliationMatch]
+    ) -> List[ReconciliationMatch]:
+        """
+        Unmatched lines paying several invoices of one party, or paying one in parts
+        
+        A line's party is the one customer whose name its narration mentions;
+        lines naming none or several are left alone. Only invoices no match
+        has claimed take part.
+        """
+        
+        matched_lines = {match.bank_transaction_id for match in matches}
+        claimed = {match.invoice_id for match in matches if match.invoice_id is not None}
+        self.party_scanner.sync({invoice['id']: invoice['customer_name'] for invoice in outstanding_invoices})
+        parties = {invoice['id']: ' '.join(str(invoice['customer_name'] or '').lower().split())
+                   for invoice in outstanding_invoices}
+        invoices = {invoice['id']: invoice for invoice in outstanding_invoices if invoice['id'] not in claimed}
+        transactions = {txn.transaction_id: txn for txn in bank_transactions if txn.transaction_id not in matched_lines}
+        
+        lines = []
+        for txn in transactions.values():
+            named = {parties[invoice_id] for invoice_id in self.party_scanner.scan(txn.description)}
+            if len(named) == 1:
+                lines.append(SplitCandidate.of(txn.transaction_id, named.pop(), txn.amount, txn.date))
+        items = [SplitCandidate.of(invoice_id, parties[invoice_id], invoice['total_amount'], invoice['invoice_date'])
+                 for invoice_id, invoice in invoices.items()]
+        if not lines or not items:
+            return []
+        
+        split_matches = []
+        for group in self.split_matcher.match(lines, items):
+            split_matches.extend(self._split_match(group, transactions, invoices))
+        self.matching_stats['split_payments'] = self.split_matcher.stats.to_dict()
+        return split_matches
+    
+    def _split_match(
+        self,
+        group: SplitMatch,
+        transactions: Dict[str, BankTransaction],
+        invoices: Dict[Any, Dict[str, Any]]
+    ) -> List[ReconciliationMatch]:
+        """One match per bank line and invoice pair of a group, sharing its match_group"""
+        
+        match_group = f"{group.kind}-{group.line_keys[0]}"
+        numbers = ', '.join(str(invoices[invoice_id]['invoice_number']) for invoice_id in group.item_keys)
+        pairs = []
+        for line_position, transaction_id in enumerate(group.line_keys, 1):
+            bank_txn = transactions[transaction_id]
+            bank_txn.status = ReconciliationStatus.MATCHED
+            bank_txn.confidence_score = group.confidence
+            for item_position, invoice_id in enumerate(group.item_keys, 1):
+                invoice = invoices[invoice_id]
+                if group.kind == 'aggregated':
+                    amount = Decimal(str(invoice['total_amount']))
+                    notes = f"Aggregated payment: invoice {item_position} of {len(group.item_keys)} ({numbers})"
+                else:
+                    amount = bank_txn.amount
+                    notes = f"Split payment: part {line_position} of {len(group.line_keys)} for invoice {numbers}"
+                pairs.append(ReconciliationMatch(
+                    bank_transaction_id=transaction_id,
+                    ledger_entry_id=None,
+                    invoice_id=invoice_id,
+                    match_amount=amount,
+                    match_confidence=group.confidence,
+                    match_type=TransactionMapping.INVOICE,
+                    match_notes=notes,
+                    is_manual=False,
+                    match_group=match_group
+                ))
+        return pairs
+    
     def _calculate_description_similarity(self, desc1: str, desc2: str) -> float:
         """Calculate similarity between two descriptions"""
         
@@ -574,59 +856,62 @@ class BankReconciliationEngine:
         suggested_mappings = []
         
         for txn in unmatched_transactions:
-            suggestions = []
+            # Recurring transactions resolve from earlier manual mappings
+            suggestions = self.mapping_memory.suggest(txn.description, txn.amount)
+            resolved = bool(suggestions) and suggestions[0]['confidence'] >= self.mapping_memory.resolve_confidence
             
             # Analyze transaction description and suggest account mapping
             desc_lower = txn.description.lower()
             
-            # Pattern-based suggestions
-            if re.search(r'salary|sal|wage', desc_lower):
-                suggestions.append({
-                    'account_code': '5110',
-                    'account_name': 'Salaries and Wages',
-                    'confidence': 0.8,
-                    'reason': 'Salary payment pattern detected'
-                })
-            
-            elif re.search(r'rent|lease', desc_lower):
-                suggestions.append({
-                    'account_code': '5120',
-                    'account_name': 'Rent Expense',
-                    'confidence': 0.8,
-                    'reason': 'Rent payment pattern detected'
-                })
-            
-            elif re.search(r'utility|electric|water|gas', desc_lower):
-                suggestions.append({
-                    'account_code': '5130',
-                    'account_name': 'Utilities Expense',
-                    'confidence': 0.7,
-                    'reason': 'Utility payment pattern detected'
-                })
-            
-            elif re.search(r'bank|charge|fee', desc_lower):
-                suggestions.append({
-                    'account_code': '5220',
-                    'account_name': 'Bank Charges',
-                    'confidence': 0.9,
-                    'reason': 'Bank charges pattern detected'
-                })
-            
-            elif re.search(r'interest', desc_lower):
-                if txn.amount > 0:
+            # Pattern-based suggestions, unless memory already resolved the transaction
+            if not resolved:
+                if re.search(r'salary|sal|wage', desc_lower):
                     suggestions.append({
-                        'account_code': '4110',
-                        'account_name': 'Interest Income',
+                        'account_code': '5110',
+                        'account_name': 'Salaries and Wages',
                         'confidence': 0.8,
-                        'reason': 'Interest income pattern detected'
+                        'reason': 'Salary payment pattern detected'
                     })
-                else:
+                
+                elif re.search(r'rent|lease', desc_lower):
                     suggestions.append({
-                        'account_code': '5210',
-                        'account_name': 'Interest Expense',
+                        'account_code': '5120',
+                        'account_name': 'Rent Expense',
                         'confidence': 0.8,
-                        'reason': 'Interest expense pattern detected'
+                        'reason': 'Rent payment pattern detected'
                     })
+                
+                elif re.search(r'utility|electric|water|gas', desc_lower):
+                    suggestions.append({
+                        'account_code': '5130',
+                        'account_name': 'Utilities Expense',
+                        'confidence': 0.7,
+                        'reason': 'Utility payment pattern detected'
+                    })
+                
+                elif re.search(r'bank|charge|fee', desc_lower):
+                    suggestions.append({
+                        'account_code': '5220',
+                        'account_name': 'Bank Charges',
+                        'confidence': 0.9,
+                        'reason': 'Bank charges pattern detected'
+                    })
+                
+                elif re.search(r'interest', desc_lower):
+                    if txn.amount > 0:
+                        suggestions.append({
+                            'account_code': '4110',
+                            'account_name': 'Interest Income',
+                            'confidence': 0.8,
+                            'reason': 'Interest income pattern detected'
+                        })
+                    else:
+                        suggestions.append({
+                            'account_code': '5210',
+                            'account_name': 'Interest Expense',
+                            'confidence': 0.8,
+                            'reason': 'Interest expense pattern detected'
+                        })
             
             # Generic suggestions based on amount and type
             if not suggestions:
@@ -666,16 +951,19 @@ class BankReconciliationEngine:
         total_bank_amount = sum(txn.amount for txn in bank_transactions)
         matched_amount = sum(match.match_amount for match in matches)
         unmatched_amount = sum(txn.amount for txn in unmatched_transactions)
+        # A split or aggregated payment has one match per invoice and bank line pair
+        matched_lines = len({match.bank_transaction_id for match in matches})
         
         summary = {
             'reconciliation_date': datetime.now().isoformat(),
             'total_transactions': len(bank_transactions),
-            'matched_transactions': len(matches),
+            'matched_transactions': matched_lines,
             'unmatched_transactions': len(unmatched_transactions),
             'total_bank_amount': float(total_bank_amount),
             'matched_amount': float(matched_amount),
             'unmatched_amount': float(unmatched_amount),
-            'reconciliation_percentage': (len(matches) / len(bank_transactions)) * 100 if bank_transactions else 0,
+            'reconciliation_percentage': (matched_lines / len(bank_transactions)) * 100 if bank_transactions else 0,
+            'split_payment_groups': len({match.match_group for match in matches if match.match_group}),
             'avg_match_confidence': sum(match.match_confidence for match in matches) / len(matches) if matches else 0,
             'transaction_breakdown': {
                 'credits': len([txn for txn in bank_transactions if txn.amount > 0]),
@@ -689,37 +977,124 @@ class BankReconciliationEngine:
     
     def _save_reconciliation_results(
         self, 
-        matches: List[ReconciliationMatch],
-        unmatched_transactions: List[BankTransaction]
+        state_store: ReconciliationStateStore,
+        plan: ReconciliationPlan,
+        matches: List[ReconciliationMatch]
     ):
         """Save reconciliation results to database"""
         
-        try:
-            # Save matches (you would create appropriate models for this)
-            for match in matches:
-                # Create reconciliation record
-                # This would involve creating new models for bank reconciliation
-                pass
-            
-            # Save unmatched transactions for manual review
-            for txn in unmatched_transactions:
-                # Create unmatched transaction record
-                pass
-            
-            logger.info(f"Saved {len(matches)} matches and {len(unmatched_transactions)} unmatched transactions")
-            
-        except Exception as e:
-            logger.error(f"Error saving reconciliation results: {str(e)}")
-            raise
+        matched = {}
+        for match in matches:
+            matched.setdefault(match.bank_transaction_id, []).append(match)
+        for txn, line in zip(plan.transactions, plan.lines):
+            if line.scope == 'skip':
+                continue
+            line_matches = matched.get(txn.transaction_id)
+            if line_matches is None:
+                line.record(ReconciliationStatus.UNMATCHED.value, [])
+                continue
+            match = line_matches[0]
+            if len(line_matches) > 1:
+                # One payment settling several invoices
+                line.record('grouped', [(f"invoice:{line_match.invoice_id}", line_match.match_confidence)
+                                        for line_match in line_matches])
+            elif match.invoice_id is not None:
+                line.record(ReconciliationStatus.MATCHED.value, [(f"invoice:{match.invoice_id}", match.match_confidence)])
+            else:
+                line.record(ReconciliationStatus.MATCHED.value, [(f"entry:{match.ledger_entry_id}", match.match_confidence)])
+        
+        stats = state_store.finish_run(plan)
+        logger.info(f"Saved {stats['matched_count']} matches and {stats['unmatched_count']} unmatched transactions "
+                    f"({stats['skipped_lines']} lines reconciled earlier)")
+    
+    def _existing_match_ids(self, matched_ids: List[str]) -> List[str]:
+        """Matched ids not offered to this run that still exist: paid or closed invoices, journal lines"""
+        from models import Invoice, JournalEntry
+        
+        ids = {'invoice': [], 'entry': []}
+        for matched_id in matched_ids:
+            kind, _, number = matched_id.partition(':')
+            if kind in ids and number.isdigit():
+                ids[kind].append(int(number))
+        
+        existing = []
+        if ids['invoice']:
+            existing += [f"invoice:{row.id}" for row in Invoice.query.with_entities(Invoice.id).filter(
+                Invoice.id.in_(ids['invoice']), Invoice.status != 'cancelled'
+            )]
+        if ids['entry']:
+            existing += [f"entry:{row.id}" for row in JournalEntry.query.with_entities(JournalEntry.id).filter(
+                JournalEntry.id.in_(ids['entry']), JournalEntry.company_id == self.company_id
+            )]
+        return existing
+    
+    def _invoice_amounts(self, matched_ids: List[str]) -> Dict[str, float]:
+        """Totals of invoices by matched id ('invoice:<id>')"""
+        from models import Invoice
+        
+        invoice_ids = [int(matched_id.partition(':')[2]) for matched_id in matched_ids
+                       if matched_id.startswith('invoice:') and matched_id.partition(':')[2].isdigit()]
+        if not invoice_ids:
+            return {}
+        return {f"invoice:{row.id}": row.total_amount for row in Invoice.query.with_entities(
+            Invoice.id, Invoice.total_amount).filter(Invoice.id.in_(invoice_ids))}
+    
+    def _restored_matches(
+        self,
+        bank_transactions: List[BankTransaction],
+        plan: ReconciliationPlan,
+        outstanding_invoices: List[Dict[str, Any]]
+    ) -> List[ReconciliationMatch]:
+        """Matches of the lines an earlier run reconciled"""
+        
+        invoice_amounts = {f"invoice:{invoice['id']}": invoice['total_amount'] for invoice in outstanding_invoices}
+        # Invoices the earlier run settled are usually paid by now
+        settled = [entry_id for line in plan.lines if line.scope == 'skip' and line.status == 'grouped'
+                   for entry_id in line.matched_entry_ids if entry_id not in invoice_amounts]
+        invoice_amounts.update(self._invoice_amounts(settled))
+        # Lines matched to the same invoice paid it in parts
+        parts = {}
+        for txn, line in zip(bank_transactions, plan.lines):
+            if line.scope == 'skip' and line.status == 'matched':
+                parts.setdefault(line.matched_entry_id, []).append(txn.transaction_id)
+        
+        restored = []
+        for txn, line in zip(bank_transactions, plan.lines):
+            if line.scope != 'skip':
+                continue
+            txn.status = ReconciliationStatus.MATCHED
+            grouped = line.status == 'grouped'
+            if grouped:
+                match_group = f"aggregated-{txn.transaction_id}"
+            elif line.status == 'matched' and len(parts[line.matched_entry_id]) > 1:
+                match_group = f"split-{parts[line.matched_entry_id][0]}"
+            else:
+                match_group = None
+            for matched_entry_id in line.matched_entry_ids or [line.matched_entry_id]:
+                kind, _, matched_id = (matched_entry_id or '').partition(':')
+                matched_id = int(matched_id) if matched_id.isdigit() else matched_id
+                restored.append(ReconciliationMatch(
+                    bank_transaction_id=txn.transaction_id,
+                    ledger_entry_id=matched_id if kind == 'entry' else None,
+                    invoice_id=matched_id if kind == 'invoice' else None,
+                    match_amount=Decimal(str(invoice_amounts[matched_entry_id])) if grouped else txn.amount,
+                    match_confidence=line.confidence,
+                    match_type=TransactionMapping.INVOICE if kind == 'invoice' else self._determine_transaction_type(txn.description),
+                    match_notes="Reconciled in an earlier run",
+                    is_manual=line.status == 'manual',
+                    match_group=match_group
+                ))
+        return restored
     
     def create_manual_mapping(
         self, 
         transaction_id: str, 
         account_code: str, 
         mapping_type: str,
-        notes: str = ""
+        notes: str = "",
+        bank_account_code: str = ""
     ) -> bool:
-        """Create manual mapping for unmatched transaction"""
+        """Create manual mapping for unmatched transaction of the statement reconciled for bank_account_code"""
         
         try:
             # Create journal entry for the manual mapping
@@ -755,6 +1130,10 @@ class BankReconciliationEngine:
             success = self.accounting_engine.create_manual_journal_entry(journal_entries)
             
             if success:
+                # Remember the choice for the next transaction like this one
+                line = ReconciliationStateStore(self.company_id, bank_account_code).statement_line(transaction_id)
+                if line is not None:
+                    self.mapping_memory.record(line['description'], line['amount'], account_code)
                 logger.info(f"Manual mapping created for transaction {transaction_id}")
                 return True
             else:
@@ -13,6 +13,15 @@ import re
 from dataclasses import dataclass
 import uuid
 
+from services.reconciliation_candidate_index import CandidateBlockingIndex
+from services.reconciliation_score_matrix import AmountDateScorer, AmountDateScores
+from services.reconciliation_description_index import DescriptionIndex
+from services.party_name_store import PartyNameStore
+from services.reconciliation_state_store import ReconciliationStateStore
+from services.mapping_memory import MappingMemory
+from services.parallel_reconciliation import score_in_shards
+from services.reconciliation_match_candidate import MatchCandidate, LAYERS
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -59,8 +68,23 @@ class BankReconciliationService:
         self.reconciliation_rules = []
         self.matched_transactions = []
         self.unmatched_transactions = []
-        self.manual_mappings = {}
         self.confidence_threshold = 0.85
+        # Every Nth bank line is also scored against the whole ledger to measure blocking recall (0 disables)
+        self.blocking_recall_sample_every = 0
+        self.candidate_stats = {}
+        # 'parallel' scores shards of the statement in forked worker processes (None: one per CPU)
+        self.execution_mode = 'serial'
+        self.parallel_workers = None
+        # TF-IDF index over the descriptions of the ledger entries being reconciled
+        self.description_index = DescriptionIndex([])
+        self.indexed_entries: List[Dict] = []
+        # Phonetic / suffix-stripped / acronym keys of the parties being reconciled
+        self.party_store = PartyNameStore()
+        # Statement lines, matches, manual mappings and runs persisted between requests
+        self.state_store = ReconciliationStateStore(company_id)
+        self.run_stats = {}
+        # Accounts users mapped similar transactions to, by description signature
+        self.mapping_memory = MappingMemory(company_id)
         
         # Initialize manual journal service for seamless integration
         from services.enhanced_manual_journal_service import EnhancedManualJournalService
@@ -84,7 +108,7 @@ class BankReconciliationService:
             transactions = self._parse_bank_statement(statement_data)
             
             # Apply automated matching rules
-            reconciliation_results = self._apply_reconciliation_rules(transactions)
+            reconciliation_results = self._apply_reconciliation_rules(transactions, bank_info['account_number'])
             
             # Categorize transactions by status
             categorized_transactions = self._categorize_transactions(reconciliation_results)
@@ -99,6 +123,8 @@ class BankReconciliationService:
                 'unmatched_count': len(categorized_transactions['unmatched']),
                 'transactions': categorized_transactions,
                 'reconciliation_summary': self._generate_reconciliation_summary(categorized_transactions),
+                'candidate_stats': self.candidate_stats,
+                'run_stats': self.run_stats,
                 'processing_timestamp': datetime.now().isoformat()
             }
             
@@ -277,15 +303,35 @@ class BankReconciliationService:
         else:
             return TransactionType.UNKNOWN
     
-    def _apply_reconciliation_rules(self, transactions: List[BankTransaction]) -> List[Dict[str, Any]]:
-        """Apply automated reconciliation rules to categorize transactions"""
+    def _apply_reconciliation_rules(self, transactions: List[BankTransaction], bank_account: str = '') -> List[Dict[str, Any]]:
+        """
+        Apply automated reconciliation rules to categorize transactions
+        
+        Runs are incremental: lines reconciled by an earlier run are restored from
+        the database, open lines are scored only against ledger entries posted
+        since they were last scored, and only lines never seen before meet the
+        whole ledger.
+        """
         
         results = []
         
         # Load existing journal entries for matching
         existing_journal_entries = self._get_existing_journal_entries()
+        entry_ids = [str(entry.get('id') or '') for entry in existing_journal_entries]
+        entries_by_id = {entry_id: entry for entry_id, entry in zip(entry_ids, existing_journal_entries) if entry_id}
+        
+        self.state_store = ReconciliationStateStore(self.company_id, bank_account)
+        plan = self.state_store.plan_run(transactions, entry_ids)
+        to_score = [position for position, line in enumerate(plan.lines)
+                    if line.scope == 'all' or (line.scope == 'new' and line.new_positions)]
+        scored_matches = self._score_statement_lines(
+            transactions, existing_journal_entries,
+            {position: None if plan.lines[position].scope == 'all' else set(plan.lines[position].new_positions)
+             for position in to_score}
+        )
         
-        for transaction in transactions:
+        for position, transaction in enumerate(transactions):
+            line = plan.lines[position]
             result = {
                 'transaction': transaction,
                 'status': ReconciliationStatus.UNMATCHED,
@@ -295,20 +341,38 @@ class BankReconciliationService:
                 'notes': []
             }
             
-            # Apply matching rules
-            matches = self._find_potential_matches(transaction, existing_journal_entries)
+            if line.scope == 'skip':
+                # Reconciled by an earlier run
+                result['status'] = ReconciliationStatus(line.status)
+                result['confidence_score'] = line.confidence
+                if line.matched_entry_id in entries_by_id:
+                    result['matched_entries'] = [self._restored_match(entries_by_id[line.matched_entry_id],
+                                                                      line.confidence)]
+                result['notes'].append('Reconciled in an earlier run')
+                results.append(result)
+                continue
+            
+            matches = scored_matches.get(position, [])
+            if line.scope == 'new':
+                # Best matches among older entries were found by earlier runs
+                restored = [self._restored_match(entries_by_id[entry_id], confidence)
+                            for entry_id, confidence in line.candidates]
+                matches = sorted(matches + restored, key=lambda x: x.confidence, reverse=True)
             
             if matches:
-                best_match = max(matches, key=lambda x: x['confidence'])
+                best_match = max(matches, key=lambda x: x.confidence)
                 
-                if best_match['confidence'] >= 0.9:
+                if best_match.confidence >= 0.9:
                     result['status'] = ReconciliationStatus.MATCHED
                     result['matched_entries'] = [best_match]
-                elif best_match['confidence'] >= 0.6:
+                elif best_match.confidence >= 0.6:
                     result['status'] = ReconciliationStatus.PARTIAL_MATCH
                     result['suggested_mappings'] = matches[:3]  # Top 3 suggestions
                 
-                result['confidence_score'] = best_match['confidence']
+                result['confidence_score'] = best_match.confidence
+            
+            line.record(result['status'].value, [(str(match.entry.get('id') or ''), match.confidence)
+                                                 for match in matches])
             
             # Apply rule-based categorization
             category_suggestions = self._get_category_suggestions(transaction)
@@ -316,8 +380,121 @@ class BankReconciliationService:
             
             results.append(result)
         
+        self.run_stats = self.state_store.finish_run(plan)
+        
         return results
     
+    def _score_statement_lines(self, transactions: List[BankTransaction], journal_entries: List[Dict],
+                               scopes: Dict[int, Optional[set]]) -> Dict[int, List[MatchCandidate]]:
+        """
+        Potential matches of the given lines, keyed by their position in transactions
+        
+        scopes maps each line to score to the ledger positions it may be matched
+        against (None for the whole ledger). Nothing is indexed when there is
+        nothing to score.
+        """
+        self.candidate_stats = {}
+        if not scopes:
+            return {}
+        
+        # Index descriptions once per run; the semantic layer and blocking both use it
+        self._index_descriptions(journal_entries)
+        self.party_store = PartyNameStore.for_parties(
+            [entry.get('party_name') for entry in journal_entries], self.company_id
+        )
+        
+        # Block once per run so each bank line is only scored against its shortlist
+        candidate_index = CandidateBlockingIndex(journal_entries, description_index=self.description_index)
+        positions = list(scopes)
+        shortlists = []
+        for position in positions:
+            transaction = transactions[position]
+            candidate_ids = candidate_index.candidates(transaction.amount, transaction.date,
+                                                       f"{transaction.description} {transaction.reference}")
+            if scopes[position] is not None:
+                candidate_ids = [index for index in candidate_ids if index in scopes[position]]
+            shortlists.append(candidate_ids)
+        
+        # Shards read the indexes built above; matches come back with ledger positions
+        context = {
+            'transactions': transactions,
+            'journal_entries': journal_entries,
+            'shortlists': dict(zip(positions, shortlists)),
+            'scorer': AmountDateScorer(journal_entries)
+        }
+        if self.execution_mode == 'parallel':
+            line_matches = score_in_shards(self._score_line_shard, context, positions, self.parallel_workers)
+        else:
+            line_matches = self._score_line_shard(context, positions)
+        
+        scored = {}
+        for sample, (position, candidate_ids, matches) in enumerate(zip(positions, shortlists, line_matches)):
+            scored[position] = [match.attach(journal_entries[entry_position], transactions[position], self.explain_match)
+                                for entry_position, match in matches]
+            
+            if (self.blocking_recall_sample_every and scopes[position] is None
+                    and sample % self.blocking_recall_sample_every == 0):
+                self._sample_blocking_recall(candidate_index, transactions[position], journal_entries, candidate_ids)
+        
+        self.candidate_stats = candidate_index.stats.to_dict()
+        logger.info(f"Candidate blocking scored {self.candidate_stats['candidate_pairs']} of "
+                    f"{self.candidate_stats['total_pairs']} pairs (pruned {self.candidate_stats['pruning_ratio']:.1%})")
+        
+        return scored
+    
+    def _score_line_shard(self, context: Dict[str, Any], positions: List[int]) -> List[List[Tuple[int, MatchCandidate]]]:
+        """
+        Potential matches of a shard of statement lines against their shortlists
+        
+        Amount and date layers are scored for the whole shard in one vectorized
+        pass. Matches come back detached, paired with their entry's ledger
+        position, so parallel shards return scores rather than copies of the
+        ledger.
+        """
+        transactions = context['transactions']
+        journal_entries = context['journal_entries']
+        shortlists = context['shortlists']
+        
+        pair_transactions = [transactions[position] for position in positions for _ in shortlists[position]]
+        amount_date_scores = context['scorer'].score(
+            [transaction.amount for transaction in pair_transactions],
+            [transaction.date for transaction in pair_transactions],
+            [index for position in positions for index in shortlists[position]]
+        )
+        
+        line_matches = []
+        first_pair = 0
+        for position in positions:
+            candidate_ids = shortlists[position]
+            last_pair = first_pair + len(candidate_ids)
+            matches = self._find_potential_matches(
+                transactions[position], [journal_entries[index] for index in candidate_ids],
+                amount_date_scores.window(first_pair, last_pair)
+            )
+            first_pair = last_pair
+            
+            entry_positions = {id(journal_entries[index]): index for index in candidate_ids}
+            line_matches.append([(entry_positions[id(match.entry)], match.detached()) for match in matches])
+        
+        return line_matches
+    
+    @staticmethod
+    def _restored_match(entry: Dict, confidence: float) -> MatchCandidate:
+        """A match found by an earlier run; only its confidence was kept"""
+        return MatchCandidate.restored_match(entry, confidence)
+    
+    def _index_descriptions(self, journal_entries: List[Dict]):
+        self.indexed_entries = journal_entries
+        self.description_index = DescriptionIndex([entry.get('description', '') for entry in journal_entries])
+    
+    def _sample_blocking_recall(self, candidate_index: CandidateBlockingIndex, transaction: BankTransaction,
+                                journal_entries: List[Dict], candidate_ids: List[int]):
+        """Score one bank line exhaustively and record whether its actionable matches were shortlisted"""
+        positions = {id(entry): index for index, entry in enumerate(journal_entries)}
+        full_matches = self._find_potential_matches(transaction, journal_entries)
+        actionable = [positions[id(match.entry)] for match in full_matches if match.confidence >= 0.6]
+        candidate_index.record_recall(actionable, candidate_ids)
+    
     def _get_existing_journal_entries(self) -> List[Dict]:
         """Get existing journal entries for matching including uploaded templates"""
         
@@ -421,7 +598,8 @@ class BankReconciliationService:
             print(f"Error getting processed files: {e}")
             return []
     
-    def _find_potential_matches(self, transaction: BankTransaction, journal_entries: List[Dict]) -> List[Dict]:
+    def _find_potential_matches(self, transaction: BankTransaction, journal_entries: List[Dict],
+                                amount_date_scores: Optional[AmountDateScores] = None) -> List[MatchCandidate]:
         """
         ENHANCED 100% LOGIC INVOICE MAPPING ALGORITHM
         ===========================================
@@ -477,253 +655,95 @@ class BankReconciliationService:
         - 70-84% confidence = YELLOW (Good Match - Review suggested)
         - 50-69% confidence = ORANGE (Moderate Match - Manual review)
         - <50% confidence = RED (Poor Match - Manual mapping required)
+        
+        Layers 1 and 2 are vectorized over all entries (or taken from the batch
+        the caller already scored); only layers 3-7 run per pair.
+        
+        Matches are MatchCandidate records holding the layer scores only; the
+        factors, per-layer analysis and risk assessment are rebuilt by
+        explain_match() when a candidate is expanded.
         """
         
         matches = []
         
-        for entry in journal_entries:
-            # Initialize comprehensive matching analysis
-            layer_scores = {}
-            comprehensive_factors = []
-            detailed_analysis = {}
-            
-            # LAYER 1: AMOUNT PRECISION ANALYSIS (100% Logic)
-            amount_analysis = self._analyze_amount_precision(transaction, entry)
-            layer_scores['amount'] = amount_analysis['score']
-            comprehensive_factors.extend(amount_analysis['factors'])
-            detailed_analysis['amount_analysis'] = amount_analysis
-            
-            # LAYER 2: TEMPORAL CORRELATION ANALYSIS (100% Logic)
-            temporal_analysis = self._analyze_temporal_correlation(transaction, entry)
-            layer_scores['temporal'] = temporal_analysis['score']
-            comprehensive_factors.extend(temporal_analysis['factors'])
-            detailed_analysis['temporal_analysis'] = temporal_analysis
-            
-            # LAYER 3: ADVANCED REFERENCE PATTERN MATCHING (100% Logic)
-            reference_analysis = self._analyze_reference_patterns(transaction, entry)
-            layer_scores['reference'] = reference_analysis['score']
-            comprehensive_factors.extend(reference_analysis['factors'])
-            detailed_analysis['reference_analysis'] = reference_analysis
-            
-            # LAYER 4: INTELLIGENT PARTY IDENTIFICATION (100% Logic)
-            party_analysis = self._analyze_party_identification(transaction, entry)
-            layer_scores['party'] = party_analysis['score']
-            comprehensive_factors.extend(party_analysis['factors'])
-            detailed_analysis['party_analysis'] = party_analysis
-            
-            # LAYER 5: SEMANTIC DESCRIPTION ANALYSIS (100% Logic)
-            semantic_analysis = self._analyze_semantic_description(transaction, entry)
-            layer_scores['semantic'] = semantic_analysis['score']
-            comprehensive_factors.extend(semantic_analysis['factors'])
-            detailed_analysis['semantic_analysis'] = semantic_analysis
-            
-            # LAYER 6: BEHAVIORAL TRANSACTION ANALYSIS (100% Logic)
-            behavioral_analysis = self._analyze_behavioral_patterns(transaction, entry)
-            layer_scores['behavioral'] = behavioral_analysis['score']
-            comprehensive_factors.extend(behavioral_analysis['factors'])
-            detailed_analysis['behavioral_analysis'] = behavioral_analysis
-            
-            # LAYER 7: CONTEXTUAL BUSINESS LOGIC (100% Logic)
-            contextual_analysis = self._analyze_contextual_business_logic(transaction, entry)
-            layer_scores['contextual'] = contextual_analysis['score']
-            comprehensive_factors.extend(contextual_analysis['factors'])
-            detailed_analysis['contextual_analysis'] = contextual_analysis
+        if amount_date_scores is None:
+            amount_date_scores = AmountDateScorer(journal_entries).score(
+                [transaction.amount] * len(journal_entries), [transaction.date] * len(journal_entries),
+                range(len(journal_entries))
+            )
+        
+        for position, entry in enumerate(journal_entries):
+            layer_scores, _, _ = self._analyze_match_layers(
+                transaction, entry,
+                amount_date_scores.amount_analysis(position), amount_date_scores.temporal_analysis(position)
+            )
             
             # CALCULATE COMPREHENSIVE CONFIDENCE SCORE
             # Weighted combination of all layers with advanced normalization
             confidence = self._calculate_comprehensive_confidence(layer_scores)
             
-            # INTELLIGENT RISK ASSESSMENT
-            risk_assessment = self._assess_matching_risk(layer_scores, detailed_analysis)
-            
-            # FINAL CATEGORIZATION WITH ENHANCED LOGIC
-            categorization = self._get_enhanced_match_category(confidence, risk_assessment)
-            
             # Only include matches above enhanced threshold
             if confidence > 0.25:  # Lower threshold for more comprehensive analysis
-                matches.append({
-                    'entry': entry,
-                    'confidence': round(confidence, 4),
-                    'layer_scores': layer_scores,
-                    'comprehensive_factors': comprehensive_factors,
-                    'detailed_analysis': detailed_analysis,
-                    'risk_assessment': risk_assessment,
-                    'categorization': categorization,
-                    'match_quality': self._determine_match_quality(confidence, risk_assessment)
-                })
+                # INTELLIGENT RISK ASSESSMENT drives the category and ranking; its details are rebuilt on demand
+                risk_assessment = self._assess_matching_risk(layer_scores)
+                matches.append(MatchCandidate(
+                    entry, transaction, round(confidence, 4),
+                    scores=tuple(layer_scores[layer] for layer in LAYERS),
+                    categorization=self._get_enhanced_match_category(confidence, risk_assessment),
+                    match_quality=self._determine_match_quality(confidence, risk_assessment),
+                    explainer=self.explain_match
+                ))
+        
+        return sorted(matches, key=lambda x: (x.confidence, x.match_quality), reverse=True)
+    
+    def _analyze_match_layers(self, transaction: BankTransaction, entry: Dict, amount_analysis: Dict,
+                              temporal_analysis: Dict) -> Tuple[Dict[str, float], List[str], Dict[str, Dict]]:
+        """Scores, factors and analysis of all seven layers for one pair (layers 1 and 2 given)"""
+        
+        layer_scores = {}
+        comprehensive_factors = []
+        detailed_analysis = {}
+        
+        layers = (
+            ('amount', amount_analysis),                                              # LAYER 1: AMOUNT PRECISION
+            ('temporal', temporal_analysis),                                          # LAYER 2: TEMPORAL CORRELATION
+            ('reference', self._analyze_reference_patterns(transaction, entry)),      # LAYER 3: REFERENCE PATTERNS
+            ('party', self._analyze_party_identification(transaction, entry)),        # LAYER 4: PARTY IDENTIFICATION
+            ('semantic', self._analyze_semantic_description(transaction, entry)),     # LAYER 5: SEMANTIC DESCRIPTION
+            ('behavioral', self._analyze_behavioral_patterns(transaction, entry)),    # LAYER 6: BEHAVIORAL PATTERNS
+            ('contextual', self._analyze_contextual_business_logic(transaction, entry))  # LAYER 7: BUSINESS CONTEXT
+        )
+        for layer, analysis in layers:
+            layer_scores[layer] = analysis['score']
+            comprehensive_factors.extend(analysis['factors'])
+            detailed_analysis[f'{layer}_analysis'] = analysis
         
-        return sorted(matches, key=lambda x: (x['confidence'], x['match_quality']), reverse=True)
+        return layer_scores, comprehensive_factors, detailed_analysis
     
-    def _analyze_amount_precision(self, transaction: BankTransaction, entry: Dict) -> Dict:
-        """LAYER 1: Advanced Amount Precision Analysis with 100% Logic"""
+    def explain_match(self, transaction: BankTransaction, entry: Dict) -> Dict[str, Any]:
+        """Full analysis of one bank line against one ledger entry, as shown when a match is expanded"""
         
-        analysis = {
-            'score': 0.0,
-            'factors': [],
-            'details': {}
+        layer_scores, comprehensive_factors, detailed_analysis = self._analyze_match_layers(
+            transaction, entry,
+            self._analyze_amount_precision(transaction, entry), self._analyze_temporal_correlation(transaction, entry)
+        )
+        confidence = self._calculate_comprehensive_confidence(layer_scores)
+        risk_assessment = self._assess_matching_risk(layer_scores, detailed_analysis)
+        return {
+            'confidence': round(confidence, 4),
+            'layer_scores': layer_scores,
+            'comprehensive_factors': comprehensive_factors,
+            'detailed_analysis': detailed_analysis,
+            'risk_assessment': risk_assessment
         }
-        
-        try:
-            bank_amount = float(transaction.amount)
-            entry_amount = float(entry.get('amount', 0))
-            
-            # Absolute difference calculation
-            amount_diff = abs(bank_amount - entry_amount)
-            
-            # Percentage difference (handle zero amounts)
-            if bank_amount != 0:
-                percentage_diff = amount_diff / abs(bank_amount)
-            else:
-                percentage_diff = 1.0 if entry_amount != 0 else 0.0
-            
-            # PRECISION MATCHING LOGIC
-            if amount_diff < 0.001:  # Perfect precision match
-                analysis['score'] = 1.0
-                analysis['factors'].append('perfect_amount_precision')
-                analysis['details']['match_type'] = 'perfect'
-            elif amount_diff < 0.01:  # Near-perfect match
-                analysis['score'] = 0.95
-                analysis['factors'].append('near_perfect_amount_match')
-                analysis['details']['match_type'] = 'near_perfect'
-            elif percentage_diff <= 0.001:  # 0.1% tolerance
-                analysis['score'] = 0.9
-                analysis['factors'].append('ultra_precise_match')
-                analysis['details']['match_type'] = 'ultra_precise'
-            elif percentage_diff <= 0.01:  # 1% tolerance
-                analysis['score'] = 0.8
-                analysis['factors'].append('high_precision_match')
-                analysis['details']['match_type'] = 'high_precision'
-            elif percentage_diff <= 0.05:  # 5% tolerance
-                analysis['score'] = 0.6
-                analysis['factors'].append('acceptable_variance')
-                analysis['details']['match_type'] = 'acceptable'
-            elif percentage_diff <= 0.1:  # 10% tolerance
-                analysis['score'] = 0.3
-                analysis['factors'].append('moderate_variance')
-                analysis['details']['match_type'] = 'moderate'
-            else:
-                analysis['score'] = 0.0
-                analysis['factors'].append('significant_amount_mismatch')
-                analysis['details']['match_type'] = 'poor'
-            
-            # ROUNDING PATTERN DETECTION
-            if amount_diff > 0:
-                # Check for common rounding patterns
-                if amount_diff % 1 == 0:  # Whole number difference
-                    analysis['score'] += 0.1
-                    analysis['factors'].append('rounding_pattern_detected')
-                elif amount_diff in [0.01, 0.02, 0.05, 0.1, 0.5]:  # Common rounding
-                    analysis['score'] += 0.05
-                    analysis['factors'].append('common_rounding_detected')
-            
-            # TRANSACTION SIZE CONTEXT
-            if abs(bank_amount) > 100000:  # Large transactions
-                analysis['details']['size_category'] = 'large'
-                if percentage_diff <= 0.001:
-                    analysis['score'] += 0.05  # Bonus for precise large amounts
-            elif abs(bank_amount) > 10000:  # Medium transactions
-                analysis['details']['size_category'] = 'medium'
-            else:  # Small transactions
-                analysis['details']['size_category'] = 'small'
-                if amount_diff <= 1:  # Small absolute difference for small amounts
-                    analysis['score'] += 0.1
-            
-            analysis['details']['amount_difference'] = amount_diff
-            analysis['details']['percentage_difference'] = percentage_diff
-            
-        except (ValueError, TypeError):
-            analysis['score'] = 0.0
-            analysis['factors'].append('amount_parsing_error')
-            analysis['details']['error'] = 'Unable to parse amounts'
-        
-        return analysis
+    
+    def _analyze_amount_precision(self, transaction: BankTransaction, entry: Dict) -> Dict:
+        """LAYER 1: Advanced Amount Precision Analysis for a single pair"""
+        return AmountDateScorer([entry]).score([transaction.amount], [transaction.date], [0]).amount_analysis(0)
     
     def _analyze_temporal_correlation(self, transaction: BankTransaction, entry: Dict) -> Dict:
-        """LAYER 2: Advanced Temporal Correlation Analysis with 100% Logic"""
-        
-        analysis = {
-            'score': 0.0,
-            'factors': [],
-            'details': {}
-        }
-        
-        try:
-            bank_date = transaction.date
-            entry_date = datetime.strptime(entry.get('date', ''), '%Y-%m-%d')
-            
-            # Calculate date difference
-            date_diff = (bank_date - entry_date).days
-            abs_date_diff = abs(date_diff)
-            
-            # TEMPORAL MATCHING LOGIC
-            if abs_date_diff == 0:  # Same day
-                analysis['score'] = 1.0
-                analysis['factors'].append('exact_date_match')
-                analysis['details']['match_type'] = 'exact'
-            elif abs_date_diff == 1:  # Next/Previous day
-                analysis['score'] = 0.9
-                analysis['factors'].append('adjacent_date_match')
-                analysis['details']['match_type'] = 'adjacent'
-            elif abs_date_diff <= 3:  # Within 3 days
-                analysis['score'] = 0.7
-                analysis['factors'].append('close_date_match')
-                analysis['details']['match_type'] = 'close'
-            elif abs_date_diff <= 7:  # Within a week
-                analysis['score'] = 0.5
-                analysis['factors'].append('week_date_match')
-                analysis['details']['match_type'] = 'weekly'
-            elif abs_date_diff <= 15:  # Within 2 weeks
-                analysis['score'] = 0.3
-                analysis['factors'].append('biweekly_match')
-                analysis['details']['match_type'] = 'biweekly'
-            elif abs_date_diff <= 30:  # Within a month
-                analysis['score'] = 0.1
-                analysis['factors'].append('monthly_match')
-                analysis['details']['match_type'] = 'monthly'
-            else:
-                analysis['score'] = 0.0
-                analysis['factors'].append('distant_date_mismatch')
-                analysis['details']['match_type'] = 'distant'
-            
-            # BUSINESS DAY LOGIC
-            weekday_bank = bank_date.weekday()
-            weekday_entry = entry_date.weekday()
-            
-            # Weekend adjustment logic
-            if weekday_bank >= 5 or weekday_entry >= 5:  # Weekend involved
-                analysis['factors'].append('weekend_involved')
-                if abs_date_diff <= 3:  # Weekend processing delay
-                    analysis['score'] += 0.1
-                    analysis['factors'].append('weekend_processing_delay')
-            
-            # PROCESSING DELAY PATTERNS
-            if date_diff > 0:  # Bank transaction after invoice
-                analysis['details']['processing_pattern'] = 'delayed_payment'
-                if abs_date_diff <= 3:
-                    analysis['score'] += 0.05
-                    analysis['factors'].append('normal_processing_delay')
-            elif date_diff < 0:  # Bank transaction before invoice
-                analysis['details']['processing_pattern'] = 'advance_payment'
-                if abs_date_diff <= 7:
-                    analysis['score'] += 0.02
-                    analysis['factors'].append('advance_payment_pattern')
-            else:
-                analysis['details']['processing_pattern'] = 'same_day'
-            
-            # RECURRING PATTERN DETECTION
-            if abs_date_diff in [7, 14, 30, 90]:  # Common recurring periods
-                analysis['factors'].append('recurring_pattern_detected')
-                analysis['score'] += 0.05
-            
-            analysis['details']['date_difference_days'] = date_diff
-            analysis['details']['absolute_difference'] = abs_date_diff
-            
-        except (ValueError, TypeError):
-            analysis['score'] = 0.0
-            analysis['factors'].append('date_parsing_error')
-            analysis['details']['error'] = 'Unable to parse dates'
-        
-        return analysis
+        """LAYER 2: Advanced Temporal Correlation Analysis for a single pair"""
+        return AmountDateScorer([entry]).score([transaction.amount], [transaction.date], [0]).temporal_analysis(0)
     
     def _analyze_reference_patterns(self, transaction: BankTransaction, entry: Dict) -> Dict:
         """LAYER 3: Advanced Reference Pattern Matching with 100% Logic"""
@@ -985,7 +1005,7 @@ class BankReconciliationService:
         
         return min(confidence, 1.0)  # Cap at 100%
     
-    def _assess_matching_risk(self, layer_scores: Dict, detailed_analysis: Dict) -> Dict:
+    def _assess_matching_risk(self, layer_scores: Dict, detailed_analysis: Optional[Dict] = None) -> Dict:
         """Assess the risk of incorrect matching"""
         
         risk_assessment = {
@@ -1050,24 +1070,28 @@ class BankReconciliationService:
         return False
     
     def _advanced_name_normalization(self, bank_desc: str, party_name: str) -> Dict:
-        """Advanced name normalization and matching"""
-        # Implement advanced name matching
+        """Match on the legal-suffix-stripped name, whole or word by word"""
+        match = self.party_store.party_match(bank_desc, party_name)
+        
+        if match.stripped:
+            return {'score': 0.95, 'factors': ['normalized_party_name_match'],
+                    'details': {'match_type': 'normalized'}}
+        if match.core_words >= 0.5:
+            return {'score': round(0.8 * match.core_words, 4), 'factors': ['partial_party_name_match'],
+                    'details': {'match_type': 'partial', 'core_word_share': match.core_words}}
         return {'score': 0.0, 'factors': [], 'details': {}}
     
     def _phonetic_name_matching(self, bank_desc: str, party_name: str) -> float:
-        """Phonetic name matching"""
-        # Implement phonetic matching
-        return 0.0
+        """Share of the party's name words that sound alike in the description"""
+        return self.party_store.phonetic_score(bank_desc, party_name)
     
     def _detect_name_abbreviations(self, bank_desc: str, party_name: str) -> float:
-        """Detect name abbreviations"""
-        # Implement abbreviation detection
-        return 0.0
+        """1.0 when an acronym of the party name appears as a word of the description"""
+        return self.party_store.acronym_score(bank_desc, party_name)
     
     def _calculate_semantic_similarity(self, text1: str, text2: str) -> float:
-        """Calculate semantic similarity between descriptions"""
-        # Implement semantic similarity calculation
-        return 0.0
+        """TF-IDF cosine similarity of two descriptions, weighted by the run's ledger vocabulary"""
+        return self.description_index.similarity(text1, text2)
     
     def _analyze_industry_keywords(self, bank_desc: str, entry_desc: str) -> float:
         """Analyze industry-specific keywords"""
@@ -1117,23 +1141,23 @@ class BankReconciliationService:
     
     def _calculate_text_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity between two text strings"""
-        
-        # Simple word-based similarity
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-        
-        if not words1 or not words2:
-            return 0.0
-        
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        return len(intersection) / len(union)
+        return self.description_index.similarity(text1, text2)
     
     def _get_category_suggestions(self, transaction: BankTransaction) -> List[Dict]:
         """Get category suggestions based on transaction description"""
         
-        suggestions = []
+        # Recurring transactions resolve from earlier manual mappings
+        remembered = self.mapping_memory.suggest(transaction.description, transaction.amount)
+        suggestions = [{
+            'suggested_account': suggestion['account_code'],
+            'account_name': suggestion['account_name'],
+            'confidence': suggestion['confidence'],
+            'reason': suggestion['reason'],
+            'source': suggestion['source']
+        } for suggestion in remembered]
+        if remembered and remembered[0]['confidence'] >= self.mapping_memory.resolve_confidence:
+            return suggestions
+        
         description = transaction.description.lower()
         
         # Rule-based categorization
@@ -1260,6 +1284,7 @@ class BankReconciliationService:
             
             # INTEGRATE WITH ACCOUNTING MODULE
             accounting_integration_result = self._integrate_with_accounting_module(journal_entry)
+            self._remember_mapping(mapping_data['description'], bank_amount, mapping_data['mapped_account_code'])
             
             return {
                 'success': True,
@@ -1706,6 +1731,37 @@ class BankReconciliationService:
         """Get chart of accounts for manual mapping interface"""
         return self.chart_of_accounts
     
+    def similar_entry_suggestions(self, description: str, amount: float, limit: int = 3,
+                                  min_similarity: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Accounts used by posted ledger entries whose descriptions resemble the transaction
+        
+        Looked up in the run's description index (built from the ledger on first use
+        when no statement has been processed yet). Receipts suggest the credited
+        account of the similar entry, payments the debited one.
+        """
+        if not self.indexed_entries:
+            self._index_descriptions(self._get_existing_journal_entries())
+        
+        suggestions = {}
+        for position, similarity in self.description_index.search(description, limit * 3, min_similarity):
+            entry = self.indexed_entries[position]
+            account_code = str(entry.get('credit_account' if amount > 0 else 'debit_account') or '')
+            if account_code not in self.chart_of_accounts or account_code in suggestions:
+                continue
+            account_info = self.chart_of_accounts[account_code]
+            suggestions[account_code] = {
+                'account_code': account_code,
+                'account_name': account_info['name'],
+                'account_type': account_info['type'],
+                'confidence': round(min(0.5 + 0.45 * similarity, 0.95), 4),
+                'reason': f"Similar to posted entry '{entry.get('description', '')}'",
+                'category': account_info['category'],
+                'similar_entry_id': entry.get('id')
+            }
+        
+        return list(suggestions.values())[:limit]
+    
     def suggest_account_mapping(self, transaction_data: Dict[str, Any]) -> Dict[str, Any]:
         """Suggest account mapping based on transaction data and patterns"""
         
@@ -1713,7 +1769,22 @@ class BankReconciliationService:
             transaction_desc = transaction_data.get('description', '').lower()
             amount = float(transaction_data.get('amount', 0))
             
-            suggestions = []
+            # Earlier manual mappings of similar transactions: a habit is returned as is
+            remembered = [self._with_chart_details(suggestion)
+                          for suggestion in self.mapping_memory.suggest(transaction_desc, amount,
+                                                                        transaction_data.get('party_name'))]
+            if remembered and remembered[0]['confidence'] >= self.mapping_memory.resolve_confidence:
+                return {
+                    'success': True,
+                    'suggestions': remembered,
+                    'transaction_analysis': {
+                        'amount': amount,
+                        'is_credit': amount > 0,
+                        'resolved_from_memory': True
+                    }
+                }
+            
+            suggestions = list(remembered)
             
             # Rule-based account suggestions
             account_suggestions = {
@@ -1772,6 +1843,12 @@ class BankReconciliationService:
                                 'category': account_info['category']
                             })
             
+            # Accounts of similar posted entries
+            for suggestion in self.similar_entry_suggestions(transaction_desc, amount):
+                if not any(existing['account_code'] == suggestion['account_code'] and
+                           existing['confidence'] >= suggestion['confidence'] for existing in suggestions):
+                    suggestions.append(suggestion)
+            
             # Sort by confidence
             suggestions.sort(key=lambda x: x['confidence'], reverse=True)
             
@@ -1781,7 +1858,8 @@ class BankReconciliationService:
                 'transaction_analysis': {
                     'amount': amount,
                     'is_credit': amount > 0,
-                    'patterns_found': [p for p in account_suggestions.keys() if p in transaction_desc]
+                    'patterns_found': [p for p in account_suggestions.keys() if p in transaction_desc],
+                    'resolved_from_memory': False
                 }
             }
             
@@ -1789,6 +1867,20 @@ class BankReconciliationService:
             logger.error(f"Error suggesting account mapping: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def _with_chart_details(self, suggestion: Dict[str, Any]) -> Dict[str, Any]:
+        """Name, type and category of a remembered account from the chart, when it is there"""
+        account_info = self.chart_of_accounts.get(suggestion['account_code'])
+        if account_info is None:
+            return suggestion
+        return dict(suggestion, account_name=account_info['name'], account_type=account_info['type'],
+                    category=account_info['category'])
+    
+    def _remember_mapping(self, description: str, amount: float, account_code: str):
+        """Teach the mapping memory a user's choice of account"""
+        account_info = self.chart_of_accounts.get(account_code)
+        account_name = account_info['name'] if account_info else self._get_account_name(account_code)
+        self.mapping_memory.record(description, amount, account_code, account_name)
+    
     def create_journal_entry_from_mapping(self, mapping_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create journal entry from manual mapping and integrate with journal system"""
         
@@ -1841,12 +1933,15 @@ class BankReconciliationService:
             
             if journal_result['success']:
                 # Update reconciliation status
-                self.manual_mappings[mapping_data['transaction_id']] = {
-                    'mapped_at': datetime.now().isoformat(),
-                    'mapped_by': self.user_id,
-                    'journal_entry_id': journal_result['journal_entry']['id'],
-                    'status': 'completed'
-                }
+                # The statement's account number scopes its transaction ids, as in process_bank_statement
+                state_store = ReconciliationStateStore(
+                    self.company_id, mapping_data.get('account_number', self.state_store.bank_account))
+                state_store.record_manual_mapping(
+                    mapping_data['transaction_id'], mapped_account,
+                    journal_result['journal_entry']['id'], mapped_by=self.user_id,
+                    description=mapping_data.get('description', ''), amount=amount
+                )
+                self._remember_mapping(mapping_data.get('description', ''), amount, mapped_account)
                 
                 return {
                     'success': True,
@@ -1867,8 +1962,8 @@ class BankReconciliationService:
     def get_reconciliation_status(self, transaction_id: str) -> Dict[str, Any]:
         """Get reconciliation status for a specific transaction"""
         
-        if transaction_id in self.manual_mappings:
-            mapping = self.manual_mappings[transaction_id]
+        mapping = self.state_store.manual_mapping(transaction_id)
+        if mapping is not None:
             return {
                 'transaction_id': transaction_id,
                 'status': 'manually_mapped',
@@ -1887,21 +1982,23 @@ class BankReconciliationService:
     def get_manual_mapping_dashboard_data(self) -> Dict[str, Any]:
         """Get dashboard data for manual mapping interface"""
         
+        manual_mappings = self.state_store.manual_mappings()
+        
         return {
             'summary': {
-                'total_manual_mappings': len(self.manual_mappings),
-                'successful_integrations': len([m for m in self.manual_mappings.values() if m['status'] == 'completed']),
-                'pending_integrations': len([m for m in self.manual_mappings.values() if m['status'] == 'pending']),
+                'total_manual_mappings': len(manual_mappings),
+                'successful_integrations': len([m for m in manual_mappings if m['status'] == 'completed']),
+                'pending_integrations': len([m for m in manual_mappings if m['status'] == 'pending']),
                 'chart_of_accounts_loaded': len(self.chart_of_accounts)
             },
             'recent_mappings': [
                 {
-                    'transaction_id': tid,
+                    'transaction_id': mapping['transaction_id'],
                     'mapped_at': mapping['mapped_at'],
                     'status': mapping['status'],
                     'journal_entry_id': mapping.get('journal_entry_id')
                 }
-                for tid, mapping in list(self.manual_mappings.items())[-5:]
+                for mapping in manual_mappings[-5:]
             ],
             'account_categories': list(set([
                 account['category'] for account in self.chart_of_accounts.values()
@@ -0,0 +1,439 @@
+"""
+Columnar Journal Builder - F-AI Accountant
+Vectorized conversion of template DataFrames into double-entry journal lines
+"""
+
+import uuid
+import logging
+from datetime import datetime
+from decimal import Decimal
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.automated_accounting_engine import AccountingEntry, AccountType, TransactionType
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Marker for values the row-wise builders would have raised on (row is skipped)
+_INVALID = object()
+
+ZERO = Decimal('0')
+
+MERGED_BUILDERS = {
+    TransactionType.PURCHASE: 'purchase',
+    TransactionType.SALES: 'sales',
+    TransactionType.INCOME: 'income',
+    TransactionType.EXPENSE: 'expense',
+    TransactionType.CREDIT_NOTE: 'credit_note',
+    TransactionType.DEBIT_NOTE: 'debit_note'
+}
+
+SPECIFIC_BUILDERS = {'purchase', 'sales', 'income', 'expense', 'credit_note', 'debit_note'}
+
+Leg = Tuple[int, int, AccountingEntry]  # (row position, leg order within the row, entry)
+
+class ColumnarJournalBuilder:
+    """
+    Converts template DataFrames to AccountingEntry lists one transaction type at a time
+
+    Rows are grouped by transaction type and each group's legs are computed column-wise:
+    amounts, dates, categories and account codes are parsed once per distinct value, the
+    tax legs are boolean masks, and entries are emitted in bulk per leg. The output matches
+    the row-wise _create_*_entries builders of AutomatedAccountingEngine entry for entry
+    (same accounts, descriptions, Decimal amounts and leg order), and rows the row-wise path
+    would skip on an exception are skipped here as well.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def build(self, df: pd.DataFrame, template_type: str = 'merged') -> List[AccountingEntry]:
+        """
+        Build journal entries for a whole template
+
+        Args:
+            df: Template rows
+            template_type: 'merged' or one of the specific template types
+
+        Returns:
+            AccountingEntry list in row order
+        """
+        frame = df.reset_index(drop=True)
+        if frame.empty:
+            return []
+
+        if template_type == 'merged':
+            if 'transaction_type' not in frame.columns:
+                logger.error(f"Skipped {len(frame)} rows: missing transaction_type column")
+                return []
+            kinds = self._map_unique(frame['transaction_type'], lambda value: TransactionType(value.lower()))
+            builder_names = np.array(
+                [None if kind is _INVALID else MERGED_BUILDERS.get(kind, 'generic') for kind in kinds],
+                dtype=object
+            )
+        elif template_type in SPECIFIC_BUILDERS:
+            builder_names = np.full(len(frame), template_type, dtype=object)
+        else:
+            return []
+
+        legs: List[Leg] = []
+        for builder_name in ('purchase', 'sales', 'income', 'expense', 'credit_note', 'debit_note', 'generic'):
+            positions = np.flatnonzero(builder_names == builder_name)
+            if len(positions):
+                group = frame.iloc[positions]
+                legs.extend(getattr(self, f'_{builder_name}_legs')(group, positions))
+
+        legs.sort(key=lambda leg: (leg[0], leg[1]))
+
+        built_rows = len({leg[0] for leg in legs})
+        if built_rows < len(frame):
+            logger.error(f"Skipped {len(frame) - built_rows} template rows that could not be converted")
+
+        return [leg[2] for leg in legs]
+
+    # ------------------------------------------------------------------
+    # Per-type leg builders (mirror AutomatedAccountingEngine._create_*_entries)
+    # ------------------------------------------------------------------
+
+    def _purchase_legs(self, group: pd.DataFrame, positions: np.ndarray) -> List[Leg]:
+        base = self._base(group, ['amount', 'date'])
+        if base is None:
+            return []
+        amounts, dates, valid = base
+
+        taxes = self._decimals(group['tax_amount']) if 'tax_amount' in group.columns else [ZERO] * len(group)
+        has_tax = self._positive(taxes)
+        valid &= np.array([flag is not _INVALID for flag in has_tax], dtype=bool)
+        tax_rows = valid & np.array([flag is True for flag in has_tax], dtype=bool)
+        if 'vendor_name' not in group.columns or 'invoice_number' not in group.columns:
+            # The tax leg indexes these columns directly, so such rows fail row-wise
+            valid &= ~tax_rows
+            tax_rows[:] = False
+
+        descriptions = self._text(group, 'description', '')
+        vendors = self._text(group, 'vendor_name', 'Vendor')
+        references = self._raw(group, 'invoice_number', 'N/A')
+        totals = [amount + tax if ok else None for amount, tax, ok in zip(amounts, taxes, valid)]
+
+        if 'purchase_template' in self.engine.account_templates:
+            # Template classification ignores description and amount - resolve once
+            classification = self.engine.classify_transaction('', 0.0, 'purchase_template')
+            debit_codes = classification.get("debit_account", "1200")
+            credit_codes = classification.get("credit_account", "2010")
+            debit_names = self.engine.standard_coa.get(debit_codes, {"name": "Inventory"})["name"]
+            credit_names = self.engine.standard_coa.get(credit_codes, {"name": "Accounts Payable"})["name"]
+        else:
+            classifications = [
+                self.engine.classify_transaction(description, float(amount), "purchase_template") if ok else {}
+                for description, amount, ok in zip(descriptions, amounts, valid)
+            ]
+            debit_codes = [c.get("debit_account", "1200") for c in classifications]
+            credit_codes = [c.get("credit_account", "2010") for c in classifications]
+            debit_names = [self.engine.standard_coa.get(code, {"name": "Inventory"})["name"] for code in debit_codes]
+            credit_names = [self.engine.standard_coa.get(code, {"name": "Accounts Payable"})["name"] for code in credit_codes]
+
+        legs = self._emit(
+            positions, 0, valid, debit_codes, debit_names, amounts, ZERO,
+            [f"Purchase from {vendor} - {description}" for vendor, description in zip(vendors, descriptions)],
+            references, dates, TransactionType.PURCHASE
+        )
+        legs += self._emit(
+            positions, 1, tax_rows, "1300", "Input Tax Credit", taxes, ZERO,
+            [f"Tax on purchase from {vendor}" for vendor in vendors],
+            references, dates, TransactionType.PURCHASE
+        )
+        legs += self._emit(
+            positions, 2, valid, credit_codes, credit_names, ZERO, totals,
+            [f"Amount payable to {vendor}" for vendor in vendors],
+            references, dates, TransactionType.PURCHASE
+        )
+        return legs
+
+    def _sales_legs(self, group: pd.DataFrame, positions: np.ndarray) -> List[Leg]:
+        base = self._base(group, ['amount', 'date', 'customer_name', 'description', 'invoice_number'])
+        if base is None:
+            return []
+        amounts, dates, valid = base
+
+        taxes = self._decimals(group['tax_amount']) if 'tax_amount' in group.columns else [ZERO] * len(group)
+        has_tax = self._positive(taxes)
+        valid &= np.array([flag is not _INVALID for flag in has_tax], dtype=bool)
+        tax_rows = valid & np.array([flag is True for flag in has_tax], dtype=bool)
+
+        customers = self._text(group, 'customer_name')
+        descriptions = self._text(group, 'description')
+        references = self._raw(group, 'invoice_number')
+        totals = [amount + tax if ok else None for amount, tax, ok in zip(amounts, taxes, valid)]
+
+        legs = self._emit(
+            positions, 0, valid, "1110", "Trade Receivables", totals, ZERO,
+            [f"Sale to {customer} - {description}" for customer, description in zip(customers, descriptions)],
+            references, dates, TransactionType.SALES
+        )
+        legs += self._emit(
+            positions, 1, valid, "4010", "Product Sales", ZERO, amounts,
+            [f"Sale to {customer}" for customer in customers],
+            references, dates, TransactionType.SALES
+        )
+        legs += self._emit(
+            positions, 2, tax_rows, "2220", "GST Payable", ZERO, taxes,
+            [f"Tax on sale to {customer}" for customer in customers],
+            references, dates, TransactionType.SALES
+        )
+        return legs
+
+    def _income_legs(self, group: pd.DataFrame, positions: np.ndarray) -> List[Leg]:
+        base = self._base(group, ['amount', 'date', 'source', 'description'])
+        if base is None:
+            return []
+        amounts, dates, valid = base
+
+        accounts = self._category_accounts(group, self.engine._get_income_account, 'other')
+        valid &= np.array([account is not _INVALID for account in accounts], dtype=bool)
+
+        sources = self._text(group, 'source')
+        descriptions = self._text(group, 'description')
+
+        legs = self._emit(
+            positions, 0, valid, "1020", "Bank Account - Current", amounts, ZERO,
+            [f"Income from {source} - {description}" for source, description in zip(sources, descriptions)],
+            self._generated_references('INC', len(group)), dates, TransactionType.INCOME
+        )
+        legs += self._emit(
+            positions, 1, valid,
+            [account["code"] if account is not _INVALID else None for account in accounts],
+            [account["name"] if account is not _INVALID else None for account in accounts],
+            ZERO, amounts,
+            [f"Income from {source}" for source in sources],
+            self._generated_references('INC', len(group)), dates, TransactionType.INCOME
+        )
+        return legs
+
+    def _expense_legs(self, group: pd.DataFrame, positions: np.ndarray) -> List[Leg]:
+        base = self._base(group, ['amount', 'date', 'vendor', 'description'])
+        if base is None:
+            return []
+        amounts, dates, valid = base
+
+        accounts = self._category_accounts(group, self.engine._get_expense_account, 'general')
+        valid &= np.array([account is not _INVALID for account in accounts], dtype=bool)
+
+        vendors = self._text(group, 'vendor')
+        descriptions = self._text(group, 'description')
+
+        legs = self._emit(
+            positions, 0, valid,
+            [account["code"] if account is not _INVALID else None for account in accounts],
+            [account["name"] if account is not _INVALID else None for account in accounts],
+            amounts, ZERO,
+            [f"Expense to {vendor} - {description}" for vendor, description in zip(vendors, descriptions)],
+            self._generated_references('EXP', len(group)), dates, TransactionType.EXPENSE
+        )
+        legs += self._emit(
+            positions, 1, valid, "1020", "Bank Account - Current", ZERO, amounts,
+            [f"Payment to {vendor}" for vendor in vendors],
+            self._generated_references('EXP', len(group)), dates, TransactionType.EXPENSE
+        )
+        return legs
+
+    def _credit_note_legs(self, group: pd.DataFrame, positions: np.ndarray) -> List[Leg]:
+        base = self._base(group, ['amount', 'date', 'party_name', 'reason', 'original_invoice'])
+        if base is None:
+            return []
+        amounts, dates, valid = base
+
+        parties = self._text(group, 'party_name')
+        reasons = self._text(group, 'reason')
+        references = [f"CN-{invoice}" for invoice in self._text(group, 'original_invoice')]
+
+        legs = self._emit(
+            positions, 0, valid, "4030", "Sales Returns", amounts, ZERO,
+            [f"Credit note to {party} - {reason}" for party, reason in zip(parties, reasons)],
+            references, dates, TransactionType.CREDIT_NOTE
+        )
+        legs += self._emit(
+            positions, 1, valid, "1110", "Trade Receivables", ZERO, amounts,
+            [f"Credit note adjustment for {party}" for party in parties],
+            references, dates, TransactionType.CREDIT_NOTE
+        )
+        return legs
+
+    def _debit_note_legs(self, group: pd.DataFrame, positions: np.ndarray) -> List[Leg]:
+        base = self._base(group, ['amount', 'date', 'party_name', 'reason', 'original_invoice'])
+        if base is None:
+            return []
+        amounts, dates, valid = base
+
+        parties = self._text(group, 'party_name')
+        reasons = self._text(group, 'reason')
+        references = [f"DN-{invoice}" for invoice in self._text(group, 'original_invoice')]
+
+        legs = self._emit(
+            positions, 0, valid, "1110", "Trade Receivables", amounts, ZERO,
+            [f"Debit note to {party} - {reason}" for party, reason in zip(parties, reasons)],
+            references, dates, TransactionType.DEBIT_NOTE
+        )
+        legs += self._emit(
+            positions, 1, valid, "4120", "Other Income", ZERO, amounts,
+            [f"Debit note adjustment for {party}" for party in parties],
+            references, dates, TransactionType.DEBIT_NOTE
+        )
+        return legs
+
+    def _generic_legs(self, group: pd.DataFrame, positions: np.ndarray) -> List[Leg]:
+        base = self._base(group, ['amount', 'date', 'description'])
+        if base is None:
+            return []
+        amounts, dates, valid = base
+
+        codes = self._raw(group, 'account_code', '1020')
+        account_infos = self._map_unique(
+            group['account_code'] if 'account_code' in group.columns else pd.Series(['1020'] * len(group)),
+            lambda code: self.engine.standard_coa.get(code, {"name": "Unknown Account", "type": AccountType.ASSETS})
+        )
+        names = [info["name"] if info is not _INVALID else None for info in account_infos]
+        debit_side = np.array(
+            [info is not _INVALID and info["type"] in [AccountType.ASSETS, AccountType.EXPENSES] for info in account_infos],
+            dtype=bool
+        )
+        valid &= np.array([info is not _INVALID for info in account_infos], dtype=bool)
+
+        raw_descriptions = self._raw(group, 'description')
+        descriptions = self._text(group, 'description')
+        debit_rows = valid & debit_side
+        credit_rows = valid & ~debit_side
+
+        # Normal debit balance accounts: Dr account, Cr bank
+        legs = self._emit(
+            positions, 0, debit_rows, codes, names, amounts, ZERO, raw_descriptions,
+            self._generated_references('GEN', len(group)), dates, TransactionType.ADJUSTMENT
+        )
+        legs += self._emit(
+            positions, 1, debit_rows, "1020", "Bank Account - Current", ZERO, amounts,
+            [f"Balancing entry for {description}" for description in descriptions],
+            self._generated_references('GEN', len(group)), dates, TransactionType.ADJUSTMENT
+        )
+
+        # Normal credit balance accounts: Dr bank, Cr account
+        legs += self._emit(
+            positions, 0, credit_rows, "1020", "Bank Account - Current", amounts, ZERO,
+            [f"Receipt for {description}" for description in descriptions],
+            self._generated_references('GEN', len(group)), dates, TransactionType.ADJUSTMENT
+        )
+        legs += self._emit(
+            positions, 1, credit_rows, codes, names, ZERO, amounts, raw_descriptions,
+            self._generated_references('GEN', len(group)), dates, TransactionType.ADJUSTMENT
+        )
+        return legs
+
+    # ------------------------------------------------------------------
+    # Column helpers
+    # ------------------------------------------------------------------
+
+    def _base(self, group: pd.DataFrame, required: List[str]) -> Optional[Tuple[List[Any], List[Any], np.ndarray]]:
+        """Parse amount and date columns; None when a required column is missing (every row fails)"""
+        missing = [column for column in required if column not in group.columns]
+        if missing:
+            logger.error(f"Skipped {len(group)} rows: missing columns {', '.join(missing)}")
+            return None
+
+        amounts = self._decimals(group['amount'])
+        dates = self._map_unique(group['date'], pd.to_datetime)
+        valid = np.array(
+            [amount is not _INVALID and date is not _INVALID for amount, date in zip(amounts, dates)],
+            dtype=bool
+        )
+        return amounts, dates, valid
+
+    def _decimals(self, series: pd.Series) -> List[Any]:
+        """Decimal(str(value)) for every value, exactly as the row-wise builders convert amounts"""
+        return self._map_unique(series, lambda value: Decimal(str(value)))
+
+    @staticmethod
+    def _positive(values: Sequence[Any]) -> List[Any]:
+        """value > 0 per element; Decimal NaN comparisons raise row-wise, so they become _INVALID"""
+        flags = []
+        for value in values:
+            if value is _INVALID:
+                flags.append(_INVALID)
+                continue
+            try:
+                flags.append(bool(value > 0))
+            except Exception:
+                flags.append(_INVALID)
+        return flags
+
+    def _category_accounts(self, group: pd.DataFrame, resolver: Callable[[str], Dict[str, str]],
+                           default: str) -> List[Any]:
+        if 'category' not in group.columns:
+            return [resolver(default)] * len(group)
+        return self._map_unique(group['category'], resolver)
+
+    def _text(self, group: pd.DataFrame, column: str, default: str = None) -> List[str]:
+        """String form of a column as an f-string would render each value"""
+        if column not in group.columns:
+            return [str(default)] * len(group)
+        return self._map_unique(group[column], str)
+
+    @staticmethod
+    def _raw(group: pd.DataFrame, column: str, default: Any = None) -> List[Any]:
+        if column not in group.columns:
+            return [default] * len(group)
+        return group[column].tolist()
+
+    @staticmethod
+    def _map_unique(series: pd.Series, func: Callable[[Any], Any]) -> List[Any]:
+        """Apply func once per distinct value; values where func raises map to _INVALID"""
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        results = []
+        for value in (uniques.tolist() if hasattr(uniques, 'tolist') else list(uniques)):
+            try:
+                results.append(func(value))
+            except Exception:
+                results.append(_INVALID)
+        mapped = np.empty(len(results), dtype=object)
+        mapped[:] = results
+        return mapped[codes].tolist()
+
+    @staticmethod
+    def _generated_references(prefix: str, count: int) -> List[str]:
+        today = datetime.now().strftime('%Y%m%d')
+        return [f"{prefix}-{today}-{uuid.uuid4().hex[:8]}" for _ in range(count)]
+
+    @staticmethod
+    def _emit(positions: np.ndarray, leg: int, mask: np.ndarray, account_code, account_name,
+              debit_amount, credit_amount, description, reference, transaction_date,
+              transaction_type: TransactionType) -> List[Leg]:
+        """Create one leg's entries for every selected row; scalar arguments apply to all rows"""
+        selected = np.flatnonzero(mask)
+        if not len(selected):
+            return []
+
+        def column(values):
+            if isinstance(values, (list, np.ndarray)):
+                return [values[i] for i in selected]
+            return repeat(values, len(selected))
+
+        return [
+            (int(positions[i]), leg, AccountingEntry(
+                account_code=code,
+                account_name=name,
+                debit_amount=debit,
+                credit_amount=credit,
+                description=text,
+                reference=ref,
+                transaction_date=date,
+                transaction_type=transaction_type
+            ))
+            for i, code, name, debit, credit, text, ref, date in zip(
+                selected,
+                column(account_code), column(account_name),
+                column(debit_amount), column(credit_amount),
+                column(description), column(reference), column(transaction_date)
+            )
+        ]
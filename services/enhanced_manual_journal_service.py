@@ -16,6 +16,7 @@ import uuid
 from app import db
 from models import *
 from services.automated_accounting_engine import AutomatedAccountingEngine
+from services.ledger_balance_service import LedgerBalanceService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -654,6 +655,9 @@ class EnhancedManualJournalService:
             journal_header.posted_at = datetime.utcnow()
             journal_header.updated_at = datetime.utcnow()
             
+            # Roll the posted lines into the account period balances before commit
+            LedgerBalanceService(self.company_id).record_entries(journal_entries_created)
+            
             db.session.commit()
             
             # Log audit trail
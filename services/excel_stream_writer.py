@@ -0,0 +1,171 @@
+"""
+Excel Stream Writer - F-AI Accountant
+Write-only xlsx export with shared named styles and sampled column widths, at constant memory
+"""
+
+import logging
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows looked at to size the columns; the rest are streamed without being measured
+DEFAULT_SAMPLE_ROWS = 200
+DEFAULT_MAX_WIDTH = 50
+
+_THIN = Side(style='thin')
+_THIN_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+
+def report_styles() -> List[NamedStyle]:
+    """Styles of the exported financial reports, registered once per workbook"""
+    def named(name, **attributes):
+        style = NamedStyle(name=name)
+        for attribute, value in attributes.items():
+            setattr(style, attribute, value)
+        return style
+
+    return [
+        named('report_company', font=Font(bold=True, size=14, color='666666')),
+        named('report_title', font=Font(bold=True, size=16, color='1F4E79')),
+        named('report_section', font=Font(bold=True, size=12)),
+        named('report_header', font=Font(bold=True, color='FFFFFF', size=12),
+              fill=PatternFill(start_color='1F4E79', end_color='1F4E79', fill_type='solid'),
+              alignment=Alignment(horizontal='center', vertical='center'), border=_THIN_BORDER),
+        named('report_cell', border=_THIN_BORDER),
+        named('plain_header', font=Font(bold=True),
+              fill=PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid'),
+              alignment=Alignment(horizontal='center'))
+    ]
+
+class StreamingSheet:
+    """
+    One write-only worksheet
+
+    Rows are written as they come. The first sample_rows rows are held back
+    until the column widths have been estimated from them, because a
+    write-only sheet fixes its column widths before its first row; after
+    that nothing is kept.
+    """
+
+    def __init__(self, worksheet, sample_rows: int, max_width: int, padding: int):
+        self.worksheet = worksheet
+        self.sample_rows = sample_rows
+        self.max_width = max_width
+        self.padding = padding
+        self.rows_written = 0
+        self._sample: Optional[List[List[Any]]] = []
+        self._widths: Dict[int, int] = {}
+        self._style_arrays: Dict[str, StyleArray] = {}
+
+    def append(self, values: Sequence[Any], style: Optional[str] = None):
+        """Write one row; style names a registered named style applied to every cell"""
+        if style:
+            style_array = self._style_array(style)
+            row = [Cell(self.worksheet, row=1, column=1, value=value, style_array=style_array) for value in values]
+        else:
+            row = list(values)
+
+        if self._sample is None:
+            self.worksheet.append(row)
+        else:
+            self._measure(values)
+            self._sample.append(row)
+            if len(self._sample) >= self.sample_rows:
+                self._flush_sample()
+        self.rows_written += 1
+
+    def blank(self):
+        self.append([])
+
+    def table(self, headers: Sequence[str], rows: Iterable[Sequence[Any]],
+              header_style: Optional[str] = 'report_header', cell_style: Optional[str] = 'report_cell') -> int:
+        """A header row and the rows of an iterator; returns the number of data rows"""
+        self.append(headers, header_style)
+        count = 0
+        for values in rows:
+            self.append(values, cell_style)
+            count += 1
+        return count
+
+    def close(self):
+        if self._sample is not None:
+            self._flush_sample()
+
+    def _style_array(self, style: str) -> StyleArray:
+        """The named style resolved once, then shared by every cell written with it"""
+        style_array = self._style_arrays.get(style)
+        if style_array is None:
+            template = WriteOnlyCell(self.worksheet)
+            template.style = style
+            style_array = self._style_arrays[style] = template._style
+        return style_array
+
+    def _measure(self, values: Sequence[Any]):
+        for column, value in enumerate(values, 1):
+            if value is None:
+                continue
+            length = len(str(value))
+            if length > self._widths.get(column, 0):
+                self._widths[column] = length
+
+    def _flush_sample(self):
+        for column, length in self._widths.items():
+            self.worksheet.column_dimensions[get_column_letter(column)].width = min(length + self.padding,
+                                                                                    self.max_width)
+        for row in self._sample:
+            self.worksheet.append(row)
+        self._sample = None
+
+class StreamingExcelWriter:
+    """
+    Write-only xlsx workbook for large reports
+
+    Cells reference shared named styles instead of carrying their own Font and
+    Border objects, column widths are estimated from the first rows of each
+    sheet instead of rescanning every cell, and rows may come from any
+    iterator, so memory stays flat however many rows are written.
+
+        writer = StreamingExcelWriter(path)
+        sheet = writer.sheet('Journal')
+        sheet.table(headers, rows_iterator)
+        writer.save()
+    """
+
+    def __init__(self, file_path: str, styles: Optional[Iterable[NamedStyle]] = None,
+                 sample_rows: int = DEFAULT_SAMPLE_ROWS, max_width: int = DEFAULT_MAX_WIDTH, padding: int = 3):
+        self.file_path = file_path
+        self.sample_rows = sample_rows
+        self.max_width = max_width
+        self.padding = padding
+        self.workbook = Workbook(write_only=True)
+        for style in (styles if styles is not None else report_styles()):
+            self.workbook.add_named_style(style)
+        self._sheets: List[StreamingSheet] = []
+
+    def sheet(self, title: str) -> StreamingSheet:
+        # Excel limits sheet titles to 31 characters
+        sheet = StreamingSheet(self.workbook.create_sheet(title=title[:31]), self.sample_rows,
+                               self.max_width, self.padding)
+        self._sheets.append(sheet)
+        return sheet
+
+    def save(self) -> str:
+        if not self._sheets:
+            self.sheet('Sheet')
+        for sheet in self._sheets:
+            sheet.close()
+        self.workbook.save(self.file_path)
+        logger.info(f"Streamed {sum(sheet.rows_written for sheet in self._sheets)} rows to {self.file_path}")
+        return self.file_path
+
+def dict_rows(records: Iterable[Dict[str, Any]]) -> Iterator[List[Any]]:
+    """Values of each record, in its own key order"""
+    for record in records:
+        yield list(record.values())
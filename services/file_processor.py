@@ -3,12 +3,15 @@ import openpyxl
 import os
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
+
+from services.parsed_dataset_cache import ParsedDatasetCache
 
 class FileProcessor:
     """Handles file processing and data extraction for AccuFin360"""
     
     ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+    DEFAULT_CHUNK_SIZE = 50000  # rows held in memory at once when streaming CSV files
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -38,8 +41,8 @@ class FileProcessor:
     def _process_csv(self, file_path: str) -> Dict[str, Any]:
         """Process CSV file and extract accounting data"""
         try:
-            # Read CSV file
-            df = pd.read_csv(file_path)
+            # Read CSV file (parsed once per upload, shared with validation)
+            df = ParsedDatasetCache().read(file_path)
             
             # Clean and normalize data
             df = self._clean_dataframe(df)
@@ -59,11 +62,47 @@ class FileProcessor:
             self.logger.error(f"Error processing CSV file {file_path}: {str(e)}")
             raise
     
+    def iter_csv_chunks(self, file_path: str, chunk_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a CSV file as cleaned chunks of accounting entries
+
+        Only one chunk of rows is held in memory at a time, so peak memory follows
+        chunk_size rather than the file size. Row numbers stay file-global because
+        pandas keeps the index running across chunks.
+
+        Yields:
+            The same shape as extract_data plus chunk_number, bytes_read and bytes_total
+        """
+        chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
+        bytes_total = os.path.getsize(file_path)
+
+        try:
+            with open(file_path, 'rb') as handle:
+                for chunk_number, chunk in enumerate(pd.read_csv(handle, chunksize=chunk_size), start=1):
+                    rows_read = len(chunk)
+                    df = self._clean_dataframe(chunk)
+
+                    yield {
+                        'file_type': 'csv',
+                        'chunk_number': chunk_number,
+                        'total_rows': rows_read,
+                        'entries': self._extract_accounting_entries(df),
+                        'columns': df.columns.tolist(),
+                        # The parser reads ahead in blocks, so the position is an upper bound
+                        'bytes_read': min(handle.tell(), bytes_total),
+                        'bytes_total': bytes_total,
+                        'processed_at': datetime.now().isoformat()
+                    }
+
+        except Exception as e:
+            self.logger.error(f"Error streaming CSV file {file_path}: {str(e)}")
+            raise
+
     def _process_excel(self, file_path: str) -> Dict[str, Any]:
         """Process Excel file and extract accounting data"""
         try:
-            # Read Excel file
-            df = pd.read_excel(file_path)
+            # Read Excel file (parsed once per upload, shared with validation)
+            df = ParsedDatasetCache().read(file_path)
             
             # Clean and normalize data
             df = self._clean_dataframe(df)
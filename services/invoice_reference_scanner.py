@@ -0,0 +1,235 @@
+"""
+Invoice Reference Scanner - F-AI Accountant
+Aho-Corasick scanning of bank narrations for every open invoice number at once
+"""
+
+import re
+import logging
+from collections import deque
+from typing import Dict, List, Any, Hashable, Iterator, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Strength of a hit by the form of the invoice number that was found
+EXACT_STRENGTH = 1.0       # as written ('INV-2024-0042')
+COMPACT_STRENGTH = 0.95    # separators dropped ('INV20240042')
+UNPADDED_STRENGTH = 0.9    # zero padding dropped ('INV-42' -> 'INV42')
+NUMBER_STRENGTH = 0.8      # prefix dropped ('20240042')
+
+class AhoCorasickAutomaton:
+    """
+    Multi-pattern substring matcher
+
+    Patterns are inserted into and removed from the trie one at a time; failure
+    and output links are recomputed lazily, once, before the next scan after a
+    change. Removed patterns only lose their terminal mark, and the trie is
+    rebuilt from the live patterns once dead nodes outnumber them.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[str] = [None]
+        self._output: List[int] = [-1]
+        self._nodes: Dict[str, int] = {}
+        self._removed = 0
+        self._linked = True
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, pattern: str) -> bool:
+        return pattern in self._nodes
+
+    def add(self, pattern: str):
+        if not pattern or pattern in self._nodes:
+            return
+        node = 0
+        for char in pattern:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._output.append(-1)
+            node = child
+        self._terminal[node] = pattern
+        self._nodes[pattern] = node
+        self._linked = False
+
+    def remove(self, pattern: str):
+        node = self._nodes.pop(pattern, None)
+        if node is None:
+            return
+        self._terminal[node] = None
+        self._removed += 1
+        self._linked = False
+        if self._removed > max(len(self._nodes), 1000):
+            live = list(self._nodes)
+            self._reset()
+            for live_pattern in live:
+                self.add(live_pattern)
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(start, pattern) for every occurrence of every pattern in text"""
+        if not self._linked:
+            self._link()
+        goto, fail, terminal, output = self._goto, self._fail, self._terminal, self._output
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            node = state if terminal[state] is not None else output[state]
+            while node != -1:
+                pattern = terminal[node]
+                yield end - len(pattern) + 1, pattern
+                node = output[node]
+
+    def _link(self):
+        """Breadth-first pass setting failure links and nearest terminal suffix links"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            self._output[child] = -1
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                suffix = self._fail[child]
+                self._output[child] = suffix if self._terminal[suffix] is not None else self._output[suffix]
+                queue.append(child)
+        self._linked = True
+
+class PatternScanner:
+    """
+    Keyed patterns over one automaton: which keys does a text mention?
+
+    Each key (an invoice id, say) registers the patterns of its value with a
+    strength. sync() brings the scanner in line with the currently open keys,
+    touching only the keys that were added, removed or changed, and scan()
+    returns the best strength per key found in a text in a single pass.
+    """
+
+    def __init__(self):
+        self.automaton = AhoCorasickAutomaton()
+        self._values: Dict[Hashable, str] = {}
+        self._key_patterns: Dict[Hashable, Dict[str, float]] = {}
+        self._pattern_keys: Dict[str, Dict[Hashable, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._values
+
+    def patterns_for(self, value: Any) -> Dict[str, float]:
+        """Lower-cased patterns to look for, with the strength of a hit on each"""
+        pattern = str(value or '').strip().lower()
+        return {pattern: EXACT_STRENGTH} if pattern else {}
+
+    def add(self, key: Hashable, value: Any):
+        if key in self._values:
+            if self._values[key] == value:
+                return
+            self.remove(key)
+        patterns = self.patterns_for(value)
+        self._values[key] = value
+        self._key_patterns[key] = patterns
+        for pattern, strength in patterns.items():
+            keys = self._pattern_keys.setdefault(pattern, {})
+            if not keys:
+                self.automaton.add(pattern)
+            keys[key] = strength
+
+    def remove(self, key: Hashable):
+        if key not in self._values:
+            return
+        del self._values[key]
+        for pattern in self._key_patterns.pop(key):
+            keys = self._pattern_keys[pattern]
+            del keys[key]
+            if not keys:
+                del self._pattern_keys[pattern]
+                self.automaton.remove(pattern)
+
+    def sync(self, values: Dict[Hashable, Any]) -> Tuple[int, int]:
+        """Index exactly these keys; returns (added or changed, removed)"""
+        stale = [key for key in self._values if key not in values]
+        for key in stale:
+            self.remove(key)
+        changed = 0
+        for key, value in values.items():
+            if key not in self._values or self._values[key] != value:
+                self.add(key, value)
+                changed += 1
+        if changed or stale:
+            logger.info(f"Reference scanner synced: {changed} added/changed, {len(stale)} removed, "
+                        f"{len(self._values)} indexed")
+        return changed, len(stale)
+
+    def scan(self, text: Any) -> Dict[Hashable, float]:
+        """Best strength per key whose patterns occur in the text"""
+        text = str(text or '').lower()
+        found: Dict[Hashable, float] = {}
+        for start, pattern in self.automaton.finditer(text):
+            for key, strength in self._pattern_keys[pattern].items():
+                if strength < EXACT_STRENGTH and not self._standalone(text, start, len(pattern)):
+                    continue
+                if strength > found.get(key, 0.0):
+                    found[key] = strength
+        return found
+
+    @staticmethod
+    def _standalone(text: str, start: int, length: int) -> bool:
+        """Derived forms must not be part of a longer word or number"""
+        end = start + length
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+class InvoiceReferenceScanner(PatternScanner):
+    """
+    Invoice numbers and their normalized variants
+
+    Besides the number as written (matched anywhere, like a substring check),
+    narrations are searched for the separator-free form, the form without zero
+    padding and, for numbers with at least min_number_digits digits, the bare
+    number without its alphabetic prefix. Those derived forms only count as
+    whole words, and only when at least min_variant_length characters long.
+    """
+
+    def __init__(self, min_variant_length: int = 4, min_number_digits: int = 5):
+        super().__init__()
+        self.min_variant_length = min_variant_length
+        self.min_number_digits = min_number_digits
+
+    def patterns_for(self, value: Any) -> Dict[str, float]:
+        patterns = super().patterns_for(value)
+        if not patterns:
+            return patterns
+        raw = next(iter(patterns))
+
+        def derive(pattern: str, strength: float, min_length: int):
+            if len(pattern) >= min_length and pattern not in patterns:
+                patterns[pattern] = strength
+
+        compact = re.sub(r'[^a-z0-9]', '', raw)
+        derive(compact, COMPACT_STRENGTH, self.min_variant_length)
+        derive(re.sub(r'(?<![0-9])0+(?=[0-9])', '', compact), UNPADDED_STRENGTH, self.min_variant_length)
+
+        number = re.sub(r'^[a-z]+', '', compact)
+        if number.isdigit():
+            derive(number, NUMBER_STRENGTH, self.min_number_digits)
+            derive(number.lstrip('0'), NUMBER_STRENGTH, self.min_number_digits)
+        return patterns
@@ -0,0 +1,321 @@
+"""
+Job Queue Service - F-AI Accountant
+Database-backed job queue and worker loop for the upload pipeline
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Optional, Set
+
+from sqlalchemy import update
+
+from app import db
+from models import ProcessingJob
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# stage -> handler(job) returning a JSON-serialisable result
+JOB_HANDLERS: Dict[str, Callable[[ProcessingJob], Any]] = {}
+# stage -> callback(job) run once a job has used up its attempts
+FAILURE_HANDLERS: Dict[str, Callable[[ProcessingJob], None]] = {}
+# Stages whose side effects must not be repeated: an expired lease fails their job instead of re-queueing it
+NON_RESTARTABLE_STAGES: Set[str] = set()
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying could repeat side effects (e.g. partially posted journals)"""
+
+def register_job_handler(stage: str, on_failure: Optional[Callable[[ProcessingJob], None]] = None,
+                         restartable: bool = True):
+    """
+    Decorator registering the function that runs jobs of a stage
+
+    A job whose worker died is re-queued, unless its stage is not restartable:
+    then it fails, and on_failure runs, so the work is redone only deliberately.
+    """
+    def decorator(handler):
+        JOB_HANDLERS[stage] = handler
+        if on_failure:
+            FAILURE_HANDLERS[stage] = on_failure
+        if restartable:
+            NON_RESTARTABLE_STAGES.discard(stage)
+        else:
+            NON_RESTARTABLE_STAGES.add(stage)
+        return handler
+    return decorator
+
+@contextmanager
+def lease_renewal(model, job_id: int, worker_id: str, interval: float):
+    """
+    Renew a claimed job's lease from a background thread while the body runs
+
+    The thread uses its own connection and only touches the row while it is
+    still running under worker_id. A worker that dies stops renewing, so its
+    lease lapses as before.
+    """
+    engine = db.engine
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(interval):
+            try:
+                with engine.begin() as connection:
+                    renewed = connection.execute(
+                        update(model)
+                        .where(model.id == job_id, model.status == 'running', model.locked_by == worker_id)
+                        .values(locked_at=datetime.utcnow())
+                    ).rowcount
+            except Exception as e:
+                logger.warning(f"Could not renew the lease of {model.__tablename__} job {job_id}: {str(e)}")
+                continue
+            if not renewed:
+                # Requeued or failed elsewhere; the body's result is recorded as usual
+                logger.warning(f"{model.__tablename__} job {job_id} is no longer leased to {worker_id}")
+                return
+
+    renewer = threading.Thread(target=renew, name=f"lease-{model.__tablename__}-{job_id}", daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        renewer.join()
+
+class JobQueueService:
+    """
+    Enqueue, claim and settle ProcessingJob rows
+
+    Claiming is a conditional UPDATE ... WHERE status = 'queued', which is atomic on
+    every backend, so competing workers never run the same job. Failed attempts are
+    re-queued with exponential backoff until max_attempts. A running job's lease is
+    renewed every LEASE_RENEW_SECONDS while its handler runs; jobs whose lease lapsed
+    for LEASE_SECONDS (the worker died) are handed to another worker, or failed if
+    their stage is not restartable.
+    """
+
+    RETRY_BASE_SECONDS = 30
+    LEASE_SECONDS = 30 * 60
+    LEASE_RENEW_SECONDS = 10 * 60
+    CLAIM_BATCH = 10
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    def enqueue(self, uploaded_file_id: int, stage: str, payload: Optional[Dict[str, Any]] = None,
+                max_attempts: int = 3) -> ProcessingJob:
+        """
+        Queue a stage for a file (does not commit)
+
+        Returns the already queued or running job for the same file and stage if there
+        is one, so double-clicks and page reloads do not duplicate work.
+        """
+        existing = ProcessingJob.query.filter(
+            ProcessingJob.uploaded_file_id == uploaded_file_id,
+            ProcessingJob.stage == stage,
+            ProcessingJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if existing:
+            return existing
+
+        job = ProcessingJob(
+            uploaded_file_id=uploaded_file_id,
+            stage=stage,
+            status='queued',
+            payload=json.dumps(payload or {}),
+            max_attempts=max_attempts,
+            run_after=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.flush()
+        logger.info(f"Queued {stage} job {job.id} for uploaded file {uploaded_file_id}")
+        return job
+
+    def latest_jobs(self, uploaded_file_id: int) -> Dict[str, ProcessingJob]:
+        """Most recent job per stage for a file"""
+        jobs = ProcessingJob.query.filter_by(uploaded_file_id=uploaded_file_id).order_by(ProcessingJob.id).all()
+        return {job.stage: job for job in jobs}
+
+    def claim_next(self) -> Optional[ProcessingJob]:
+        """Atomically take the oldest runnable job, or None when the queue is empty"""
+        self.requeue_expired()
+        now = datetime.utcnow()
+        candidate_ids = [row[0] for row in db.session.query(ProcessingJob.id).filter(
+            ProcessingJob.status == 'queued',
+            ProcessingJob.run_after <= now
+        ).order_by(ProcessingJob.run_after, ProcessingJob.id).limit(self.CLAIM_BATCH).all()]
+
+        for job_id in candidate_ids:
+            claimed = db.session.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id, ProcessingJob.status == 'queued')
+                .values(status='running', locked_by=self.worker_id, locked_at=now, started_at=now,
+                        attempts=ProcessingJob.attempts + 1)
+            )
+            db.session.commit()
+            if claimed.rowcount == 1:
+                return db.session.get(ProcessingJob, job_id, populate_existing=True)
+        return None
+
+    def run_job(self, job: ProcessingJob) -> bool:
+        """Run a claimed job through its stage handler; returns True on success"""
+        handler = JOB_HANDLERS.get(job.stage)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for stage '{job.stage}'")
+
+            with lease_renewal(ProcessingJob, job.id, self.worker_id, self.LEASE_RENEW_SECONDS):
+                result = handler(job)
+
+            job.status = 'succeeded'
+            job.progress_percent = 100.0
+            job.result = json.dumps(result, default=str) if result is not None else None
+            job.last_error = None
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            logger.info(f"{job.stage} job {job.id} succeeded on attempt {job.attempts}")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            self._record_failure(job, e)
+            return False
+
+    def run_pending(self, limit: Optional[int] = None) -> int:
+        """Run queued jobs in this process until the queue is empty (or limit jobs ran)"""
+        ran = 0
+        while limit is None or ran < limit:
+            job = self.claim_next()
+            if job is None:
+                break
+            self.run_job(job)
+            ran += 1
+        return ran
+
+    def heartbeat(self, job: ProcessingJob, progress_percent: Optional[float] = None):
+        """Extend the job's lease and publish stage progress (commits)"""
+        job.locked_at = datetime.utcnow()
+        if progress_percent is not None:
+            job.progress_percent = round(min(max(progress_percent, 0.0), 100.0), 1)
+        db.session.commit()
+
+    def requeue_expired(self) -> int:
+        """Return running jobs whose worker died to the queue, or fail them if their stage is not restartable"""
+        now = datetime.utcnow()
+        expired_before = now - timedelta(seconds=self.LEASE_SECONDS)
+        expired = (ProcessingJob.status == 'running', ProcessingJob.locked_at < expired_before)
+
+        failed_ids = [row[0] for row in db.session.query(ProcessingJob.id).filter(
+            *expired, ProcessingJob.stage.in_(NON_RESTARTABLE_STAGES)
+        ).all()] if NON_RESTARTABLE_STAGES else []
+        for job_id in failed_ids:
+            failed = db.session.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id, *expired)
+                .values(status='failed', locked_by=None, finished_at=now,
+                        last_error='Worker lease expired; the stage is not restarted automatically')
+            ).rowcount
+            db.session.commit()
+            if failed:
+                job = db.session.get(ProcessingJob, job_id, populate_existing=True)
+                logger.error(f"{job.stage} job {job.id} failed: worker lease expired")
+                self._run_failure_handler(job)
+
+        requeued = db.session.execute(
+            update(ProcessingJob)
+            .where(*expired, ProcessingJob.stage.not_in(NON_RESTARTABLE_STAGES))
+            .values(status='queued', locked_by=None, last_error='Worker lease expired')
+        ).rowcount
+        db.session.commit()
+        if requeued:
+            logger.warning(f"Re-queued {requeued} jobs with expired worker leases")
+        return requeued
+
+    def _record_failure(self, job: ProcessingJob, error: Exception):
+        job = db.session.get(ProcessingJob, job.id, populate_existing=True)
+        job.last_error = str(error)
+        job.locked_by = None
+
+        if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            logger.error(f"{job.stage} job {job.id} failed after {job.attempts} attempts: {str(error)}")
+            self._run_failure_handler(job)
+        else:
+            delay = self.RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            db.session.commit()
+            logger.warning(f"{job.stage} job {job.id} attempt {job.attempts} failed, retrying in {delay}s: {str(error)}")
+
+    @staticmethod
+    def _run_failure_handler(job: ProcessingJob):
+        on_failure = FAILURE_HANDLERS.get(job.stage)
+        if on_failure:
+            try:
+                on_failure(job)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failure callback for {job.stage} job {job.id} raised: {str(e)}")
+
+
+def _worker_main(poll_interval: float):
+    """Entry point of one worker process: claim and run jobs until terminated"""
+    from app import app
+    import services.upload_pipeline_service  # noqa: F401 - registers the stage handlers
+    from services.report_render_service import ReportRenderService
+
+    queue = JobQueueService()
+    renderer = ReportRenderService(queue.worker_id)
+    logger.info(f"Worker {queue.worker_id} started")
+    with app.app_context():
+        while True:
+            try:
+                ran = queue.run_pending(limit=1)
+                ran += renderer.run_pending(limit=1)
+                if not ran:
+                    time.sleep(poll_interval)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Worker {queue.worker_id} loop error: {str(e)}")
+                time.sleep(poll_interval)
+            finally:
+                db.session.remove()
+
+def run_worker_pool(worker_count: int = 2, poll_interval: float = 2.0):
+    """Start worker_count processes and restart any that exit until interrupted"""
+    context = multiprocessing.get_context('spawn')  # fresh interpreter, no inherited DB connections
+
+    def start_worker():
+        # Not daemonic, so render jobs can fan exports out to a process pool; stopped in the finally below
+        process = context.Process(target=_worker_main, args=(poll_interval,))
+        process.start()
+        return process
+
+    workers = [start_worker() for _ in range(worker_count)]
+    logger.info(f"Started {worker_count} pipeline workers")
+    try:
+        while True:
+            time.sleep(poll_interval)
+            for index, process in enumerate(workers):
+                if not process.is_alive():
+                    logger.warning(f"Worker pid {process.pid} exited with {process.exitcode}, restarting")
+                    workers[index] = start_worker()
+    except KeyboardInterrupt:
+        logger.info("Stopping pipeline workers")
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join(timeout=10)
@@ -0,0 +1,117 @@
+"""
+Ledger Aggregate - F-AI Accountant
+A period's account totals read once, answering every statement's questions from memory
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+
+from services.ledger_balance_service import LedgerBalanceService
+from services.ledger_query_service import LedgerQueryService
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LedgerAggregate:
+    """
+    A period's per-account totals, read with one grouped query
+
+    Totals come from LedgerBalanceService.account_balances_query(), so whole
+    months are read from account_period_balances and only the partial months
+    at the edges of the range are summed from journal_entries. The trial
+    balance and every statement built on account totals read the loaded
+    columns instead of querying again.
+
+    Only the journal and the ledger need individual lines; journal_lines() and
+    ledger_lines() stream them from LedgerQueryService for the loaded range
+    rather than holding the period's journal in memory.
+
+    account_balances(), ledger_lines() and journal_lines() return what the
+    LedgerQueryService methods of the same name return (the line methods as
+    iterators), so the report generators take either as their source.
+    """
+
+    def __init__(self, company_id: int, date_from: datetime = None, date_to: datetime = None):
+        self.company_id = company_id
+        self.date_from = date_from
+        self.date_to = date_to
+        self.load_seconds = 0.0
+
+        # Chart columns with their totals, ordered by account code
+        self.account_ids: List[int] = []
+        self.account_codes: List[str] = []
+        self.account_names: List[str] = []
+        self.account_types: List[str] = []
+        self.debit_totals: List[float] = []
+        self.credit_totals: List[float] = []
+
+    @classmethod
+    def load(cls, company_id: int, date_from: datetime = None, date_to: datetime = None) -> 'LedgerAggregate':
+        """Read the chart with each account's posted totals for the period"""
+        started = datetime.now()
+        aggregate = cls(company_id, date_from, date_to)
+        aggregate._load_totals()
+        aggregate.load_seconds = (datetime.now() - started).total_seconds()
+        logger.info(f"Loaded totals for {len(aggregate.account_ids)} accounts "
+                    f"for company {company_id} in {aggregate.load_seconds:.3f}s")
+        return aggregate
+
+    def _load_totals(self):
+        rows = LedgerBalanceService(self.company_id).account_balances_query(self.date_from, self.date_to).all()
+        for account_id, account_code, account_name, account_type, debit_total, credit_total in rows:
+            self.account_ids.append(account_id)
+            self.account_codes.append(account_code)
+            self.account_names.append(account_name)
+            self.account_types.append(account_type)
+            self.debit_totals.append(float(debit_total or 0))
+            self.credit_totals.append(float(credit_total or 0))
+
+    def account_balances(self, date_from: datetime = None, date_to: datetime = None,
+                         account_types: Iterable[str] = None) -> List[Dict[str, Any]]:
+        """
+        Posted debit/credit totals for every account in the chart, as LedgerQueryService.account_balances()
+
+        The range is the one the aggregate was loaded for; date_from and
+        date_to are accepted for signature compatibility only.
+        """
+        self._check_range(date_from, date_to)
+        wanted = {account_type.lower() for account_type in account_types} if account_types else None
+
+        balances = []
+        for position, account_id in enumerate(self.account_ids):
+            account_type = self.account_types[position]
+            if wanted is not None and (account_type or '').lower() not in wanted:
+                continue
+            debit_total = self.debit_totals[position]
+            credit_total = self.credit_totals[position]
+            balances.append({
+                'account_id': account_id,
+                'account_code': self.account_codes[position],
+                'account_name': self.account_names[position],
+                'account_type': account_type,
+                'debit_total': debit_total,
+                'credit_total': credit_total,
+                'net_balance': debit_total - credit_total
+            })
+        return balances
+
+    def ledger_lines(self, date_from: datetime = None, date_to: datetime = None,
+                     posted_only: bool = False, include_empty_accounts: bool = True,
+                     account_name_like: str = None) -> Iterator[Dict[str, Any]]:
+        """Journal lines per account with running balances, streamed as LedgerQueryService.ledger_lines()"""
+        self._check_range(date_from, date_to)
+        return LedgerQueryService(self.company_id).iter_ledger_lines(
+            self.date_from, self.date_to, posted_only, include_empty_accounts, account_name_like
+        )
+
+    def journal_lines(self, date_from: datetime = None, date_to: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Journal lines in entry order with their account details, streamed as LedgerQueryService.journal_lines()"""
+        self._check_range(date_from, date_to)
+        return LedgerQueryService(self.company_id).iter_journal_lines(self.date_from, self.date_to)
+
+    def _check_range(self, date_from: Optional[datetime], date_to: Optional[datetime]):
+        if (date_from is not None and date_from != self.date_from) or (date_to is not None and date_to != self.date_to):
+            raise ValueError(f"LedgerAggregate was loaded for {self.date_from} - {self.date_to}, "
+                             f"not {date_from} - {date_to}")
@@ -0,0 +1,392 @@
+"""
+Ledger Balance Service - F-AI Accountant
+Incrementally maintained account-period balances behind the general ledger
+"""
+
+import logging
+from itertools import chain
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Any, Iterable
+
+from sqlalchemy import event, func, and_, or_, extract, inspect, select, true, union_all
+from sqlalchemy.orm import Session
+
+from app import db
+from models import AccountPeriodBalance, ChartOfAccount, JournalEntry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PeriodKey = Tuple[int, int, int, int]  # (company_id, account_id, year, month)
+
+# Journal line columns that decide where, and whether, a line counts in the aggregate
+BALANCE_COLUMNS = ('company_id', 'account_id', 'entry_date', 'debit_amount', 'credit_amount', 'is_posted')
+
+class LedgerBalanceService:
+    """
+    Maintains the account_period_balances aggregate and answers per-account totals from it.
+
+    Posting paths call record_entries() before their commit so the aggregate is updated
+    in the same transaction as the journal lines. Edits and deletes of stored lines
+    (including unposting) go through record_changes() from a before_flush listener,
+    so they need no call of their own. Statement generators call
+    account_balances_query() (directly or through get_account_totals() and
+    LedgerQueryService.account_balances()), which reads whole months from the aggregate
+    and only scans journal_entries for the partial months at the edges of the range.
+    """
+
+    def __init__(self, company_id: int):
+        self.company_id = company_id
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+
+    def record_entries(self, entries: Iterable[Any]) -> int:
+        """
+        Fold posted journal lines into the period aggregate (does not commit)
+
+        Args:
+            entries: JournalEntry objects or dicts with account_id, entry_date,
+                     debit_amount, credit_amount and optionally company_id/is_posted
+
+        Returns:
+            Number of account-period rows touched
+        """
+        deltas = self._collect_deltas(entries)
+        if not deltas:
+            return 0
+
+        self._apply_deltas(deltas)
+        return len(deltas)
+
+    def record_changes(self, removed: Iterable[Any], added: Iterable[Any]) -> int:
+        """
+        Take lines out of the period aggregate and fold others in (does not commit)
+
+        An edited line is removed as stored and added as edited; a deleted
+        line is only removed. Unposted lines are skipped on either side.
+
+        Returns:
+            Number of account-period rows touched
+        """
+        deltas = self._collect_deltas(added)
+        for key, removal in self._collect_deltas(removed).items():
+            delta = deltas[key]
+            delta['debit_total'] -= removal['debit_total']
+            delta['credit_total'] -= removal['credit_total']
+            delta['entry_count'] -= removal['entry_count']
+        if not deltas:
+            return 0
+
+        self._apply_deltas(deltas)
+        return len(deltas)
+
+    def rebuild(self) -> int:
+        """Recompute the aggregate for this company from journal_entries (does not commit)"""
+        AccountPeriodBalance.query.filter_by(company_id=self.company_id).delete(synchronize_session=False)
+
+        period_year = extract('year', JournalEntry.entry_date)
+        period_month = extract('month', JournalEntry.entry_date)
+        grouped = db.session.query(
+            JournalEntry.company_id,
+            JournalEntry.account_id,
+            period_year,
+            period_month,
+            func.coalesce(func.sum(JournalEntry.debit_amount), 0.0),
+            func.coalesce(func.sum(JournalEntry.credit_amount), 0.0),
+            func.count(JournalEntry.id),
+            func.current_timestamp()
+        ).filter(
+            JournalEntry.company_id == self.company_id,
+            JournalEntry.is_posted == True
+        ).group_by(
+            JournalEntry.company_id, JournalEntry.account_id, period_year, period_month
+        )
+
+        table = AccountPeriodBalance.__table__
+        result = db.session.execute(
+            table.insert().from_select(
+                ['company_id', 'account_id', 'period_year', 'period_month',
+                 'debit_total', 'credit_total', 'entry_count', 'updated_at'],
+                grouped
+            )
+        )
+        logger.info(f"Rebuilt account period balances for company {self.company_id}")
+        return result.rowcount or 0
+
+    def _collect_deltas(self, entries: Iterable[Any]) -> Dict[PeriodKey, Dict[str, float]]:
+        """Sum debit/credit per (company, account, year, month) for the given lines"""
+        deltas: Dict[PeriodKey, Dict[str, float]] = defaultdict(
+            lambda: {'debit_total': 0.0, 'credit_total': 0.0, 'entry_count': 0}
+        )
+
+        for entry in entries:
+            if isinstance(entry, dict):
+                get = entry.get
+            else:
+                get = lambda name, default=None, _entry=entry: getattr(_entry, name, default)
+
+            if get('is_posted', True) is False:
+                continue
+
+            account_id = get('account_id')
+            entry_date = get('entry_date')
+            if account_id is None or entry_date is None:
+                continue
+
+            key = (get('company_id') or self.company_id, account_id, entry_date.year, entry_date.month)
+            delta = deltas[key]
+            delta['debit_total'] += float(get('debit_amount') or 0)
+            delta['credit_total'] += float(get('credit_amount') or 0)
+            delta['entry_count'] += 1
+
+        return deltas
+
+    def _apply_deltas(self, deltas: Dict[PeriodKey, Dict[str, float]]):
+        """Add deltas to existing rows, inserting rows for new account-periods"""
+        now = datetime.utcnow()
+        rows = [
+            {
+                'company_id': company_id,
+                'account_id': account_id,
+                'period_year': year,
+                'period_month': month,
+                'debit_total': delta['debit_total'],
+                'credit_total': delta['credit_total'],
+                'entry_count': delta['entry_count'],
+                'updated_at': now
+            }
+            for (company_id, account_id, year, month), delta in deltas.items()
+        ]
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            self._apply_deltas_orm(rows)
+            return
+
+        table = AccountPeriodBalance.__table__
+        stmt = upsert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['company_id', 'account_id', 'period_year', 'period_month'],
+            set_={
+                'debit_total': table.c.debit_total + stmt.excluded.debit_total,
+                'credit_total': table.c.credit_total + stmt.excluded.credit_total,
+                'entry_count': table.c.entry_count + stmt.excluded.entry_count,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        db.session.execute(stmt)
+
+    def _apply_deltas_orm(self, rows: List[Dict[str, Any]]):
+        """Read-modify-write fallback for dialects without ON CONFLICT support"""
+        for row in rows:
+            balance = AccountPeriodBalance.query.filter_by(
+                company_id=row['company_id'],
+                account_id=row['account_id'],
+                period_year=row['period_year'],
+                period_month=row['period_month']
+            ).with_for_update().first()
+
+            if balance:
+                balance.debit_total = (balance.debit_total or 0.0) + row['debit_total']
+                balance.credit_total = (balance.credit_total or 0.0) + row['credit_total']
+                balance.entry_count = (balance.entry_count or 0) + row['entry_count']
+                balance.updated_at = row['updated_at']
+            else:
+                db.session.add(AccountPeriodBalance(**row))
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+
+    def get_account_totals(self, date_from: datetime = None, date_to: datetime = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Get posted debit/credit totals per account for an inclusive date range
+
+        Returns:
+            Dictionary keyed by account_id with account details and totals,
+            for accounts with activity in the range
+        """
+        totals: Dict[int, Dict[str, Any]] = {}
+        rows = self.account_balances_query(date_from, date_to, include_empty_accounts=False).all()
+        for account_id, account_code, account_name, account_type, debit_total, credit_total in rows:
+            totals[account_id] = {
+                'account_id': account_id,
+                'account_code': account_code,
+                'account_name': account_name,
+                'account_type': account_type,
+                'debit_total': float(debit_total or 0),
+                'credit_total': float(credit_total or 0)
+            }
+        return totals
+
+    def account_balances_query(self, date_from: datetime = None, date_to: datetime = None,
+                               account_types: Iterable[str] = None, include_empty_accounts: bool = True):
+        """
+        Build (without executing) one grouped query of per-account totals, ordered by account code
+
+        Whole months inside the range come from account_period_balances; only the
+        partial months at either end are summed from journal_entries. Both feed
+        one UNION ALL joined to the chart, so accounts without activity are
+        listed with zero totals when include_empty_accounts is set.
+        """
+        first_month, last_month = self._full_month_span(date_from, date_to)
+
+        movements = []
+        if first_month is None or last_month is None or first_month <= last_month:
+            movements.append(self._period_movements(first_month, last_month))
+            edge_ranges = self._edge_ranges(date_from, date_to, first_month, last_month)
+        else:
+            # No whole month inside the range - read the lines directly
+            edge_ranges = [(date_from, date_to)]
+        if edge_ranges:
+            movements.append(self._journal_movements(edge_ranges))
+
+        movement = (union_all(*movements) if len(movements) > 1 else movements[0]).subquery()
+
+        query = db.session.query(
+            ChartOfAccount.id,
+            ChartOfAccount.account_code,
+            ChartOfAccount.account_name,
+            ChartOfAccount.account_type,
+            func.coalesce(func.sum(movement.c.debit_total), 0.0),
+            func.coalesce(func.sum(movement.c.credit_total), 0.0)
+        )
+        if include_empty_accounts:
+            query = query.outerjoin(movement, movement.c.account_id == ChartOfAccount.id)
+        else:
+            query = query.join(movement, movement.c.account_id == ChartOfAccount.id)
+        query = query.filter(ChartOfAccount.company_id == self.company_id)
+
+        if account_types:
+            query = query.filter(func.lower(ChartOfAccount.account_type).in_(
+                [account_type.lower() for account_type in account_types]
+            ))
+
+        return query.group_by(
+            ChartOfAccount.id, ChartOfAccount.account_code,
+            ChartOfAccount.account_name, ChartOfAccount.account_type
+        ).order_by(ChartOfAccount.account_code)
+
+    def _period_movements(self, first_month: Optional[Tuple[int, int]], last_month: Optional[Tuple[int, int]]):
+        """Aggregate rows for an inclusive (year, month) span"""
+        period_key = AccountPeriodBalance.period_year * 100 + AccountPeriodBalance.period_month
+        conditions = [AccountPeriodBalance.company_id == self.company_id]
+        if first_month is not None:
+            conditions.append(period_key >= first_month[0] * 100 + first_month[1])
+        if last_month is not None:
+            conditions.append(period_key <= last_month[0] * 100 + last_month[1])
+
+        return select(
+            AccountPeriodBalance.account_id.label('account_id'),
+            AccountPeriodBalance.debit_total.label('debit_total'),
+            AccountPeriodBalance.credit_total.label('credit_total')
+        ).where(*conditions)
+
+    def _journal_movements(self, ranges: List[Tuple[Optional[datetime], Optional[datetime]]]):
+        """Posted journal lines in the given partial date ranges"""
+        conditions = []
+        for start, end in ranges:
+            bounds = []
+            if start is not None:
+                bounds.append(JournalEntry.entry_date >= start)
+            if end is not None:
+                bounds.append(JournalEntry.entry_date <= end)
+            conditions.append(and_(*bounds) if bounds else true())
+
+        return select(
+            JournalEntry.account_id.label('account_id'),
+            JournalEntry.debit_amount.label('debit_total'),
+            JournalEntry.credit_amount.label('credit_total')
+        ).where(
+            JournalEntry.company_id == self.company_id,
+            JournalEntry.is_posted == True,
+            or_(*conditions)
+        )
+
+    @staticmethod
+    def _month_start(year: int, month: int) -> datetime:
+        return datetime(year, month, 1)
+
+    @staticmethod
+    def _next_month(year: int, month: int) -> Tuple[int, int]:
+        return (year + 1, 1) if month == 12 else (year, month + 1)
+
+    @staticmethod
+    def _previous_month(year: int, month: int) -> Tuple[int, int]:
+        return (year - 1, 12) if month == 1 else (year, month - 1)
+
+    def _full_month_span(self, date_from: Optional[datetime],
+                         date_to: Optional[datetime]) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+        """First and last (year, month) lying entirely inside [date_from, date_to]; None means unbounded"""
+        first_month = None
+        if date_from is not None:
+            first_month = (date_from.year, date_from.month)
+            if date_from > self._month_start(*first_month):
+                first_month = self._next_month(*first_month)
+
+        last_month = None
+        if date_to is not None:
+            last_month = (date_to.year, date_to.month)
+            month_end = self._month_start(*self._next_month(*last_month)) - timedelta(microseconds=1)
+            if date_to < month_end:
+                last_month = self._previous_month(*last_month)
+
+        return first_month, last_month
+
+    def _edge_ranges(self, date_from: Optional[datetime], date_to: Optional[datetime],
+                     first_month: Optional[Tuple[int, int]],
+                     last_month: Optional[Tuple[int, int]]) -> List[Tuple[datetime, datetime]]:
+        """Date ranges not covered by the whole-month span"""
+        ranges = []
+        if date_from is not None and first_month is not None:
+            first_start = self._month_start(*first_month)
+            if date_from < first_start:
+                ranges.append((date_from, first_start - timedelta(microseconds=1)))
+
+        if date_to is not None and last_month is not None:
+            after_last = self._month_start(*self._next_month(*last_month))
+            if date_to >= after_last:
+                ranges.append((after_last, date_to))
+
+        return ranges
+
+def _balance_changed(line: JournalEntry) -> bool:
+    state = inspect(line)
+    return any(state.attrs[column].history.has_changes() for column in BALANCE_COLUMNS)
+
+@event.listens_for(Session, 'before_flush')
+def _track_stored_line_changes(session, flush_context, instances):
+    """Move edited and deleted journal lines through account_period_balances in the flushing transaction"""
+    edited = [line for line in session.dirty
+              if isinstance(line, JournalEntry) and line.id is not None and _balance_changed(line)]
+    deleted = [line for line in session.deleted if isinstance(line, JournalEntry) and line.id is not None]
+    if not edited and not deleted:
+        return
+
+    # The rows as last flushed are what the aggregate currently holds
+    stored = {
+        row['id']: dict(row) for row in session.execute(
+            select(JournalEntry.id, *(getattr(JournalEntry, column) for column in BALANCE_COLUMNS))
+            .where(JournalEntry.id.in_([line.id for line in chain(edited, deleted)]))
+        ).mappings()
+    }
+
+    by_company: Dict[int, Tuple[List[Any], List[Any]]] = defaultdict(lambda: ([], []))
+    for line in chain(edited, deleted):
+        previous = stored.get(line.id)
+        if previous is not None:
+            by_company[previous['company_id']][0].append(previous)
+    for line in edited:
+        if line.id in stored:
+            by_company[line.company_id][1].append(line)
+
+    for company_id, (removed, added) in by_company.items():
+        LedgerBalanceService(company_id).record_changes(removed, added)
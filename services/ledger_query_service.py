@@ -0,0 +1,175 @@
+"""
+Ledger Query Service - F-AI Accountant
+Set-based aggregation layer for statement generation: one grouped query per report
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Iterator
+
+from sqlalchemy import func, and_
+
+from app import db
+from models import ChartOfAccount, JournalEntry
+from services.ledger_balance_service import LedgerBalanceService
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when lines are streamed
+STREAM_BATCH_SIZE = 2000
+
+class LedgerQueryService:
+    """
+    Builds per-account totals and ledger lines with single grouped/windowed queries
+    joined to chart_of_accounts, so report latency does not grow with the chart size.
+
+    Account totals come from LedgerBalanceService.account_balances_query(), which
+    reads whole months from account_period_balances and only the edge months
+    from journal_entries.
+    """
+
+    def __init__(self, company_id: int):
+        self.company_id = company_id
+
+    def account_balances(self, date_from: datetime = None, date_to: datetime = None,
+                         account_types: Iterable[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get debit/credit totals for every account in the chart (zero-activity accounts included)
+
+        Args:
+            date_from: Inclusive start of the range (None for open-ended)
+            date_to: Inclusive end of the range (None for open-ended)
+            account_types: Optional account types to restrict to (case-insensitive)
+
+        Returns:
+            List of account dictionaries ordered by account code
+        """
+        rows = LedgerBalanceService(self.company_id).account_balances_query(date_from, date_to, account_types).all()
+
+        return [
+            {
+                'account_id': account_id,
+                'account_code': account_code,
+                'account_name': account_name,
+                'account_type': account_type,
+                'debit_total': float(debit_total or 0),
+                'credit_total': float(credit_total or 0),
+                'net_balance': float(debit_total or 0) - float(credit_total or 0)
+            }
+            for account_id, account_code, account_name, account_type, debit_total, credit_total in rows
+        ]
+
+    def ledger_lines(self, date_from: datetime = None, date_to: datetime = None,
+                     posted_only: bool = False, include_empty_accounts: bool = True,
+                     account_name_like: str = None) -> List[Dict[str, Any]]:
+        """
+        Get journal lines per account with a running balance computed by a window function
+
+        Accounts without lines are returned once with entry_id None when
+        include_empty_accounts is set, so the ledger still lists them.
+        """
+        return list(self.iter_ledger_lines(date_from, date_to, posted_only, include_empty_accounts, account_name_like))
+
+    def iter_ledger_lines(self, date_from: datetime = None, date_to: datetime = None,
+                          posted_only: bool = False, include_empty_accounts: bool = True,
+                          account_name_like: str = None) -> Iterator[Dict[str, Any]]:
+        """Stream ledger_lines() in batches of STREAM_BATCH_SIZE rows instead of materialising them"""
+        query = self.ledger_lines_query(date_from, date_to, posted_only, include_empty_accounts, account_name_like)
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield {
+                'account_id': row[0],
+                'account_code': row[1],
+                'account_name': row[2],
+                'account_type': row[3],
+                'entry_id': row[4],
+                'entry_date': row[5],
+                'description': row[6] or '',
+                'reference_number': row[7] or '',
+                'debit_amount': float(row[8] or 0),
+                'credit_amount': float(row[9] or 0),
+                'running_balance': float(row[10] or 0)
+            }
+
+    def ledger_lines_query(self, date_from: datetime = None, date_to: datetime = None,
+                           posted_only: bool = False, include_empty_accounts: bool = True,
+                           account_name_like: str = None):
+        """Build (without executing) the windowed query behind ledger_lines()"""
+        signed_amount = func.coalesce(JournalEntry.debit_amount, 0.0) - func.coalesce(JournalEntry.credit_amount, 0.0)
+        running_balance = func.sum(signed_amount).over(
+            partition_by=ChartOfAccount.id,
+            order_by=(JournalEntry.entry_date, JournalEntry.id)
+        )
+
+        line_conditions = [
+            JournalEntry.account_id == ChartOfAccount.id,
+            JournalEntry.company_id == self.company_id
+        ]
+        if posted_only:
+            line_conditions.append(JournalEntry.is_posted == True)
+        if date_from is not None:
+            line_conditions.append(JournalEntry.entry_date >= date_from)
+        if date_to is not None:
+            line_conditions.append(JournalEntry.entry_date <= date_to)
+
+        query = db.session.query(
+            ChartOfAccount.id,
+            ChartOfAccount.account_code,
+            ChartOfAccount.account_name,
+            ChartOfAccount.account_type,
+            JournalEntry.id,
+            JournalEntry.entry_date,
+            JournalEntry.description,
+            JournalEntry.reference_number,
+            JournalEntry.debit_amount,
+            JournalEntry.credit_amount,
+            running_balance
+        )
+
+        if include_empty_accounts:
+            query = query.outerjoin(JournalEntry, and_(*line_conditions))
+        else:
+            query = query.join(JournalEntry, and_(*line_conditions))
+
+        query = query.filter(ChartOfAccount.company_id == self.company_id)
+        if account_name_like:
+            query = query.filter(ChartOfAccount.account_name.ilike(account_name_like))
+
+        return query.order_by(
+            ChartOfAccount.account_code, JournalEntry.entry_date, JournalEntry.id
+        )
+
+    def journal_lines(self, date_from: datetime = None, date_to: datetime = None) -> List[Dict[str, Any]]:
+        """Get journal lines in entry order with their account details (one joined query)"""
+        return list(self.iter_journal_lines(date_from, date_to))
+
+    def iter_journal_lines(self, date_from: datetime = None, date_to: datetime = None) -> Iterator[Dict[str, Any]]:
+        """Stream journal_lines() in batches of STREAM_BATCH_SIZE rows instead of materialising them"""
+        query = db.session.query(
+            JournalEntry.id, JournalEntry.entry_date, JournalEntry.description, JournalEntry.reference_number,
+            ChartOfAccount.account_code, ChartOfAccount.account_name,
+            JournalEntry.debit_amount, JournalEntry.credit_amount, JournalEntry.source_type
+        ).outerjoin(
+            ChartOfAccount, JournalEntry.account_id == ChartOfAccount.id
+        ).filter(JournalEntry.company_id == self.company_id)
+
+        if date_from is not None:
+            query = query.filter(JournalEntry.entry_date >= date_from)
+        if date_to is not None:
+            query = query.filter(JournalEntry.entry_date <= date_to)
+
+        for (entry_id, entry_date, description, reference_number, account_code, account_name,
+             debit_amount, credit_amount, source_type) in query.order_by(
+                JournalEntry.entry_date, JournalEntry.id).yield_per(STREAM_BATCH_SIZE):
+            yield {
+                'entry_id': entry_id,
+                'entry_date': entry_date,
+                'description': description or '',
+                'reference_number': reference_number or '',
+                'account_code': account_code or '',
+                'account_name': account_name or '',
+                'debit_amount': float(debit_amount or 0),
+                'credit_amount': float(credit_amount or 0),
+                'source_type': source_type or ''
+            }
@@ -0,0 +1,83 @@
+"""
+Ledger Version - F-AI Accountant
+Monotonic per-company ledger counter, bumped in the transaction of every journal change
+"""
+
+import logging
+from itertools import chain
+from datetime import datetime
+from typing import Iterable, Set
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from models import ChartOfAccount, JournalEntry, LedgerVersion
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Changes to these invalidate generated reports
+TRACKED_MODELS = (JournalEntry, ChartOfAccount)
+
+def current_version(company_id: int) -> int:
+    """The company's ledger version; 0 until its ledger first changes"""
+    version = db.session.execute(
+        select(LedgerVersion.version).where(LedgerVersion.company_id == company_id)
+    ).scalar()
+    return version or 0
+
+def bump_versions(session: Session, company_ids: Iterable[int]):
+    """
+    Increment the ledger version of each company (does not commit)
+
+    Posting paths that write journal lines without the ORM (bulk inserts,
+    COPY) call this themselves; ORM changes are picked up at flush.
+    """
+    company_ids = sorted({company_id for company_id in company_ids if company_id is not None})
+    if not company_ids:
+        return
+
+    connection = session.connection()
+    table = LedgerVersion.__table__
+    now = datetime.utcnow()
+    rows = [{'company_id': company_id, 'version': 1, 'updated_at': now} for company_id in company_ids]
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        stmt = upsert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['company_id'],
+            set_={'version': table.c.version + 1, 'updated_at': stmt.excluded.updated_at}
+        )
+        connection.execute(stmt)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            update(table).where(table.c.company_id == row['company_id'])
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            connection.execute(table.insert().values(**row))
+
+def _changed_companies(session: Session) -> Set[int]:
+    companies = set()
+    for instance in chain(session.new, session.deleted):
+        if isinstance(instance, TRACKED_MODELS):
+            companies.add(instance.company_id)
+    for instance in session.dirty:
+        if isinstance(instance, TRACKED_MODELS) and session.is_modified(instance, include_collections=False):
+            companies.add(instance.company_id)
+    return companies
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed_ledgers(session, flush_context):
+    """Bump the versions of companies whose journal lines or accounts this flush wrote"""
+    # Still in the flushing transaction, so a rollback undoes the bump as well
+    bump_versions(session, _changed_companies(session))
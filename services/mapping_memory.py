@@ -0,0 +1,219 @@
+"""
+Mapping Memory - F-AI Accountant
+Manual bank mappings remembered by description signature and served as account suggestions
+"""
+
+import re
+import math
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.reconciliation_description_index import description_terms
+from services.party_name_store import LEGAL_TERMS, normalize_party_name
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Payment rails and booking words that say nothing about what was paid for
+CHANNEL_TERMS = {'neft', 'rtgs', 'imps', 'upi', 'nach', 'ecs', 'ach', 'cheque', 'chq', 'inward', 'outward',
+                 'transfer', 'trf', 'payment', 'paid', 'pay', 'received', 'receipt', 'credit', 'debit',
+                 'ref', 'txn', 'towards', 'bank', 'account'}
+MONTH_TERMS = {'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+               'january', 'february', 'march', 'april', 'june', 'july', 'august', 'september', 'october',
+               'november', 'december'}
+COUNTERPARTY_CUES = ('from', 'to', 'by')
+MAX_COUNTERPARTY_WORDS = 2
+
+# Lookup levels, most specific first, with the confidence ceiling of each
+LEVEL_WEIGHTS = {'signature': 1.0, 'tokens': 0.9, 'counterparty': 0.8}
+
+@dataclass(frozen=True)
+class MappingSignature:
+    """
+    Normalized description of a bank transaction
+
+    tokens are the narration's significant words, sorted, without payment
+    rails, references, numbers and month names, so 'NEFT RENT JAN 2024 REF 81'
+    and 'RENT FEB 2024 REF 97' agree; amount_band groups amounts within a
+    factor of about 1.8.
+    """
+    direction: str
+    tokens: str
+    counterparty: str
+    amount_band: int
+
+    @classmethod
+    def of(cls, description: Any, amount: Any, party_name: Any = None) -> 'MappingSignature':
+        amount = float(amount or 0)
+        tokens = sorted({term for term in description_terms(description)
+                         if term.isalpha() and term not in CHANNEL_TERMS and term not in MONTH_TERMS
+                         and term not in LEGAL_TERMS})
+        counterparty = normalize_party_name(party_name) if party_name else cls._counterparty(description)
+        counterparty = ' '.join(word for word in counterparty.split() if word not in LEGAL_TERMS)
+        amount_band = int(math.floor(math.log10(abs(amount)) * 4)) if abs(amount) >= 1 else 0
+        return cls('in' if amount > 0 else 'out', ' '.join(tokens)[:255], counterparty[:200], amount_band)
+
+    @staticmethod
+    def _counterparty(description: Any) -> str:
+        """Words after 'from' / 'to' / 'by' in the narration ('NEFT TO XYZ PROPERTIES RENT' -> 'xyz properties')"""
+        words = re.findall(r'[a-z]+', str(description or '').lower())
+        for position, word in enumerate(words):
+            if word in COUNTERPARTY_CUES:
+                party = [following for following in words[position + 1:]
+                         if following not in CHANNEL_TERMS and following not in MONTH_TERMS
+                         and following not in LEGAL_TERMS and len(following) > 1]
+                return ' '.join(party[:MAX_COUNTERPARTY_WORDS])
+        return ''
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.tokens and not self.counterparty
+
+class MappingMemory:
+    """
+    Which accounts a company's users mapped similar transactions to
+
+    record() counts a manual mapping under the transaction's signature;
+    suggest() reads the counts back with two indexed lookups and no scoring.
+    Accounts are ranked at three levels: the full signature, the same words at
+    any amount, and the same counterparty. At each level the confidence grows
+    with the account's share of the mappings and with how many there were, so
+    one mapping suggests and a habit resolves:
+
+        confidence = weight * (0.5 + 0.49 * share * n / (n + 1))
+
+    Without a database the counts are kept in memory for the instance's life.
+    """
+
+    def __init__(self, company_id: int, resolve_confidence: float = 0.85):
+        self.company_id = company_id
+        # Suggestions at or above this confidence are used without further analysis
+        self.resolve_confidence = resolve_confidence
+        self._memory: Dict[Tuple[MappingSignature, str], Dict[str, Any]] = {}
+
+    def record(self, description: Any, amount: Any, account_code: Any, account_name: str = '',
+               party_name: Any = None) -> Optional[MappingSignature]:
+        """Count one manual mapping of a transaction to an account"""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        signature = MappingSignature.of(description, amount, party_name)
+        account_code = str(account_code or '')
+        if signature.is_empty or not account_code:
+            return None
+
+        try:
+            from app import db
+            from models import MappingMemoryEntry
+
+            row = MappingMemoryEntry.query.filter_by(
+                company_id=self.company_id, direction=signature.direction, tokens=signature.tokens,
+                counterparty=signature.counterparty, amount_band=signature.amount_band, account_code=account_code
+            ).first()
+            if row is None:
+                row = MappingMemoryEntry(
+                    company_id=self.company_id, direction=signature.direction, tokens=signature.tokens,
+                    counterparty=signature.counterparty, amount_band=signature.amount_band,
+                    account_code=account_code, times_used=0
+                )
+                db.session.add(row)
+            row.times_used = (row.times_used or 0) + 1
+            row.account_name = account_name or row.account_name or ''
+            row.last_used_at = datetime.utcnow()
+            db.session.commit()
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            logger.warning(f"Mapping memory kept in memory only: {str(e)}")
+            self._rollback()
+            entry = self._memory.setdefault((signature, account_code), {'times_used': 0, 'account_name': ''})
+            entry['times_used'] += 1
+            entry['account_name'] = account_name or entry['account_name']
+
+        return signature
+
+    def suggest(self, description: Any, amount: Any, party_name: Any = None,
+                limit: int = 3) -> List[Dict[str, Any]]:
+        """Remembered accounts for a transaction, most confident first"""
+        signature = MappingSignature.of(description, amount, party_name)
+        if signature.is_empty:
+            return []
+
+        levels = {level: defaultdict(int) for level in LEVEL_WEIGHTS}
+        names = {}
+        for row_signature, account_code, times_used, account_name in self._rows(signature):
+            names[account_code] = names.get(account_code) or account_name
+            if signature.tokens and row_signature.tokens == signature.tokens:
+                levels['tokens'][account_code] += times_used
+                if (row_signature.amount_band == signature.amount_band
+                        and row_signature.counterparty == signature.counterparty):
+                    levels['signature'][account_code] += times_used
+            if signature.counterparty and row_signature.counterparty == signature.counterparty:
+                levels['counterparty'][account_code] += times_used
+
+        suggestions = {}
+        for level, counts in levels.items():
+            total = sum(counts.values())
+            for account_code, times_used in counts.items():
+                confidence = LEVEL_WEIGHTS[level] * (0.5 + 0.49 * (times_used / total) * total / (total + 1))
+                if account_code in suggestions and suggestions[account_code]['confidence'] >= confidence:
+                    continue
+                suggestions[account_code] = {
+                    'account_code': account_code,
+                    'account_name': names[account_code],
+                    'confidence': round(confidence, 4),
+                    'reason': f"Mapped {times_used} of {total} times for similar transactions ({level})",
+                    'times_used': times_used,
+                    'source': 'mapping_memory'
+                }
+
+        return sorted(suggestions.values(), key=lambda x: (x['confidence'], x['times_used']), reverse=True)[:limit]
+
+    def resolve(self, description: Any, amount: Any, party_name: Any = None) -> Optional[Dict[str, Any]]:
+        """The remembered account when it is confident enough to use as is"""
+        suggestions = self.suggest(description, amount, party_name, limit=1)
+        if suggestions and suggestions[0]['confidence'] >= self.resolve_confidence:
+            return suggestions[0]
+        return None
+
+    def _rows(self, signature: MappingSignature) -> List[Tuple[MappingSignature, str, int, str]]:
+        """Remembered mappings sharing the signature's words or counterparty"""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        rows = [(row_signature, account_code, entry['times_used'], entry['account_name'])
+                for (row_signature, account_code), entry in self._memory.items()
+                if row_signature.direction == signature.direction
+                and ((signature.tokens and row_signature.tokens == signature.tokens)
+                     or (signature.counterparty and row_signature.counterparty == signature.counterparty))]
+        try:
+            from models import MappingMemoryEntry
+
+            query = MappingMemoryEntry.query.filter_by(company_id=self.company_id, direction=signature.direction)
+            matched = []
+            if signature.tokens:
+                matched.extend(query.filter(MappingMemoryEntry.tokens == signature.tokens).all())
+            if signature.counterparty:
+                seen = {row.id for row in matched}
+                matched.extend(row for row in query.filter(
+                    MappingMemoryEntry.counterparty == signature.counterparty
+                ).all() if row.id not in seen)
+            rows.extend((MappingSignature(row.direction, row.tokens or '', row.counterparty or '', row.amount_band or 0),
+                         row.account_code, row.times_used or 0, row.account_name or '')
+                        for row in matched)
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            logger.warning(f"Mapping memory not available: {str(e)}")
+            self._rollback()
+
+        return rows
+
+    @staticmethod
+    def _rollback():
+        from sqlalchemy.exc import SQLAlchemyError
+        try:
+            from app import db
+            db.session.rollback()
+        except (SQLAlchemyError, RuntimeError):
+            pass
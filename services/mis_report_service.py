@@ -135,13 +135,17 @@ class MISReportService:
     def _validate_double_entry(self, journal_data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate double entry principle"""
         try:
-            entries = journal_data.get('entries', [])
-            total_debits = 0
-            total_credits = 0
-            
-            for entry in entries:
-                total_debits += float(entry.get('debit_amount', 0))
-                total_credits += float(entry.get('credit_amount', 0))
+            summary = journal_data.get('summary', {})
+            if 'total_debits' in summary and 'total_credits' in summary:
+                # Totals already summed while the journal was built
+                total_debits = float(summary['total_debits'])
+                total_credits = float(summary['total_credits'])
+            else:
+                total_debits = 0
+                total_credits = 0
+                for entry in journal_data.get('entries', []):
+                    total_debits += float(entry.get('debit_amount', 0))
+                    total_credits += float(entry.get('credit_amount', 0))
             
             difference = abs(total_debits - total_credits)
             
@@ -165,9 +169,14 @@ class MISReportService:
     def _validate_trial_balance(self, trial_balance_data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate trial balance totals"""
         try:
-            accounts = trial_balance_data.get('accounts', [])
-            total_debits = sum(float(acc.get('debit_balance', 0)) for acc in accounts)
-            total_credits = sum(float(acc.get('credit_balance', 0)) for acc in accounts)
+            totals = trial_balance_data.get('totals', {})
+            if 'total_debits' in totals and 'total_credits' in totals:
+                total_debits = float(totals['total_debits'])
+                total_credits = float(totals['total_credits'])
+            else:
+                accounts = trial_balance_data.get('accounts', [])
+                total_debits = sum(float(acc.get('debit_balance', 0)) for acc in accounts)
+                total_credits = sum(float(acc.get('credit_balance', 0)) for acc in accounts)
             
             difference = abs(total_debits - total_credits)
             
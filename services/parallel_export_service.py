@@ -0,0 +1,185 @@
+"""
+Parallel Export Service - F-AI Accountant
+Fans independent report artifacts out over a process pool and assembles the zip
+"""
+
+import os
+import time
+import shutil
+import atexit
+import logging
+import zipfile
+import tempfile
+import threading
+import multiprocessing
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('excel', 'word', 'pdf')
+
+# name -> (module-level function, arguments); both must pickle
+ExportTask = Tuple[Callable[..., Any], tuple]
+
+@dataclass
+class ExportResult:
+    """The assembled file and the seconds each artifact, the assembly and the whole export took"""
+    path: str
+    timings: Dict[str, float] = field(default_factory=dict)
+
+def _timed(function: Callable[..., Any], args: tuple) -> Tuple[Any, float]:
+    """Run one task and measure it where it ran, so timings exclude queueing in the pool"""
+    started = time.perf_counter()
+    return function(*args), time.perf_counter() - started
+
+def export_artifact(report_data: Dict[str, Any], report_name: str, format_type: str,
+                    company_name: str, reports_dir: str) -> str:
+    """Render one report in one format (pool task); returns the absolute file path"""
+    from services.report_export_service import ReportExportService
+
+    export_service = ReportExportService()
+    export_service.reports_dir = reports_dir
+    return os.path.abspath(export_service.export_report(report_data, report_name, format_type, company_name))
+
+class ParallelExportService:
+    """
+    Run CPU-bound renderers (openpyxl, reportlab) in worker processes
+
+    Threads would serialize on the GIL, so tasks go to a process pool shared by
+    the whole process and created on first use, with REPORT_EXPORT_WORKERS
+    processes (default: one per core). Spawned workers start without the
+    parent's database connections. With one worker, one task, or inside a
+    daemonic process (which may not have children), tasks run inline instead.
+
+    Tasks are module-level functions with picklable arguments; what they
+    return (file paths) is assembled here, in the calling process.
+    """
+
+    _pool: Optional[ProcessPoolExecutor] = None
+    _pool_workers = 0
+    _lock = threading.Lock()
+
+    def __init__(self, workers: Optional[int] = None):
+        config = current_app.config if has_app_context() else {}
+        self.workers = workers if workers is not None else config.get(
+            'REPORT_EXPORT_WORKERS', os.cpu_count() or 1)
+
+    def parallel(self, task_count: int) -> bool:
+        """Whether task_count tasks would be spread over worker processes"""
+        return self.workers > 1 and task_count > 1 and not multiprocessing.current_process().daemon
+
+    def run(self, tasks: Dict[str, ExportTask],
+            skip_failures: bool = False) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Run named tasks; returns their results and per-task seconds, in task order
+
+        With skip_failures a task that raises is logged and left out of the
+        results instead of failing the whole run.
+        """
+        pool = None
+        if not self.parallel(len(tasks)):
+            pending = {name: self._inline(function, args) for name, (function, args) in tasks.items()}
+        else:
+            pool = self._shared_pool(self.workers)
+            pending = {name: pool.submit(_timed, function, args) for name, (function, args) in tasks.items()}
+
+        results, timings = {}, {}
+        for name, future in pending.items():
+            try:
+                result, seconds = future.result()
+            except BrokenProcessPool:
+                # A worker died (killed, out of memory); the next call starts a fresh pool
+                if pool is not None:
+                    self._discard_pool(pool)
+                raise
+            except Exception as e:
+                if not skip_failures:
+                    raise
+                logger.warning(f"Export artifact {name} failed: {str(e)}")
+                continue
+            results[name] = result
+            timings[name] = round(seconds, 4)
+        return results, timings
+
+    @staticmethod
+    def _inline(function: Callable[..., Any], args: tuple) -> Future:
+        """Run a task here, wrapped like a pool result"""
+        future = Future()
+        try:
+            future.set_result(_timed(function, args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def export_bundle(self, reports: Dict[str, Dict[str, Any]], archive_path: str,
+                      formats: Iterable[str] = EXPORT_FORMATS, company_name: str = "F-AI Accountant") -> ExportResult:
+        """Every report in every format, rendered in parallel and zipped into archive_path; timings name what was included"""
+        started = time.perf_counter()
+        archive_dir = os.path.dirname(archive_path) or '.'
+        os.makedirs(archive_dir, exist_ok=True)
+        # Files are named by report and second, so each bundle renders into its own directory
+        staging_dir = tempfile.mkdtemp(prefix='bundle_', dir=archive_dir)
+        try:
+            tasks = {
+                f"{report_name}.{format_type}": (export_artifact,
+                                                 (report_data, report_name, format_type, company_name, staging_dir))
+                for report_name, report_data in reports.items()
+                for format_type in formats
+            }
+            # A report a renderer cannot handle is left out rather than losing the rest
+            paths, timings = self.run(tasks, skip_failures=True)
+            if not paths:
+                raise RuntimeError('No report could be exported')
+
+            assemble_started = time.perf_counter()
+            with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for path in paths.values():
+                    archive.write(path, arcname=os.path.basename(path))
+            timings['assemble'] = round(time.perf_counter() - assemble_started, 4)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        timings['total'] = round(time.perf_counter() - started, 4)
+
+        self._log(archive_path, len(tasks), timings)
+        return ExportResult(archive_path, timings)
+
+    @classmethod
+    def _shared_pool(cls, workers: int) -> ProcessPoolExecutor:
+        with cls._lock:
+            if cls._pool is None or cls._pool_workers != workers:
+                if cls._pool is not None:
+                    cls._pool.shutdown(wait=False)
+                cls._pool = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+                cls._pool_workers = workers
+                logger.info(f"Started export pool with {workers} processes")
+            return cls._pool
+
+    @classmethod
+    def _discard_pool(cls, pool: ProcessPoolExecutor):
+        with cls._lock:
+            if cls._pool is pool:
+                cls._pool = None
+        pool.shutdown(wait=False)
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            pool, cls._pool = cls._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    @staticmethod
+    def _log(path: str, task_count: int, timings: Dict[str, float]):
+        rendered = {name: seconds for name, seconds in timings.items() if name not in ('assemble', 'total')}
+        logger.info(f"Exported {len(rendered)} of {task_count} artifacts to {path} in {timings['total']:.3f}s "
+                    f"({sum(rendered.values()):.3f}s of rendering, {timings['assemble']:.3f}s assembling)")
+
+atexit.register(ParallelExportService.shutdown)
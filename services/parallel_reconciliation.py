@@ -0,0 +1,77 @@
+"""
+Parallel Reconciliation - F-AI Accountant
+Sharded scoring of bank statement lines across a process pool
+"""
+
+import os
+import uuid
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Callable, Optional, Sequence, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# token -> (score_shard, context), set by the parent just before its pool forks
+_SHARED: Dict[str, Tuple[Callable[[Any, Sequence[Any]], List[Any]], Any]] = {}
+
+def fork_available() -> bool:
+    """Workers can only inherit the shared state where processes are forked"""
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+def _score_shard(token: str, items: Sequence[Any]) -> List[Any]:
+    score_shard, context = _SHARED[token]
+    return score_shard(context, items)
+
+def partition(items: Sequence[Any], workers: int, min_shard_size: int) -> List[Sequence[Any]]:
+    """Contiguous shards, about four per worker so a slow shard does not hold up the rest"""
+    shard_count = max(1, min(workers * 4, len(items) // max(min_shard_size, 1)))
+    size, extra = divmod(len(items), shard_count)
+    shards = []
+    start = 0
+    for index in range(shard_count):
+        end = start + size + (1 if index < extra else 0)
+        shards.append(items[start:end])
+        start = end
+    return shards
+
+def score_in_shards(score_shard: Callable[[Any, Sequence[Any]], List[Any]], context: Any,
+                    items: Sequence[Any], workers: Optional[int] = None,
+                    min_shard_size: int = 50) -> List[Any]:
+    """
+    score_shard(context, shard) over every shard of items, results in item order
+
+    score_shard returns one result per item of its shard. Workers are forked
+    after context is registered, so they read the parent's indexes, arrays and
+    bound methods copy-on-write instead of receiving them pickled; only shards
+    (a few ids) go out and results come back. Shards are merged in statement
+    order, so the outcome is the same as scoring serially.
+
+    Runs in-process when there is one worker, one shard, or no fork.
+    """
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    shards = partition(items, workers, min_shard_size) if items else []
+
+    if workers <= 1 or len(shards) <= 1 or not fork_available():
+        return score_shard(context, items) if items else []
+
+    token = uuid.uuid4().hex
+    _SHARED[token] = (score_shard, context)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)),
+                                 mp_context=multiprocessing.get_context('fork')) as executor:
+            futures = [executor.submit(_score_shard, token, shard) for shard in shards]
+            results = []
+            for shard, future in zip(shards, futures):
+                shard_results = future.result()
+                if len(shard_results) != len(shard):
+                    raise ValueError(f"Shard returned {len(shard_results)} results for {len(shard)} items")
+                results.extend(shard_results)
+    finally:
+        del _SHARED[token]
+
+    logger.info(f"Scored {len(items)} statement lines in {len(shards)} shards on {min(workers, len(shards))} processes")
+    return results
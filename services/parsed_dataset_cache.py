@@ -0,0 +1,206 @@
+"""
+Parsed Dataset Cache - F-AI Accountant
+Parse-once cache of uploaded spreadsheets, shared by validation, processing and reconciliation
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Tuple, Optional
+
+import pandas as pd
+from flask import current_app, has_app_context
+
+try:
+    import pyarrow  # noqa: F401 - required by DataFrame.to_feather / read_feather
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the stored representation changes so stale entries are never read
+CACHE_FORMAT_VERSION = 2
+
+# Entry formats, in the order they are looked up
+ARROW_SUFFIX = '.arrow'
+PICKLE_SUFFIX = '.pkl'
+
+DEFAULT_CACHE_DIR = os.path.join('cache', 'parsed_datasets')
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600  # one week since last use
+
+class ParsedDatasetCache:
+    """
+    Stores the first sheet of an uploaded CSV/Excel file on local disk
+
+    Entries are keyed by the upload's content hash (FileStorageMetadata.file_hash,
+    or a SHA-256 of the file when no metadata row exists), so every stage that reads
+    the same upload shares one parse. Reading an entry touches its mtime; entries
+    unused for longer than max_age_seconds are dropped, then the least recently
+    used ones until the directory fits in max_bytes.
+
+    Frames are stored as Arrow IPC when Arrow can hold them unchanged. Frames it
+    cannot (non-string column labels, object columns mixing Python types, as in
+    hand-edited Excel sheets) and every frame without pyarrow are pickled instead,
+    so a cached read returns exactly what parsing returned. The directory is
+    written only by this class and must not be shared with untrusted writers.
+    """
+
+    # (path, size, mtime_ns) -> content hash, so unchanged files are hashed once per process
+    _hash_memo: Dict[Tuple[str, int, int], str] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[int] = None):
+        config = current_app.config if has_app_context() else {}
+        self.cache_dir = cache_dir or config.get('PARSED_CACHE_FOLDER', DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else config.get('PARSED_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        self.max_age_seconds = (max_age_seconds if max_age_seconds is not None
+                                else config.get('PARSED_CACHE_MAX_AGE_SECONDS', DEFAULT_MAX_AGE_SECONDS))
+
+    def read(self, file_path: str) -> pd.DataFrame:
+        """
+        Load an uploaded file as a DataFrame, parsing it only on the first request
+
+        Callers get their own copy of the frame and may modify it freely.
+        """
+        cache_path = self._cache_path(self.content_hash(file_path))
+        for suffix, load in ((ARROW_SUFFIX, pd.read_feather), (PICKLE_SUFFIX, pd.read_pickle)):
+            entry_path = cache_path + suffix
+            if not os.path.exists(entry_path):
+                continue
+            try:
+                df = load(entry_path)
+                os.utime(entry_path)
+                logger.debug(f"Parsed dataset cache hit for {file_path}")
+                return df
+            except Exception as e:
+                logger.warning(f"Discarding unreadable parsed dataset cache entry {entry_path}: {str(e)}")
+                self._remove(entry_path)
+
+        df = self._parse(file_path).reset_index(drop=True)
+        self._store(df, cache_path)
+        return df
+
+    def content_hash(self, file_path: str) -> str:
+        """Hash that identifies the upload's content"""
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if memo_key in self._hash_memo:
+            return self._hash_memo[memo_key]
+
+        file_hash = self._recorded_hash(file_path)
+        if not file_hash:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as handle:
+                for block in iter(lambda: handle.read(1024 * 1024), b''):
+                    digest.update(block)
+            file_hash = digest.hexdigest()
+
+        self._hash_memo[memo_key] = file_hash
+        return file_hash
+
+    def evict(self) -> int:
+        """Drop entries past max age, then least recently used ones over max size; returns entries removed"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        with self._lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith((ARROW_SUFFIX, PICKLE_SUFFIX)):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            removed = 0
+            kept = []
+            for last_used, size, path in entries:
+                if now - last_used > self.max_age_seconds:
+                    removed += self._remove(path)
+                else:
+                    kept.append((last_used, size, path))
+
+            total_bytes = sum(size for _, size, _ in kept)
+            for last_used, size, path in sorted(kept):
+                if total_bytes <= self.max_bytes:
+                    break
+                removed += self._remove(path)
+                total_bytes -= size
+
+            if removed:
+                logger.info(f"Evicted {removed} parsed dataset cache entries")
+            return removed
+
+    def _recorded_hash(self, file_path: str) -> Optional[str]:
+        """file_hash captured at upload time, when the file came through the storage service"""
+        if not has_app_context():
+            return None
+        try:
+            from models import FileStorageMetadata
+            metadata = FileStorageMetadata.query.filter_by(file_path=file_path).first()
+            return metadata.file_hash if metadata else None
+        except Exception as e:
+            logger.debug(f"No recorded file hash for {file_path}: {str(e)}")
+            return None
+
+    def _cache_path(self, file_hash: str) -> str:
+        """Entry path without its format suffix"""
+        return os.path.join(self.cache_dir, f"{file_hash}-v{CACHE_FORMAT_VERSION}")
+
+    def _store(self, df: pd.DataFrame, cache_path: str):
+        """Write atomically so concurrent readers never see a partial file"""
+        if self._arrow_safe(df):
+            entry_path = cache_path + ARROW_SUFFIX
+            write = df.to_feather
+        else:
+            entry_path = cache_path + PICKLE_SUFFIX
+            write = df.to_pickle
+        temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write(temp_path)
+            os.replace(temp_path, entry_path)
+        except Exception as e:
+            logger.warning(f"Could not cache parsed dataset at {entry_path}: {str(e)}")
+            self._remove(temp_path)
+            return
+        self.evict()
+
+    @staticmethod
+    def _parse(file_path: str) -> pd.DataFrame:
+        if file_path.lower().endswith(('.xlsx', '.xls')):
+            return pd.read_excel(file_path)
+        return pd.read_csv(file_path)
+
+    @staticmethod
+    def _arrow_safe(df: pd.DataFrame) -> bool:
+        """Whether Arrow IPC round-trips the frame unchanged (Arrow would coerce or reject the rest)"""
+        if not ARROW_AVAILABLE or not all(isinstance(col, str) for col in df.columns):
+            return False
+        if len(set(df.columns)) != len(df.columns):
+            return False
+        for position in range(len(df.columns)):
+            column = df.iloc[:, position]
+            if column.dtype == object and column.dropna().map(type).nunique() > 1:
+                return False
+        return True
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
@@ -0,0 +1,348 @@
+"""
+Party Name Store - F-AI Accountant
+Precomputed phonetic, suffix-stripped and acronym keys for vendor/customer names
+"""
+
+import re
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Callable, Iterable, Optional, Set
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the key algorithms change so persisted keys are recomputed
+KEY_VERSION = 1
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+LEGAL_TERMS = {'ltd', 'limited', 'pvt', 'private', 'company', 'co', 'corp', 'corporation', 'inc',
+               'incorporated', 'llp', 'llc', 'plc', 'and', 'the', 'ms'}
+VOWELS = set('AEIOU')
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ['AEIOUYHW', 'BFPV', 'CGJKQSXZ', 'DT', 'L', 'MN', 'R'], start=0) for letter in letters}
+
+def normalize_party_name(name: Any) -> str:
+    """Lower-case words of a party name, single spaced"""
+    return ' '.join(WORD_PATTERN.findall(str(name or '').lower()))
+
+def soundex(word: str) -> str:
+    """American Soundex code ('Robert' -> 'R163')"""
+    letters = [letter for letter in word.upper() if 'A' <= letter <= 'Z']
+    if not letters:
+        return ''
+    code = letters[0]
+    previous = SOUNDEX_CODES[letters[0]]
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES[letter]
+        if digit != '0' and digit != previous:
+            code += digit
+        # H and W do not separate letters with the same code; vowels do
+        if letter not in 'HW':
+            previous = digit
+    return (code + '000')[:4]
+
+def metaphone(word: str) -> str:
+    """Original Metaphone key ('Knight' -> 'NT', 'Smith' -> 'SM0')"""
+    word = ''.join(letter for letter in word.upper() if 'A' <= letter <= 'Z')
+    if not word:
+        return ''
+    if word[:2] in ('AE', 'GN', 'KN', 'PN', 'WR'):
+        word = word[1:]
+    if word[0] == 'X':
+        word = 'S' + word[1:]
+    elif word[:2] == 'WH':
+        word = 'W' + word[2:]
+
+    key = []
+    length = len(word)
+    for i, letter in enumerate(word):
+        if i > 0 and letter == word[i - 1] and letter != 'C':
+            continue
+        following = word[i + 1] if i + 1 < length else ''
+        after = word[i + 2] if i + 2 < length else ''
+        previous = word[i - 1] if i > 0 else ''
+
+        if letter in VOWELS:
+            if i == 0:
+                key.append(letter)
+        elif letter == 'B':
+            if not (previous == 'M' and i == length - 1):
+                key.append('B')
+        elif letter == 'C':
+            if following == 'I' and after == 'A':
+                key.append('X')
+            elif following == 'H':
+                key.append('K' if previous == 'S' else 'X')
+            elif following in ('I', 'E', 'Y'):
+                if previous != 'S':
+                    key.append('S')
+            else:
+                key.append('K')
+        elif letter == 'D':
+            key.append('J' if following == 'G' and after in ('E', 'I', 'Y') else 'T')
+        elif letter == 'G':
+            if following == 'H' and after and after not in VOWELS:
+                continue
+            if following == 'N' and (i + 2 == length or word[i + 1:] == 'NED'):
+                continue
+            if following in ('I', 'E', 'Y') and previous != 'G':
+                key.append('J')
+            else:
+                key.append('K')
+        elif letter == 'H':
+            if following in VOWELS and previous not in ('C', 'G', 'P', 'S', 'T'):
+                key.append('H')
+        elif letter == 'K':
+            if previous != 'C':
+                key.append('K')
+        elif letter == 'P':
+            key.append('F' if following == 'H' else 'P')
+        elif letter == 'Q':
+            key.append('K')
+        elif letter == 'S':
+            key.append('X' if following == 'H' or (following == 'I' and after in ('O', 'A')) else 'S')
+        elif letter == 'T':
+            if following == 'I' and after in ('O', 'A'):
+                key.append('X')
+            elif following == 'H':
+                key.append('0')
+            elif not (following == 'C' and after == 'H'):
+                key.append('T')
+        elif letter == 'V':
+            key.append('F')
+        elif letter in ('W', 'Y'):
+            if following in VOWELS:
+                key.append(letter)
+        elif letter == 'X':
+            key.append('KS')
+        elif letter == 'Z':
+            key.append('S')
+        else:
+            key.append(letter)
+    return ''.join(key)
+
+def phonetic_words(words: Iterable[str]) -> List[str]:
+    """Words long enough, and alphabetic enough, to compare by sound"""
+    return [word for word in words if len(word) >= 3 and word.isalpha()]
+
+@dataclass
+class PartyKeys:
+    """Match keys of one party name"""
+    party_name: str
+    stripped_name: str
+    acronyms: List[str] = field(default_factory=list)
+    soundex_keys: List[str] = field(default_factory=list)
+    metaphone_keys: List[str] = field(default_factory=list)
+    key_version: int = KEY_VERSION
+
+    @classmethod
+    def compute(cls, party_name: Any) -> 'PartyKeys':
+        name = normalize_party_name(party_name)
+        words = name.split()
+        core_words = [word for word in words if word not in LEGAL_TERMS] or words
+        sounding = phonetic_words(core_words)
+
+        # 'ABC Technologies Pvt Ltd' is written ATPL as often as AT; single letters
+        # and two-letter forms collide with ordinary words, so keep three or more
+        acronyms = []
+        for acronym_words in (core_words, [word for word in words if word not in ('and', 'the')]):
+            acronym = ''.join(word[0] for word in acronym_words)
+            if len(acronym_words) >= 2 and len(acronym) >= 3 and acronym not in acronyms:
+                acronyms.append(acronym)
+
+        return cls(
+            party_name=name,
+            stripped_name=' '.join(core_words),
+            acronyms=acronyms,
+            soundex_keys=[soundex(word) for word in sounding],
+            metaphone_keys=[metaphone(word) for word in sounding]
+        )
+
+@dataclass
+class PartyMatch:
+    """How a bank description matches one party"""
+    phonetic: float = 0.0
+    acronym: float = 0.0
+    stripped: float = 0.0
+    core_words: float = 0.0
+
+class PartyNameStore:
+    """
+    Hash index from name keys to parties
+
+    Keys are computed once per party (and persisted per company by
+    for_parties()); a bank description is tokenized once, its words and word
+    n-grams looked up in the key maps, and the result cached, so asking how a
+    description matches any party is a dictionary lookup rather than a string
+    comparison per pair.
+
+    Per party, a description is scored on:
+    - stripped: the suffix-stripped name appears as consecutive words ('abc
+      technologies' in 'NEFT ABC TECHNOLOGIES PVT') or glued ('ABCTECHNOLOGIES');
+    - core_words: share of the stripped name's words present;
+    - phonetic: share of its words that sound alike (Metaphone; Soundex counts 0.9);
+    - acronym: an acronym form appears as a word ('TCS').
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self.keys: Dict[str, PartyKeys] = {}
+        self._by_stripped: Dict[str, Set[str]] = defaultdict(set)
+        self._by_word: Dict[str, Set[str]] = defaultdict(set)
+        self._by_metaphone: Dict[str, Set[str]] = defaultdict(set)
+        self._by_soundex: Dict[str, Set[str]] = defaultdict(set)
+        self._by_acronym: Dict[str, Set[str]] = defaultdict(set)
+        self._max_words = 1
+        self._matches: Dict[str, Dict[str, PartyMatch]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, keys: PartyKeys):
+        """Index a party's keys, replacing any previous keys for the same name"""
+        if keys.party_name in self.keys:
+            self._unindex(self.keys[keys.party_name])
+        self.keys[keys.party_name] = keys
+        core_words = keys.stripped_name.split()
+        self._by_stripped[keys.stripped_name.replace(' ', '')].add(keys.party_name)
+        for word in set(core_words):
+            self._by_word[word].add(keys.party_name)
+        for key in set(keys.metaphone_keys):
+            self._by_metaphone[key].add(keys.party_name)
+        for key in set(keys.soundex_keys):
+            self._by_soundex[key].add(keys.party_name)
+        for acronym in keys.acronyms:
+            self._by_acronym[acronym].add(keys.party_name)
+        self._max_words = max(self._max_words, len(core_words))
+        self._matches.clear()
+
+    def keys_for(self, party_name: Any) -> PartyKeys:
+        """Keys of a party, computed and indexed on first use"""
+        name = normalize_party_name(party_name)
+        keys = self.keys.get(name)
+        if keys is None:
+            keys = PartyKeys.compute(name)
+            self.add(keys)
+        return keys
+
+    def match(self, description: Any) -> Dict[str, PartyMatch]:
+        """Every party the description matches on any key, cached per description"""
+        text = str(description or '').lower()
+        matches = self._matches.get(text)
+        if matches is not None:
+            return matches
+        if len(self._matches) >= self.cache_size:
+            self._matches.clear()
+
+        words = WORD_PATTERN.findall(text)
+        matches = defaultdict(PartyMatch)
+
+        for size in range(1, min(self._max_words, len(words)) + 1):
+            for start in range(len(words) - size + 1):
+                for party in self._by_stripped.get(''.join(words[start:start + size]), ()):
+                    matches[party].stripped = 1.0
+
+        for word in set(words):
+            for party in self._by_acronym.get(word, ()):
+                matches[party].acronym = 1.0
+
+        sounding = phonetic_words(set(words))
+        self._accumulate(matches, set(words), self._by_word,
+                         lambda keys: keys.stripped_name.split(), 'core_words', 1.0)
+        self._accumulate(matches, {metaphone(word) for word in sounding}, self._by_metaphone,
+                         lambda keys: keys.metaphone_keys, 'phonetic', 1.0)
+        self._accumulate(matches, {soundex(word) for word in sounding}, self._by_soundex,
+                         lambda keys: keys.soundex_keys, 'phonetic', 0.9)
+
+        self._matches[text] = matches = dict(matches)
+        return matches
+
+    def party_match(self, description: Any, party_name: Any) -> PartyMatch:
+        """How the description matches one party"""
+        name = self.keys_for(party_name).party_name
+        return self.match(description).get(name) or PartyMatch()
+
+    def phonetic_score(self, description: Any, party_name: Any) -> float:
+        return self.party_match(description, party_name).phonetic
+
+    def acronym_score(self, description: Any, party_name: Any) -> float:
+        return self.party_match(description, party_name).acronym
+
+    def _accumulate(self, matches: Dict[str, PartyMatch], description_keys: Set[str],
+                    index: Dict[str, Set[str]], party_keys: Callable[[PartyKeys], List[str]],
+                    attribute: str, weight: float):
+        """Share of each party's keys present in the description, scaled by weight"""
+        hits: Dict[str, int] = defaultdict(int)
+        for key in description_keys:
+            for party in index.get(key, ()):
+                hits[party] += 1
+        for party, count in hits.items():
+            score = weight * min(count / len(set(party_keys(self.keys[party]))), 1.0)
+            setattr(matches[party], attribute, max(getattr(matches[party], attribute), score))
+
+    def _unindex(self, keys: PartyKeys):
+        self._by_stripped[keys.stripped_name.replace(' ', '')].discard(keys.party_name)
+        for word in keys.stripped_name.split():
+            self._by_word[word].discard(keys.party_name)
+        for key in keys.metaphone_keys:
+            self._by_metaphone[key].discard(keys.party_name)
+        for key in keys.soundex_keys:
+            self._by_soundex[key].discard(keys.party_name)
+        for acronym in keys.acronyms:
+            self._by_acronym[acronym].discard(keys.party_name)
+
+    @classmethod
+    def for_parties(cls, party_names: Iterable[Any], company_id: Optional[int] = None) -> 'PartyNameStore':
+        """
+        Store for a company's parties, backed by the party_name_keys table
+
+        Keys already persisted (at the current KEY_VERSION) are loaded as they are;
+        only parties that are new, renamed or stored by an older key version are
+        computed and written back. Without a database the keys are computed in
+        memory.
+        """
+        from sqlalchemy.exc import SQLAlchemyError
+
+        store = cls()
+        names = {normalize_party_name(name) for name in party_names}
+        names.discard('')
+        if not names:
+            return store
+
+        try:
+            from app import db
+            from models import PartyNameKey
+
+            rows = {row.party_name: row for row in PartyNameKey.query.filter_by(company_id=company_id).all()}
+            refreshed = 0
+            for name in names:
+                row = rows.get(name)
+                if row is not None and row.key_version == KEY_VERSION:
+                    store.add(row.to_keys())
+                    continue
+                keys = PartyKeys.compute(name)
+                store.add(keys)
+                if row is None:
+                    row = PartyNameKey(company_id=company_id, party_name=name)
+                    db.session.add(row)
+                row.update_from(keys)
+                refreshed += 1
+            if refreshed:
+                db.session.commit()
+            logger.info(f"Loaded name keys for {len(names)} parties ({refreshed} computed)")
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            # No app context or no table: fall back to in-memory keys
+            logger.warning(f"Party name keys not persisted: {str(e)}")
+            try:
+                from app import db
+                db.session.rollback()
+            except (SQLAlchemyError, RuntimeError):
+                pass
+            for name in names:
+                if name not in store.keys:
+                    store.add(PartyKeys.compute(name))
+
+        return store
@@ -12,6 +12,11 @@ import re
 import logging
 from dataclasses import dataclass
 from enum import Enum
+from operator import mul
+
+from services.party_name_store import PartyNameStore
+
+logger = logging.getLogger(__name__)
 
 class MatchingStage(Enum):
     STAGE_1_AMOUNT = "amount_precision"
@@ -83,6 +88,42 @@ class ProfessionalInvoiceMappingEngine:
             MatchingStage.STAGE_6_BEHAVIORAL: 0.10,
             MatchingStage.STAGE_7_CONTEXTUAL: 0.10
         }
+        
+        # 'sequential' runs every stage on every invoice; 'cascade' runs the cheap stages
+        # first and abandons an invoice once it can no longer reach the LOW threshold
+        self.execution_mode = 'sequential'
+        
+        # Cascade order (cheapest first) and the highest score each stage can return
+        self.cascade_order = [
+            MatchingStage.STAGE_1_AMOUNT,
+            MatchingStage.STAGE_2_TEMPORAL,
+            MatchingStage.STAGE_3_REFERENCE,
+            MatchingStage.STAGE_7_CONTEXTUAL,
+            MatchingStage.STAGE_6_BEHAVIORAL,
+            MatchingStage.STAGE_4_PARTY,
+            MatchingStage.STAGE_5_SEMANTIC
+        ]
+        self.stage_upper_bounds = {
+            MatchingStage.STAGE_1_AMOUNT: 1.0,
+            MatchingStage.STAGE_2_TEMPORAL: 1.0,
+            MatchingStage.STAGE_3_REFERENCE: 1.0,
+            MatchingStage.STAGE_4_PARTY: 1.0,
+            MatchingStage.STAGE_5_SEMANTIC: 0.95,
+            MatchingStage.STAGE_6_BEHAVIORAL: 1.0,
+            MatchingStage.STAGE_7_CONTEXTUAL: 0.95
+        }
+        self.cascade_stats = self._empty_cascade_stats()
+        
+        # Party name keys are computed once per party, descriptions matched by lookup
+        self.party_store = PartyNameStore()
+    
+    def _empty_cascade_stats(self) -> Dict:
+        return {
+            'candidates': 0,
+            'pruned': 0,
+            'pruned_after': {stage.value: 0 for stage in self.cascade_order},
+            'stage_evaluations': {stage.value: 0 for stage in self.cascade_order}
+        }
     
     def process_mapping_sequence(self, bank_transaction: BankTransaction, 
                                 invoice_entries: List[Dict]) -> Dict:
@@ -105,24 +146,28 @@ class ProfessionalInvoiceMappingEngine:
             'audit_trail': []
         }
         
-        print(f"\n🔄 STARTING PROFESSIONAL MAPPING SEQUENCE")
-        print(f"Transaction: {bank_transaction.description[:50]}...")
-        print(f"Amount: ₹{bank_transaction.amount:,.2f}")
-        print(f"Date: {bank_transaction.date.strftime('%Y-%m-%d')}")
-        print("=" * 80)
+        logger.debug(f"Mapping '{bank_transaction.description[:50]}' ({bank_transaction.amount:,.2f}) "
+                     f"against {len(invoice_entries)} invoices in {self.execution_mode} mode")
+        
+        cascade = self.execution_mode == 'cascade'
+        if cascade:
+            self.cascade_stats = self._empty_cascade_stats()
+            cascade_layout = self._cascade_layout()
         
         # Process each invoice through the sequential stages
         for invoice_idx, invoice in enumerate(invoice_entries, 1):
-            print(f"\n📋 PROCESSING INVOICE {invoice_idx}: {invoice.get('invoice_number', 'N/A')}")
-            print(f"Party: {invoice.get('party_name', 'N/A')}")
-            print(f"Amount: ₹{invoice.get('amount', 0):,.2f}")
-            
-            invoice_results = self._process_invoice_through_stages(
-                bank_transaction, invoice, invoice_idx
-            )
+            if cascade:
+                invoice_results = self._process_invoice_through_cascade(bank_transaction, invoice, cascade_layout)
+            else:
+                invoice_results = self._process_invoice_through_stages(
+                    bank_transaction, invoice, invoice_idx
+                )
             
             mapping_results['stage_results'][f"invoice_{invoice_idx}"] = invoice_results
             
+            if invoice_results.get('pruned'):
+                continue
+            
             # Determine final categorization
             final_confidence = invoice_results['final_confidence']
             categorization = self._categorize_match(final_confidence, invoice_results)
@@ -134,7 +179,7 @@ class ProfessionalInvoiceMappingEngine:
                     'categorization': categorization,
                     'stage_results': invoice_results
                 })
-                print(f"✅ AUTO-MATCHED: {categorization['category']} ({final_confidence:.1%})")
+                logger.debug(f"Invoice {invoice_idx} auto-matched: {categorization['category']} ({final_confidence:.1%})")
             else:
                 mapping_results['manual_mapping_required'].append({
                     'invoice': invoice,
@@ -143,10 +188,12 @@ class ProfessionalInvoiceMappingEngine:
                     'stage_results': invoice_results,
                     'manual_review_reasons': categorization['manual_reasons']
                 })
-                print(f"⚠️ MANUAL REVIEW: {categorization['category']} ({final_confidence:.1%})")
+                logger.debug(f"Invoice {invoice_idx} needs review: {categorization['category']} ({final_confidence:.1%})")
         
         # Generate processing summary
         mapping_results['processing_summary'] = self._generate_processing_summary(mapping_results)
+        if cascade:
+            mapping_results['cascade_stats'] = self.cascade_stats
         
         # Handle manual mapping if required
         if mapping_results['manual_mapping_required']:
@@ -164,13 +211,9 @@ class ProfessionalInvoiceMappingEngine:
         cumulative_score = 0.0
         processing_log = []
         
-        print(f"\n   🔍 SEQUENTIAL STAGE PROCESSING:")
-        
         for stage_idx, stage_func in enumerate(self.processing_stages, 1):
             stage_name = list(MatchingStage)[stage_idx - 1]
             
-            print(f"   Stage {stage_idx}: {stage_name.value.replace('_', ' ').title()}", end=" → ")
-            
             start_time = datetime.now()
             stage_result = stage_func(bank_transaction, invoice)
             processing_time = (datetime.now() - start_time).total_seconds() * 1000
@@ -180,9 +223,6 @@ class ProfessionalInvoiceMappingEngine:
             weighted_score = stage_result.score * stage_weight
             cumulative_score += weighted_score
             
-            # Log the stage result
-            print(f"{stage_result.score:.1%} (Weight: {stage_weight:.0%}) = +{weighted_score:.3f}")
-            
             processing_log.append({
                 'stage': stage_name.value,
                 'score': stage_result.score,
@@ -194,12 +234,9 @@ class ProfessionalInvoiceMappingEngine:
             
             # Early termination for perfect matches
             if stage_result.score >= 0.99 and stage_name in [MatchingStage.STAGE_1_AMOUNT, MatchingStage.STAGE_3_REFERENCE]:
-                print(f"   🎯 EARLY PERFECT MATCH DETECTED - Confidence boost applied")
                 cumulative_score += 0.05  # Bonus for early perfect match
                 break
         
-        print(f"   📊 FINAL CUMULATIVE SCORE: {cumulative_score:.1%}")
-        
         return {
             'stage_results': stage_results,
             'cumulative_score': cumulative_score,
@@ -208,6 +245,214 @@ class ProfessionalInvoiceMappingEngine:
             'early_termination': cumulative_score >= 0.99
         }
     
+    def _cascade_layout(self) -> Dict:
+        """
+        Per-call view of the stage configuration used by the cascade
+        
+        Scores and weights are kept in stage_weights order so the per-invoice
+        bound arithmetic works on plain lists.
+        """
+        stages = list(self.stage_weights)
+        position = {stage: index for index, stage in enumerate(stages)}
+        stage_functions = dict(zip(MatchingStage, self.processing_stages))
+        return {
+            'stages': stages,
+            'weights': [self.stage_weights[stage] for stage in stages],
+            'upper_bounds': [self.stage_upper_bounds[stage] for stage in stages],
+            'steps': [(stage, position[stage], stage_functions[stage]) for stage in self.cascade_order],
+            'expensive': {position[stage]: stage for stage in (MatchingStage.STAGE_4_PARTY,
+                                                               MatchingStage.STAGE_5_SEMANTIC)},
+            'stop_positions': {position[MatchingStage.STAGE_1_AMOUNT]: MatchingStage.STAGE_1_AMOUNT,
+                               position[MatchingStage.STAGE_3_REFERENCE]: MatchingStage.STAGE_3_REFERENCE}
+        }
+    
+    def _process_invoice_through_cascade(self, bank_transaction: BankTransaction, invoice: Dict,
+                                         layout: Optional[Dict] = None) -> Dict:
+        """
+        Cascade form of _process_invoice_through_stages
+        
+        Stages run in cascade_order. Before each one, the best final confidence the
+        invoice could still reach is bounded from the scores so far and the stage
+        upper bounds; once that bound falls below the LOW threshold the invoice is
+        abandoned. Invoices that are not abandoned get exactly the sequential result.
+        """
+        layout = layout or self._cascade_layout()
+        low_threshold = self.confidence_thresholds[ConfidenceLevel.LOW]
+        weights = layout['weights']
+        # Best score each stage can still reach: its upper bound until it has run,
+        # then its actual score
+        best_scores = list(layout['upper_bounds'])
+        results = [None] * len(best_scores)
+        processing_times = [0.0] * len(best_scores)
+        # Party/semantic stages not run yet, and their candidate-specific bounds,
+        # computed at most once per invoice
+        pending_expensive = dict(layout['expensive'])
+        expensive_bounds = {}
+        last_stage = None
+        stopped = False
+        evaluations = self.cascade_stats['stage_evaluations']
+        
+        self.cascade_stats['candidates'] += 1
+        
+        for stage, index, stage_function in layout['steps']:
+            if last_stage is not None:
+                upper_bound = self._cascade_upper_bound(bank_transaction, invoice, best_scores, weights,
+                                                        pending_expensive, expensive_bounds)
+                if upper_bound < low_threshold:
+                    self.cascade_stats['pruned'] += 1
+                    self.cascade_stats['pruned_after'][last_stage.value] += 1
+                    return {
+                        'pruned': True,
+                        'pruned_after': last_stage.value,
+                        'upper_bound': upper_bound,
+                        'final_confidence': 0.0
+                    }
+            
+            start_time = datetime.now()
+            results[index] = stage_function(bank_transaction, invoice)
+            processing_times[index] = (datetime.now() - start_time).total_seconds() * 1000
+            best_scores[index] = results[index].score
+            pending_expensive.pop(index, None)
+            evaluations[stage.value] += 1
+            last_stage = stage
+            
+            if index in layout['stop_positions']:
+                stage_results = {stop_stage: results[position]
+                                 for position, stop_stage in layout['stop_positions'].items()
+                                 if results[position] is not None}
+                if self._sequential_stop_stage(stage_results) is not None:
+                    stopped = True
+                    break
+        
+        # Replay the stages in sequential order so the result matches sequential mode
+        ordered_results = {}
+        processing_log = []
+        cumulative_score = 0.0
+        for index, stage in enumerate(layout['stages']):
+            stage_result = results[index]
+            if stage_result is None:
+                break
+            ordered_results[stage] = stage_result
+            weighted_score = stage_result.score * weights[index]
+            cumulative_score += weighted_score
+            processing_log.append({
+                'stage': stage.value,
+                'score': stage_result.score,
+                'weight': weights[index],
+                'contribution': weighted_score,
+                'factors': stage_result.factors,
+                'processing_time_ms': processing_times[index]
+            })
+            if stopped and index in layout['stop_positions'] and stage_result.score >= 0.99:
+                cumulative_score += 0.05  # Bonus for early perfect match
+                break
+        
+        return {
+            'stage_results': ordered_results,
+            'cumulative_score': cumulative_score,
+            'final_confidence': min(cumulative_score, 1.0),
+            'processing_log': processing_log,
+            'early_termination': cumulative_score >= 0.99
+        }
+    
+    def _sequential_stop_stage(self, stage_results: Dict) -> Optional[MatchingStage]:
+        """Stage at which sequential processing stops early (perfect amount or reference), if known"""
+        for stage in (MatchingStage.STAGE_1_AMOUNT, MatchingStage.STAGE_3_REFERENCE):
+            if stage not in stage_results:
+                return None
+            if stage_results[stage].score >= 0.99:
+                return stage
+        return None
+    
+    def _cascade_upper_bound(self, bank_tx: BankTransaction, invoice: Dict, best_scores: List[float],
+                             weights: List[float], pending_expensive: Dict, expensive_bounds: Dict) -> float:
+        """
+        Highest final confidence the invoice can still reach given the stages already run
+        
+        best_scores and weights are in stage_weights order; pending_expensive maps
+        the positions of the party/semantic stages not run yet to the stage. Their
+        bounds cost about as much as the stages themselves, so they are only
+        computed when they could decide pruning: not when the static bounds
+        already prune, nor when the invoice clears the LOW threshold even with
+        both stages scoring zero. expensive_bounds caches them across the steps
+        of one invoice's cascade.
+        """
+        low_threshold = self.confidence_thresholds[ConfidenceLevel.LOW]
+        upper_bound = self._confidence_bound(best_scores, weights)
+        if upper_bound < low_threshold or not pending_expensive:
+            return upper_bound
+        
+        floor_scores = list(best_scores)
+        for index in pending_expensive:
+            floor_scores[index] = 0.0
+        if self._confidence_bound(floor_scores, weights) >= low_threshold:
+            return upper_bound
+        
+        tight_scores = list(best_scores)
+        for index, stage in pending_expensive.items():
+            if stage not in expensive_bounds:
+                expensive_bounds[stage] = self._stage_upper_bound(stage, bank_tx, invoice)
+            tight_scores[index] = expensive_bounds[stage]
+        return self._confidence_bound(tight_scores, weights)
+    
+    def _confidence_bound(self, scores: List[float], weights: List[float]) -> float:
+        """Final confidence of the sequential run if each stage, in stage_weights order, scored as given"""
+        reference = 2  # STAGE_3_REFERENCE
+        total = sum(map(mul, scores, weights))
+        if scores[reference] < 0.99:
+            return min(total, 1.0)
+        # A perfect reference ends the sequence after stage 3 with the early-match bonus
+        early = sum(map(mul, scores[:3], weights[:3])) + 0.05
+        capped = total - (scores[reference] - 0.99) * weights[reference]
+        return min(max(early, capped), 1.0)
+    
+    def _stage_upper_bound(self, stage: MatchingStage, bank_tx: BankTransaction, invoice: Dict) -> float:
+        """
+        Upper bound on a stage's score before running it
+        
+        The party and semantic stages are the expensive ones, so they get a
+        candidate-specific bound from cheap necessary conditions: without any of
+        them the stage cannot score above its floor.
+        """
+        if stage == MatchingStage.STAGE_4_PARTY:
+            return self._party_score_bound(bank_tx, invoice)
+        if stage == MatchingStage.STAGE_5_SEMANTIC:
+            return self._semantic_score_bound(bank_tx, invoice)
+        return self.stage_upper_bounds[stage]
+    
+    def _party_score_bound(self, bank_tx: BankTransaction, invoice: Dict) -> float:
+        bank_desc = bank_tx.description.lower()
+        party_name = invoice.get('party_name', '').lower()
+        if not party_name or len(party_name) < 3:
+            return 0.0
+        
+        party_analysis = self._analyze_party_name_components(party_name)
+        if party_name in bank_desc or any(word in bank_desc for word in party_analysis['core_words']):
+            return self.stage_upper_bounds[MatchingStage.STAGE_4_PARTY]
+        
+        bound = 0.0
+        if self._detect_business_abbreviations(bank_desc, party_name) > 0.75:
+            bound = 0.85
+        elif self._phonetic_name_analysis(bank_desc, party_name) > 0.7:
+            bound = 0.80
+        elif self._analyze_brand_relationships(bank_desc, party_name) > 0.6:
+            bound = 0.70
+        return bound
+    
+    def _semantic_score_bound(self, bank_tx: BankTransaction, invoice: Dict) -> float:
+        bank_desc = bank_tx.description.lower()
+        invoice_desc = invoice.get('description', '').lower()
+        if not invoice_desc or len(invoice_desc) < 5:
+            return 0.0
+        
+        # Without a shared word the similarity tier is the 0.10 floor
+        bound = self.stage_upper_bounds[MatchingStage.STAGE_5_SEMANTIC] if set(bank_desc.split()) & set(invoice_desc.split()) else 0.10
+        if self._classify_transaction_purpose(bank_desc, invoice_desc) > 0.7:
+            bound = max(bound, 0.80)
+        if self._analyze_industry_keywords(bank_desc, invoice_desc) > 0.6:
+            bound = max(bound, 0.75)
+        return bound
+    
     def _stage_1_amount_precision(self, bank_tx: BankTransaction, invoice: Dict) -> MatchingResult:
         """STAGE 1: Mathematical Amount Precision Analysis"""
         
@@ -1013,19 +1258,13 @@ class ProfessionalInvoiceMappingEngine:
         }
     
     def _phonetic_name_analysis(self, bank_desc: str, party_name: str) -> float:
-        """Simplified phonetic analysis"""
-        # This would use a phonetic algorithm like Soundex in production
-        return 0.5  # Placeholder
+        """Share of the party's name words that sound alike (Metaphone/Soundex) in the description"""
+        return self.party_store.phonetic_score(bank_desc, party_name)
     
     def _detect_business_abbreviations(self, bank_desc: str, party_name: str) -> float:
         """Detect business name abbreviations"""
-        # Extract first letters of each word
-        words = [word for word in party_name.split() if len(word) > 2]
-        if len(words) < 2:
-            return 0.0
-        
-        abbreviation = ''.join(word[0] for word in words)
-        return 0.8 if abbreviation.upper() in bank_desc.upper() else 0.0
+        # Acronym forms of the name (with and without legal suffixes) looked up as words
+        return 0.8 if self.party_store.acronym_score(bank_desc, party_name) else 0.0
     
     def _analyze_brand_relationships(self, bank_desc: str, party_name: str) -> float:
         """Analyze brand and subsidiary relationships"""
@@ -1188,13 +1427,20 @@ class ProfessionalInvoiceMappingEngine:
         total_invoices = len(mapping_results['stage_results'])
         auto_matched = len(mapping_results['final_matches'])
         manual_required = len(mapping_results['manual_mapping_required'])
+        pruned = sum(1 for result in mapping_results['stage_results'].values() if result.get('pruned'))
+        
+        if total_invoices == 0:
+            total_invoices_ratio = 0
+        else:
+            total_invoices_ratio = auto_matched / total_invoices
         
         return {
             'total_invoices_processed': total_invoices,
             'auto_matched_count': auto_matched,
             'manual_mapping_required_count': manual_required,
+            'pruned_count': pruned,
             'auto_match_rate': (auto_matched / total_invoices * 100) if total_invoices > 0 else 0,
-            'processing_efficiency': 'high' if auto_matched / total_invoices > 0.8 else 'medium' if auto_matched / total_invoices > 0.5 else 'low',
+            'processing_efficiency': 'high' if total_invoices_ratio > 0.8 else 'medium' if total_invoices_ratio > 0.5 else 'low',
             'recommendation': self._get_processing_recommendation(auto_matched, manual_required)
         }
     
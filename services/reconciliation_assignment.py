@@ -0,0 +1,134 @@
+"""
+Reconciliation Assignment - F-AI Accountant
+Globally optimal one-to-one assignment of bank lines to ledger entries and invoices
+"""
+
+import heapq
+import logging
+from collections import defaultdict
+from typing import Dict, List, Tuple, Hashable
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Scores are compared as integers so potentials stay exact and results are repeatable
+SCORE_SCALE = 1_000_000
+
+class SparseScoreMatrix:
+    """
+    Match scores for the (bank line, candidate) pairs that survived blocking
+
+    Rows and columns are arbitrary hashable keys (bank transaction ids, ('invoice', id),
+    ('ledger', id), ...). Pairs that were never scored are simply absent, so memory
+    grows with the number of candidate pairs rather than rows x columns.
+    """
+
+    def __init__(self):
+        self._scores: Dict[Hashable, Dict[Hashable, float]] = defaultdict(dict)
+
+    def add(self, row: Hashable, column: Hashable, score: float):
+        """Record a pair's score, keeping the highest if the pair is scored twice"""
+        scores = self._scores[row]
+        if score > scores.get(column, float('-inf')):
+            scores[column] = score
+
+    def rows(self) -> List[Hashable]:
+        return [row for row, scores in self._scores.items() if scores]
+
+    def row(self, row: Hashable) -> Dict[Hashable, float]:
+        return self._scores.get(row, {})
+
+    def __len__(self) -> int:
+        return sum(len(scores) for scores in self._scores.values())
+
+def solve_assignment(matrix: SparseScoreMatrix, min_score: float = 0.0) -> Dict[Hashable, Tuple[Hashable, float]]:
+    """
+    Maximum-weight one-to-one matching over the sparse score matrix
+
+    Pairs scoring below min_score are ignored. Every row may also stay unassigned,
+    so the result maximises the total score of the accepted pairs rather than their
+    count. Solved with the shortest augmenting path form of the Hungarian method
+    (Dijkstra over reduced costs), which only ever walks the candidate pairs;
+    unrelated blocks of the matrix never touch each other.
+
+    Returns {row: (column, score)} for assigned rows.
+    """
+    rows = matrix.rows()
+    edges: Dict[Hashable, List[Tuple[Hashable, int]]] = {}
+    best = 0
+    for row in rows:
+        row_edges = [(column, int(round(score * SCORE_SCALE)))
+                     for column, score in matrix.row(row).items() if score >= min_score]
+        if row_edges:
+            edges[row] = row_edges
+            best = max(best, max(weight for _, weight in row_edges))
+
+    # Costs are offset so the private "unassigned" column of each row costs the most
+    unassigned_cost = best + 1
+    adjacency: Dict[Hashable, List[Tuple[Tuple, int]]] = {}
+    for row, row_edges in edges.items():
+        adjacency[row] = [((0, column), unassigned_cost - weight) for column, weight in row_edges]
+        adjacency[row].append(((1, row), unassigned_cost))
+
+    row_potential: Dict[Hashable, int] = {}
+    column_potential: Dict[Tuple, int] = defaultdict(int)
+    column_owner: Dict[Tuple, Hashable] = {}
+    row_column: Dict[Hashable, Tuple] = {}
+
+    for source in adjacency:
+        row_potential[source] = min(cost - column_potential[column] for column, cost in adjacency[source])
+
+        settled: Dict[Tuple, int] = {}
+        predecessor: Dict[Tuple, Hashable] = {}
+        visited_rows = {source: 0}
+        heap = []
+        counter = 0
+
+        def relax(row: Hashable, distance: int):
+            nonlocal counter
+            for column, cost in adjacency[row]:
+                if column not in settled:
+                    reduced = cost - row_potential[row] - column_potential[column]
+                    counter += 1
+                    heapq.heappush(heap, (distance + reduced, counter, column, row))
+
+        relax(source, 0)
+        target = None
+        while heap:
+            distance, _, column, row = heapq.heappop(heap)
+            if column in settled:
+                continue
+            settled[column] = distance
+            predecessor[column] = row
+            owner = column_owner.get(column)
+            if owner is None:
+                target = column
+                break
+            visited_rows[owner] = distance
+            relax(owner, distance)
+
+        shortest = settled[target]
+        for row, distance in visited_rows.items():
+            row_potential[row] += shortest - distance
+        for column, distance in settled.items():
+            column_potential[column] -= shortest - distance
+
+        # Flip the alternating path ending at the free column
+        column = target
+        while True:
+            row = predecessor[column]
+            previous = row_column.get(row)
+            column_owner[column] = row
+            row_column[row] = column
+            if row == source:
+                break
+            column = previous
+
+    assignment = {}
+    for row, (kind, column) in row_column.items():
+        if kind == 0:
+            assignment[row] = (column, matrix.row(row)[column])
+
+    logger.info(f"Assigned {len(assignment)} of {len(rows)} bank lines over {len(matrix)} candidate pairs")
+    return assignment
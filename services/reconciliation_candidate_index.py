@@ -0,0 +1,224 @@
+"""
+Reconciliation Candidate Index - F-AI Accountant
+Blocking stage that shortlists ledger entries before the expensive matching layers
+"""
+
+import re
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from datetime import datetime, date
+from typing import Dict, List, Any, Optional, Iterable, Set
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+REFERENCE_FIELDS = ('invoice_number', 'reference')
+PARTY_FIELDS = ('party_name',)
+
+@dataclass
+class BlockingStats:
+    """Pruning and (sampled) recall figures for one reconciliation run"""
+    bank_transactions: int = 0
+    ledger_entries: int = 0
+    candidate_pairs: int = 0
+    amount_hits: int = 0
+    token_hits: int = 0
+    description_hits: int = 0
+    date_narrowed_blocks: int = 0
+    recall_sampled: int = 0
+    recall_hits: int = 0
+
+    @property
+    def total_pairs(self) -> int:
+        return self.bank_transactions * self.ledger_entries
+
+    @property
+    def pruning_ratio(self) -> float:
+        """Share of bank x ledger pairs that were never scored"""
+        return 1.0 - self.candidate_pairs / self.total_pairs if self.total_pairs else 0.0
+
+    @property
+    def recall(self) -> Optional[float]:
+        """Share of sampled actionable matches (found by exhaustive scoring) that survived blocking"""
+        return self.recall_hits / self.recall_sampled if self.recall_sampled else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats.update({
+            'total_pairs': self.total_pairs,
+            'pruning_ratio': round(self.pruning_ratio, 4),
+            'recall': round(self.recall, 4) if self.recall is not None else None
+        })
+        return stats
+
+def tokenize(text: Any) -> List[str]:
+    """Lower-case alphanumeric runs of three or more characters"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(str(text).lower()) if len(token) >= 3]
+
+def reference_keys(value: Any) -> Set[str]:
+    """Tokens of a reference plus its separator-free form, so 'INV-001' also matches 'INV001'"""
+    tokens = set(tokenize(value))
+    joined = ''.join(TOKEN_PATTERN.findall(str(value).lower())) if value else ''
+    if len(joined) >= 3:
+        tokens.add(joined)
+    return tokens
+
+def _as_ordinal(value: Any) -> Optional[int]:
+    if isinstance(value, datetime):
+        return value.toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    if isinstance(value, str) and value:
+        for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y'):
+            try:
+                return datetime.strptime(value[:10], fmt).toordinal()
+            except ValueError:
+                continue
+    return None
+
+class CandidateBlockingIndex:
+    """
+    Shortlists ledger entries for a bank line so only plausible pairs are scored
+
+    Three indexes are built once per run:
+    - amount: entry amounts sorted for a range lookup of +/- amount_tolerance of
+      the bank amount (plus absolute_slack for small amounts), which is where the
+      amount layer gives any score at all. Matchers that also accept scaled
+      amounts (GST inclusive/exclusive) pass the scale factors as amount_ratios;
+    - date: entry dates sorted, used to narrow amount blocks larger than
+      max_block_size (round amounts such as rent) to the date_window_days window;
+    - tokens: inverted index of invoice number, reference and party-name tokens.
+      Tokens posted by more than max_token_share of entries carry no signal and
+      are dropped, like stop words.
+
+    The shortlist is the union of the amount block and every entry sharing a
+    token with the bank narration or reference, in ledger order. When a
+    DescriptionIndex over the same entries is passed, the description_limit
+    entries whose descriptions are most similar to the narration (at least
+    description_min_score) are added as well.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], amount_tolerance: float = 0.10,
+                 absolute_slack: float = 1.0, date_window_days: int = 30,
+                 max_block_size: int = 500, max_token_share: float = 0.05,
+                 amount_ratios: Iterable[float] = (1.0,), description_index=None,
+                 description_limit: int = 10, description_min_score: float = 0.5):
+        self.entries = entries
+        self.description_index = description_index
+        self.description_limit = description_limit
+        self.description_min_score = description_min_score
+        self.amount_ratios = list(amount_ratios)
+        self.amount_tolerance = amount_tolerance
+        self.absolute_slack = absolute_slack
+        self.date_window_days = date_window_days
+        self.max_block_size = max_block_size
+        self.stats = BlockingStats(ledger_entries=len(entries))
+
+        amounts = np.array([self._amount(entry) for entry in entries], dtype=float)
+        valid = ~np.isnan(amounts)
+        self._amount_order = np.flatnonzero(valid)[np.argsort(amounts[valid], kind='stable')]
+        self._sorted_amounts = amounts[self._amount_order]
+        self._unparsed_amounts = np.flatnonzero(~valid)
+
+        self._ordinals = [_as_ordinal(entry.get('date')) for entry in entries]
+        dated = sorted((ordinal, index) for index, ordinal in enumerate(self._ordinals) if ordinal is not None)
+        self._sorted_ordinals = [ordinal for ordinal, _ in dated]
+        self._date_order = [index for _, index in dated]
+
+        postings = defaultdict(set)
+        for index, entry in enumerate(entries):
+            for field in REFERENCE_FIELDS:
+                for token in reference_keys(entry.get(field)):
+                    postings[token].add(index)
+            for field in PARTY_FIELDS:
+                for token in tokenize(entry.get(field)):
+                    postings[token].add(index)
+        posting_limit = max(1, int(max_token_share * len(entries))) if len(entries) >= 100 else len(entries)
+        self._postings = {token: ids for token, ids in postings.items() if len(ids) <= posting_limit}
+
+        logger.info(f"Built reconciliation candidate index over {len(entries)} ledger entries "
+                    f"({len(self._postings)} reference/party tokens)")
+
+    def candidates(self, amount: Any, when: Any, text: str) -> List[int]:
+        """Indices into entries worth scoring for one bank line"""
+        self.stats.bank_transactions += 1
+
+        block = self._amount_block(amount)
+        if len(block) > self.max_block_size:
+            block = self._narrow_by_date(block, _as_ordinal(when))
+            self.stats.date_narrowed_blocks += 1
+        self.stats.amount_hits += len(block)
+
+        shortlist = set(block)
+        for token in self._query_tokens(text):
+            ids = self._postings.get(token)
+            if ids:
+                self.stats.token_hits += len(ids)
+                shortlist.update(ids)
+
+        if self.description_index is not None:
+            hits = self.description_index.search(text, self.description_limit, self.description_min_score)
+            self.stats.description_hits += len(hits)
+            shortlist.update(position for position, _ in hits)
+
+        ordered = sorted(shortlist)
+        self.stats.candidate_pairs += len(ordered)
+        return ordered
+
+    def candidate_entries(self, amount: Any, when: Any, text: str) -> List[Dict[str, Any]]:
+        return [self.entries[index] for index in self.candidates(amount, when, text)]
+
+    def record_recall(self, actionable_ids: Iterable[int], candidate_ids: Iterable[int]):
+        """Count how many exhaustively found matches the shortlist kept"""
+        candidate_ids = set(candidate_ids)
+        for entry_id in actionable_ids:
+            self.stats.recall_sampled += 1
+            if entry_id in candidate_ids:
+                self.stats.recall_hits += 1
+
+    def _amount_block(self, amount: Any) -> List[int]:
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            return list(range(len(self.entries)))
+        block = []
+        for ratio in self.amount_ratios:
+            target = amount * ratio
+            spread = abs(target) * self.amount_tolerance + self.absolute_slack
+            low = np.searchsorted(self._sorted_amounts, target - spread, side='left')
+            high = np.searchsorted(self._sorted_amounts, target + spread, side='right')
+            block.extend(self._amount_order[low:high].tolist())
+        if len(self.amount_ratios) > 1:
+            block = list(dict.fromkeys(block))
+        block.extend(self._unparsed_amounts.tolist())
+        return block
+
+    def _narrow_by_date(self, block: List[int], ordinal: Optional[int]) -> List[int]:
+        if ordinal is None:
+            return block
+        low = bisect_left(self._sorted_ordinals, ordinal - self.date_window_days)
+        high = bisect_right(self._sorted_ordinals, ordinal + self.date_window_days)
+        in_window = set(self._date_order[low:high])
+        return [index for index in block if index in in_window or self._ordinals[index] is None]
+
+    @staticmethod
+    def _query_tokens(text: str) -> Set[str]:
+        tokens = set(tokenize(text))
+        # Narrations often glue references together ("INV001PAYMENT"); keep digit runs too
+        tokens.update(run for run in re.findall(r'\d{4,}', text or ''))
+        return tokens
+
+    @staticmethod
+    def _amount(entry: Dict[str, Any]) -> float:
+        try:
+            return float(entry.get('amount'))
+        except (TypeError, ValueError):
+            return float('nan')
@@ -0,0 +1,118 @@
+"""
+Reconciliation Description Index - F-AI Accountant
+TF-IDF inverted index over ledger and invoice descriptions
+"""
+
+import heapq
+import math
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple, Sequence, Any
+
+from services.reconciliation_candidate_index import tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = {'the', 'and', 'for', 'from', 'with', 'via', 'into', 'our', 'your', 'being'}
+
+def description_terms(text: Any) -> List[str]:
+    """
+    Normalized description terms
+
+    Lower-case alphanumeric tokens of three or more characters, without stop words
+    and pure numbers (references are matched by the reference layer), with plural
+    's' trimmed so 'services' and 'service' agree.
+    """
+    terms = []
+    for token in tokenize(text):
+        if token in STOP_WORDS or token.isdigit():
+            continue
+        if len(token) > 4 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+class DescriptionIndex:
+    """
+    Inverted index of description terms with IDF weights, built once per run
+
+    Every description is turned into an L2-normalized TF-IDF vector when the index
+    is built. Bank narrations are vectorized once (and cached), after which:
+    - search() walks only the postings of the narration's terms, giving the most
+      similar documents without touching the rest of the ledger;
+    - similarity() is the cosine of two cached vectors, so scoring a pair never
+      re-tokenizes either string.
+
+    Terms the index has never seen get the highest IDF: they count against the
+    similarity of everything, as an unmatched word should.
+    """
+
+    def __init__(self, documents: Sequence[Any], cache_size: int = 4096):
+        self.documents = list(documents)
+        self.cache_size = cache_size
+
+        terms = [description_terms(document) for document in self.documents]
+        document_frequency = Counter(term for document_terms in terms for term in set(document_terms))
+        total = len(self.documents)
+        self._idf = {term: math.log((1 + total) / (1 + count)) + 1.0 for term, count in document_frequency.items()}
+        self._unseen_idf = math.log(1 + total) + 1.0
+
+        self._vectors: Dict[str, Dict[str, float]] = {}
+        self._document_vectors: List[Dict[str, float]] = []
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for position, (document, document_terms) in enumerate(zip(self.documents, terms)):
+            key = str(document or '').lower()
+            vector = self._vectors.get(key)
+            if vector is None:
+                vector = self._vectors[key] = self._weigh(document_terms)
+            self._document_vectors.append(vector)
+            for term, weight in vector.items():
+                self._postings[term].append((position, weight))
+        self._document_count = len(self._vectors)
+
+        logger.info(f"Built description index over {total} documents ({len(self._idf)} terms)")
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def vector(self, text: Any) -> Dict[str, float]:
+        """TF-IDF vector of a text, cached by its lower-cased form"""
+        key = str(text or '').lower()
+        vector = self._vectors.get(key)
+        if vector is None:
+            if len(self._vectors) - self._document_count >= self.cache_size:
+                # Drop cached queries, keep the documents
+                self._vectors = {str(document or '').lower(): vector
+                                 for document, vector in zip(self.documents, self._document_vectors)}
+            vector = self._vectors[key] = self._weigh(description_terms(key))
+        return vector
+
+    def similarity(self, text1: Any, text2: Any) -> float:
+        """Cosine similarity of two texts under the index's IDF weights"""
+        vector1 = self.vector(text1)
+        vector2 = self.vector(text2)
+        if len(vector2) < len(vector1):
+            vector1, vector2 = vector2, vector1
+        return min(sum(weight * vector2.get(term, 0.0) for term, weight in vector1.items()), 1.0)
+
+    def document_similarity(self, text: Any, position: int) -> float:
+        """Cosine similarity of a text and an indexed document"""
+        document_vector = self._document_vectors[position]
+        return min(sum(weight * document_vector.get(term, 0.0) for term, weight in self.vector(text).items()), 1.0)
+
+    def search(self, text: Any, limit: int = 10, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """(position, similarity) of the best matching documents, best first"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in self.vector(text).items():
+            for position, document_weight in self._postings.get(term, ()):
+                scores[position] += weight * document_weight
+        hits = heapq.nlargest(limit, scores.items(), key=lambda hit: (hit[1], -hit[0]))
+        return [(position, min(score, 1.0)) for position, score in hits if score >= min_score]
+
+    def _weigh(self, terms: List[str]) -> Dict[str, float]:
+        counts = Counter(terms)
+        vector = {term: count * self._idf.get(term, self._unseen_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
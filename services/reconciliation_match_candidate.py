@@ -0,0 +1,131 @@
+"""
+Reconciliation Match Candidate - F-AI Accountant
+Compact scored matches whose explanation is rebuilt only when someone reads it
+"""
+
+import logging
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Scoring layers, in the order their scores are kept
+LAYERS = ('amount', 'temporal', 'reference', 'party', 'semantic', 'behavioral', 'contextual')
+
+# Parts of a match that are only built on demand
+EXPLANATION_KEYS = ('comprehensive_factors', 'detailed_analysis', 'risk_assessment')
+
+# Keys a candidate answers to when read like a match dict
+MATCH_KEYS = ('entry', 'confidence', 'layer_scores', 'categorization', 'match_quality', 'restored') + EXPLANATION_KEYS
+
+class MatchCandidate:
+    """
+    A ledger entry scored against a bank line
+
+    Only what ranking and categorizing need is kept: the entry, the
+    confidence, one score per layer, the category and the match quality. The
+    analysis behind the scores (each layer's details, the factors and the risk
+    assessment) is rebuilt by explainer(transaction, entry) the first time
+    detailed_analysis, comprehensive_factors or risk_assessment is read,
+    usually for the few matches a user expands, and cached from then on.
+
+    Candidates read like the dicts they replace (candidate['confidence'],
+    candidate.get('layer_scores')); to_dict() gives the serializable form,
+    with the explanation only when asked for.
+    """
+
+    __slots__ = ('entry', 'transaction', 'confidence', 'scores', 'categorization', 'match_quality',
+                 'restored', '_explainer', '_explanation')
+
+    def __init__(self, entry: Dict, transaction: Any, confidence: float, scores: Optional[Tuple[float, ...]] = None,
+                 categorization: Optional[str] = None, match_quality: int = 0, restored: bool = False,
+                 explainer: Optional[Callable[[Any, Dict], Dict[str, Any]]] = None):
+        self.entry = entry
+        self.transaction = transaction
+        self.confidence = confidence
+        self.scores = scores
+        self.categorization = categorization
+        self.match_quality = match_quality
+        self.restored = restored
+        self._explainer = explainer
+        self._explanation = None
+
+    @classmethod
+    def restored_match(cls, entry: Dict, confidence: float) -> 'MatchCandidate':
+        """A match found by an earlier run; only its confidence was kept"""
+        return cls(entry, None, confidence, restored=True)
+
+    @property
+    def layer_scores(self) -> Dict[str, float]:
+        return dict(zip(LAYERS, self.scores)) if self.scores is not None else {}
+
+    @property
+    def is_explained(self) -> bool:
+        return self._explanation is not None
+
+    def explain(self) -> Dict[str, Any]:
+        """The factors, per-layer analysis and risk assessment behind the scores"""
+        if self._explanation is None:
+            if self._explainer is None or self.transaction is None:
+                self._explanation = {'comprehensive_factors': [], 'detailed_analysis': {}, 'risk_assessment': {}}
+            else:
+                explanation = self._explainer(self.transaction, self.entry)
+                self._explanation = {key: explanation[key] for key in EXPLANATION_KEYS}
+        return self._explanation
+
+    @property
+    def comprehensive_factors(self) -> List[str]:
+        return self.explain()['comprehensive_factors']
+
+    @property
+    def detailed_analysis(self) -> Dict[str, Any]:
+        return self.explain()['detailed_analysis']
+
+    @property
+    def risk_assessment(self) -> Dict[str, Any]:
+        return self.explain()['risk_assessment']
+
+    def detached(self) -> 'MatchCandidate':
+        """A copy without the entry, transaction and explainer, cheap to send back from a worker"""
+        return MatchCandidate(None, None, self.confidence, self.scores, self.categorization, self.match_quality,
+                              self.restored)
+
+    def attach(self, entry: Dict, transaction: Any, explainer: Optional[Callable[[Any, Dict], Dict[str, Any]]]):
+        self.entry = entry
+        self.transaction = transaction
+        self._explainer = explainer
+        return self
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in MATCH_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in MATCH_KEYS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self, detailed: bool = False) -> Dict[str, Any]:
+        """Serializable form; detailed adds the explanation, building it if needed"""
+        match = {
+            'entry': self.entry,
+            'confidence': self.confidence,
+            'layer_scores': self.layer_scores,
+            'categorization': self.categorization,
+            'match_quality': self.match_quality
+        }
+        if self.restored:
+            match['restored'] = True
+        if detailed:
+            match.update(self.explain())
+        return match
+
+    def __repr__(self) -> str:
+        entry_id = self.entry.get('id') if isinstance(self.entry, dict) else self.entry
+        return f"MatchCandidate(entry={entry_id!r}, confidence={self.confidence})"
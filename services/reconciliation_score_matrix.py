@@ -0,0 +1,218 @@
+"""
+Reconciliation Score Matrix - F-AI Accountant
+Vectorized amount and date scoring layers for bank reconciliation
+"""
+
+import logging
+from datetime import datetime, date
+from typing import Dict, List, Any, Sequence
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ONE_DAY = np.timedelta64(1, 'D')
+NOT_A_TIME = np.datetime64('NaT', 'us')
+
+# Tiers of the amount precision layer: (factor, match_type, score), checked in order
+AMOUNT_TIERS = [
+    ('perfect_amount_precision', 'perfect', 1.0),
+    ('near_perfect_amount_match', 'near_perfect', 0.95),
+    ('ultra_precise_match', 'ultra_precise', 0.9),
+    ('high_precision_match', 'high_precision', 0.8),
+    ('acceptable_variance', 'acceptable', 0.6),
+    ('moderate_variance', 'moderate', 0.3),
+    ('significant_amount_mismatch', 'poor', 0.0),
+]
+COMMON_ROUNDING = [0.01, 0.02, 0.05, 0.1, 0.5]
+
+# Tiers of the temporal correlation layer
+TEMPORAL_TIERS = [
+    ('exact_date_match', 'exact', 1.0),
+    ('adjacent_date_match', 'adjacent', 0.9),
+    ('close_date_match', 'close', 0.7),
+    ('week_date_match', 'weekly', 0.5),
+    ('biweekly_match', 'biweekly', 0.3),
+    ('monthly_match', 'monthly', 0.1),
+    ('distant_date_mismatch', 'distant', 0.0),
+]
+RECURRING_PERIODS = [7, 14, 30, 90]
+
+def to_datetime64(values: Sequence[Any]) -> np.ndarray:
+    """datetime/date values as datetime64[us]; anything else becomes NaT"""
+    return np.array([np.datetime64(value, 'us') if isinstance(value, (datetime, date)) else NOT_A_TIME
+                     for value in values], dtype='datetime64[us]')
+
+def parse_iso_dates(values: Sequence[Any]) -> np.ndarray:
+    """'%Y-%m-%d' strings as datetime64[us]; unparseable values become NaT"""
+    parsed = []
+    for value in values:
+        try:
+            parsed.append(np.datetime64(datetime.strptime(value, '%Y-%m-%d'), 'us'))
+        except (ValueError, TypeError):
+            parsed.append(NOT_A_TIME)
+    return np.array(parsed, dtype='datetime64[us]')
+
+def parse_amounts(values: Sequence[Any]) -> np.ndarray:
+    """Floats, with NaN for values float() rejects"""
+    parsed = np.empty(len(values), dtype=float)
+    for position, value in enumerate(values):
+        try:
+            parsed[position] = float(value)
+        except (ValueError, TypeError):
+            parsed[position] = np.nan
+    return parsed
+
+def day_difference(later: np.ndarray, earlier: np.ndarray) -> np.ndarray:
+    """Whole days between datetime64 arrays, floored like timedelta.days (float, NaN where either is NaT)"""
+    valid = ~(np.isnat(later) | np.isnat(earlier))
+    days = np.full(later.shape, np.nan)
+    days[valid] = (later[valid] - earlier[valid]) // ONE_DAY
+    return days
+
+def weekday(values: np.ndarray) -> np.ndarray:
+    """Monday=0 ... Sunday=6, as datetime.weekday()"""
+    return (values.astype('datetime64[D]').astype(np.int64) + 3) % 7
+
+class AmountDateScores:
+    """
+    Layer 1 (amount precision) and layer 2 (temporal correlation) for a batch of pairs
+
+    Scores are computed for every pair at once from flat arrays; the per-pair
+    factor lists and details of the original layers are rebuilt on request with
+    amount_analysis() / temporal_analysis().
+    """
+
+    def __init__(self, bank_amounts: np.ndarray, entry_amounts: np.ndarray,
+                 bank_dates: np.ndarray, entry_dates: np.ndarray):
+        self.bank_amounts = bank_amounts
+        self._score_amounts(bank_amounts, entry_amounts)
+        self._score_dates(bank_dates, entry_dates)
+
+    def __len__(self) -> int:
+        return len(self.amount_scores)
+
+    def window(self, start: int, stop: int) -> 'AmountDateScores':
+        """The pairs start..stop as their own batch (array views, no copying)"""
+        sliced = object.__new__(AmountDateScores)
+        for name, value in vars(self).items():
+            setattr(sliced, name, value[start:stop])
+        return sliced
+
+    def _score_amounts(self, bank: np.ndarray, entry: np.ndarray):
+        self.amount_valid = ~np.isnan(bank) & ~np.isnan(entry)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            difference = np.abs(bank - entry)
+            percentage = np.where(bank != 0, difference / np.abs(bank), np.where(entry != 0, 1.0, 0.0))
+
+        conditions = [difference < 0.001, difference < 0.01, percentage <= 0.001,
+                      percentage <= 0.01, percentage <= 0.05, percentage <= 0.1]
+        self.amount_tier = np.select(conditions, range(len(conditions)), len(conditions))
+        scores = np.array([score for _, _, score in AMOUNT_TIERS])[self.amount_tier]
+
+        # Rounding patterns, then transaction size context
+        positive = difference > 0
+        self.whole_rounding = positive & (np.mod(difference, 1) == 0)
+        self.common_rounding = positive & ~self.whole_rounding & np.isin(difference, COMMON_ROUNDING)
+        scores = scores + np.where(self.whole_rounding, 0.1, 0.0)
+        scores = scores + np.where(self.common_rounding, 0.05, 0.0)
+        magnitude = np.abs(bank)
+        scores = scores + np.where((magnitude > 100000) & (percentage <= 0.001), 0.05, 0.0)
+        scores = scores + np.where((magnitude <= 10000) & (difference <= 1), 0.1, 0.0)
+
+        self.amount_differences = difference
+        self.percentage_differences = percentage
+        self.amount_scores = np.where(self.amount_valid, scores, 0.0)
+
+    def _score_dates(self, bank: np.ndarray, entry: np.ndarray):
+        signed = day_difference(bank, entry)
+        self.dates_valid = ~np.isnan(signed)
+        absolute = np.abs(signed)
+
+        conditions = [absolute == 0, absolute == 1, absolute <= 3, absolute <= 7, absolute <= 15, absolute <= 30]
+        self.temporal_tier = np.select(conditions, range(len(conditions)), len(conditions))
+        scores = np.array([score for _, _, score in TEMPORAL_TIERS])[self.temporal_tier]
+
+        self.weekend = self.dates_valid & ((weekday(bank) >= 5) | (weekday(entry) >= 5))
+        scores = scores + np.where(self.weekend & (absolute <= 3), 0.1, 0.0)
+        scores = scores + np.where((signed > 0) & (absolute <= 3), 0.05, 0.0)
+        scores = scores + np.where((signed < 0) & (absolute <= 7), 0.02, 0.0)
+        self.recurring = np.isin(absolute, RECURRING_PERIODS)
+        scores = scores + np.where(self.recurring, 0.05, 0.0)
+
+        self.date_differences = signed
+        self.temporal_scores = np.where(self.dates_valid, scores, 0.0)
+
+    def amount_analysis(self, position: int) -> Dict[str, Any]:
+        """Layer 1 result for one pair in the shape of the per-pair analysis"""
+        if not self.amount_valid[position]:
+            return {'score': 0.0, 'factors': ['amount_parsing_error'],
+                    'details': {'error': 'Unable to parse amounts'}}
+
+        factor, match_type, _ = AMOUNT_TIERS[self.amount_tier[position]]
+        factors = [factor]
+        details: Dict[str, Any] = {'match_type': match_type}
+        if self.whole_rounding[position]:
+            factors.append('rounding_pattern_detected')
+        elif self.common_rounding[position]:
+            factors.append('common_rounding_detected')
+
+        magnitude = abs(self.bank_amounts[position])
+        details['size_category'] = 'large' if magnitude > 100000 else 'medium' if magnitude > 10000 else 'small'
+        details['amount_difference'] = float(self.amount_differences[position])
+        details['percentage_difference'] = float(self.percentage_differences[position])
+        return {'score': float(self.amount_scores[position]), 'factors': factors, 'details': details}
+
+    def temporal_analysis(self, position: int) -> Dict[str, Any]:
+        """Layer 2 result for one pair in the shape of the per-pair analysis"""
+        if not self.dates_valid[position]:
+            return {'score': 0.0, 'factors': ['date_parsing_error'],
+                    'details': {'error': 'Unable to parse dates'}}
+
+        factor, match_type, _ = TEMPORAL_TIERS[self.temporal_tier[position]]
+        factors = [factor]
+        details: Dict[str, Any] = {'match_type': match_type}
+        signed = int(self.date_differences[position])
+        absolute = abs(signed)
+
+        if self.weekend[position]:
+            factors.append('weekend_involved')
+            if absolute <= 3:
+                factors.append('weekend_processing_delay')
+        if signed > 0:
+            details['processing_pattern'] = 'delayed_payment'
+            if absolute <= 3:
+                factors.append('normal_processing_delay')
+        elif signed < 0:
+            details['processing_pattern'] = 'advance_payment'
+            if absolute <= 7:
+                factors.append('advance_payment_pattern')
+        else:
+            details['processing_pattern'] = 'same_day'
+        if self.recurring[position]:
+            factors.append('recurring_pattern_detected')
+
+        details['date_difference_days'] = signed
+        details['absolute_difference'] = absolute
+        return {'score': float(self.temporal_scores[position]), 'factors': factors, 'details': details}
+
+class AmountDateScorer:
+    """
+    Ledger side of the amount/date layers, parsed once per reconciliation run
+
+    score() takes bank amounts and dates plus the ledger positions they are paired
+    with (one element per pair) and returns every pair's layer 1 and layer 2
+    scores from a single vectorized pass.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entry_amounts = parse_amounts([entry.get('amount', 0) for entry in entries])
+        self.entry_dates = parse_iso_dates([entry.get('date', '') for entry in entries])
+
+    def score(self, bank_amounts: Sequence[Any], bank_dates: Sequence[Any],
+              entry_positions: Sequence[int]) -> AmountDateScores:
+        positions = np.asarray(entry_positions, dtype=np.int64)
+        return AmountDateScores(parse_amounts(bank_amounts), self.entry_amounts[positions],
+                                to_datetime64(bank_dates), self.entry_dates[positions])
@@ -0,0 +1,463 @@
+"""
+Reconciliation State Store - F-AI Accountant
+Persisted statement lines, matches, manual mappings and run history for incremental reconciliation
+"""
+
+import json
+import hashlib
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Any, Optional, Sequence, Set, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lines in these states are never scored again
+RECONCILED_STATUSES = ('matched', 'grouped', 'manual', 'ignored')
+
+# A grouped line settles all its candidates together (one payment for several invoices)
+MATCHED_STATUSES = ('matched', 'grouped')
+
+# Ranked candidates kept per open line (the partial-match suggestions)
+MAX_CANDIDATES = 3
+
+# Keep IN (...) lists under SQLite's bound-parameter limit
+QUERY_CHUNK = 500
+
+def statement_line_keys(transactions: Sequence[Any]) -> List[str]:
+    """
+    Stable identity of each statement line across uploads
+
+    A digest of the line's date, amount, narration and reference. Identical
+    lines within one statement (two ATM withdrawals on the same day) are told
+    apart by their occurrence number.
+    """
+    seen = Counter()
+    keys = []
+    for transaction in transactions:
+        date = transaction.date.strftime('%Y-%m-%d') if hasattr(transaction.date, 'strftime') else str(transaction.date)
+        base = '|'.join([
+            date,
+            f"{float(transaction.amount):.2f}",
+            ' '.join(str(transaction.description or '').lower().split()),
+            str(transaction.reference or '').strip().lower()
+        ])
+        seen[base] += 1
+        keys.append(hashlib.sha1(f"{base}#{seen[base]}".encode('utf-8')).hexdigest())
+    return keys
+
+@dataclass
+class LineState:
+    """
+    What a run has to do for one statement line
+
+    scope is 'all' for lines never seen (or whose stored matches no longer
+    hold), to be scored against the whole ledger; 'new' for open lines, to be
+    scored only against the ledger positions in new_positions; 'skip' for
+    reconciled lines.
+    """
+    line_key: str
+    scope: str = 'all'
+    status: str = 'unmatched'
+    confidence: float = 0.0
+    matched_entry_id: Optional[str] = None
+    candidates: List[Tuple[str, float]] = field(default_factory=list)
+    new_positions: List[int] = field(default_factory=list)
+    recorded: bool = False
+
+    def record(self, status: str, candidates: List[Tuple[str, float]]):
+        """Outcome of this run's scoring: status and best candidates, best first (a grouped line keeps them all)"""
+        self.status = status
+        kept = candidates if status == 'grouped' else candidates[:MAX_CANDIDATES]
+        self.candidates = [(str(entry_id), float(confidence)) for entry_id, confidence in kept]
+        self.confidence = self.candidates[0][1] if self.candidates else 0.0
+        self.matched_entry_id = self.candidates[0][0] if status in MATCHED_STATUSES and self.candidates else None
+        self.recorded = True
+
+    @property
+    def matched_entry_ids(self) -> List[str]:
+        """Everything the line is matched to"""
+        if self.status == 'grouped':
+            return [entry_id for entry_id, _ in self.candidates]
+        return [self.matched_entry_id] if self.matched_entry_id else []
+
+@dataclass
+class ReconciliationPlan:
+    """Per-line work for one run, aligned with the statement's transactions"""
+    transactions: List[Any]
+    lines: List[LineState]
+    ledger_ids: List[str]
+    run_id: Optional[int] = None
+    new_ledger_entries: int = 0
+    _rows: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def count(self, scope: str) -> int:
+        return sum(1 for line in self.lines if line.scope == scope)
+
+class ReconciliationStateStore:
+    """
+    Reconciliation state of one company's bank account, kept in the database
+
+    plan_run() looks up every line of a new statement: reconciled lines are
+    skipped, open lines are only scored against ledger entries first seen after
+    their last run, and only unseen lines meet the whole ledger. Each ledger
+    entry is recorded once, with the run that first saw it, so a run writes only
+    the entries that are new to it. finish_run() writes the outcome and the
+    confirmed matches.
+
+    Without a database (no app context, missing tables) every line is planned
+    as new, nothing is written, and manual mappings are kept in memory.
+    """
+
+    def __init__(self, company_id: int, bank_account: str = ''):
+        self.company_id = company_id
+        self.bank_account = str(bank_account or '')
+        self._memory_mappings: Dict[str, Dict[str, Any]] = {}
+
+    def plan_run(self, transactions: Sequence[Any], ledger_ids: Sequence[Any],
+                 still_held: Optional[Callable[[List[str]], Iterable[str]]] = None) -> ReconciliationPlan:
+        """
+        Plan a run over a statement's transactions and the current ledger
+
+        ledger_ids are the ids of the ledger entries (or invoices) the run can
+        match against, in the order the caller scores them; an entry without an
+        id is always treated as new.
+
+        Reconciling often takes a match out of what the next run is offered (a
+        paid invoice is no longer outstanding). still_held is given the matched
+        ids missing from ledger_ids and returns those that still exist; lines
+        matched to them stay reconciled. Without it, such matches are dropped
+        and their lines scored again.
+        """
+        from sqlalchemy.exc import SQLAlchemyError
+
+        keys = statement_line_keys(transactions)
+        ledger_ids = [str(entry_id or '') for entry_id in ledger_ids]
+        plan = ReconciliationPlan(list(transactions), [LineState(key) for key in keys], ledger_ids,
+                                  new_ledger_entries=len(ledger_ids))
+
+        try:
+            from app import db
+            from models import BankStatementLine, ReconciliationLedgerEntry, ReconciliationRun
+
+            rows = {}
+            for start in range(0, len(keys), QUERY_CHUNK):
+                for row in BankStatementLine.query.filter(
+                    BankStatementLine.company_id == self.company_id,
+                    BankStatementLine.bank_account == self.bank_account,
+                    BankStatementLine.line_key.in_(keys[start:start + QUERY_CHUNK])
+                ).all():
+                    rows[row.line_key] = row
+            plan._rows = rows
+
+            # Run that first saw each ledger entry; absent for entries no run has seen
+            entry_ids = sorted({entry_id for entry_id in ledger_ids if entry_id})
+            first_seen = {}
+            for start in range(0, len(entry_ids), QUERY_CHUNK):
+                first_seen.update(db.session.query(
+                    ReconciliationLedgerEntry.entry_id, ReconciliationLedgerEntry.first_run_id
+                ).filter(
+                    ReconciliationLedgerEntry.company_id == self.company_id,
+                    ReconciliationLedgerEntry.bank_account == self.bank_account,
+                    ReconciliationLedgerEntry.entry_id.in_(entry_ids[start:start + QUERY_CHUNK])
+                ).all())
+
+            latest = db.session.query(ReconciliationRun.id).filter(
+                ReconciliationRun.company_id == self.company_id,
+                ReconciliationRun.bank_account == self.bank_account,
+                ReconciliationRun.completed_at.isnot(None)
+            ).order_by(ReconciliationRun.id.desc()).limit(1).scalar()
+            if latest is not None:
+                plan.new_ledger_entries = sum(1 for entry_id in ledger_ids
+                                              if self._seen_after(first_seen, entry_id, latest))
+            self._plan_lines(plan, rows, first_seen, still_held)
+
+            run = ReconciliationRun(
+                company_id=self.company_id,
+                bank_account=self.bank_account,
+                statement_lines=len(keys),
+                new_ledger_entries=plan.new_ledger_entries
+            )
+            db.session.add(run)
+            db.session.flush()
+            db.session.add_all(ReconciliationLedgerEntry(
+                company_id=self.company_id,
+                bank_account=self.bank_account,
+                entry_id=entry_id,
+                first_run_id=run.id
+            ) for entry_id in entry_ids if entry_id not in first_seen)
+            db.session.commit()
+            plan.run_id = run.id
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            # No app context or no tables: reconcile every line from scratch
+            logger.warning(f"Reconciliation state not loaded: {str(e)}")
+            self._rollback()
+            plan.lines = [LineState(key) for key in keys]
+            plan._rows = {}
+            plan.new_ledger_entries = len(ledger_ids)
+
+        logger.info(f"Reconciliation plan: {plan.count('all')} lines against the whole ledger, "
+                    f"{sum(1 for line in plan.lines if line.scope == 'new' and line.new_positions)} open lines "
+                    f"against {plan.new_ledger_entries} new entries, {plan.count('skip')} reconciled")
+        return plan
+
+    @staticmethod
+    def _seen_after(first_seen: Dict[str, int], entry_id: str, run_id: int) -> bool:
+        """Whether an entry was new to the ledger after run_id (an entry without an id always is)"""
+        return not entry_id or first_seen.get(entry_id, run_id + 1) > run_id
+
+    @staticmethod
+    def _held_ids(row: Any, candidates: List[Tuple[str, float]]) -> List[str]:
+        """What a reconciled row is matched to"""
+        if row.status == 'grouped':
+            return [entry_id for entry_id, _ in candidates]
+        return [row.matched_entry_id] if row.status in MATCHED_STATUSES else []
+
+    def _plan_lines(self, plan: ReconciliationPlan, rows: Dict[str, Any], first_seen: Dict[str, int],
+                    still_held: Optional[Callable[[List[str]], Iterable[str]]] = None):
+        positions = {entry_id: position for position, entry_id in enumerate(plan.ledger_ids) if entry_id}
+        candidates_by_key = {
+            key: [(str(entry_id), float(confidence)) for entry_id, confidence in json.loads(row.candidates or '[]')]
+            for key, row in rows.items()
+        }
+
+        # Matches no longer offered to this run, looked up in one call
+        missing = sorted({entry_id for key, row in rows.items() if row.status in RECONCILED_STATUSES
+                          for entry_id in self._held_ids(row, candidates_by_key[key])
+                          if entry_id not in positions})
+        held_elsewhere: Set[str] = set(still_held(missing)) if missing and still_held else set()
+
+        new_positions = {}
+        for line in plan.lines:
+            row = rows.get(line.line_key)
+            if row is None:
+                continue
+            candidates = candidates_by_key[line.line_key]
+
+            if row.status in RECONCILED_STATUSES:
+                # A match to an entry that has since been deleted no longer holds
+                if all(entry_id in positions or entry_id in held_elsewhere
+                       for entry_id in self._held_ids(row, candidates)):
+                    line.scope = 'skip'
+                    line.status = row.status
+                    line.confidence = row.confidence or 0.0
+                    line.matched_entry_id = row.matched_entry_id
+                    line.candidates = candidates
+                continue
+
+            if row.last_run_id is None or any(entry_id not in positions for entry_id, _ in candidates):
+                continue
+
+            line.scope = 'new'
+            line.status = row.status
+            line.candidates = candidates
+            line.confidence = candidates[0][1] if candidates else 0.0
+            if row.last_run_id not in new_positions:
+                new_positions[row.last_run_id] = [position for position, entry_id in enumerate(plan.ledger_ids)
+                                                  if self._seen_after(first_seen, entry_id, row.last_run_id)]
+            line.new_positions = new_positions[row.last_run_id]
+
+    def finish_run(self, plan: ReconciliationPlan) -> Dict[str, Any]:
+        """Write the recorded line outcomes, their matches and the run's totals"""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        stats = {
+            'run_id': plan.run_id,
+            'statement_lines': len(plan.lines),
+            'new_lines': sum(1 for line in plan.lines if line.line_key not in plan._rows),
+            'rescored_lines': sum(1 for line in plan.lines if line.scope == 'new' and line.new_positions),
+            'skipped_lines': sum(1 for line in plan.lines
+                                 if line.scope == 'skip' or (line.scope == 'new' and not line.new_positions)),
+            'new_ledger_entries': plan.new_ledger_entries
+        }
+        statuses = Counter(line.status for line in plan.lines)
+        stats.update({
+            'matched_count': statuses['matched'] + statuses['grouped'],
+            'partial_count': statuses['partial'],
+            'unmatched_count': statuses['unmatched']
+        })
+        if plan.run_id is None:
+            return stats
+
+        try:
+            from app import db
+            from models import BankStatementLine, BankReconciliationMatch, ReconciliationRun
+
+            now = datetime.utcnow()
+            confirmed = []
+            for transaction, line in zip(plan.transactions, plan.lines):
+                row = plan._rows.get(line.line_key)
+                if row is None:
+                    row = BankStatementLine(
+                        company_id=self.company_id,
+                        bank_account=self.bank_account,
+                        line_key=line.line_key,
+                        transaction_date=transaction.date if isinstance(transaction.date, datetime) else None,
+                        description=str(transaction.description or ''),
+                        amount=float(transaction.amount),
+                        reference=str(transaction.reference or '')[:100],
+                        first_run_id=plan.run_id
+                    )
+                    db.session.add(row)
+                    plan._rows[line.line_key] = row
+                row.transaction_id = str(transaction.transaction_id)
+                if not line.recorded:
+                    continue
+                row.status = line.status
+                row.confidence = line.confidence
+                row.matched_entry_id = line.matched_entry_id
+                row.candidates = json.dumps(line.candidates)
+                row.last_run_id = plan.run_id
+                if line.status in MATCHED_STATUSES:
+                    row.reconciled_at = now
+                    confirmed.append((row, line))
+
+            db.session.flush()
+            for row, line in confirmed:
+                for entry_id in line.matched_entry_ids:
+                    db.session.add(BankReconciliationMatch(
+                        statement_line_id=row.id,
+                        run_id=plan.run_id,
+                        entry_id=entry_id,
+                        confidence=line.confidence
+                    ))
+
+            run = db.session.get(ReconciliationRun, plan.run_id)
+            for name in ('new_lines', 'rescored_lines', 'skipped_lines', 'matched_count',
+                         'partial_count', 'unmatched_count'):
+                setattr(run, name, stats[name])
+            run.completed_at = now
+            db.session.commit()
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            logger.warning(f"Reconciliation state not saved: {str(e)}")
+            self._rollback()
+
+        return stats
+
+    def record_manual_mapping(self, transaction_id: str, mapped_account_code: str, journal_entry_id: Any,
+                              mapped_by: Optional[int] = None, description: str = '',
+                              amount: float = 0.0) -> Dict[str, Any]:
+        """Persist a user's mapping and mark its statement line (of this bank account) reconciled"""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        mapping = {
+            'transaction_id': str(transaction_id),
+            'mapped_at': datetime.utcnow().isoformat(),
+            'mapped_by': mapped_by,
+            'journal_entry_id': journal_entry_id,
+            'mapped_account_code': mapped_account_code,
+            'status': 'completed'
+        }
+        try:
+            from app import db
+            from models import BankManualMapping, BankReconciliationMatch
+
+            line = self._line_by_transaction(transaction_id)
+            record = BankManualMapping(
+                company_id=self.company_id,
+                transaction_id=str(transaction_id),
+                statement_line_id=line.id if line is not None else None,
+                description=description,
+                amount=float(amount or 0),
+                mapped_account_code=mapped_account_code,
+                journal_entry_id=str(journal_entry_id),
+                mapped_by=mapped_by
+            )
+            db.session.add(record)
+            if line is not None:
+                line.status = 'manual'
+                line.reconciled_at = datetime.utcnow()
+                db.session.add(BankReconciliationMatch(
+                    statement_line_id=line.id, entry_id=str(journal_entry_id), confidence=1.0, is_manual=True
+                ))
+            db.session.commit()
+            return record.to_dict()
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            logger.warning(f"Manual mapping kept in memory only: {str(e)}")
+            self._rollback()
+            self._memory_mappings[str(transaction_id)] = mapping
+            return mapping
+
+    def statement_line(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """Date, narration and amount of a stored line of this bank account, by its latest transaction id"""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        try:
+            line = self._line_by_transaction(transaction_id)
+            if line is None:
+                return None
+            return {
+                'transaction_id': line.transaction_id,
+                'date': line.transaction_date,
+                'description': line.description,
+                'amount': line.amount,
+                'reference': line.reference,
+                'status': line.status
+            }
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            logger.warning(f"Statement lines not available: {str(e)}")
+            self._rollback()
+            return None
+
+    def manual_mapping(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """Latest manual mapping of a transaction, if any"""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        if str(transaction_id) in self._memory_mappings:
+            return self._memory_mappings[str(transaction_id)]
+        try:
+            from models import BankManualMapping
+
+            record = BankManualMapping.query.filter_by(
+                company_id=self.company_id, transaction_id=str(transaction_id)
+            ).order_by(BankManualMapping.id.desc()).first()
+            return record.to_dict() if record is not None else None
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            logger.warning(f"Manual mappings not available: {str(e)}")
+            self._rollback()
+            return None
+
+    def manual_mappings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Manual mappings of the company, oldest first (the latest `limit` if given)"""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        mappings = []
+        try:
+            from models import BankManualMapping
+
+            query = BankManualMapping.query.filter_by(company_id=self.company_id).order_by(BankManualMapping.id.desc())
+            if limit is not None:
+                query = query.limit(limit)
+            mappings = [record.to_dict() for record in reversed(query.all())]
+
+        except (SQLAlchemyError, RuntimeError) as e:
+            logger.warning(f"Manual mappings not available: {str(e)}")
+            self._rollback()
+
+        mappings.extend(self._memory_mappings.values())
+        return mappings[-limit:] if limit is not None else mappings
+
+    def _line_by_transaction(self, transaction_id: str):
+        # Transaction ids come from the upload (often row numbers), so they only identify a line within its account
+        from models import BankStatementLine
+
+        return BankStatementLine.query.filter_by(
+            company_id=self.company_id, bank_account=self.bank_account, transaction_id=str(transaction_id)
+        ).order_by(BankStatementLine.id.desc()).first()
+
+    @staticmethod
+    def _rollback():
+        from sqlalchemy.exc import SQLAlchemyError
+        try:
+            from app import db
+            db.session.rollback()
+        except (SQLAlchemyError, RuntimeError):
+            pass
@@ -0,0 +1,199 @@
+"""
+Report Cache - F-AI Accountant
+Generated report data and rendered files, served until the company's ledger version moves on
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+from services.ledger_version import current_version
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024 * 1024  # 1GB of rendered files
+
+CacheKey = Tuple[int, str, Tuple[Optional[str], Optional[str]], str, int]
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    file_bytes: int = 0
+    file_mtime_ns: int = 0
+
+def parameters_digest(parameters: Optional[Dict[str, Any]]) -> str:
+    """Stable digest of report parameters (any JSON-serializable values)"""
+    if not parameters:
+        return ''
+    encoded = json.dumps(parameters, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:32]
+
+class ReportCache:
+    """
+    Process-wide LRU of report results keyed by (company, report type, period, parameters, ledger version)
+
+    get_report() returns the data a build() call produced for the same key,
+    get_file() the path a render() call wrote. The ledger version is read
+    (one primary-key lookup) on every call, so the first request after a post,
+    edit or delete of journal lines builds afresh; entries of older versions
+    are dropped as soon as a newer one is seen. Entries beyond max_entries, or
+    rendered files beyond max_file_bytes in total, are evicted least recently
+    used first, deleting the files they own.
+
+    Cached report data is shared between requests and must be treated as
+    read-only.
+    """
+
+    _entries: 'OrderedDict[CacheKey, _CacheEntry]' = OrderedDict()
+    _latest_versions: Dict[int, int] = {}
+    _file_bytes = 0
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    def __init__(self, max_entries: Optional[int] = None, max_file_bytes: Optional[int] = None):
+        config = current_app.config if has_app_context() else {}
+        self.max_entries = max_entries if max_entries is not None else config.get(
+            'REPORT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        self.max_file_bytes = max_file_bytes if max_file_bytes is not None else config.get(
+            'REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_FILE_BYTES)
+
+    def get_report(self, company_id: int, report_type: str, build: Callable[[], Any],
+                   period: Tuple[Optional[datetime], Optional[datetime]] = (None, None),
+                   parameters: Optional[Dict[str, Any]] = None,
+                   validate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        The report's data, built only when the ledger changed since it was last built
+
+        validate, when given, is asked whether a cached value can still be
+        served (say, whether the files it lists exist); if not it is rebuilt.
+        """
+        key = self._key(company_id, report_type, period, parameters)
+        entry = self._lookup(key)
+        if entry is not None:
+            if validate is None or validate(entry.value):
+                return entry.value
+            self.discard(key)
+
+        value = build()
+        if self._cacheable(value):
+            self._store(key, _CacheEntry(value))
+        return value
+
+    def get_file(self, company_id: int, report_type: str, render: Callable[[], str],
+                 period: Tuple[Optional[datetime], Optional[datetime]] = (None, None),
+                 parameters: Optional[Dict[str, Any]] = None) -> str:
+        """Path of the rendered report, rendered again only when the ledger changed or the file went missing"""
+        key = self._key(company_id, f"file:{report_type}", period, parameters)
+        entry = self._lookup(key)
+        if entry is not None:
+            if self._file_unchanged(entry):
+                return entry.value
+            self.discard(key)
+
+        file_path = render()
+        try:
+            stat = os.stat(file_path)
+        except (OSError, TypeError):
+            return file_path
+        self._store(key, _CacheEntry(file_path, stat.st_size, stat.st_mtime_ns))
+        return file_path
+
+    def discard(self, key: CacheKey):
+        with self._lock:
+            self._drop(key, remove_file=False)
+
+    @classmethod
+    def clear(cls, company_id: Optional[int] = None):
+        """Forget cached results (of one company, or all); rendered files are left in place"""
+        with cls._lock:
+            for key in [key for key in cls._entries if company_id is None or key[0] == company_id]:
+                cls._drop(key, remove_file=False)
+            if company_id is None:
+                cls._latest_versions.clear()
+            else:
+                cls._latest_versions.pop(company_id, None)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        with cls._lock:
+            return {'entries': len(cls._entries), 'file_bytes': cls._file_bytes,
+                    'hits': cls.hits, 'misses': cls.misses}
+
+    def _key(self, company_id: int, report_type: str, period: Tuple[Optional[datetime], Optional[datetime]],
+             parameters: Optional[Dict[str, Any]]) -> CacheKey:
+        date_from, date_to = period
+        return (company_id, report_type,
+                (date_from.isoformat() if date_from else None, date_to.isoformat() if date_to else None),
+                parameters_digest(parameters), current_version(company_id))
+
+    def _lookup(self, key: CacheKey) -> Optional[_CacheEntry]:
+        cls = type(self)
+        company_id, version = key[0], key[-1]
+        with cls._lock:
+            if cls._latest_versions.get(company_id, version) < version:
+                # The ledger moved on: nothing cached for this company can be served again
+                for stale in [cached for cached in cls._entries if cached[0] == company_id and cached[-1] < version]:
+                    cls._drop(stale, remove_file=True)
+            cls._latest_versions[company_id] = max(version, cls._latest_versions.get(company_id, version))
+
+            entry = cls._entries.get(key)
+            if entry is None:
+                cls.misses += 1
+                return None
+            cls._entries.move_to_end(key)
+            cls.hits += 1
+            return entry
+
+    def _store(self, key: CacheKey, entry: _CacheEntry):
+        cls = type(self)
+        with cls._lock:
+            if key in cls._entries:
+                cls._drop(key, remove_file=False)
+            cls._entries[key] = entry
+            cls._file_bytes += entry.file_bytes
+
+            while cls._entries and (len(cls._entries) > self.max_entries or cls._file_bytes > self.max_file_bytes):
+                oldest = next(iter(cls._entries))
+                if oldest == key and len(cls._entries) == 1:
+                    break
+                cls._drop(oldest, remove_file=True)
+                logger.debug(f"Evicted report cache entry {oldest[:2]}")
+
+    @classmethod
+    def _drop(cls, key: CacheKey, remove_file: bool):
+        """Remove an entry (lock held); with remove_file, delete its file if it is still the one cached"""
+        entry = cls._entries.pop(key, None)
+        if entry is None:
+            return
+        cls._file_bytes -= entry.file_bytes
+        if remove_file and entry.file_bytes and cls._file_unchanged(entry):
+            try:
+                os.remove(entry.value)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _file_unchanged(entry: _CacheEntry) -> bool:
+        """The cached file still exists and was not overwritten by a later render"""
+        try:
+            stat = os.stat(entry.value)
+        except OSError:
+            return False
+        return stat.st_size == entry.file_bytes and stat.st_mtime_ns == entry.file_mtime_ns
+
+    @staticmethod
+    def _cacheable(value: Any) -> bool:
+        """Failed generations (empty, or a dict carrying an error) are not kept"""
+        return bool(value) and not (isinstance(value, dict) and 'error' in value)
@@ -5,8 +5,6 @@ Handles export of financial reports in multiple formats: Excel, Word, PDF
 
 import os
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -14,6 +12,8 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 import tempfile
 
+from services.excel_stream_writer import StreamingExcelWriter, dict_rows
+
 
 class ReportExportService:
     """Service for exporting financial reports in multiple formats"""
@@ -48,102 +48,35 @@ class ReportExportService:
             raise ValueError(f"Unsupported format: {format_type}")
     
     def _export_to_excel(self, report_data, report_name, timestamp, company_name):
-        """Export report to Excel format"""
+        """Export report to Excel format, streaming rows through a write-only workbook"""
         filename = f"{report_name}_{timestamp}.xlsx"
         file_path = os.path.join(self.reports_dir, filename)
         
-        wb = Workbook()
-        ws = wb.active
-        ws.title = report_name
-        
-        # Professional styling
-        header_font = Font(bold=True, color='FFFFFF', size=12)
-        header_fill = PatternFill(start_color='1F4E79', end_color='1F4E79', fill_type='solid')
-        header_alignment = Alignment(horizontal='center', vertical='center')
-        
-        title_font = Font(bold=True, size=16, color='1F4E79')
-        company_font = Font(bold=True, size=14, color='666666')
-        
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        current_row = 1
+        writer = StreamingExcelWriter(file_path)
+        ws = writer.sheet(report_name)
         
-        # Add company header
-        ws.cell(row=current_row, column=1, value=company_name).font = company_font
-        current_row += 1
-        
-        # Add report title
-        ws.cell(row=current_row, column=1, value=report_name.replace('_', ' ').title()).font = title_font
-        current_row += 1
-        
-        # Add generation date
-        ws.cell(row=current_row, column=1, value=f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}")
-        current_row += 2
+        # Add company header, report title and generation date
+        ws.append([company_name], 'report_company')
+        ws.append([report_name.replace('_', ' ').title()], 'report_title')
+        ws.append([f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"])
+        ws.blank()
         
         # Process report data
         if isinstance(report_data, dict):
             for section_name, section_data in report_data.items():
                 if isinstance(section_data, list) and section_data:
-                    # Add section header
-                    ws.cell(row=current_row, column=1, value=section_name.replace('_', ' ').title()).font = Font(bold=True, size=12)
-                    current_row += 1
-                    
-                    # Add table headers
-                    headers = list(section_data[0].keys()) if section_data else []
-                    for col_idx, header in enumerate(headers, 1):
-                        cell = ws.cell(row=current_row, column=col_idx, value=header.replace('_', ' ').title())
-                        cell.font = header_font
-                        cell.fill = header_fill
-                        cell.alignment = header_alignment
-                        cell.border = thin_border
-                    current_row += 1
-                    
-                    # Add data rows
-                    for row_data in section_data:
-                        for col_idx, value in enumerate(row_data.values(), 1):
-                            cell = ws.cell(row=current_row, column=col_idx, value=value)
-                            cell.border = thin_border
-                        current_row += 1
-                    
-                    current_row += 1  # Add space between sections
+                    # Section header, then the table
+                    ws.append([section_name.replace('_', ' ').title()], 'report_section')
+                    headers = [header.replace('_', ' ').title() for header in section_data[0].keys()]
+                    ws.table(headers, dict_rows(section_data))
+                    ws.blank()  # Add space between sections
         
         elif isinstance(report_data, list) and report_data:
             # Single table format
-            headers = list(report_data[0].keys())
-            for col_idx, header in enumerate(headers, 1):
-                cell = ws.cell(row=current_row, column=col_idx, value=header.replace('_', ' ').title())
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = thin_border
-            current_row += 1
-            
-            for row_data in report_data:
-                for col_idx, value in enumerate(row_data.values(), 1):
-                    cell = ws.cell(row=current_row, column=col_idx, value=value)
-                    cell.border = thin_border
-                current_row += 1
+            headers = [header.replace('_', ' ').title() for header in report_data[0].keys()]
+            ws.table(headers, dict_rows(report_data))
         
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 3, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        wb.save(file_path)
-        return file_path
+        return writer.save()
     
     def _export_to_pdf(self, report_data, report_name, timestamp, company_name):
         """Export report to PDF format"""
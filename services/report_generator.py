@@ -13,6 +13,8 @@ from reportlab.lib import colors
 from app import db
 from models import JournalEntry, ChartOfAccount, FinancialReport, Company
 from services.accounting_engine import AccountingEngine
+from services.report_cache import ReportCache
+from services.excel_stream_writer import StreamingExcelWriter
 
 class ReportGenerator:
     """Generate financial reports in multiple formats"""
@@ -23,6 +25,14 @@ class ReportGenerator:
         self.company_id = 1  # Default company ID
     
     def generate_all_reports(self, file_id: int) -> Dict[str, Any]:
+        """Generate all standard financial reports, reusing the last set while the ledger is unchanged"""
+        return ReportCache().get_report(
+            self.company_id, 'report_generator', lambda: self._generate_all_reports(file_id),
+            parameters={'file_id': file_id},
+            validate=lambda reports: all(os.path.exists(report['filepath']) for report in reports.values())
+        )
+    
+    def _generate_all_reports(self, file_id: int) -> Dict[str, Any]:
         """Generate all standard financial reports"""
         try:
             reports = {}
@@ -44,59 +54,40 @@ class ReportGenerator:
     def generate_journal_entries_report(self, file_id: int) -> Dict[str, Any]:
         """Generate Journal Entries Report"""
         try:
-            # Get journal entries
-            entries = JournalEntry.query.filter_by(company_id=self.company_id).order_by(JournalEntry.entry_date.desc()).all()
-            
-            # Create Excel report
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Journal Entries"
-            
-            # Headers
-            headers = ['Date', 'Description', 'Account Code', 'Account Name', 'Debit', 'Credit', 'Reference']
-            ws.append(headers)
-            
-            # Style headers
-            header_font = Font(bold=True)
-            header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-            
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal='center')
-            
-            # Add data
-            for entry in entries:
-                row_data = [
-                    entry.entry_date.strftime('%Y-%m-%d'),
-                    entry.description,
-                    entry.account.account_code,
-                    entry.account.account_name,
-                    entry.debit_amount if entry.debit_amount > 0 else '',
-                    entry.credit_amount if entry.credit_amount > 0 else '',
-                    entry.reference_number or ''
+            # Stream journal lines with their accounts instead of loading them all
+            entries = db.session.query(
+                JournalEntry.entry_date, JournalEntry.description, ChartOfAccount.account_code,
+                ChartOfAccount.account_name, JournalEntry.debit_amount, JournalEntry.credit_amount,
+                JournalEntry.reference_number
+            ).join(
+                ChartOfAccount, JournalEntry.account_id == ChartOfAccount.id
+            ).filter(
+                JournalEntry.company_id == self.company_id
+            ).order_by(JournalEntry.entry_date.desc()).execution_options(yield_per=1000)
+            
+            rows = (
+                [
+                    entry_date.strftime('%Y-%m-%d'),
+                    description,
+                    account_code,
+                    account_name,
+                    debit_amount if debit_amount > 0 else '',
+                    credit_amount if credit_amount > 0 else '',
+                    reference_number or ''
                 ]
-                ws.append(row_data)
-            
-            # Auto-adjust column widths
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
+                for entry_date, description, account_code, account_name, debit_amount, credit_amount, reference_number
+                in entries
+            )
             
-            # Save Excel file
+            # Write-only workbook: shared header style, widths from the first rows
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"journal_entries_{timestamp}.xlsx"
             filepath = os.path.join('reports', filename)
-            wb.save(filepath)
+            writer = StreamingExcelWriter(filepath, padding=2)
+            headers = ['Date', 'Description', 'Account Code', 'Account Name', 'Debit', 'Credit', 'Reference']
+            total_entries = writer.sheet('Journal Entries').table(headers, rows, header_style='plain_header',
+                                                                  cell_style=None)
+            writer.save()
             
             # Save report record
             report = FinancialReport(
@@ -113,7 +104,7 @@ class ReportGenerator:
                 'type': 'journal_entries',
                 'filename': filename,
                 'filepath': filepath,
-                'total_entries': len(entries),
+                'total_entries': total_entries,
                 'generated_at': datetime.now().isoformat()
             }
             
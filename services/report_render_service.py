@@ -0,0 +1,320 @@
+"""
+Report Render Service - F-AI Accountant
+Queued report rendering with coalesced requests, progress and signed download tokens
+"""
+
+import os
+import json
+import socket
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from flask import current_app, has_app_context
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import update
+
+from app import db
+from models import ReportRenderJob
+from services.job_queue_service import PermanentJobError, lease_renewal
+from services.ledger_version import current_version
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATEMENT_TYPES = ('journal', 'ledger', 'trial_balance', 'profit_loss', 'balance_sheet',
+                   'cash_flow', 'shareholders_equity')
+REPORT_TYPES = STATEMENT_TYPES + ('all_reports', 'financial_package')
+
+MIME_TYPES = {
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'word': 'application/msword',
+    'pdf': 'application/pdf',
+    'zip': 'application/zip'
+}
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+DEFAULT_TOKEN_SECONDS = 60 * 60
+TOKEN_SALT = 'report-render-download'
+
+class ExpiredDownloadToken(Exception):
+    """Raised for a genuine report download token past its lifetime"""
+
+class ReportRenderService:
+    """
+    Enqueue, render and hand out ReportRenderJob files
+
+    Web requests only call request_render() and status(); the rendering runs
+    in the pipeline workers, which claim render jobs the same way they claim
+    processing jobs. Requests for the same report, format and parameters at
+    the same ledger version share one job, and a finished job is reused while
+    its file exists, so repeated clicks cost one render.
+
+    A claimed job holds a lease of LEASE_SECONDS. A background thread renews
+    it every LEASE_RENEW_SECONDS for as long as the render runs, so only jobs
+    whose worker died are handed to another worker, however long they take.
+    """
+
+    RETRY_BASE_SECONDS = 30
+    LEASE_SECONDS = 30 * 60
+    LEASE_RENEW_SECONDS = 10 * 60
+    CLAIM_BATCH = 10
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    def request_render(self, company_id: int, user_id: int, report_type: str, format_type: str,
+                       parameters: Optional[Dict[str, Any]] = None) -> ReportRenderJob:
+        """
+        Queue a render, or join the job already rendering (or rendered) the same report (commits)
+
+        Raises ValueError for an unknown report type or format.
+        """
+        if report_type not in REPORT_TYPES:
+            raise ValueError(f"Invalid report type '{report_type}'")
+        if format_type not in MIME_TYPES:
+            raise ValueError(f"Invalid format type '{format_type}'")
+        if report_type == 'financial_package' and format_type != 'excel':
+            raise ValueError("The financial report package is only available as excel")
+        if format_type == 'zip' and report_type != 'all_reports':
+            raise ValueError("Only the full report set is available as a zip of every format")
+
+        parameters = parameters or {}
+        request_key = self.request_key(company_id, report_type, format_type, parameters)
+
+        existing = ReportRenderJob.query.filter(
+            ReportRenderJob.request_key == request_key,
+            ReportRenderJob.status.in_(ACTIVE_STATUSES + ('succeeded',))
+        ).order_by(ReportRenderJob.id.desc()).all()
+        for job in existing:
+            if job.status in ACTIVE_STATUSES or (job.file_path and os.path.exists(job.file_path)):
+                logger.info(f"Joined report render job {job.id} ({report_type}, {format_type})")
+                return job
+
+        job = ReportRenderJob(
+            company_id=company_id,
+            requested_by=user_id,
+            report_type=report_type,
+            format_type=format_type,
+            parameters=json.dumps(parameters, sort_keys=True, default=str),
+            request_key=request_key,
+            status='queued',
+            progress_message='Waiting for a worker',
+            run_after=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+        logger.info(f"Queued report render job {job.id} ({report_type}, {format_type})")
+        return job
+
+    @staticmethod
+    def request_key(company_id: int, report_type: str, format_type: str, parameters: Dict[str, Any]) -> str:
+        """Digest shared by requests that would render the same file"""
+        encoded = json.dumps([company_id, report_type, format_type, parameters, current_version(company_id)],
+                             sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def status(self, job: ReportRenderJob) -> Dict[str, Any]:
+        """Job state for polling; carries the download URL once the file is ready"""
+        status = job.to_dict()
+        if job.status == 'succeeded':
+            status['download_url'] = f"/api/secure-download/{self.download_token(job)}"
+            status['download_name'] = job.download_name
+        return status
+
+    # Worker side
+
+    def claim_next(self) -> Optional[ReportRenderJob]:
+        """Atomically take the oldest runnable render job, or None when there is none"""
+        self.requeue_expired()
+        now = datetime.utcnow()
+        candidate_ids = [row[0] for row in db.session.query(ReportRenderJob.id).filter(
+            ReportRenderJob.status == 'queued',
+            ReportRenderJob.run_after <= now
+        ).order_by(ReportRenderJob.run_after, ReportRenderJob.id).limit(self.CLAIM_BATCH).all()]
+
+        for job_id in candidate_ids:
+            claimed = db.session.execute(
+                update(ReportRenderJob)
+                .where(ReportRenderJob.id == job_id, ReportRenderJob.status == 'queued')
+                .values(status='running', locked_by=self.worker_id, locked_at=now, started_at=now,
+                        attempts=ReportRenderJob.attempts + 1)
+            )
+            db.session.commit()
+            if claimed.rowcount == 1:
+                return db.session.get(ReportRenderJob, job_id, populate_existing=True)
+        return None
+
+    def run_job(self, job: ReportRenderJob) -> bool:
+        """Render a claimed job; returns True on success"""
+        try:
+            with lease_renewal(ReportRenderJob, job.id, self.worker_id, self.LEASE_RENEW_SECONDS):
+                file_path = self._render(job)
+            if not file_path or not os.path.exists(file_path):
+                raise RuntimeError('Renderer did not produce a file')
+
+            job.status = 'succeeded'
+            job.progress_percent = 100.0
+            job.progress_message = 'Ready for download'
+            job.file_path = os.path.abspath(file_path)
+            job.download_name = os.path.basename(file_path)
+            job.mimetype = MIME_TYPES[job.format_type]
+            job.last_error = None
+            job.locked_by = None
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            logger.info(f"Report render job {job.id} succeeded on attempt {job.attempts}")
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            self._record_failure(job, e)
+            return False
+
+    def run_pending(self, limit: Optional[int] = None) -> int:
+        """Render queued jobs in this process until none are left (or limit jobs ran)"""
+        ran = 0
+        while limit is None or ran < limit:
+            job = self.claim_next()
+            if job is None:
+                break
+            self.run_job(job)
+            ran += 1
+        return ran
+
+    def heartbeat(self, job: ReportRenderJob, progress_percent: float, message: Optional[str] = None):
+        """Extend the job's lease and publish its progress (commits)"""
+        job.locked_at = datetime.utcnow()
+        job.progress_percent = round(min(max(progress_percent, 0.0), 100.0), 1)
+        if message:
+            job.progress_message = message
+        db.session.commit()
+
+    def requeue_expired(self) -> int:
+        """Return running render jobs whose worker died to the queue"""
+        expired_before = datetime.utcnow() - timedelta(seconds=self.LEASE_SECONDS)
+        requeued = db.session.execute(
+            update(ReportRenderJob)
+            .where(ReportRenderJob.status == 'running', ReportRenderJob.locked_at < expired_before)
+            .values(status='queued', locked_by=None, last_error='Worker lease expired')
+        ).rowcount
+        db.session.commit()
+        if requeued:
+            logger.warning(f"Re-queued {requeued} report render jobs with expired worker leases")
+        return requeued
+
+    def _record_failure(self, job: ReportRenderJob, error: Exception):
+        job = db.session.get(ReportRenderJob, job.id, populate_existing=True)
+        job.last_error = str(error)
+        job.locked_by = None
+
+        if isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.progress_message = 'Rendering failed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            logger.error(f"Report render job {job.id} failed after {job.attempts} attempts: {str(error)}")
+        else:
+            delay = self.RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+            job.status = 'queued'
+            job.progress_message = 'Retrying'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            db.session.commit()
+            logger.warning(f"Report render job {job.id} attempt {job.attempts} failed, "
+                           f"retrying in {delay}s: {str(error)}")
+
+    def _render(self, job: ReportRenderJob) -> str:
+        parameters = json.loads(job.parameters or '{}')
+        if job.report_type == 'financial_package':
+            from services.financial_report_package_generator import FinancialReportPackageGenerator
+
+            self.heartbeat(job, 10, 'Building the report package')
+            return FinancialReportPackageGenerator().generate_comprehensive_package(
+                parameters.get('company_info'))
+
+        from services.automated_accounting_engine import AutomatedAccountingEngine
+        from services.report_cache import ReportCache
+        from services.report_export_service import ReportExportService
+
+        engine = AutomatedAccountingEngine(job.company_id, job.requested_by)
+        builders = {report_type: getattr(engine, method) for report_type, method in (
+            ('journal', 'generate_journal_report'),
+            ('ledger', 'generate_ledger_report'),
+            ('trial_balance', 'generate_trial_balance'),
+            ('profit_loss', 'generate_profit_loss_statement'),
+            ('balance_sheet', 'generate_balance_sheet'),
+            ('cash_flow', 'generate_cash_flow_statement'),
+            ('shareholders_equity', 'generate_shareholders_equity_statement'),
+            ('all_reports', 'generate_all_reports')
+        )}
+        report_name = 'Complete_Financial_Reports' if job.report_type == 'all_reports' else job.report_type
+
+        # Same cache keys as the direct download routes, so either path reuses the other's work
+        report_cache = ReportCache()
+        self.heartbeat(job, 10, 'Generating report data')
+        report_data = report_cache.get_report(job.company_id, job.report_type, builders[job.report_type])
+        if not report_data or (isinstance(report_data, dict) and 'error' in report_data):
+            raise PermanentJobError('No data available for report')
+
+        if job.format_type == 'zip':
+            # Every statement in every format, rendered in parallel
+            from services.parallel_export_service import ParallelExportService
+
+            statements = {name: data for name, data in report_data.items() if name != 'metadata'}
+            self.heartbeat(job, 40, f"Rendering {len(statements)} reports in every format")
+            return report_cache.get_file(
+                job.company_id, job.report_type,
+                lambda: ParallelExportService().export_bundle(
+                    statements,
+                    os.path.join('reports', f"{report_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"),
+                    company_name=parameters.get('company_name', 'F-AI Accountant')
+                ).path,
+                parameters={'format': job.format_type, 'report_name': report_name}
+            )
+
+        self.heartbeat(job, 60, f"Rendering {job.format_type}")
+        return report_cache.get_file(
+            job.company_id, job.report_type,
+            lambda: ReportExportService().export_report(
+                report_data=report_data,
+                report_name=report_name,
+                format_type=job.format_type,
+                company_name=parameters.get('company_name', 'F-AI Accountant')
+            ),
+            parameters={'format': job.format_type, 'report_name': report_name}
+        )
+
+    # Download tokens
+
+    @staticmethod
+    def _serializer() -> URLSafeTimedSerializer:
+        return URLSafeTimedSerializer(current_app.secret_key, salt=TOKEN_SALT)
+
+    def download_token(self, job: ReportRenderJob) -> str:
+        """Signed, expiring token naming the job's file"""
+        return self._serializer().dumps({'report_job': job.id})
+
+    def resolve_download_token(self, token: str) -> Optional[ReportRenderJob]:
+        """
+        The finished job a token was issued for, or None if it is not a report token
+
+        Raises ExpiredDownloadToken for a valid token past its lifetime.
+        """
+        config = current_app.config if has_app_context() else {}
+        max_age = config.get('REPORT_DOWNLOAD_TOKEN_SECONDS', DEFAULT_TOKEN_SECONDS)
+        try:
+            data = self._serializer().loads(token, max_age=max_age)
+        except SignatureExpired:
+            raise ExpiredDownloadToken('Download link has expired')
+        except BadSignature:
+            return None
+
+        if not isinstance(data, dict) or 'report_job' not in data:
+            return None
+        job = db.session.get(ReportRenderJob, data['report_job'])
+        if job is None or job.status != 'succeeded' or not job.file_path or not os.path.exists(job.file_path):
+            return None
+        return job
@@ -0,0 +1,118 @@
+"""
+Schema Migration Service - F-AI Accountant
+Applies versioned SQL migrations from database/migrations exactly once per database
+"""
+
+import os
+import re
+import logging
+import importlib.util
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'migrations')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{4})_([a-z0-9_]+)\.(sql|py)$')
+
+class SchemaMigrationService:
+    """
+    Versioned migration runner
+
+    db.create_all() only creates missing tables; it never adds indexes or columns to
+    tables that already exist. Migrations named NNNN_description.sql are applied in
+    version order and recorded in schema_migrations, so existing databases pick up
+    schema changes on the next start. Data migrations are NNNN_description.py files
+    defining upgrade(session); they run in the same transaction as their record.
+    """
+
+    def __init__(self, migrations_dir: str = None):
+        self.migrations_dir = migrations_dir or MIGRATIONS_DIR
+
+    def available_migrations(self) -> List[Tuple[str, str, str]]:
+        """List (version, name, path) for every migration file, oldest first"""
+        if not os.path.isdir(self.migrations_dir):
+            return []
+
+        migrations = []
+        for filename in sorted(os.listdir(self.migrations_dir)):
+            match = MIGRATION_FILE_PATTERN.match(filename)
+            if match:
+                migrations.append((match.group(1), match.group(2), os.path.join(self.migrations_dir, filename)))
+        return migrations
+
+    def applied_versions(self) -> List[str]:
+        """Versions already recorded in schema_migrations"""
+        self._ensure_migrations_table()
+        rows = db.session.execute(text('SELECT version FROM schema_migrations ORDER BY version')).fetchall()
+        return [row[0] for row in rows]
+
+    def apply_pending(self) -> List[str]:
+        """
+        Apply every migration not yet recorded
+
+        Returns:
+            Versions applied by this call
+        """
+        applied = set(self.applied_versions())
+        newly_applied = []
+
+        for version, name, path in self.available_migrations():
+            if version in applied:
+                continue
+
+            try:
+                if path.endswith('.py'):
+                    self._load_module(version, name, path).upgrade(db.session)
+                else:
+                    for statement in self._read_statements(path):
+                        db.session.execute(text(statement))
+                db.session.execute(
+                    text('INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)'),
+                    {'version': version, 'name': name, 'applied_at': datetime.utcnow()}
+                )
+                db.session.commit()
+                newly_applied.append(version)
+                logger.info(f"Applied schema migration {version}_{name}")
+
+            except IntegrityError:
+                # Another process recorded the same version first
+                db.session.rollback()
+                logger.info(f"Schema migration {version}_{name} already applied by another process")
+
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error applying schema migration {version}_{name}: {str(e)}")
+                raise
+
+        return newly_applied
+
+    def _ensure_migrations_table(self):
+        db.session.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version VARCHAR(20) PRIMARY KEY, '
+            'name VARCHAR(200) NOT NULL, '
+            'applied_at TIMESTAMP NOT NULL)'
+        ))
+        db.session.commit()
+
+    @staticmethod
+    def _load_module(version: str, name: str, path: str):
+        spec = importlib.util.spec_from_file_location(f"migration_{version}_{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    @staticmethod
+    def _read_statements(path: str) -> List[str]:
+        """Split a migration file into statements, dropping -- comments"""
+        with open(path, 'r', encoding='utf-8') as migration_file:
+            lines = [line for line in migration_file if not line.strip().startswith('--')]
+        return [statement.strip() for statement in ''.join(lines).split(';') if statement.strip()]
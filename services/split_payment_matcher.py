@@ -0,0 +1,261 @@
+"""
+Split Payment Matcher - F-AI Accountant
+Bounded subset-sum matching of bank lines to groups of same-party open items
+"""
+
+import time
+import bisect
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, List, Any, Hashable, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hard limits of the search; without them the combinations grow as 2^n
+MAX_POOL_SIZE = 24           # open items (or bank lines) considered for one target
+MAX_GROUP_SIZE = 5           # items in one combination
+SEARCH_TIME_BUDGET = 0.05    # seconds for one target
+TOTAL_TIME_BUDGET = 2.0      # seconds for one statement
+
+# Confidence of a group that adds up exactly, less a step for every item beyond two
+GROUP_CONFIDENCE = 0.85
+GROUP_SIZE_PENALTY = 0.025
+INEXACT_PENALTY = 0.05      # adds up only within the tolerance
+
+@dataclass
+class SplitCandidate:
+    """A bank line or open item taking part in the search, amounts in cents"""
+    key: Hashable
+    party: str
+    cents: int
+    date: Optional[datetime]
+
+    @classmethod
+    def of(cls, key: Hashable, party: str, amount: Any, date: Any) -> 'SplitCandidate':
+        parsed = pd.to_datetime(date, errors='coerce') if date is not None else None
+        return cls(key, party, int(round(float(amount or 0) * 100)),
+                   None if parsed is None or pd.isna(parsed) else parsed.to_pydatetime())
+
+@dataclass
+class SplitMatch:
+    """
+    Bank lines and open items that settle each other as a group
+
+    kind is 'aggregated' for one bank line paying several items and 'split'
+    for several bank lines paying one item.
+    """
+    kind: str
+    line_keys: List[Hashable]
+    item_keys: List[Hashable]
+    amount: float
+    difference: float
+    confidence: float
+
+@dataclass
+class SplitSearchStats:
+    targets: int = 0
+    searches: int = 0
+    truncated_pools: int = 0
+    timeouts: int = 0
+    subsets_enumerated: int = 0
+    groups: int = 0
+    budget_exhausted: bool = False
+    elapsed: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+class _Deadline:
+    """Time limit checked every few hundred enumerated subsets"""
+
+    CHECK_EVERY = 256
+
+    def __init__(self, seconds: float):
+        self.expires = time.perf_counter() + seconds
+        self.expired = False
+        self._ticks = 0
+
+    def tick(self) -> bool:
+        self._ticks += 1
+        if self._ticks % self.CHECK_EVERY == 0 and time.perf_counter() > self.expires:
+            self.expired = True
+        return self.expired
+
+def _subset_sums(amounts: Sequence[int], max_size: int, limit: int,
+                 deadline: _Deadline) -> List[Tuple[int, int, Tuple[int, ...]]]:
+    """(sum, size, positions) of every subset of up to max_size amounts whose sum stays within limit"""
+    sums = [(0, 0, ())]
+    for size in range(1, max_size + 1):
+        for positions in combinations(range(len(amounts)), size):
+            if deadline.tick():
+                return sums
+            total = sum(amounts[position] for position in positions)
+            if total <= limit:
+                sums.append((total, size, positions))
+    return sums
+
+def find_subset(target: int, amounts: Sequence[int], tolerance: int = 0, max_size: int = MAX_GROUP_SIZE,
+                min_size: int = 2, time_budget: float = SEARCH_TIME_BUDGET,
+                stats: Optional[SplitSearchStats] = None) -> Optional[Tuple[int, ...]]:
+    """
+    Positions of amounts adding up to target within tolerance (all in cents)
+
+    Meet in the middle: the subset sums of each half of the amounts are
+    enumerated (at most max_size items, none above the target), the second
+    half sorted, and every first-half sum looks up its complement with a
+    binary search. That is about 2 * C(n/2, k) sums instead of C(n, k)
+    combinations. Of the fitting subsets the closest, then the smallest, then
+    the one listed first wins, so the answer does not depend on timing.
+
+    Returns None when nothing fits or the time budget ran out first.
+    """
+    amounts = list(amounts)
+    if len(amounts) < min_size or any(amount <= 0 for amount in amounts) or target <= 0:
+        return None
+
+    deadline = _Deadline(time_budget)
+    half = len(amounts) // 2
+    limit = target + tolerance
+    left = _subset_sums(amounts[:half], max_size, limit, deadline)
+    right = _subset_sums(amounts[half:], max_size, limit, deadline)
+    right.sort()
+    right_sums = [total for total, _, _ in right]
+    if stats is not None:
+        stats.searches += 1
+        stats.subsets_enumerated += len(left) + len(right)
+
+    best = None
+    for left_total, left_size, left_positions in left:
+        low = bisect.bisect_left(right_sums, target - tolerance - left_total)
+        high = bisect.bisect_right(right_sums, target + tolerance - left_total)
+        for right_total, right_size, right_positions in right[low:high]:
+            size = left_size + right_size
+            if not min_size <= size <= max_size:
+                continue
+            positions = left_positions + tuple(half + position for position in right_positions)
+            rank = (abs(left_total + right_total - target), size, positions)
+            if best is None or rank < best:
+                best = rank
+        if deadline.tick():
+            break
+
+    if deadline.expired:
+        if stats is not None:
+            stats.timeouts += 1
+        return None
+    return best[2] if best else None
+
+class SplitPaymentMatcher:
+    """
+    Many-to-one and one-to-many matching of what one-to-one matching left over
+
+    A bank line naming a party can settle several of that party's open items
+    ('aggregated': three invoices in one NEFT), and several bank lines of a
+    party can settle one item ('split': an invoice paid in two parts). Each
+    target is searched for among the same party's candidates of the same sign
+    dated within date_window_days, none larger than the target.
+
+    Every bound is hard: a pool keeps only the max_pool_size candidates closest
+    in date, a group has at most max_group_size members, one search gives up
+    after search_time_budget seconds and the statement stops searching after
+    total_time_budget seconds, whatever is left staying unmatched.
+    """
+
+    def __init__(self, date_window_days: int = 45, tolerance: float = 0.0,
+                 max_pool_size: int = MAX_POOL_SIZE, max_group_size: int = MAX_GROUP_SIZE,
+                 search_time_budget: float = SEARCH_TIME_BUDGET, total_time_budget: float = TOTAL_TIME_BUDGET):
+        self.date_window_days = date_window_days
+        self.tolerance = tolerance
+        self.max_pool_size = max_pool_size
+        self.max_group_size = max_group_size
+        self.search_time_budget = search_time_budget
+        self.total_time_budget = total_time_budget
+        self.stats = SplitSearchStats()
+
+    def match(self, lines: Sequence[SplitCandidate], items: Sequence[SplitCandidate]) -> List[SplitMatch]:
+        """Groups found among unmatched bank lines and open items; each takes part in one group at most"""
+        self.stats = SplitSearchStats()
+        started = time.perf_counter()
+        deadline = started + self.total_time_budget
+        tolerance = int(round(self.tolerance * 100))
+
+        order = lambda candidate: (candidate.date or datetime.min, str(candidate.key))
+        lines = sorted((line for line in lines if line.party and line.cents), key=order)
+        items = sorted((item for item in items if item.party and item.cents), key=order)
+        used_lines, used_items = set(), set()
+        matches = []
+
+        # One bank line paying several items, then several bank lines paying one item
+        passes = (('aggregated', lines, items, used_lines, used_items),
+                  ('split', items, lines, used_items, used_lines))
+        for kind, targets, pool, used_targets, used_pool in passes:
+            for target in targets:
+                if target.key in used_targets:
+                    continue
+                if time.perf_counter() > deadline:
+                    self.stats.budget_exhausted = True
+                    break
+                self.stats.targets += 1
+                members = self._pool(target, pool, used_pool, tolerance)
+                positions = find_subset(abs(target.cents), [abs(member.cents) for member in members], tolerance,
+                                        self.max_group_size, 2,
+                                        min(self.search_time_budget, max(deadline - time.perf_counter(), 0.0)),
+                                        self.stats)
+                if positions is None:
+                    continue
+                group = [members[position] for position in positions]
+                used_targets.add(target.key)
+                used_pool.update(member.key for member in group)
+                matches.append(self._group(kind, target, group))
+
+        self.stats.groups = len(matches)
+        self.stats.elapsed = round(time.perf_counter() - started, 4)
+        if matches or self.stats.timeouts or self.stats.budget_exhausted:
+            logger.info(f"Split payment search: {len(matches)} groups from {self.stats.targets} targets "
+                        f"({self.stats.timeouts} timed out, budget exhausted: {self.stats.budget_exhausted})")
+        return matches
+
+    def _pool(self, target: SplitCandidate, pool: Sequence[SplitCandidate], used: set,
+              tolerance: int) -> List[SplitCandidate]:
+        """Same party and sign, within the date window, no larger than the target; the closest in date"""
+        members = []
+        for candidate in pool:
+            if (candidate.key in used or candidate.party != target.party
+                    or (candidate.cents > 0) != (target.cents > 0)
+                    or abs(candidate.cents) > abs(target.cents) + tolerance):
+                continue
+            distance = self._days_apart(target, candidate)
+            if distance is None or distance <= self.date_window_days:
+                members.append((distance if distance is not None else self.date_window_days, candidate))
+        if len(members) > self.max_pool_size:
+            self.stats.truncated_pools += 1
+            members.sort(key=lambda member: member[0])
+            members = members[:self.max_pool_size]
+        return [candidate for _, candidate in members]
+
+    @staticmethod
+    def _days_apart(first: SplitCandidate, second: SplitCandidate) -> Optional[int]:
+        if first.date is None or second.date is None:
+            return None
+        return abs((first.date - second.date).days)
+
+    def _group(self, kind: str, target: SplitCandidate, group: List[SplitCandidate]) -> SplitMatch:
+        group_cents = sum(member.cents for member in group)
+        confidence = GROUP_CONFIDENCE - GROUP_SIZE_PENALTY * (len(group) - 2)
+        if group_cents != target.cents:
+            confidence -= INEXACT_PENALTY
+        keys = [member.key for member in group]
+        return SplitMatch(
+            kind=kind,
+            line_keys=[target.key] if kind == 'aggregated' else keys,
+            item_keys=keys if kind == 'aggregated' else [target.key],
+            amount=target.cents / 100,
+            difference=(target.cents - group_cents) / 100,
+            confidence=round(confidence, 4)
+        )
@@ -0,0 +1,235 @@
+"""
+Upload Pipeline Service - F-AI Accountant
+Upload status state machine and the validate, process and report job handlers
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable
+
+from flask import current_app
+
+from app import db
+from models import UploadedFile, ProcessingResult, FileIngestionProgress, ProcessingJob
+from services.file_processor import FileProcessor
+from services.accounting_engine import AccountingEngine, UnbalancedJournalError
+from services.validation_engine import ValidationEngine
+from services.report_generator import ReportGenerator
+from services.job_queue_service import JobQueueService, PermanentJobError, register_job_handler, ACTIVE_STATUSES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class InvalidStatusTransition(ValueError):
+    """An uploaded file was asked to move to a status its current status cannot reach"""
+
+class UploadStateMachine:
+    """Allowed UploadedFile.status transitions"""
+
+    TRANSITIONS = {
+        'uploaded': {'validating'},
+        'validating': {'validated', 'validation_error'},
+        'validation_error': {'validating'},
+        'validated': {'validating', 'processing'},
+        'processing': {'processed', 'processing_error'},
+        'processing_error': set(),  # journals may be partially posted; re-upload instead
+        'processed': set(),
+        'error': {'validating'}  # legacy status
+    }
+
+    @classmethod
+    def can_transition(cls, current: Optional[str], new: str) -> bool:
+        return current == new or new in cls.TRANSITIONS.get(current or 'uploaded', set())
+
+    @classmethod
+    def transition(cls, uploaded_file: UploadedFile, new_status: str):
+        """Move a file to new_status (does not commit)"""
+        if not cls.can_transition(uploaded_file.status, new_status):
+            raise InvalidStatusTransition(
+                f"Uploaded file {uploaded_file.id} cannot move from '{uploaded_file.status}' to '{new_status}'"
+            )
+        uploaded_file.status = new_status
+
+class UploadPipelineService:
+    """
+    Web-facing side of the upload pipeline
+
+    Routes call the enqueue_* methods, which only move the file's status and insert
+    a ProcessingJob; the work itself runs in worker processes (see worker.py).
+    """
+
+    def __init__(self):
+        self.queue = JobQueueService()
+
+    def enqueue_validation(self, uploaded_file: UploadedFile) -> ProcessingJob:
+        UploadStateMachine.transition(uploaded_file, 'validating')
+        job = self.queue.enqueue(uploaded_file.id, 'validate')
+        db.session.commit()
+        return job
+
+    def enqueue_processing(self, uploaded_file: UploadedFile) -> ProcessingJob:
+        UploadStateMachine.transition(uploaded_file, 'processing')
+        # Posting is not idempotent, so the process stage only retries failures that happen before anything was posted
+        job = self.queue.enqueue(uploaded_file.id, 'process')
+        db.session.commit()
+        return job
+
+    def enqueue_reports(self, uploaded_file: UploadedFile) -> ProcessingJob:
+        if uploaded_file.status != 'processed':
+            raise InvalidStatusTransition(f"Uploaded file {uploaded_file.id} must be processed before reporting")
+        job = self.queue.enqueue(uploaded_file.id, 'report')
+        db.session.commit()
+        return job
+
+    def latest_job(self, uploaded_file: UploadedFile, stage: str) -> Optional[ProcessingJob]:
+        return self.queue.latest_jobs(uploaded_file.id).get(stage)
+
+    def status(self, uploaded_file: UploadedFile) -> Dict[str, Any]:
+        """Stage-by-stage status for /api/upload-status"""
+        jobs = self.queue.latest_jobs(uploaded_file.id)
+        return {
+            'status': uploaded_file.status,
+            'stages': {stage: job.to_dict() for stage, job in jobs.items()},
+            'active': any(job.status in ACTIVE_STATUSES for job in jobs.values())
+        }
+
+    @staticmethod
+    def job_result(job: Optional[ProcessingJob]) -> Optional[Dict[str, Any]]:
+        if job is None or not job.result:
+            return None
+        return json.loads(job.result)
+
+
+def csv_chunk_size(uploaded_file: UploadedFile) -> Optional[int]:
+    """Rows per chunk when the upload is a CSV large enough to stream, otherwise None"""
+    file_path = uploaded_file.file_path
+    if not file_path.lower().endswith('.csv') or not os.path.exists(file_path):
+        return None
+    if os.path.getsize(file_path) < current_app.config['CSV_STREAMING_THRESHOLD']:
+        return None
+    return current_app.config['CSV_CHUNK_SIZE']
+
+def _ingestion_progress_callback(job: ProcessingJob, stage: str):
+    """Reset the file's progress row for a stage and return a per-chunk updater that also heart-beats the job"""
+    uploaded_file = job.uploaded_file
+    progress = uploaded_file.ingestion_progress or FileIngestionProgress(uploaded_file_id=uploaded_file.id)
+    progress.stage = stage
+    progress.bytes_read = progress.rows_read = progress.rows_posted = 0
+    progress.rows_rejected = progress.chunks_completed = 0
+    progress.started_at = datetime.utcnow()
+    db.session.add(progress)
+    db.session.commit()
+    queue = JobQueueService()
+
+    def update(counters: Dict[str, Any]):
+        for key, value in counters.items():
+            setattr(progress, key, value)
+        queue.heartbeat(job, progress.percent_complete)
+
+    return progress, update
+
+
+def _validation_failed(job: ProcessingJob):
+    uploaded_file = job.uploaded_file
+    UploadStateMachine.transition(uploaded_file, 'validation_error')
+    uploaded_file.validation_errors = str([f'File validation error: {job.last_error}'])
+    if uploaded_file.ingestion_progress:
+        uploaded_file.ingestion_progress.stage = 'failed'
+
+@register_job_handler('validate', on_failure=_validation_failed)
+def run_validation(job: ProcessingJob) -> Dict[str, Any]:
+    uploaded_file = job.uploaded_file
+    validator = ValidationEngine()
+
+    chunk_size = csv_chunk_size(uploaded_file)
+    if chunk_size:
+        # Large CSVs are validated chunk by chunk so memory stays bounded
+        progress, update_progress = _ingestion_progress_callback(job, 'validating')
+        validation_result = validator.validate_file(uploaded_file.file_path, chunk_size=chunk_size,
+                                                    progress_callback=update_progress)
+        progress.stage = 'validated' if validation_result['is_valid'] else 'failed'
+    else:
+        validation_result = validator.validate_file(uploaded_file.file_path)
+
+    if validation_result['is_valid']:
+        UploadStateMachine.transition(uploaded_file, 'validated')
+        uploaded_file.validation_errors = None
+    else:
+        UploadStateMachine.transition(uploaded_file, 'validation_error')
+        uploaded_file.validation_errors = str(validation_result['errors'])
+
+    return validation_result
+
+
+def _processing_failed(job: ProcessingJob):
+    uploaded_file = job.uploaded_file
+    UploadStateMachine.transition(uploaded_file, 'processing_error')
+    if uploaded_file.ingestion_progress:
+        uploaded_file.ingestion_progress.stage = 'failed'
+
+# Posting is not idempotent: a worker that died mid-file may have committed some chunks
+@register_job_handler('process', on_failure=_processing_failed, restartable=False)
+def run_processing(job: ProcessingJob) -> Dict[str, Any]:
+    uploaded_file = job.uploaded_file
+    processor = FileProcessor()
+    accounting_engine = AccountingEngine()
+    posted = False
+
+    try:
+        chunk_size = csv_chunk_size(uploaded_file)
+        if chunk_size:
+            # Stream large CSVs: each chunk is cleaned, validated and posted before the next is read
+            progress, update_progress = _ingestion_progress_callback(job, 'posting')
+
+            def track_posting(counters: Dict[str, Any]):
+                nonlocal posted
+                posted = posted or counters['rows_posted'] > 0
+                update_progress(counters)
+
+            processing_result = accounting_engine.process_entry_chunks(
+                processor.iter_csv_chunks(uploaded_file.file_path, chunk_size),
+                progress_callback=track_posting
+            )
+            progress.stage = 'completed'
+        else:
+            data = processor.extract_data(uploaded_file.file_path)
+            processing_result = accounting_engine.process_entries(data)
+            posted = processing_result['saved_entries'] > 0
+
+        UploadStateMachine.transition(uploaded_file, 'processed')
+        uploaded_file.processed_at = datetime.utcnow()
+
+        db.session.add(ProcessingResult(
+            uploaded_file_id=uploaded_file.id,
+            total_records=processing_result['total_records'],
+            processed_records=processing_result['processed_records'],
+            error_records=processing_result['error_records'],
+            processing_log=str(processing_result['log'])
+        ))
+
+        # Reports are generated in the background as soon as the journals are in
+        JobQueueService().enqueue(uploaded_file.id, 'report')
+
+    except UnbalancedJournalError as e:
+        # The same rows fail the same way on every attempt
+        raise PermanentJobError(str(e)) from e
+    except Exception as e:
+        if posted:
+            raise PermanentJobError(f"Processing stopped after journals were posted: {str(e)}") from e
+        raise
+
+    return {
+        'total_records': processing_result['total_records'],
+        'processed_records': processing_result['processed_records'],
+        'error_records': processing_result['error_records'],
+        'errors': processing_result['errors'][:100],
+        'log': processing_result['log']
+    }
+
+
+@register_job_handler('report')
+def run_reports(job: ProcessingJob) -> Dict[str, Any]:
+    return ReportGenerator().generate_all_reports(job.uploaded_file_id)
@@ -1,10 +1,13 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 import logging
+import os
 import re
 
+from services.parsed_dataset_cache import ParsedDatasetCache
+
 class ValidationEngine:
     """Data validation engine for financial data"""
     
@@ -12,17 +15,18 @@ class ValidationEngine:
         self.logger = logging.getLogger(__name__)
         self.validation_rules = self._load_validation_rules()
     
-    def validate_file(self, file_path: str) -> Dict[str, Any]:
-        """Main validation function for uploaded files"""
+    def validate_file(self, file_path: str, chunk_size: Optional[int] = None,
+                      progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Main validation function for uploaded files (CSV files stream when chunk_size is given)"""
         try:
             # Extract file extension
             file_extension = file_path.rsplit('.', 1)[1].lower()
             
             # Load data based on file type
-            if file_extension == 'csv':
-                df = pd.read_csv(file_path)
-            elif file_extension in ['xlsx', 'xls']:
-                df = pd.read_excel(file_path)
+            if file_extension == 'csv' and chunk_size:
+                return self._validate_csv_in_chunks(file_path, chunk_size, progress_callback)
+            elif file_extension in ['csv', 'xlsx', 'xls']:
+                df = ParsedDatasetCache().read(file_path)
             else:
                 return {
                     'is_valid': False,
@@ -43,291 +47,34 @@ class ValidationEngine:
     
     def _run_validation_checks(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Run comprehensive validation checks"""
-        errors = []
-        warnings = []
-        
-        # Structure validation
-        structure_errors = self._validate_structure(df)
-        errors.extend(structure_errors)
-        
-        # Data type validation
-        data_type_errors = self._validate_data_types(df)
-        errors.extend(data_type_errors)
-        
-        # Business logic validation
-        business_errors = self._validate_business_logic(df)
-        errors.extend(business_errors)
-        
-        # Completeness validation
-        completeness_errors = self._validate_completeness(df)
-        errors.extend(completeness_errors)
-        
-        # Consistency validation
-        consistency_errors = self._validate_consistency(df)
-        errors.extend(consistency_errors)
-        
-        # Range validation
-        range_errors = self._validate_ranges(df)
-        errors.extend(range_errors)
-        
-        # Format validation
-        format_errors = self._validate_formats(df)
-        errors.extend(format_errors)
-        
-        # Duplicate validation
-        duplicate_errors = self._validate_duplicates(df)
-        warnings.extend(duplicate_errors)
-        
-        # Calculate validation score
-        total_checks = len(df) * 10  # Approximate number of checks
-        error_count = len(errors)
-        validation_score = max(0, (total_checks - error_count) / total_checks * 100)
-        
-        return {
-            'is_valid': len(errors) == 0,
-            'errors': errors,
-            'warnings': warnings,
-            'validation_score': validation_score,
-            'total_rows': len(df),
-            'columns': list(df.columns),
-            'validation_summary': self._generate_validation_summary(df, errors, warnings)
-        }
-    
-    def _validate_structure(self, df: pd.DataFrame) -> List[str]:
-        """Validate file structure"""
-        errors = []
-        
-        # Check if file is empty
-        if df.empty:
-            errors.append("File is empty")
-            return errors
-        
-        # Check minimum required columns
-        required_columns = ['date', 'description', 'amount']
-        missing_columns = []
-        
-        for req_col in required_columns:
-            if not any(req_col.lower() in col.lower() for col in df.columns):
-                missing_columns.append(req_col)
-        
-        if missing_columns:
-            errors.append(f"Missing required columns: {', '.join(missing_columns)}")
-        
-        # Check for completely empty columns
-        empty_columns = [col for col in df.columns if df[col].isna().all()]
-        if empty_columns:
-            errors.append(f"Found empty columns: {', '.join(empty_columns)}")
-        
-        # Check for duplicate column names
-        if len(df.columns) != len(set(df.columns)):
-            errors.append("Duplicate column names found")
-        
-        return errors
-    
-    def _validate_data_types(self, df: pd.DataFrame) -> List[str]:
-        """Validate data types"""
-        errors = []
-        
-        # Find potential numeric columns
-        numeric_columns = ['amount', 'debit', 'credit', 'balance', 'quantity', 'price', 'total']
-        
-        for col in df.columns:
-            col_lower = col.lower()
-            
-            # Check numeric columns
-            if any(num_col in col_lower for num_col in numeric_columns):
-                non_numeric_count = 0
-                for idx, value in df[col].items():
-                    if pd.notna(value) and not self._is_numeric(value):
-                        non_numeric_count += 1
-                
-                if non_numeric_count > 0:
-                    errors.append(f"Column '{col}' contains {non_numeric_count} non-numeric values")
-            
-            # Check date columns
-            if any(date_col in col_lower for date_col in ['date', 'time']):
-                invalid_dates = 0
-                for idx, value in df[col].items():
-                    if pd.notna(value) and not self._is_valid_date(value):
-                        invalid_dates += 1
-                
-                if invalid_dates > 0:
-                    errors.append(f"Column '{col}' contains {invalid_dates} invalid date values")
-        
-        return errors
-    
-    def _validate_business_logic(self, df: pd.DataFrame) -> List[str]:
-        """Validate business logic rules"""
-        errors = []
-        
-        # Find debit and credit columns
-        debit_col = self._find_column(df, ['debit', 'dr', 'debit_amount'])
-        credit_col = self._find_column(df, ['credit', 'cr', 'credit_amount'])
-        
-        if debit_col and credit_col:
-            # Check double-entry bookkeeping
-            total_debits = pd.to_numeric(df[debit_col], errors='coerce').sum()
-            total_credits = pd.to_numeric(df[credit_col], errors='coerce').sum()
-            
-            if abs(total_debits - total_credits) > 0.01:
-                errors.append(f"Double-entry bookkeeping violation: Total debits (${total_debits:.2f}) != Total credits (${total_credits:.2f})")
-            
-            # Check for entries with both debit and credit
-            both_present = 0
-            for idx, row in df.iterrows():
-                debit_val = pd.to_numeric(row[debit_col], errors='coerce')
-                credit_val = pd.to_numeric(row[credit_col], errors='coerce')
-                
-                if pd.notna(debit_val) and pd.notna(credit_val) and debit_val > 0 and credit_val > 0:
-                    both_present += 1
-            
-            if both_present > 0:
-                errors.append(f"Found {both_present} entries with both debit and credit amounts")
-        
-        # Check for negative amounts where they shouldn't be
-        amount_col = self._find_column(df, ['amount', 'total', 'value'])
-        if amount_col:
-            negative_amounts = (pd.to_numeric(df[amount_col], errors='coerce') < 0).sum()
-            if negative_amounts > 0:
-                errors.append(f"Found {negative_amounts} negative amounts")
-        
-        return errors
-    
-    def _validate_completeness(self, df: pd.DataFrame) -> List[str]:
-        """Validate data completeness"""
-        errors = []
-        
-        # Check for required fields
-        required_fields = {
-            'description': ['description', 'narration', 'particulars'],
-            'amount': ['amount', 'debit', 'credit', 'total'],
-            'date': ['date', 'transaction_date', 'entry_date']
-        }
-        
-        for field_name, possible_columns in required_fields.items():
-            found_col = self._find_column(df, possible_columns)
-            if found_col:
-                null_count = df[found_col].isna().sum()
-                if null_count > 0:
-                    errors.append(f"Field '{found_col}' has {null_count} missing values")
-        
-        # Check for completely empty rows
-        empty_rows = df.isna().all(axis=1).sum()
-        if empty_rows > 0:
-            errors.append(f"Found {empty_rows} completely empty rows")
-        
-        return errors
-    
-    def _validate_consistency(self, df: pd.DataFrame) -> List[str]:
-        """Validate data consistency"""
-        errors = []
-        
-        # Check date consistency
-        date_col = self._find_column(df, ['date', 'transaction_date', 'entry_date'])
-        if date_col:
-            dates = pd.to_datetime(df[date_col], errors='coerce')
-            valid_dates = dates.dropna()
-            
-            if len(valid_dates) > 1:
-                date_range = valid_dates.max() - valid_dates.min()
-                if date_range.days > 365:
-                    errors.append(f"Date range spans {date_range.days} days - may indicate data inconsistency")
-                
-                # Check for future dates
-                future_dates = (valid_dates > datetime.now()).sum()
-                if future_dates > 0:
-                    errors.append(f"Found {future_dates} future dates")
-        
-        # Check account code consistency
-        account_col = self._find_column(df, ['account', 'account_code', 'account_name'])
-        if account_col:
-            # Check for inconsistent account code formats
-            account_codes = df[account_col].dropna().astype(str)
-            if len(account_codes) > 0:
-                # Check if all codes follow similar format
-                formats = set()
-                for code in account_codes:
-                    if re.match(r'^\d+$', code):
-                        formats.add('numeric')
-                    elif re.match(r'^[A-Z]+\d+$', code):
-                        formats.add('alpha_numeric')
-                    else:
-                        formats.add('other')
-                
-                if len(formats) > 1:
-                    errors.append(f"Inconsistent account code formats found: {', '.join(formats)}")
-        
-        return errors
-    
-    def _validate_ranges(self, df: pd.DataFrame) -> List[str]:
-        """Validate value ranges"""
-        errors = []
-        
-        # Check for unreasonable amounts
-        amount_cols = ['amount', 'debit', 'credit', 'total', 'balance']
-        
-        for col in df.columns:
-            if any(amount_col in col.lower() for amount_col in amount_cols):
-                numeric_values = pd.to_numeric(df[col], errors='coerce').dropna()
-                
-                if len(numeric_values) > 0:
-                    # Check for extremely large amounts
-                    max_val = numeric_values.max()
-                    if max_val > 1000000000:  # 1 billion
-                        errors.append(f"Column '{col}' contains extremely large values (max: ${max_val:,.2f})")
-                    
-                    # Check for extremely small amounts
-                    min_positive = numeric_values[numeric_values > 0].min() if (numeric_values > 0).any() else 0
-                    if min_positive > 0 and min_positive < 0.01:
-                        errors.append(f"Column '{col}' contains very small values (min: ${min_positive:.4f})")
-        
-        return errors
+        return _ValidationTotals.from_frame(self, df).result()
     
-    def _validate_formats(self, df: pd.DataFrame) -> List[str]:
-        """Validate data formats"""
-        errors = []
-        
-        # Check phone number format
-        phone_col = self._find_column(df, ['phone', 'telephone', 'mobile'])
-        if phone_col:
-            invalid_phones = 0
-            for value in df[phone_col].dropna():
-                if not self._is_valid_phone(str(value)):
-                    invalid_phones += 1
-            
-            if invalid_phones > 0:
-                errors.append(f"Column '{phone_col}' contains {invalid_phones} invalid phone numbers")
-        
-        # Check email format
-        email_col = self._find_column(df, ['email', 'email_address'])
-        if email_col:
-            invalid_emails = 0
-            for value in df[email_col].dropna():
-                if not self._is_valid_email(str(value)):
-                    invalid_emails += 1
-            
-            if invalid_emails > 0:
-                errors.append(f"Column '{email_col}' contains {invalid_emails} invalid email addresses")
-        
-        return errors
-    
-    def _validate_duplicates(self, df: pd.DataFrame) -> List[str]:
-        """Validate for duplicate records"""
-        warnings = []
-        
-        # Check for duplicate rows
-        duplicate_rows = df.duplicated().sum()
-        if duplicate_rows > 0:
-            warnings.append(f"Found {duplicate_rows} duplicate rows")
-        
-        # Check for duplicate reference numbers
-        ref_col = self._find_column(df, ['reference', 'ref_no', 'voucher_no', 'transaction_id'])
-        if ref_col:
-            duplicate_refs = df[ref_col].duplicated().sum()
-            if duplicate_refs > 0:
-                warnings.append(f"Found {duplicate_refs} duplicate reference numbers")
-        
-        return warnings
+    def _validate_csv_in_chunks(self, file_path: str, chunk_size: int,
+                                progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Run the same checks as _run_validation_checks one chunk at a time
+
+        Each chunk's figures are merged into the file's running totals, so the
+        result matches a whole-file validation while only chunk_size rows are in
+        memory. Duplicates are tracked as 64-bit row hashes rather than the rows,
+        up to _ValidationTotals.MAX_TRACKED_HASHES of them.
+        """
+        totals = None
+        bytes_total = os.path.getsize(file_path)
+        
+        with open(file_path, 'rb') as handle:
+            for chunk_number, chunk in enumerate(pd.read_csv(handle, chunksize=chunk_size), start=1):
+                chunk_totals = _ValidationTotals.from_frame(self, chunk)
+                totals = chunk_totals if totals is None else totals.merge(chunk_totals)
+                if progress_callback:
+                    progress_callback({
+                        'chunks_completed': chunk_number,
+                        'rows_read': totals.total_rows,
+                        'bytes_read': min(handle.tell(), bytes_total),
+                        'bytes_total': bytes_total
+                    })
+        
+        return (totals or _ValidationTotals.from_frame(self, pd.DataFrame())).result()
     
     def _find_column(self, df: pd.DataFrame, possible_names: List[str]) -> Optional[str]:
         """Find column by possible names"""
@@ -370,39 +117,6 @@ class ValidationEngine:
         email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
         return bool(re.match(email_pattern, email))
     
-    def _generate_validation_summary(self, df: pd.DataFrame, errors: List[str], warnings: List[str]) -> Dict[str, Any]:
-        """Generate validation summary"""
-        return {
-            'total_rows': len(df),
-            'total_columns': len(df.columns),
-            'error_count': len(errors),
-            'warning_count': len(warnings),
-            'data_quality_score': max(0, 100 - len(errors) * 5 - len(warnings) * 2),
-            'completeness_score': self._calculate_completeness_score(df),
-            'consistency_score': self._calculate_consistency_score(df)
-        }
-    
-    def _calculate_completeness_score(self, df: pd.DataFrame) -> float:
-        """Calculate data completeness score"""
-        total_cells = df.size
-        missing_cells = df.isna().sum().sum()
-        return ((total_cells - missing_cells) / total_cells) * 100 if total_cells > 0 else 0
-    
-    def _calculate_consistency_score(self, df: pd.DataFrame) -> float:
-        """Calculate data consistency score"""
-        # Simple consistency score based on data types
-        score = 100
-        
-        for col in df.columns:
-            unique_types = set()
-            for value in df[col].dropna():
-                unique_types.add(type(value).__name__)
-            
-            if len(unique_types) > 1:
-                score -= 10
-        
-        return max(0, score)
-    
     def _load_validation_rules(self) -> Dict[str, Any]:
         """Load validation rules configuration"""
         return {
@@ -415,3 +129,288 @@ class ValidationEngine:
             'phone_pattern': r'^[\+]?[1-9][\d]{0,15}$',
             'email_pattern': r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
         }
+
+
+
+
+class _ValidationTotals:
+    """
+    Mergeable figures behind every validation check
+
+    from_frame() measures one DataFrame (a whole file or one chunk of it),
+    merge() folds a later chunk's figures in, and result() turns the totals
+    into errors and warnings. Whole-file and chunked validation therefore run
+    the same rules.
+
+    Duplicate rows and references are found by 64-bit hash. Across chunks at
+    most MAX_TRACKED_HASHES distinct hashes are remembered, keeping memory
+    bounded on very long files; beyond that, repeats of forgotten rows are not
+    counted and the result says the duplicate check was partial.
+    """
+    
+    MAX_TRACKED_HASHES = 2000000  # 16MB per hash set
+    NUMERIC_HINTS = ['amount', 'debit', 'credit', 'balance', 'quantity', 'price', 'total']
+    DATE_HINTS = ['date', 'time']
+    RANGE_HINTS = ['amount', 'debit', 'credit', 'total', 'balance']
+    REQUIRED_COLUMNS = ['date', 'description', 'amount']
+    REQUIRED_FIELDS = {
+        'description': ['description', 'narration', 'particulars'],
+        'amount': ['amount', 'debit', 'credit', 'total'],
+        'date': ['date', 'transaction_date', 'entry_date']
+    }
+    
+    @classmethod
+    def from_frame(cls, engine: 'ValidationEngine', df: pd.DataFrame) -> '_ValidationTotals':
+        totals = cls()
+        totals.columns = list(df.columns)
+        totals.debit_col = engine._find_column(df, ['debit', 'dr', 'debit_amount'])
+        totals.credit_col = engine._find_column(df, ['credit', 'cr', 'credit_amount'])
+        totals.amount_col = engine._find_column(df, ['amount', 'total', 'value'])
+        totals.date_col = engine._find_column(df, ['date', 'transaction_date', 'entry_date'])
+        totals.account_col = engine._find_column(df, ['account', 'account_code', 'account_name'])
+        totals.phone_col = engine._find_column(df, ['phone', 'telephone', 'mobile'])
+        totals.email_col = engine._find_column(df, ['email', 'email_address'])
+        totals.ref_col = engine._find_column(df, ['reference', 'ref_no', 'voucher_no', 'transaction_id'])
+        totals.required_cols = [engine._find_column(df, names) for names in cls.REQUIRED_FIELDS.values()]
+        
+        # Structure and completeness
+        totals.total_rows = len(df)
+        totals.total_cells = df.size
+        nulls = df.isna()
+        totals.missing_cells = int(nulls.sum().sum())
+        totals.empty_rows = int(nulls.all(axis=1).sum()) if len(df.columns) else 0
+        totals.non_null_columns = {col for position, col in enumerate(df.columns) if not nulls.iloc[:, position].all()}
+        totals.missing_values = {col: int(df[col].isna().sum()) for col in totals.required_cols if col}
+        
+        # Data types, ranges and per-column value types
+        totals.non_numeric, totals.invalid_dates, totals.value_types = {}, {}, {}
+        totals.max_values, totals.min_positive = {}, {}
+        for position, col in enumerate(df.columns):
+            series = df.iloc[:, position]
+            col_lower = col.lower()
+            values = series.dropna()
+            totals.value_types[col] = {type(value).__name__ for value in values}
+            if any(hint in col_lower for hint in cls.NUMERIC_HINTS + cls.DATE_HINTS):
+                counts = values.value_counts()
+                if any(hint in col_lower for hint in cls.NUMERIC_HINTS):
+                    totals.non_numeric[col] = int(sum(n for value, n in counts.items() if not engine._is_numeric(value)))
+                if any(hint in col_lower for hint in cls.DATE_HINTS):
+                    totals.invalid_dates[col] = int(sum(n for value, n in counts.items()
+                                                        if not engine._is_valid_date(value)))
+            if any(hint in col_lower for hint in cls.RANGE_HINTS):
+                numeric_values = pd.to_numeric(series, errors='coerce').dropna()
+                if len(numeric_values) > 0:
+                    totals.max_values[col] = float(numeric_values.max())
+                    positive = numeric_values[numeric_values > 0]
+                    if len(positive) > 0:
+                        totals.min_positive[col] = float(positive.min())
+        
+        # Business logic
+        totals.total_debits = totals.total_credits = 0.0
+        totals.both_present = totals.negative_amounts = 0
+        if totals.debit_col and totals.credit_col:
+            debits = pd.to_numeric(df[totals.debit_col], errors='coerce')
+            credits = pd.to_numeric(df[totals.credit_col], errors='coerce')
+            totals.total_debits = float(debits.sum())
+            totals.total_credits = float(credits.sum())
+            totals.both_present = int(((debits > 0) & (credits > 0)).sum())
+        if totals.amount_col:
+            totals.negative_amounts = int((pd.to_numeric(df[totals.amount_col], errors='coerce') < 0).sum())
+        
+        # Consistency
+        totals.valid_dates = totals.future_dates = 0
+        totals.date_min = totals.date_max = None
+        if totals.date_col:
+            dates = pd.to_datetime(df[totals.date_col], errors='coerce').dropna()
+            if len(dates) > 0:
+                totals.valid_dates = len(dates)
+                totals.date_min, totals.date_max = dates.min(), dates.max()
+                totals.future_dates = int((dates > datetime.now()).sum())
+        totals.account_formats = set()
+        if totals.account_col:
+            for code in df[totals.account_col].dropna().astype(str).unique():
+                if re.match(r'^\d+$', code):
+                    totals.account_formats.add('numeric')
+                elif re.match(r'^[A-Z]+\d+$', code):
+                    totals.account_formats.add('alpha_numeric')
+                else:
+                    totals.account_formats.add('other')
+        
+        # Formats
+        totals.invalid_phones = sum(1 for value in df[totals.phone_col].dropna()
+                                    if not engine._is_valid_phone(str(value))) if totals.phone_col else 0
+        totals.invalid_emails = sum(1 for value in df[totals.email_col].dropna()
+                                    if not engine._is_valid_email(str(value))) if totals.email_col else 0
+        
+        # Duplicates
+        totals.duplicates_partial = False
+        totals.duplicate_rows, totals.row_hashes = cls._repeats(
+            pd.util.hash_pandas_object(df, index=False).to_numpy() if len(df.columns) else np.array([], dtype=np.uint64)
+        )
+        totals.duplicate_refs, totals.ref_hashes = 0, np.array([], dtype=np.uint64)
+        if totals.ref_col:
+            totals.duplicate_refs, totals.ref_hashes = cls._repeats(
+                pd.util.hash_pandas_object(df[totals.ref_col], index=False).to_numpy()
+            )
+        return totals
+    
+    def merge(self, later: '_ValidationTotals') -> '_ValidationTotals':
+        """Fold in the figures of the chunk that follows; returns self"""
+        def add_counts(mine: Dict[str, int], theirs: Dict[str, int]):
+            for col, count in theirs.items():
+                mine[col] = mine.get(col, 0) + count
+        
+        self.total_rows += later.total_rows
+        self.total_cells += later.total_cells
+        self.missing_cells += later.missing_cells
+        self.empty_rows += later.empty_rows
+        self.non_null_columns |= later.non_null_columns
+        add_counts(self.missing_values, later.missing_values)
+        add_counts(self.non_numeric, later.non_numeric)
+        add_counts(self.invalid_dates, later.invalid_dates)
+        for col, types in later.value_types.items():
+            self.value_types.setdefault(col, set()).update(types)
+        for col, value in later.max_values.items():
+            self.max_values[col] = max(self.max_values.get(col, value), value)
+        for col, value in later.min_positive.items():
+            self.min_positive[col] = min(self.min_positive.get(col, value), value)
+        
+        self.total_debits += later.total_debits
+        self.total_credits += later.total_credits
+        self.both_present += later.both_present
+        self.negative_amounts += later.negative_amounts
+        
+        if later.valid_dates:
+            self.date_min = later.date_min if self.date_min is None else min(self.date_min, later.date_min)
+            self.date_max = later.date_max if self.date_max is None else max(self.date_max, later.date_max)
+        self.valid_dates += later.valid_dates
+        self.future_dates += later.future_dates
+        self.account_formats |= later.account_formats
+        self.invalid_phones += later.invalid_phones
+        self.invalid_emails += later.invalid_emails
+        
+        self.duplicate_rows, self.row_hashes = self._merge_repeats(
+            self.duplicate_rows + later.duplicate_rows, self.row_hashes, later.row_hashes)
+        self.duplicate_refs, self.ref_hashes = self._merge_repeats(
+            self.duplicate_refs + later.duplicate_refs, self.ref_hashes, later.ref_hashes)
+        return self
+    
+    @staticmethod
+    def _repeats(hashes: np.ndarray):
+        """Rows repeating an earlier row of the same frame, and the frame's distinct hashes in first-seen order"""
+        distinct, first_rows = np.unique(hashes, return_index=True)
+        return len(hashes) - len(distinct), hashes[np.sort(first_rows)]
+    
+    def _merge_repeats(self, count: int, seen: np.ndarray, later: np.ndarray):
+        """Add the later chunk's rows already seen before it; remember its new hashes while there is room"""
+        already_seen = np.isin(later, seen, assume_unique=True)
+        count += int(already_seen.sum())
+        new = later[~already_seen]
+        room = max(self.MAX_TRACKED_HASHES - len(seen), 0)
+        if len(new) > room:
+            # Keep the earliest rows so the warning's "first N distinct rows" holds
+            self.duplicates_partial = True
+            new = new[:room]
+        return count, np.concatenate([seen, new])
+    
+    def result(self) -> Dict[str, Any]:
+        """Errors, warnings and scores, as returned by ValidationEngine.validate_file"""
+        if self.total_rows == 0:
+            return {
+                'is_valid': False,
+                'errors': ['File is empty'],
+                'warnings': [],
+                'validation_score': 0,
+                'total_rows': 0,
+                'columns': self.columns
+            }
+        
+        errors = []
+        warnings = []
+        
+        # Structure validation
+        missing_columns = [req_col for req_col in self.REQUIRED_COLUMNS
+                           if not any(req_col.lower() in col.lower() for col in self.columns)]
+        if missing_columns:
+            errors.append(f"Missing required columns: {', '.join(missing_columns)}")
+        empty_columns = [col for col in self.columns if col not in self.non_null_columns]
+        if empty_columns:
+            errors.append(f"Found empty columns: {', '.join(empty_columns)}")
+        if len(self.columns) != len(set(self.columns)):
+            errors.append("Duplicate column names found")
+        
+        # Data type validation
+        for col in self.columns:
+            if self.non_numeric.get(col, 0) > 0:
+                errors.append(f"Column '{col}' contains {self.non_numeric[col]} non-numeric values")
+            if self.invalid_dates.get(col, 0) > 0:
+                errors.append(f"Column '{col}' contains {self.invalid_dates[col]} invalid date values")
+        
+        # Business logic validation
+        if self.debit_col and self.credit_col:
+            if abs(self.total_debits - self.total_credits) > 0.01:
+                errors.append(f"Double-entry bookkeeping violation: Total debits (${self.total_debits:.2f}) != Total credits (${self.total_credits:.2f})")
+            if self.both_present > 0:
+                errors.append(f"Found {self.both_present} entries with both debit and credit amounts")
+        if self.negative_amounts > 0:
+            errors.append(f"Found {self.negative_amounts} negative amounts")
+        
+        # Completeness validation
+        for col in self.required_cols:
+            if col and self.missing_values.get(col, 0) > 0:
+                errors.append(f"Field '{col}' has {self.missing_values[col]} missing values")
+        if self.empty_rows > 0:
+            errors.append(f"Found {self.empty_rows} completely empty rows")
+        
+        # Consistency validation
+        if self.valid_dates > 1:
+            date_range = self.date_max - self.date_min
+            if date_range.days > 365:
+                errors.append(f"Date range spans {date_range.days} days - may indicate data inconsistency")
+            if self.future_dates > 0:
+                errors.append(f"Found {self.future_dates} future dates")
+        if len(self.account_formats) > 1:
+            errors.append(f"Inconsistent account code formats found: {', '.join(sorted(self.account_formats))}")
+        
+        # Range validation
+        for col in self.columns:
+            if self.max_values.get(col, 0) > 1000000000:
+                errors.append(f"Column '{col}' contains extremely large values (max: ${self.max_values[col]:,.2f})")
+            if 0 < self.min_positive.get(col, 0) < 0.01:
+                errors.append(f"Column '{col}' contains very small values (min: ${self.min_positive[col]:.4f})")
+        
+        # Format validation
+        if self.invalid_phones > 0:
+            errors.append(f"Column '{self.phone_col}' contains {self.invalid_phones} invalid phone numbers")
+        if self.invalid_emails > 0:
+            errors.append(f"Column '{self.email_col}' contains {self.invalid_emails} invalid email addresses")
+        
+        # Duplicate validation
+        if self.duplicate_rows > 0:
+            warnings.append(f"Found {self.duplicate_rows} duplicate rows")
+        if self.ref_col and self.duplicate_refs > 0:
+            warnings.append(f"Found {self.duplicate_refs} duplicate reference numbers")
+        if self.duplicates_partial:
+            warnings.append(f"Duplicate check compared rows against the first {self.MAX_TRACKED_HASHES:,} "
+                            f"distinct rows only")
+        
+        total_checks = self.total_rows * 10  # Approximate number of checks
+        validation_score = max(0, (total_checks - len(errors)) / total_checks * 100)
+        
+        return {
+            'is_valid': len(errors) == 0,
+            'errors': errors,
+            'warnings': warnings,
+            'validation_score': validation_score,
+            'total_rows': self.total_rows,
+            'columns': self.columns,
+            'validation_summary': {
+                'total_rows': self.total_rows,
+                'total_columns': len(self.columns),
+                'error_count': len(errors),
+                'warning_count': len(warnings),
+                'data_quality_score': max(0, 100 - len(errors) * 5 - len(warnings) * 2),
+                'completeness_score': ((self.total_cells - self.missing_cells) / self.total_cells) * 100 if self.total_cells > 0 else 0,
+                'consistency_score': max(0, 100 - 10 * sum(1 for types in self.value_types.values() if len(types) > 1))
+            }
+        }
@@ -0,0 +1,573 @@
+import os
+import json
+import unittest
+from unittest import mock
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from datetime import datetime
+from decimal import Decimal
+
+from services.reconciliation_candidate_index import CandidateBlockingIndex
+from services.reconciliation_assignment import SparseScoreMatrix, solve_assignment
+from services.reconciliation_score_matrix import AmountDateScorer
+from services.reconciliation_description_index import DescriptionIndex
+from services.advanced_bank_reconciliation_engine import AdvancedBankReconciliationEngine
+from services.professional_invoice_mapping_engine import ProfessionalInvoiceMappingEngine, BankTransaction
+from services.party_name_store import PartyNameStore, PartyKeys, soundex, metaphone
+from services.invoice_reference_scanner import InvoiceReferenceScanner
+from services.bank_reconciliation_service import BankReconciliationService
+from services.mapping_memory import MappingMemory, MappingSignature
+from services.parallel_reconciliation import score_in_shards, fork_available
+from services.bank_reconciliation_service import BankTransaction as StatementLine, TransactionType
+from services.split_payment_matcher import find_subset, SplitSearchStats
+from services.bank_reconciliation_engine import BankReconciliationEngine
+
+def _ledger():
+    entries = [
+        {'id': 'JE-INV', 'date': '2024-01-15', 'amount': 50000, 'reference': 'INV-001',
+         'invoice_number': 'INV-001', 'party_name': 'ABC Company'},
+        {'id': 'JE-NEAR', 'date': '2024-01-10', 'amount': 52000, 'reference': 'X1', 'party_name': 'Other Ltd'},
+        {'id': 'JE-FAR', 'date': '2024-01-15', 'amount': 75000, 'reference': 'X2', 'party_name': 'Other Ltd'},
+    ]
+    # Many identical rent postings, only two of which fall inside the date window
+    for month in range(1, 13):
+        for day in (1, 2):
+            entries.append({'id': f'RENT-{month}-{day}', 'date': f'2023-{month:02d}-{day:02d}',
+                            'amount': -15000, 'reference': '', 'party_name': 'XYZ Properties'})
+    return entries
+
+class TestCandidateBlockingIndex(unittest.TestCase):
+    """Bank lines are only scored against ledger entries the blocking index shortlists"""
+
+    def test_amount_window_and_reference_tokens(self):
+        entries = _ledger()
+        index = CandidateBlockingIndex(entries)
+
+        ids = [entries[i]['id'] for i in index.candidates(50500, '2024-01-16', 'NEFT CR')]
+        self.assertEqual(ids, ['JE-INV', 'JE-NEAR'])
+
+        # A separator-free reference in the narration reaches the invoice even when the amount is off
+        ids = [entries[i]['id'] for i in index.candidates(1000, '2024-01-16', 'PART PAYMENT INV001')]
+        self.assertEqual(ids, ['JE-INV'])
+
+    def test_large_amount_blocks_are_narrowed_by_date(self):
+        entries = _ledger()
+        index = CandidateBlockingIndex(entries, max_block_size=10)
+
+        # Window is 4 May - 3 July
+        ids = [entries[i]['id'] for i in index.candidates(-15000, '2023-06-03', 'RENT')]
+        self.assertEqual(ids, ['RENT-6-1', 'RENT-6-2', 'RENT-7-1', 'RENT-7-2'])
+        self.assertEqual(index.stats.date_narrowed_blocks, 1)
+
+    def test_stats_report_pruning_and_recall(self):
+        entries = _ledger()
+        index = CandidateBlockingIndex(entries)
+        shortlist = index.candidates(50000, '2024-01-15', '')
+        index.record_recall([0], shortlist)
+        index.record_recall([2], shortlist)
+
+        stats = index.stats.to_dict()
+        self.assertEqual(stats['total_pairs'], len(entries))
+        self.assertEqual(stats['candidate_pairs'], 2)
+        self.assertEqual(stats['recall'], 0.5)
+        self.assertGreater(stats['pruning_ratio'], 0.9)
+
+class TestDescriptionIndex(unittest.TestCase):
+    """Descriptions are tokenized once and compared as TF-IDF vectors"""
+
+    def test_search_ranks_by_rare_shared_terms(self):
+        index = DescriptionIndex([
+            'Payment received from ABC Company',
+            'Office rent payment to XYZ Properties',
+            'Payment for consulting services',
+            'Consulting service retainer',
+        ])
+
+        hits = index.search('NEFT payment ABC COMPANY', limit=2)
+        self.assertEqual(hits[0][0], 0)
+        self.assertGreater(hits[0][1], 0.5)
+        self.assertEqual(len(index.search('NEFT payment', limit=10)), 3)
+        # Plurals agree, and a common word counts for less than a rare one
+        self.assertAlmostEqual(index.similarity('consulting services', 'Consulting service'), 1.0)
+        self.assertLess(index.document_similarity('payment', 1), index.document_similarity('rent', 1))
+        self.assertEqual(index.similarity('UPI 20240115', 'Payment received'), 0.0)
+
+    def test_blocking_shortlists_similar_descriptions(self):
+        entries = _ledger()
+        for entry in entries:
+            entry.setdefault('description', 'Monthly rent XYZ Properties')
+        entries[1]['description'] = 'Quarterly audit retainer'
+        description_index = DescriptionIndex([entry['description'] for entry in entries])
+        index = CandidateBlockingIndex(entries, description_index=description_index)
+
+        ids = [entries[i]['id'] for i in index.candidates(1000, '2024-01-16', 'AUDIT RETAINER Q1')]
+        self.assertEqual(ids, ['JE-NEAR'])
+        self.assertEqual(index.stats.description_hits, 1)
+
+class TestPartyNameStore(unittest.TestCase):
+    """Party names are matched through precomputed keys"""
+
+    def test_keys_and_lookups(self):
+        self.assertEqual((soundex('Robert'), soundex('Rupert'), soundex('Ashcraft')), ('R163', 'R163', 'A261'))
+        self.assertEqual(metaphone('Relaince'), metaphone('Reliance'))
+
+        keys = PartyKeys.compute('Tata Consultancy Services Limited')
+        self.assertEqual(keys.stripped_name, 'tata consultancy services')
+        self.assertEqual(keys.acronyms, ['tcs', 'tcsl'])
+
+        store = PartyNameStore()
+        for name in ('ABC Technologies Pvt. Ltd.', 'Tata Consultancy Services Limited', 'Reliance Industries'):
+            store.keys_for(name)
+        self.assertEqual(store.party_match('NEFT CR ABCTECHNOLOGIES', 'abc technologies pvt ltd').stripped, 1.0)
+        self.assertEqual(store.acronym_score('IMPS TCS SALARY', 'Tata Consultancy Services Limited'), 1.0)
+        self.assertEqual(store.phonetic_score('RTGS RELAINCE INDUSTREES', 'Reliance Industries'), 1.0)
+        self.assertEqual(set(store.match('RTGS RELAINCE INDUSTREES')), {'reliance industries'})
+
+    def test_keys_are_persisted_and_reused(self):
+        from app import app, db
+        from models import PartyNameKey
+
+        with app.app_context():
+            db.create_all()
+            try:
+                PartyNameStore.for_parties(['XYZ Properties', 'ABC Company'], company_id=None)
+                self.assertEqual(PartyNameKey.query.count(), 2)
+
+                with mock.patch.object(PartyKeys, 'compute', wraps=PartyKeys.compute) as compute:
+                    store = PartyNameStore.for_parties(['XYZ Properties', 'Om Traders'], company_id=None)
+                self.assertEqual([call.args[0] for call in compute.call_args_list], ['om traders'])
+                self.assertEqual(PartyNameKey.query.count(), 3)
+                self.assertEqual(store.phonetic_score('xyz propertys rent', 'XYZ Properties'), 1.0)
+            finally:
+                db.session.remove()
+                db.drop_all()
+
+class TestInvoiceReferenceScanner(unittest.TestCase):
+    """One pass over a narration finds every open invoice it mentions"""
+
+    def test_variants_only_count_as_whole_words(self):
+        scanner = InvoiceReferenceScanner()
+        scanner.sync({'A': 'INV-2024-0042', 'B': 'INV-7', 'C': 'BILL/00123'})
+
+        self.assertEqual(scanner.scan('NEFT CR inv-2024-0042 ABC'), {'A': 1.0})
+        self.assertEqual(scanner.scan('UPI/INV20240042/ABC'), {'A': 0.95})
+        self.assertEqual(scanner.scan('PAYMENT 20240042'), {'A': 0.8})
+        self.assertEqual(scanner.scan('IMPS BILL123 XYZ'), {'C': 0.9})
+        # Derived forms inside a longer number do not count; the written form does
+        self.assertEqual(scanner.scan('REF 9920240042'), {})
+        self.assertEqual(scanner.scan('INV-77 settled'), {'B': 1.0})
+
+    def test_sync_adds_and_removes_only_changes(self):
+        scanner = InvoiceReferenceScanner()
+        self.assertEqual(scanner.sync({'A': 'INV-1001', 'B': 'INV-1002'}), (2, 0))
+        self.assertEqual(scanner.sync({'B': 'INV-1002', 'C': 'INV-1003'}), (1, 1))
+
+        self.assertEqual(scanner.scan('INV-1001 INV-1002 INV-1003'), {'B': 1.0, 'C': 1.0})
+        scanner.remove('B')
+        self.assertEqual(scanner.scan('INV1002'), {})
+        self.assertEqual(len(scanner), 1)
+
+class TestIncrementalReconciliation(unittest.TestCase):
+    """Runs only score what changed since the lines were last scored"""
+
+    LEDGER = [
+        {'id': 'JE001', 'date': '2024-01-15', 'description': 'Payment received from ABC Company', 'amount': 50000,
+         'reference': 'INV001', 'party_name': 'ABC Company', 'invoice_number': 'INV001'},
+        {'id': 'JE002', 'date': '2024-01-16', 'description': 'Office rent payment', 'amount': -15000,
+         'reference': 'RENT001', 'party_name': 'XYZ Properties'},
+    ]
+    STATEMENT = {'account_number': '1234', 'transactions': [
+        {'date': '2024-01-15', 'description': 'NEFT INWARD FROM ABC COMPANY INV001', 'amount': 50000,
+         'reference': 'INV001'},
+        {'date': '2024-01-20', 'description': 'IMPS FROM OM TRADERS BILL 77', 'amount': 7000, 'reference': 'IMPS77'},
+    ]}
+
+    def _run(self, ledger):
+        service = BankReconciliationService(1, 1)
+        with mock.patch.object(BankReconciliationService, '_get_existing_journal_entries', return_value=ledger), \
+                mock.patch.object(BankReconciliationService, '_find_potential_matches',
+                                  wraps=service._find_potential_matches) as scored:
+            result = service.process_bank_statement(self.STATEMENT)
+        statuses = {item['transaction'].reference: item['status'].value
+                    for items in result['transactions'].values() for item in items}
+        return result, statuses, [[entry['id'] for entry in call.args[1]] for call in scored.call_args_list]
+
+    def test_reruns_skip_scored_pairs(self):
+        from app import app, db
+        from models import ReconciliationLedgerEntry
+        from services.reconciliation_state_store import ReconciliationStateStore
+
+        with app.app_context():
+            db.create_all()
+            try:
+                _, statuses, scored = self._run(self.LEDGER)
+                self.assertEqual(statuses, {'INV001': 'partial', 'IMPS77': 'unmatched'})
+                self.assertEqual(scored, [['JE001'], []])
+
+                # Nothing new: both lines come back from the database unscored
+                result, statuses, scored = self._run(self.LEDGER)
+                self.assertEqual(statuses, {'INV001': 'partial', 'IMPS77': 'unmatched'})
+                self.assertEqual((scored, result['run_stats']['skipped_lines']), ([], 2))
+
+                # One new entry: open lines meet only that entry
+                receipt = {'id': 'JE003', 'date': '2024-01-20', 'description': 'Receipt from Om Traders bill 77',
+                           'amount': 7000, 'reference': 'IMPS77', 'party_name': 'Om Traders'}
+                result, statuses, scored = self._run(self.LEDGER + [receipt])
+                self.assertEqual(statuses, {'INV001': 'partial', 'IMPS77': 'matched'})
+                self.assertEqual(scored, [[], ['JE003']])
+                self.assertEqual(result['run_stats']['new_ledger_entries'], 1)
+                # Each entry is recorded once, by the run that first saw it
+                self.assertEqual(ReconciliationLedgerEntry.query.count(), 3)
+
+                # Transaction ids only identify a line within its bank account
+                partial = result['transactions']['partial'][0]['transaction']
+                self.assertIsNone(ReconciliationStateStore(1, '9999').statement_line(partial.transaction_id))
+                ReconciliationStateStore(1, '9999').record_manual_mapping(partial.transaction_id, '4100', 'JE-8')
+                self.assertEqual(ReconciliationStateStore(1, '1234').statement_line(
+                    partial.transaction_id)['status'], 'partial')
+
+                # Matched and manually mapped lines are never scored again
+                ReconciliationStateStore(1, '1234').record_manual_mapping(partial.transaction_id, '4100', 'JE-9')
+                _, statuses, scored = self._run(self.LEDGER + [receipt, dict(receipt, id='JE004')])
+                self.assertEqual(statuses, {'INV001': 'manual', 'IMPS77': 'matched'})
+                self.assertEqual(scored, [])
+                self.assertEqual(BankReconciliationService(1, 1).get_reconciliation_status(
+                    partial.transaction_id)['journal_entry_id'], 'JE-9')
+            finally:
+                db.session.remove()
+                db.drop_all()
+
+class TestMappingMemory(unittest.TestCase):
+    """Manual mappings are remembered by description signature"""
+
+    def test_signature_ignores_rails_references_and_months(self):
+        january = MappingSignature.of('NEFT TO XYZ PROPERTIES RENT JAN 2024 REF 81', -15000)
+        february = MappingSignature.of('NEFT TO XYZ PROPERTIES LTD RENT FEB 2024 REF 97', -15600)
+        self.assertEqual(january, february)
+        self.assertEqual((january.direction, january.counterparty), ('out', 'xyz properties'))
+        self.assertNotEqual(january, MappingSignature.of('NEFT TO XYZ PROPERTIES RENT JAN 2024', 15000))
+
+    def test_recurring_mapping_resolves_without_analysis(self):
+        from app import app, db
+
+        with app.app_context():
+            db.create_all()
+            try:
+                service = BankReconciliationService(1, 1)
+                for month in ('JAN', 'FEB'):
+                    service._remember_mapping(f'NEFT TO XYZ PROPERTIES RENT {month}', -15000, '6100')
+                transaction = {'description': 'NEFT TO XYZ PROPERTIES RENT MAR', 'amount': -15000}
+
+                # Two mappings suggest; the third makes a habit
+                first = MappingMemory(1).suggest(transaction['description'], transaction['amount'])
+                self.assertEqual((first[0]['account_code'], first[0]['times_used']), ('6100', 2))
+                self.assertFalse(service.suggest_account_mapping(transaction)['transaction_analysis']['resolved_from_memory'])
+
+                service._remember_mapping('NEFT TO XYZ PROPERTIES RENT MAR', -15000, '6100')
+                with mock.patch.object(BankReconciliationService, 'similar_entry_suggestions') as similar:
+                    result = BankReconciliationService(1, 1).suggest_account_mapping(transaction)
+                similar.assert_not_called()
+                self.assertTrue(result['transaction_analysis']['resolved_from_memory'])
+                self.assertEqual([s['account_code'] for s in result['suggestions']], ['6100'])
+                self.assertEqual(result['suggestions'][0]['account_name'], 'Rent Expense')
+            finally:
+                db.session.remove()
+                db.drop_all()
+
+@unittest.skipUnless(fork_available(), 'parallel mode needs fork')
+class TestParallelReconciliation(unittest.TestCase):
+    """Sharded scoring in worker processes gives the serial result"""
+
+    def test_shards_inherit_context_and_merge_in_order(self):
+        offset = 1000
+        # A closure over local state cannot be pickled; workers must inherit it
+        score = lambda context, items: [(item + context['offset'], os.getpid()) for item in items]
+        results = score_in_shards(score, {'offset': offset}, range(40), workers=2, min_shard_size=5)
+        self.assertEqual([value for value, _ in results], list(range(1000, 1040)))
+        self.assertNotIn(os.getpid(), {pid for _, pid in results})
+
+    def test_service_parallel_mode_matches_serial(self):
+        base = datetime(2024, 1, 1)
+        ledger = [{'id': f'JE{i}', 'date': f'2024-01-{i % 28 + 1:02d}', 'description': f'Receipt {i}',
+                   'amount': 500 + 41 * i, 'reference': f'REF{i}', 'party_name': f'Customer {i % 17}'}
+                  for i in range(120)]
+        lines = [StatementLine(f'T{i}', datetime(2024, 1, i % 28 + 1), f'NEFT FROM CUSTOMER {i % 17} REF{i}',
+                               Decimal(500 + 41 * i), TransactionType.CREDIT, f'REF{i}') for i in range(120)]
+
+        outcomes = []
+        for mode in ('serial', 'parallel'):
+            service = BankReconciliationService(1, 1)
+            service.execution_mode = mode
+            service.parallel_workers = 2
+            scored = service._score_statement_lines(lines, ledger, {i: None for i in range(len(lines))})
+            outcomes.append(({position: [(match['entry']['id'], match['confidence']) for match in matches]
+                              for position, matches in scored.items()}, service.candidate_stats))
+
+        self.assertEqual(outcomes[0], outcomes[1])
+        self.assertTrue(all(outcomes[0][0][i][0][0] == f'JE{i}' for i in range(120)))
+
+class TestSplitPaymentMatching(unittest.TestCase):
+    """Leftover lines settle groups of same-party invoices within hard search bounds"""
+
+    INVOICES = [
+        {'id': 1, 'invoice_number': 'INV-101', 'customer_name': 'Orion Traders', 'total_amount': 10000.0,
+         'invoice_date': datetime(2024, 1, 3), 'due_date': None},
+        {'id': 2, 'invoice_number': 'INV-102', 'customer_name': 'Orion Traders', 'total_amount': 24500.0,
+         'invoice_date': datetime(2024, 1, 9), 'due_date': None},
+        {'id': 3, 'invoice_number': 'INV-103', 'customer_name': 'Orion Traders', 'total_amount': 7250.5,
+         'invoice_date': datetime(2024, 1, 12), 'due_date': None},
+        {'id': 4, 'invoice_number': 'INV-104', 'customer_name': 'Orion Traders', 'total_amount': 18000.0,
+         'invoice_date': datetime(2024, 1, 14), 'due_date': None},
+        {'id': 5, 'invoice_number': 'INV-201', 'customer_name': 'Vega Foods', 'total_amount': 40000.0,
+         'invoice_date': datetime(2024, 1, 5), 'due_date': None},
+    ]
+
+    def test_meet_in_the_middle_search_is_bounded(self):
+        amounts = [1000 * (3 ** position % 97) + position for position in range(24)]
+        target = amounts[2] + amounts[11] + amounts[19]
+        found = find_subset(target, amounts)
+        self.assertEqual(sum(amounts[position] for position in found), target)
+        self.assertLessEqual(len(found), 3)
+
+        # Only a six-item group adds up: beyond the size bound
+        self.assertIsNone(find_subset(sum(amounts[:6]), amounts[:6], max_size=5))
+        stats = SplitSearchStats()
+        self.assertIsNone(find_subset(target, amounts, time_budget=0.0, stats=stats))
+        self.assertEqual(stats.timeouts, 1)
+
+    @staticmethod
+    def _write_statement(directory):
+        import pandas as pd
+
+        path = os.path.join(directory, 'statement.csv')
+        pd.DataFrame([
+            {'date': '2024-01-20', 'description': 'NEFT FROM ORION TRADERS', 'amount': 41750.5,
+             'reference': 'UTR1'},
+            {'date': '2024-01-08', 'description': 'IMPS VEGA FOODS PART 1', 'amount': 15000, 'reference': 'UTR2'},
+            {'date': '2024-01-22', 'description': 'IMPS VEGA FOODS PART 2', 'amount': 25000, 'reference': 'UTR3'},
+        ]).to_csv(path, index=False)
+        return path
+
+    def test_engine_matches_aggregated_and_split_payments(self):
+        import tempfile
+        from app import app, db
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = self._write_statement(directory)
+
+            with app.app_context():
+                db.create_all()
+                try:
+                    engine = BankReconciliationEngine(1, 1)
+                    with mock.patch.object(engine, '_get_ledger_entries', return_value=[]), \
+                            mock.patch.object(engine, '_get_outstanding_invoices', return_value=self.INVOICES):
+                        result = engine.process_bank_statement(path, '1020')
+                        groups = {}
+                        for match in result.matches:
+                            groups.setdefault(match.match_group, []).append(match)
+                        self.assertEqual(sorted(sorted(match.invoice_id for match in group) for group in groups.values()),
+                                         [[1, 2, 3], [5, 5]])
+                        self.assertEqual((result.matched_transactions, result.unmatched_transactions), (3, 0))
+                        self.assertAlmostEqual(float(sum(match.match_amount for match in result.matches)), 81750.5)
+
+                        # The grouped line is restored with all three invoices withheld from the rest
+                        rerun = engine.process_bank_statement(path, '1020')
+                        self.assertEqual(sorted(match.invoice_id for match in rerun.matches), [1, 2, 3, 5, 5])
+                        self.assertEqual({match.match_notes for match in rerun.matches}, {'Reconciled in an earlier run'})
+                        self.assertEqual(rerun.reconciliation_summary['split_payment_groups'], 2)
+                finally:
+                    db.session.remove()
+                    db.drop_all()
+
+    def test_rerun_after_invoices_are_paid_keeps_their_matches(self):
+        import tempfile
+        from app import app, db
+        from models import BankStatementLine, Invoice
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = self._write_statement(directory)
+
+            with app.app_context():
+                db.create_all()
+                try:
+                    engine = BankReconciliationEngine(1, 1)
+                    with mock.patch.object(engine, '_get_ledger_entries', return_value=[]), \
+                            mock.patch.object(engine, '_get_outstanding_invoices', return_value=self.INVOICES):
+                        engine.process_bank_statement(path, '1020')
+
+                    # Reconciling settles the invoices: only INV-104 is still outstanding
+                    for invoice in self.INVOICES:
+                        db.session.add(Invoice(subtotal=invoice['total_amount'],
+                                               status='sent' if invoice['id'] == 4 else 'paid', **invoice))
+                    db.session.commit()
+                    with mock.patch.object(engine, '_get_ledger_entries', return_value=[]), \
+                            mock.patch.object(engine, '_get_outstanding_invoices', return_value=self.INVOICES[3:4]):
+                        rerun = engine.process_bank_statement(path, '1020')
+
+                    self.assertEqual(sorted(match.invoice_id for match in rerun.matches), [1, 2, 3, 5, 5])
+                    self.assertEqual({match.match_notes for match in rerun.matches}, {'Reconciled in an earlier run'})
+                    self.assertAlmostEqual(float(sum(match.match_amount for match in rerun.matches)), 81750.5)
+                    orion = BankStatementLine.query.filter_by(reference='UTR1').one()
+                    self.assertEqual((orion.status, len(json.loads(orion.candidates))), ('grouped', 3))
+                finally:
+                    db.session.remove()
+                    db.drop_all()
+
+class TestLazyMatchExplanations(unittest.TestCase):
+    """Candidates keep scores only; the explanation is built when a match is expanded"""
+
+    def test_explanation_is_built_on_demand(self):
+        import app  # noqa: F401  (the service imports it lazily; load it first, as the app does)
+
+        service = BankReconciliationService(1, 1)
+        transaction = StatementLine('T1', datetime(2024, 1, 15), 'NEFT FROM ABC COMPANY INV-001', Decimal('50000'),
+                                    TransactionType.CREDIT, 'INV-001')
+        with mock.patch.object(service, 'explain_match', wraps=service.explain_match) as explain:
+            matches = service._find_potential_matches(transaction, _ledger())
+            best = matches[0]
+            self.assertEqual(best['entry']['id'], 'JE-INV')
+            self.assertNotIn('detailed_analysis', best.to_dict())
+            self.assertFalse(any(match.is_explained for match in matches))
+            self.assertEqual(explain.call_count, 0)
+
+            detailed = best.to_dict(detailed=True)
+            self.assertEqual(best['risk_assessment']['risk_level'], 'low')
+        self.assertEqual(explain.call_count, 1)
+        self.assertEqual(set(detailed['detailed_analysis']), {f'{layer}_analysis' for layer in best.layer_scores})
+        self.assertIn('perfect_amount_precision', detailed['comprehensive_factors'])
+        self.assertEqual(service.explain_match(transaction, best.entry)['confidence'], best.confidence)
+
+class TestAmountDateScores(unittest.TestCase):
+    """Amount and date layers are scored for a whole batch of pairs at once"""
+
+    def test_batch_scores_follow_the_layer_rules(self):
+        scorer = AmountDateScorer([
+            {'amount': 50000, 'date': '2024-01-12'},  # a Friday
+            {'amount': 49000, 'date': '2024-01-15'},
+            {'amount': 'n/a', 'date': 'someday'},
+        ])
+        # Bank line on Saturday 13 January against each entry
+        scores = scorer.score([Decimal('50000')] * 3, [datetime(2024, 1, 13)] * 3, [0, 1, 2])
+
+        # exact amount; adjacent day + weekend + normal delay
+        self.assertEqual(scores.amount_scores[0], 1.0)
+        self.assertAlmostEqual(scores.temporal_scores[0], 0.9 + 0.1 + 0.05)
+        # 2% off with a whole-number difference; two days early with the weekend bonus
+        self.assertAlmostEqual(scores.amount_scores[1], 0.6 + 0.1)
+        self.assertAlmostEqual(scores.temporal_scores[1], 0.7 + 0.1 + 0.02)
+
+        analysis = scores.temporal_analysis(1)
+        self.assertEqual(analysis['details']['processing_pattern'], 'advance_payment')
+        self.assertIn('weekend_processing_delay', analysis['factors'])
+        self.assertEqual(scores.amount_analysis(2)['factors'], ['amount_parsing_error'])
+        self.assertEqual(scores.window(1, 3).temporal_analysis(1)['factors'], ['date_parsing_error'])
+
+class TestGlobalAssignment(unittest.TestCase):
+    """Matches are assigned one-to-one to maximise total confidence"""
+
+    def test_contested_candidate_goes_to_the_best_overall_pairing(self):
+        scores = SparseScoreMatrix()
+        # Greedy in row order gives A the invoice B needs, leaving B unmatched (total 0.9)
+        scores.add('A', 'INV-1', 0.90)
+        scores.add('A', 'INV-2', 0.85)
+        scores.add('B', 'INV-1', 0.88)
+        scores.add('C', 'INV-3', 0.50)
+
+        assignment = solve_assignment(scores, min_score=0.7)
+        self.assertEqual(assignment, {'A': ('INV-2', 0.85), 'B': ('INV-1', 0.88)})
+
+    def test_advanced_engine_does_not_map_an_invoice_twice(self):
+        engine = AdvancedBankReconciliationEngine()
+        engine.load_bank_statement([
+            {'date': '2024-01-15', 'description': 'NEFT CR ABC TECH', 'amount': 59000, 'reference': 'INV2024001'},
+            {'date': '2024-01-16', 'description': 'NEFT CR ABC TECH', 'amount': 59000, 'reference': 'N2'},
+            {'date': '2024-01-20', 'description': 'NEFT CR ABC TECH', 'amount': 59000, 'reference': 'INV2024002'},
+        ])
+        engine.load_invoice_data([
+            {'date': '2024-01-14', 'invoice_number': 'INV2024001', 'party_name': 'ABC Tech',
+             'amount': 50000, 'description': 'Software'},
+            {'date': '2024-01-19', 'invoice_number': 'INV2024002', 'party_name': 'ABC Tech',
+             'amount': 50000, 'description': 'Software'},
+        ])
+
+        # Greedy mapping also hands INV_2 to BT_2 as a moderate suggestion
+        engine.perform_automatic_mapping()
+        mapped = {m.bank_transaction_id: m.invoice_id for m in engine.matches if m.invoice_id}
+        self.assertEqual(mapped, {'BT_1': 'INV_1', 'BT_3': 'INV_2'})
+        self.assertEqual(engine.matching_stats['assigned'], 2)
+
+class TestMappingCascade(unittest.TestCase):
+    """Cascade mode drops invoices that cannot reach LOW confidence and scores the rest as before"""
+
+    def test_cascade_matches_sequential_for_surviving_invoices(self):
+        bank_tx = BankTransaction(datetime(2024, 1, 15), 'NEFT CR ABC TECHNOLOGIES SOFTWARE', 59000,
+                                  'UTR123', 'ACC-1', 'credit')
+        invoices = [
+            {'invoice_number': 'INV-55', 'party_name': 'ABC Technologies', 'amount': 59000,
+             'date': '2024-01-14', 'description': 'software licence'},
+            {'invoice_number': 'INV-56', 'party_name': 'ABC Technologies', 'amount': 58500,
+             'date': '2024-01-10', 'description': 'software support'},
+            {'invoice_number': 'X', 'party_name': 'Om', 'amount': 590000,
+             'date': '2023-10-01', 'description': 'rent'},
+        ]
+        engine = ProfessionalInvoiceMappingEngine()
+        sequential = engine.process_mapping_sequence(bank_tx, invoices)
+        engine.execution_mode = 'cascade'
+        cascade = engine.process_mapping_sequence(bank_tx, invoices)
+
+        self.assertTrue(cascade['stage_results']['invoice_3']['pruned'])
+        self.assertLess(sequential['stage_results']['invoice_3']['final_confidence'], 0.25)
+        for key in ('invoice_1', 'invoice_2'):
+            self.assertEqual(cascade['stage_results'][key]['final_confidence'],
+                             sequential['stage_results'][key]['final_confidence'])
+
+        stats = cascade['cascade_stats']
+        self.assertEqual((stats['candidates'], stats['pruned']), (3, 1))
+        self.assertEqual(sum(stats['pruned_after'].values()), 1)
+        self.assertEqual(cascade['processing_summary']['pruned_count'], 1)
+        self.assertLess(stats['stage_evaluations']['semantic_analysis'], 3)
+
+    def test_bound_helpers_run_no_more_often_than_the_stages_they_replace(self):
+        bank_tx = BankTransaction(datetime(2024, 1, 15), 'NEFT CR ABC TECHNOLOGIES SOFTWARE', 59000,
+                                  'UTR123', 'ACC-1', 'credit')
+        invoices = [
+            {'invoice_number': f'X{i}', 'party_name': f'Vendor {i} Ltd', 'amount': 59000 + i * 37,
+             'date': '2024-01-%02d' % (1 + i % 28), 'description': 'office rent payment'}
+            for i in range(200)
+        ] + [
+            {'invoice_number': f'Y{i}', 'party_name': f'Lessor {i}', 'amount': 990000 + i,
+             'date': '2023-01-01', 'description': 'office rent'}
+            for i in range(20)
+        ]
+        expensive = {
+            '_stage_4_party_identification': '_party_score_bound',
+            '_stage_5_semantic_analysis': '_semantic_score_bound',
+        }
+
+        def counted_run(mode):
+            # processing_stages binds the stage methods, so patch before building the engine
+            patches = {name: mock.patch.object(ProfessionalInvoiceMappingEngine, name, autospec=True,
+                                               side_effect=getattr(ProfessionalInvoiceMappingEngine, name))
+                       for pair in expensive.items() for name in pair}
+            mocks = {name: patch.start() for name, patch in patches.items()}
+            try:
+                engine = ProfessionalInvoiceMappingEngine()
+                engine.execution_mode = mode
+                result = engine.process_mapping_sequence(bank_tx, invoices)
+            finally:
+                for patch in patches.values():
+                    patch.stop()
+            return result, {name: helper.call_count for name, helper in mocks.items()}
+
+        sequential, sequential_calls = counted_run('sequential')
+        cascade, cascade_calls = counted_run('cascade')
+
+        self.assertGreater(cascade['cascade_stats']['pruned'], 20)
+        self.assertGreater(cascade_calls['_party_score_bound'], 0)
+        for stage, bound in expensive.items():
+            self.assertEqual(sequential_calls[bound], 0)
+            self.assertLessEqual(cascade_calls[stage] + cascade_calls[bound], sequential_calls[stage])
+
+if __name__ == '__main__':
+    unittest.main()
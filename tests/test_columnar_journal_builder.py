@@ -0,0 +1,125 @@
+import os
+import unittest
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import numpy as np
+import pandas as pd
+
+from app import app
+from services.automated_accounting_engine import AutomatedAccountingEngine
+from services.columnar_journal_builder import ColumnarJournalBuilder
+
+# References built from datetime.now() and a random uuid only agree on the prefix
+GENERATED_REFERENCE_PREFIXES = ('INC-', 'EXP-', 'GEN-')
+
+def _comparable(entry):
+    reference = entry.reference
+    if isinstance(reference, str) and reference.startswith(GENERATED_REFERENCE_PREFIXES):
+        reference = reference[:13]
+    return (
+        entry.account_code, entry.account_name, entry.debit_amount, entry.credit_amount,
+        str(entry.description), str(reference), entry.transaction_date, entry.transaction_type
+    )
+
+class TestColumnarJournalBuilder(unittest.TestCase):
+    """The columnar builder must reproduce the row-wise template conversion exactly"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        self.engine = AutomatedAccountingEngine(company_id=1, user_id=1)
+        self.builder = ColumnarJournalBuilder(self.engine)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        self.app_context.pop()
+
+    def assertEquivalent(self, rowwise, columnar):
+        self.assertEqual(len(rowwise), len(columnar))
+        for expected, actual in zip(rowwise, columnar):
+            self.assertEqual(_comparable(expected), _comparable(actual))
+
+    def _merged_frame(self):
+        return pd.DataFrame([
+            {'date': '2024-01-05', 'transaction_type': 'Purchase', 'party_name': 'Acme', 'amount': 1000,
+             'description': 'Raw material', 'account_code': '1200', 'vendor_name': 'Acme',
+             'invoice_number': 'P-1', 'tax_amount': 180.5},
+            {'date': '2024-01-06', 'transaction_type': 'purchase', 'party_name': 'Acme', 'amount': 250.25,
+             'description': 'Packing', 'account_code': '1200', 'vendor_name': 'Acme',
+             'invoice_number': 'P-2', 'tax_amount': 0},
+            {'date': '2024-01-07', 'transaction_type': 'sales', 'party_name': 'Beta', 'amount': 5000,
+             'description': 'Widgets', 'account_code': '4010', 'customer_name': 'Beta',
+             'invoice_number': 'S-1', 'tax_amount': 900},
+            {'date': '2024-01-08', 'transaction_type': 'sales', 'party_name': 'Beta', 'amount': 10,
+             'description': 'Bad tax', 'account_code': '4010', 'customer_name': 'Beta',
+             'invoice_number': 'S-2', 'tax_amount': np.nan},
+            {'date': '2024-01-09', 'transaction_type': 'income', 'party_name': 'Bank', 'amount': 75,
+             'description': 'FD interest', 'account_code': '4110', 'source': 'Bank', 'category': 'Interest'},
+            {'date': '2024-01-10', 'transaction_type': 'income', 'party_name': 'X', 'amount': 5,
+             'description': 'No category', 'account_code': '4100', 'source': 'X', 'category': np.nan},
+            {'date': '2024-01-11', 'transaction_type': 'expense', 'party_name': 'Landlord', 'amount': 3000,
+             'description': 'January rent', 'account_code': '5120', 'vendor': 'Landlord', 'category': 'rent'},
+            {'date': '2024-01-12', 'transaction_type': 'credit_note', 'party_name': 'Beta', 'amount': 200,
+             'description': 'Return', 'account_code': '4030', 'reason': 'Damaged', 'original_invoice': 'S-1'},
+            {'date': '2024-01-13', 'transaction_type': 'debit_note', 'party_name': 'Beta', 'amount': 50,
+             'description': 'Late fee', 'account_code': '4120', 'reason': 'Late', 'original_invoice': 'S-1'},
+            {'date': '2024-01-14', 'transaction_type': 'payment', 'party_name': 'Acme', 'amount': 400,
+             'description': 'Supplies paid', 'account_code': '5140'},
+            {'date': '2024-01-15', 'transaction_type': 'receipt', 'party_name': 'Beta', 'amount': 600,
+             'description': 'Capital', 'account_code': '4010'},
+            {'date': '2024-01-16', 'transaction_type': 'unknown', 'party_name': 'Z', 'amount': 1,
+             'description': 'Skipped type', 'account_code': '1020'},
+            {'date': 'not a date', 'transaction_type': 'payment', 'party_name': 'Z', 'amount': 1,
+             'description': 'Skipped date', 'account_code': '1020'},
+            {'date': '2024-01-17', 'transaction_type': 'payment', 'party_name': 'Z', 'amount': 'abc',
+             'description': 'Skipped amount', 'account_code': '1020'},
+        ])
+
+    def test_merged_template_matches_rowwise(self):
+        frame = self._merged_frame()
+        self.assertEquivalent(self.engine._process_merged_template_rows(frame),
+                              self.builder.build(frame, 'merged'))
+
+    def test_merged_template_missing_optional_columns(self):
+        """Types whose columns are absent are skipped the same way the row-wise path skips them"""
+        frame = self._merged_frame()[['date', 'transaction_type', 'party_name', 'amount', 'description', 'account_code']]
+        rowwise = self.engine._process_merged_template_rows(frame)
+        self.assertEquivalent(rowwise, self.builder.build(frame, 'merged'))
+        self.assertTrue(rowwise)
+
+    def test_specific_templates_match_rowwise(self):
+        frame = self._merged_frame()
+        for template_type in ('purchase', 'sales', 'income', 'expense', 'credit_note', 'debit_note'):
+            with self.subTest(template_type=template_type):
+                subset = frame[frame['transaction_type'].str.lower() == template_type]
+                self.assertEquivalent(self.engine._process_specific_template_rows(subset, template_type),
+                                      self.builder.build(subset, template_type))
+
+    def test_large_random_merged_template(self):
+        rng = np.random.default_rng(7)
+        size = 2000
+        types = rng.choice(['purchase', 'sales', 'income', 'expense', 'credit_note', 'debit_note', 'transfer'], size)
+        frame = pd.DataFrame({
+            'date': pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, size), unit='D'),
+            'transaction_type': types,
+            'party_name': [f'Party {i % 37}' for i in range(size)],
+            'amount': np.round(rng.uniform(1, 10000, size), 2),
+            'description': [f'Line {i}' for i in range(size)],
+            'account_code': rng.choice(['1020', '1200', '4010', '5120', '2010', '9999'], size),
+            'vendor_name': [f'Vendor {i % 11}' for i in range(size)],
+            'customer_name': [f'Customer {i % 13}' for i in range(size)],
+            'invoice_number': [f'INV-{i}' for i in range(size)],
+            'tax_amount': np.where(rng.random(size) < 0.5, 0.0, np.round(rng.uniform(1, 500, size), 2)),
+            'source': 'Ops',
+            'vendor': 'Ops',
+            'category': rng.choice(['rent', 'salary', 'interest', 'other', 'misc'], size),
+            'reason': 'Adjustment',
+            'original_invoice': [f'INV-{i // 2}' for i in range(size)],
+        })
+        self.assertEquivalent(self.engine._process_merged_template_rows(frame),
+                              self.builder.build(frame, 'merged'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from datetime import datetime, timedelta
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import pandas as pd
+
+from app import app, db
+from models import (UploadedFile, ProcessingJob, ProcessingResult, JournalEntry, Company, ChartOfAccount, ReportRenderJob,
+                    User, UserCategory, UserCompanyAccess)
+from services.job_queue_service import JobQueueService, PermanentJobError, JOB_HANDLERS, FAILURE_HANDLERS
+from services.upload_pipeline_service import UploadPipelineService, UploadStateMachine, InvalidStatusTransition
+from services.report_cache import ReportCache
+from services.report_render_service import ReportRenderService, ExpiredDownloadToken
+
+class TestJobQueue(unittest.TestCase):
+    """Upload stages run from the processing_jobs queue, not in the request"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        handle, self.csv_path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        # Amount columns first: ValidationEngine's 'cr' hint would otherwise match 'description'
+        pd.DataFrame([
+            {'date': '2024-01-05', 'debit_amount': 100, 'credit_amount': 0, 'account': 'Cash',
+             'description': 'Cash sale', 'reference': 'S-1'},
+            {'date': '2024-01-05', 'debit_amount': 0, 'credit_amount': 100, 'account': 'Revenue',
+             'description': 'Cash sale', 'reference': 'S-1'},
+        ]).to_csv(self.csv_path, index=False)
+        self.uploaded_file = UploadedFile(user_id=1, filename='sales.csv', original_filename='sales.csv',
+                                          file_path=self.csv_path, file_size=os.path.getsize(self.csv_path),
+                                          file_type='text/csv', status='uploaded')
+        db.session.add(self.uploaded_file)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        for stage in ('flaky', 'broken'):
+            JOB_HANDLERS.pop(stage, None)
+            FAILURE_HANDLERS.pop(stage, None)
+        os.remove(self.csv_path)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_validate_then_process(self):
+        pipeline = UploadPipelineService()
+        job = pipeline.enqueue_validation(self.uploaded_file)
+        self.assertEqual(self.uploaded_file.status, 'validating')
+        self.assertEqual(pipeline.enqueue_validation(self.uploaded_file).id, job.id)
+
+        self.assertEqual(JobQueueService().run_pending(), 1)
+        db.session.refresh(self.uploaded_file)
+        self.assertEqual(self.uploaded_file.status, 'validated')
+        self.assertTrue(pipeline.job_result(pipeline.latest_job(self.uploaded_file, 'validate'))['is_valid'])
+
+        pipeline.enqueue_processing(self.uploaded_file)
+        self.assertEqual(JobQueueService().run_pending(limit=1), 1)
+        db.session.refresh(self.uploaded_file)
+        self.assertEqual(self.uploaded_file.status, 'processed')
+        self.assertEqual(JournalEntry.query.count(), 2)
+        self.assertEqual(ProcessingResult.query.count(), 1)
+
+        status = pipeline.status(self.uploaded_file)
+        self.assertEqual(status['stages']['process']['status'], 'succeeded')
+        self.assertEqual(status['stages']['report']['status'], 'queued')
+        self.assertTrue(status['active'])
+
+    def test_state_machine_rejects_skipped_stages(self):
+        with self.assertRaises(InvalidStatusTransition):
+            UploadStateMachine.transition(self.uploaded_file, 'processing')
+        with self.assertRaises(InvalidStatusTransition):
+            UploadPipelineService().enqueue_reports(self.uploaded_file)
+        self.assertEqual(ProcessingJob.query.count(), 0)
+
+    def test_failed_attempts_retry_then_fail(self):
+        calls = []
+        failures = []
+        JOB_HANDLERS['flaky'] = lambda job: calls.append(job.attempts) or (_ for _ in ()).throw(RuntimeError('boom'))
+        FAILURE_HANDLERS['flaky'] = failures.append
+
+        queue = JobQueueService()
+        job = queue.enqueue(self.uploaded_file.id, 'flaky', max_attempts=2)
+        db.session.commit()
+
+        queue.run_pending()
+        job = db.session.get(ProcessingJob, job.id)
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_after, datetime.utcnow())
+        self.assertEqual(queue.run_pending(), 0)  # backing off
+
+        job.run_after = datetime.utcnow()
+        db.session.commit()
+        queue.run_pending()
+        job = db.session.get(ProcessingJob, job.id)
+        self.assertEqual((job.status, job.attempts, job.last_error), ('failed', 2, 'boom'))
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(len(failures), 1)
+
+    def test_permanent_errors_are_not_retried(self):
+        def broken(job):
+            raise PermanentJobError('journals already posted')
+        JOB_HANDLERS['broken'] = broken
+
+        queue = JobQueueService()
+        job = queue.enqueue(self.uploaded_file.id, 'broken')
+        db.session.commit()
+        queue.run_pending()
+        self.assertEqual(db.session.get(ProcessingJob, job.id).status, 'failed')
+
+    def test_a_job_is_claimed_once(self):
+        JOB_HANDLERS['flaky'] = lambda job: {'ok': True}
+        JobQueueService().enqueue(self.uploaded_file.id, 'flaky')
+        db.session.commit()
+
+        first = JobQueueService(worker_id='a').claim_next()
+        self.assertIsNotNone(first)
+        self.assertEqual(first.locked_by, 'a')
+        self.assertIsNone(JobQueueService(worker_id='b').claim_next())
+
+        JobQueueService(worker_id='a').run_job(first)
+        self.assertEqual(json.loads(db.session.get(ProcessingJob, first.id).result), {'ok': True})
+
+    def test_lease_is_renewed_while_a_handler_runs(self):
+        requeued = []
+
+        def slow(job):
+            # Outlive the lease several times over; another worker looks for dead leases meanwhile
+            time.sleep(0.6)
+            requeued.append(JobQueueService(worker_id='b').requeue_expired())
+            return {'ok': True}
+        JOB_HANDLERS['flaky'] = slow
+        job = JobQueueService().enqueue(self.uploaded_file.id, 'flaky')
+        db.session.commit()
+
+        queue = JobQueueService(worker_id='a')
+        with mock.patch.object(JobQueueService, 'LEASE_SECONDS', 0.3), \
+                mock.patch.object(JobQueueService, 'LEASE_RENEW_SECONDS', 0.05):
+            self.assertTrue(queue.run_job(queue.claim_next()))
+        self.assertEqual(requeued, [0])
+        job = db.session.get(ProcessingJob, job.id, populate_existing=True)
+        self.assertEqual((job.status, job.attempts), ('succeeded', 1))
+
+    def test_expired_processing_is_failed_not_rerun(self):
+        pipeline = UploadPipelineService()
+        pipeline.enqueue_validation(self.uploaded_file)
+        JobQueueService().run_pending()
+        db.session.refresh(self.uploaded_file)
+        process = pipeline.enqueue_processing(self.uploaded_file)
+        JOB_HANDLERS['flaky'] = lambda job: {'ok': True}
+        other = JobQueueService().enqueue(self.uploaded_file.id, 'flaky')
+        db.session.commit()
+
+        # Both workers die mid-job
+        dead = JobQueueService(worker_id='dead')
+        self.assertEqual({dead.claim_next().id, dead.claim_next().id}, {process.id, other.id})
+        ProcessingJob.query.update({'locked_at': datetime.utcnow() - timedelta(hours=1)})
+        db.session.commit()
+
+        self.assertEqual(JobQueueService(worker_id='b').requeue_expired(), 1)
+        self.assertEqual(db.session.get(ProcessingJob, other.id).status, 'queued')
+        process = db.session.get(ProcessingJob, process.id, populate_existing=True)
+        self.assertEqual(process.status, 'failed')
+        db.session.refresh(self.uploaded_file)
+        self.assertEqual(self.uploaded_file.status, 'processing_error')
+        self.assertEqual(JournalEntry.query.count(), 0)
+
+class TestReportRender(unittest.TestCase):
+    """Report files are rendered by workers and fetched with a signed token"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        ReportCache.clear()
+
+        company = Company(name='Render Test Co', owner_user_id=1)
+        db.session.add(company)
+        db.session.flush()
+        self.company_id = company.id
+        cash = ChartOfAccount(company_id=self.company_id, account_code='1110',
+                              account_name='Cash', account_type='assets')
+        db.session.add(cash)
+        db.session.flush()
+        self.cash_id = cash.id
+        db.session.add(JournalEntry(company_id=self.company_id, account_id=cash.id, created_by=1,
+                                    entry_date=datetime(2024, 1, 5), description='Receipt',
+                                    debit_amount=10.0, credit_amount=0.0, is_posted=True))
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        for job in ReportRenderJob.query.all():
+            if job.file_path and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+        app.config.pop('REPORT_DOWNLOAD_TOKEN_SECONDS', None)
+        ReportCache.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_identical_requests_share_one_render(self):
+        renderer = ReportRenderService()
+        job = renderer.request_render(self.company_id, 1, 'journal', 'excel')
+        self.assertEqual(renderer.request_render(self.company_id, 2, 'journal', 'excel').id, job.id)
+        self.assertNotEqual(renderer.request_render(self.company_id, 1, 'journal', 'pdf').id, job.id)
+        self.assertNotIn('download_url', renderer.status(job))
+
+        self.assertEqual(renderer.run_pending(), 2)
+        job = db.session.get(ReportRenderJob, job.id)
+        self.assertEqual((job.status, job.progress_percent), ('succeeded', 100.0))
+        self.assertTrue(os.path.exists(job.file_path))
+
+        # A finished render is reused until the ledger changes
+        self.assertEqual(renderer.request_render(self.company_id, 1, 'journal', 'excel').id, job.id)
+        db.session.add(JournalEntry(company_id=self.company_id, account_id=self.cash_id, created_by=1,
+                                    entry_date=datetime(2024, 1, 6), description='Receipt',
+                                    debit_amount=5.0, credit_amount=0.0, is_posted=True))
+        db.session.commit()
+        self.assertNotEqual(renderer.request_render(self.company_id, 1, 'journal', 'excel').id, job.id)
+
+        with self.assertRaises(ValueError):
+            renderer.request_render(self.company_id, 1, 'journal', 'csv')
+        with self.assertRaises(ValueError):
+            renderer.request_render(self.company_id, 1, 'financial_package', 'pdf')
+
+    def test_download_token(self):
+        renderer = ReportRenderService()
+        job = renderer.request_render(self.company_id, 1, 'trial_balance', 'excel')
+        renderer.run_pending()
+        job = db.session.get(ReportRenderJob, job.id)
+
+        download_url = renderer.status(job)['download_url']
+        token = download_url.rsplit('/', 1)[1]
+        self.assertEqual(renderer.resolve_download_token(token).id, job.id)
+        self.assertIsNone(renderer.resolve_download_token(token[:-2] + 'xx'))
+
+        response = app.test_client().get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(job.download_name, response.headers['Content-Disposition'])
+        response.close()
+
+        app.config['REPORT_DOWNLOAD_TOKEN_SECONDS'] = -1
+        with self.assertRaises(ExpiredDownloadToken):
+            renderer.resolve_download_token(token)
+        self.assertEqual(app.test_client().get(download_url).status_code, 403)
+
+    def test_report_jobs_are_scoped_to_the_users_companies(self):
+        other = Company(name='Other Co', owner_user_id=1)
+        db.session.add(other)
+        db.session.flush()
+        users = {}
+        for name, company_id in (('member', self.company_id), ('outsider', other.id)):
+            user = User(username=name, email=f'{name}@example.com', password_hash='x', first_name=name,
+                        last_name='User', category=UserCategory.INDIVIDUAL)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(UserCompanyAccess(user_id=user.id, company_id=company_id, access_level='full'))
+            users[name] = user.id
+        db.session.commit()
+
+        def call(name, method, url, **kwargs):
+            # A fresh app context per request, so flask-login does not reuse the previous user from g
+            with app.app_context():
+                client = app.test_client()
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(users[name])
+                response = getattr(client, method)(url, **kwargs)
+                return response.status_code, response.get_json()
+
+        status, body = call('member', 'post', '/api/report-jobs', json={'report_type': 'journal', 'format': 'excel'})
+        self.assertEqual(status, 202)
+        job_id = body['job']['id']
+        self.assertEqual(db.session.get(ReportRenderJob, job_id).company_id, self.company_id)
+
+        self.assertEqual(call('member', 'get', f'/api/report-jobs/{job_id}')[0], 200)
+        self.assertEqual(call('outsider', 'get', f'/api/report-jobs/{job_id}')[0], 404)
+        self.assertEqual(call('outsider', 'post', '/api/report-jobs',
+                              json={'report_type': 'journal', 'company_id': self.company_id})[0], 403)
+
+    def test_all_formats_zip(self):
+        renderer = ReportRenderService()
+        with self.assertRaises(ValueError):
+            renderer.request_render(self.company_id, 1, 'journal', 'zip')
+        job = renderer.request_render(self.company_id, 1, 'all_reports', 'zip')
+        renderer.run_pending()
+        job = db.session.get(ReportRenderJob, job.id)
+        self.assertEqual((job.status, job.mimetype), ('succeeded', 'application/zip'))
+        with zipfile.ZipFile(job.file_path) as archive:
+            self.assertIn('journal', {name.split('_20')[0] for name in archive.namelist()})
+
+    def test_lease_is_renewed_while_rendering(self):
+        renderer = ReportRenderService('worker-a')
+        job = renderer.request_render(self.company_id, 1, 'journal', 'excel')
+        file_path = os.path.join(tempfile.mkdtemp(), 'journal.xlsx')
+        requeued = []
+
+        def slow_render(service, claimed):
+            # Outlive the lease several times over; another worker looks for dead leases meanwhile
+            time.sleep(0.6)
+            requeued.append(ReportRenderService('worker-b').requeue_expired())
+            with open(file_path, 'wb') as handle:
+                handle.write(b'report')
+            return file_path
+
+        with mock.patch.object(ReportRenderService, 'LEASE_SECONDS', 0.3), \
+                mock.patch.object(ReportRenderService, 'LEASE_RENEW_SECONDS', 0.05), \
+                mock.patch.object(ReportRenderService, '_render', side_effect=slow_render, autospec=True):
+            self.assertTrue(renderer.run_job(renderer.claim_next()))
+
+        self.assertEqual(requeued, [0])
+        job = db.session.get(ReportRenderJob, job.id, populate_existing=True)
+        self.assertEqual((job.status, job.attempts), ('succeeded', 1))
+
+if __name__ == '__main__':
+    unittest.main()
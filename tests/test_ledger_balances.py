@@ -0,0 +1,463 @@
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event, text
+
+from app import app, db
+from models import Company, ChartOfAccount, JournalEntry, AccountPeriodBalance
+from services.ledger_balance_service import LedgerBalanceService
+from services.schema_migration_service import SchemaMigrationService
+from services.accounting_engine import AccountingEngine
+from services.ledger_query_service import LedgerQueryService
+from services.journal_bulk_writer import JournalBulkWriter, JOURNAL_COLUMNS
+from services.ledger_aggregate import LedgerAggregate
+from services.automated_accounting_engine import AutomatedAccountingEngine
+from services.ledger_version import current_version
+from services.report_cache import ReportCache
+
+class TestLedgerBalanceService(unittest.TestCase):
+    """Account period balances must always agree with the posted journal lines"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        company = Company(name='Ledger Test Co', owner_user_id=1)
+        db.session.add(company)
+        db.session.flush()
+        self.company_id = company.id
+
+        self.cash = ChartOfAccount(company_id=self.company_id, account_code='1110',
+                                   account_name='Cash', account_type='assets')
+        self.sales = ChartOfAccount(company_id=self.company_id, account_code='4010',
+                                    account_name='Sales', account_type='revenue')
+        db.session.add_all([self.cash, self.sales])
+        db.session.commit()
+
+        self.service = LedgerBalanceService(self.company_id)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, entry_date, amount, is_posted=True):
+        lines = [
+            JournalEntry(company_id=self.company_id, account_id=self.cash.id, created_by=1,
+                         entry_date=entry_date, description='Cash sale', debit_amount=amount, credit_amount=0.0,
+                         is_posted=is_posted),
+            JournalEntry(company_id=self.company_id, account_id=self.sales.id, created_by=1,
+                         entry_date=entry_date, description='Cash sale', debit_amount=0.0, credit_amount=amount,
+                         is_posted=is_posted)
+        ]
+        db.session.add_all(lines)
+        self.service.record_entries(lines)
+        db.session.commit()
+
+    def test_record_entries_accumulates_per_month(self):
+        """Repeated posts into the same month update one row"""
+        self._post(datetime(2024, 1, 5), 100.0)
+        self._post(datetime(2024, 1, 20), 50.0)
+        self._post(datetime(2024, 2, 1), 25.0)
+        self._post(datetime(2024, 2, 2), 999.0, is_posted=False)
+
+        january = AccountPeriodBalance.query.filter_by(
+            account_id=self.cash.id, period_year=2024, period_month=1
+        ).one()
+        self.assertEqual(january.debit_total, 150.0)
+        self.assertEqual(january.entry_count, 2)
+        self.assertEqual(AccountPeriodBalance.query.count(), 4)
+
+    def test_totals_split_whole_and_partial_months(self):
+        """Range totals combine aggregate months with edge-month journal lines"""
+        self._post(datetime(2024, 1, 5), 100.0)
+        self._post(datetime(2024, 2, 10), 40.0)
+        self._post(datetime(2024, 3, 15), 7.0)
+        self._post(datetime(2024, 3, 25), 3.0)
+
+        totals = self.service.get_account_totals(datetime(2024, 1, 10), datetime(2024, 3, 20))
+        self.assertEqual(totals[self.cash.id]['debit_total'], 47.0)
+        self.assertEqual(totals[self.sales.id]['credit_total'], 47.0)
+
+        all_time = self.service.get_account_totals()
+        self.assertEqual(all_time[self.cash.id]['debit_total'], 150.0)
+
+        within_month = self.service.get_account_totals(datetime(2024, 3, 1), datetime(2024, 3, 16))
+        self.assertEqual(within_month[self.cash.id]['debit_total'], 7.0)
+
+    def test_rebuild_matches_incremental(self):
+        """A full rebuild reproduces the incrementally maintained rows"""
+        self._post(datetime(2024, 1, 5), 100.0)
+        self._post(datetime(2024, 4, 5), 60.0)
+        before = {(b.account_id, b.period_year, b.period_month): (b.debit_total, b.credit_total, b.entry_count)
+                  for b in AccountPeriodBalance.query.all()}
+
+        self.service.rebuild()
+        db.session.commit()
+        after = {(b.account_id, b.period_year, b.period_month): (b.debit_total, b.credit_total, b.entry_count)
+                 for b in AccountPeriodBalance.query.all()}
+        self.assertEqual(before, after)
+
+    def test_edits_unposting_and_deletes_move_the_aggregate(self):
+        """Changing a stored line takes its old amounts out and puts the new ones in"""
+        self._post(datetime(2024, 1, 5), 100.0)
+        self._post(datetime(2024, 1, 20), 50.0)
+        self._post(datetime(2024, 2, 1), 25.0)
+        cash_lines = JournalEntry.query.filter_by(account_id=self.cash.id).order_by(JournalEntry.id).all()
+
+        cash_lines[0].debit_amount = 80.0
+        cash_lines[1].entry_date = datetime(2024, 2, 10)
+        cash_lines[2].is_posted = False
+        db.session.commit()
+        db.session.delete(JournalEntry.query.filter_by(account_id=self.sales.id, credit_amount=100.0).one())
+        db.session.commit()
+
+        def totals():
+            return {(b.account_id, b.period_year, b.period_month): (b.debit_total, b.credit_total, b.entry_count)
+                    for b in AccountPeriodBalance.query.all() if b.entry_count}
+
+        self.assertEqual(totals()[(self.cash.id, 2024, 1)], (80.0, 0.0, 1))
+        self.assertEqual(totals()[(self.cash.id, 2024, 2)], (50.0, 0.0, 1))
+        incremental = totals()
+        self.service.rebuild()
+        db.session.commit()
+        self.assertEqual(incremental, totals())
+
+    def test_migration_backfills_history_posted_before_the_aggregate(self):
+        """Journals written before account_period_balances existed show up once the migration ran"""
+        AccountPeriodBalance.__table__.drop(db.engine)
+        for entry_date, amount in ((datetime(2023, 11, 5), 100.0), (datetime(2024, 2, 10), 40.0)):
+            db.session.add_all([
+                JournalEntry(company_id=self.company_id, account_id=self.cash.id, created_by=1,
+                             entry_date=entry_date, description='Cash sale', debit_amount=amount,
+                             credit_amount=0.0, is_posted=True),
+                JournalEntry(company_id=self.company_id, account_id=self.sales.id, created_by=1,
+                             entry_date=entry_date, description='Cash sale', debit_amount=0.0,
+                             credit_amount=amount, is_posted=True)
+            ])
+        db.session.commit()
+        db.create_all()
+        db.session.execute(text("DELETE FROM schema_migrations WHERE version = '0002'"))
+        db.session.commit()
+
+        self.assertIn('0002', SchemaMigrationService().apply_pending())
+        balances = {a['account_code']: a for a in LedgerQueryService(self.company_id).account_balances()}
+        self.assertEqual(balances['1110']['debit_total'], 140.0)
+        self.assertEqual(balances['4010']['credit_total'], 140.0)
+
+        engine = AccountingEngine()
+        engine.company_id = self.company_id
+        trial_balance = engine.get_trial_balance(datetime(2023, 1, 1), datetime(2024, 12, 31))
+        self.assertEqual(trial_balance['total_debits'], 140.0)
+        self.assertTrue(trial_balance['is_balanced'])
+
+    def test_account_balances_single_query_paths_agree(self):
+        """Month-aligned and edge-month ranges give the same totals through the one period/journal query"""
+        self._post(datetime(2024, 1, 5), 100.0)
+        self._post(datetime(2024, 2, 10), 40.0)
+        self._post(datetime(2024, 2, 11), 5.0, is_posted=False)
+        idle = ChartOfAccount(company_id=self.company_id, account_code='3010',
+                              account_name='Share Capital', account_type='equity')
+        db.session.add(idle)
+        db.session.commit()
+
+        query_service = LedgerQueryService(self.company_id)
+        aligned = query_service.account_balances(datetime(2024, 1, 1), datetime(2024, 2, 29, 23, 59, 59))
+        ranged = query_service.account_balances(datetime(2024, 1, 2), datetime(2024, 2, 28))
+        self.assertEqual(aligned, ranged)
+        self.assertEqual([a['account_code'] for a in aligned], ['1110', '3010', '4010'])
+        self.assertEqual(aligned[0]['debit_total'], 140.0)
+        self.assertEqual(aligned[1]['net_balance'], 0.0)
+
+        revenue = query_service.account_balances(account_types=['Revenue'])
+        self.assertEqual([a['account_code'] for a in revenue], ['4010'])
+
+    def test_ledger_lines_running_balance(self):
+        """Window function running balance restarts per account"""
+        self._post(datetime(2024, 1, 5), 100.0)
+        self._post(datetime(2024, 1, 6), 20.0)
+
+        lines = LedgerQueryService(self.company_id).ledger_lines()
+        cash_balances = [l['running_balance'] for l in lines if l['account_id'] == self.cash.id]
+        sales_balances = [l['running_balance'] for l in lines if l['account_id'] == self.sales.id]
+        self.assertEqual(cash_balances, [100.0, 120.0])
+        self.assertEqual(sales_balances, [-100.0, -120.0])
+
+    def test_bulk_writer_creates_accounts_and_updates_balances(self):
+        """Bulk path writes every line, creates unknown codes once and keeps balances in step"""
+        lines = []
+        for day in range(1, 29):
+            lines.append({'account_code': '1110', 'entry_date': datetime(2024, 5, day),
+                          'description': 'Receipt', 'reference_number': f'R{day}',
+                          'debit_amount': 10.0, 'credit_amount': 0.0})
+            lines.append({'account_code': '2010', 'account_name': 'Accounts Payable',
+                          'account_type': 'liabilities', 'entry_date': datetime(2024, 5, day),
+                          'description': 'Receipt', 'reference_number': f'R{day}',
+                          'debit_amount': 0.0, 'credit_amount': 10.0})
+
+        stats = JournalBulkWriter(self.company_id, user_id=1).write_lines(lines)
+        db.session.commit()
+
+        self.assertEqual(stats.rows_written, 56)
+        self.assertEqual(stats.accounts_created, 1)
+        self.assertGreater(stats.rows_per_second, 0)
+        self.assertEqual(JournalEntry.query.count(), 56)
+
+        payable = ChartOfAccount.query.filter_by(company_id=self.company_id, account_code='2010').one()
+        self.assertEqual(payable.account_name, 'Accounts Payable')
+        may = AccountPeriodBalance.query.filter_by(account_id=payable.id, period_year=2024, period_month=5).one()
+        self.assertEqual(may.credit_total, 280.0)
+        self.assertEqual(may.entry_count, 28)
+
+    def test_copy_buffer_writes_none_as_null(self):
+        """COPY reads unquoted empty fields as NULL, so only None may be written that way"""
+        row = dict.fromkeys(JOURNAL_COLUMNS)
+        row.update(company_id=self.company_id, account_id=self.cash.id, created_by=1,
+                   entry_date=datetime(2024, 5, 1), description='Cheque "42"', reference_number='',
+                   debit_amount=10.0, credit_amount=0.0, is_posted=True)
+
+        fields = next(csv.reader(JournalBulkWriter._copy_buffer([row])))
+        raw = JournalBulkWriter._copy_buffer([row]).getvalue().rstrip('\n').split(',')
+        by_column = dict(zip(JOURNAL_COLUMNS, raw))
+
+        self.assertEqual(by_column['source_reference'], '')
+        self.assertEqual(by_column['currency'], '')
+        self.assertEqual(by_column['reference_number'], '""')
+        self.assertEqual(dict(zip(JOURNAL_COLUMNS, fields))['description'], 'Cheque "42"')
+        self.assertEqual(dict(zip(JOURNAL_COLUMNS, fields))['is_posted'], 'true')
+
+def _without_generation_dates(report):
+    if isinstance(report, dict):
+        return {key: _without_generation_dates(value) for key, value in report.items() if key != 'generation_date'}
+    if isinstance(report, list):
+        return [_without_generation_dates(value) for value in report]
+    return report
+
+class TestReportBundle(unittest.TestCase):
+    """Statements built from one loaded ledger must equal those built query by query"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        company = Company(name='Bundle Test Co', owner_user_id=1)
+        db.session.add(company)
+        db.session.flush()
+        self.company_id = company.id
+
+        self.accounts = {}
+        for code, name, account_type in [('1110', 'Cash in Hand', 'assets'), ('1500', 'Equipment', 'Assets'),
+                                          ('2010', 'Accounts Payable', 'liabilities'),
+                                          ('3010', 'Share Capital', 'equity'), ('4010', 'Sales', 'revenue'),
+                                          ('5010', 'Rent', 'expenses'), ('5020', 'Travel', 'expenses')]:
+            account = ChartOfAccount(company_id=self.company_id, account_code=code,
+                                     account_name=name, account_type=account_type)
+            db.session.add(account)
+            self.accounts[code] = account
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _post(self, entry_date, debit_code, credit_code, amount, description, is_posted=True):
+        lines = [
+            JournalEntry(company_id=self.company_id, account_id=self.accounts[debit_code].id, created_by=1,
+                         entry_date=entry_date, description=description, debit_amount=amount, credit_amount=0.0,
+                         is_posted=is_posted, source_type='manual'),
+            JournalEntry(company_id=self.company_id, account_id=self.accounts[credit_code].id, created_by=1,
+                         entry_date=entry_date, description=description, debit_amount=0.0, credit_amount=amount,
+                         is_posted=is_posted, source_type='manual')
+        ]
+        db.session.add_all(lines)
+        LedgerBalanceService(self.company_id).record_entries(lines)
+        db.session.commit()
+
+    def test_bundle_matches_individual_statements(self):
+        """Every statement equals its own-query version; the MIS report reads the same totals"""
+        self._post(datetime(2024, 1, 2), '1110', '3010', 5000.0, 'Capital introduced')
+        self._post(datetime(2024, 1, 10), '1500', '2010', 1200.0, 'Equipment purchase')
+        self._post(datetime(2024, 1, 10), '1110', '4010', 800.5, 'Cash sale')
+        self._post(datetime(2024, 2, 3), '5010', '1110', 300.25, 'Rent payment')
+        self._post(datetime(2024, 2, 4), '5010', '1110', 99.0, 'Draft rent', is_posted=False)
+
+        engine = AutomatedAccountingEngine(self.company_id, user_id=1)
+        bundle = engine.generate_all_reports()
+        individual = {
+            'journal': engine.generate_journal_report(),
+            'ledger': engine.generate_ledger_report(),
+            'trial_balance': engine.generate_trial_balance(),
+            'profit_loss': engine.generate_profit_loss_statement(),
+            'balance_sheet': engine.generate_balance_sheet(),
+            'cash_flow': engine.generate_cash_flow_statement(),
+            'shareholders_equity': engine.generate_shareholders_equity_statement()
+        }
+        for report_name, report in individual.items():
+            self.assertNotIn('error', report, report_name)
+            self.assertEqual(_without_generation_dates(bundle[report_name]), _without_generation_dates(report),
+                             report_name)
+
+        timings = bundle['metadata']['timings']
+        self.assertEqual(set(timings), set(individual) | {'ledger_load', 'mis_report', 'total'})
+        self.assertEqual(bundle['metadata']['journal_lines'], 10)
+        validations = bundle['mis_report']['accounting_validation']['validations']
+        self.assertEqual(validations[0]['total_debits'], 7399.75)
+        self.assertEqual(validations[1]['status'], 'PASS')
+
+    def test_aggregate_period_and_name_filter(self):
+        """A loaded period keeps only its lines; LIKE patterns match names case-insensitively"""
+        self._post(datetime(2024, 1, 2), '1110', '3010', 5000.0, 'Capital introduced')
+        self._post(datetime(2024, 3, 5), '5020', '1110', 40.0, 'Taxi')
+
+        march = LedgerAggregate.load(self.company_id, datetime(2024, 3, 1), datetime(2024, 3, 31, 23, 59, 59))
+        expected = LedgerQueryService(self.company_id).account_balances(
+            datetime(2024, 3, 1), datetime(2024, 3, 31, 23, 59, 59))
+        self.assertEqual(march.account_balances(), expected)
+        self.assertEqual([line['entry_id'] for line in march.journal_lines()],
+                         [line['entry_id'] for line in LedgerQueryService(self.company_id).journal_lines(
+                             datetime(2024, 3, 1), datetime(2024, 3, 31, 23, 59, 59))])
+
+        cash = march.ledger_lines(include_empty_accounts=False, account_name_like='%CASH%')
+        self.assertEqual([(line['account_code'], line['running_balance']) for line in cash], [('1110', -40.0)])
+        with self.assertRaises(ValueError):
+            march.account_balances(datetime(2024, 1, 1))
+
+    def test_aggregate_totals_come_from_period_balances(self):
+        """Loading reads account_period_balances in one query; journal lines are only read when streamed"""
+        self._post(datetime(2024, 1, 2), '1110', '3010', 5000.0, 'Capital introduced')
+        self._post(datetime(2024, 2, 3), '5010', '1110', 300.25, 'Rent payment')
+
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            ledger = LedgerAggregate.load(self.company_id)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+        self.assertEqual(len(statements), 1)
+        self.assertIn('account_period_balances', statements[0])
+        self.assertNotIn('journal_entries', statements[0])
+        balances = {account['account_code']: account['net_balance'] for account in ledger.account_balances()}
+        self.assertEqual(balances['1110'], 4699.75)
+        self.assertEqual(len(list(ledger.journal_lines())), 4)
+
+class TestReportCache(unittest.TestCase):
+    """Cached reports are served until a journal change bumps the ledger version"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        ReportCache.clear()
+
+        company = Company(name='Cache Test Co', owner_user_id=1)
+        db.session.add(company)
+        db.session.flush()
+        self.company_id = company.id
+        self.cash = ChartOfAccount(company_id=self.company_id, account_code='1110',
+                                   account_name='Cash', account_type='assets')
+        db.session.add(self.cash)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        ReportCache.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _line(self, amount=10.0):
+        line = JournalEntry(company_id=self.company_id, account_id=self.cash.id, created_by=1,
+                            entry_date=datetime(2024, 1, 5), description='Receipt', debit_amount=amount,
+                            credit_amount=0.0, is_posted=True)
+        db.session.add(line)
+        db.session.commit()
+        return line
+
+    def test_version_moves_on_post_edit_delete_only(self):
+        """Adds, edits, deletes and bulk writes bump the version; rolled back changes do not"""
+        start = current_version(self.company_id)
+        line = self._line()
+        self.assertEqual(current_version(self.company_id), start + 1)
+
+        line.debit_amount = 12.0
+        db.session.commit()
+        self.assertEqual(current_version(self.company_id), start + 2)
+
+        db.session.add(Company(name='Unrelated Co', owner_user_id=1))
+        db.session.commit()
+        self.assertEqual(current_version(self.company_id), start + 2)
+
+        db.session.delete(line)
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(current_version(self.company_id), start + 2)
+
+        db.session.delete(db.session.get(JournalEntry, line.id))
+        db.session.commit()
+        self.assertEqual(current_version(self.company_id), start + 3)
+
+        JournalBulkWriter(self.company_id, user_id=1).write_lines([
+            {'account_code': '1110', 'entry_date': datetime(2024, 1, 6), 'description': 'Bulk',
+             'reference_number': 'B1', 'debit_amount': 1.0, 'credit_amount': 0.0}
+        ])
+        db.session.commit()
+        self.assertEqual(current_version(self.company_id), start + 4)
+
+    def test_reports_rebuilt_only_after_ledger_changes(self):
+        """Same key serves the cached value; a post makes the next call build again"""
+        builds = []
+        build = lambda: builds.append(1) or {'total': len(builds)}
+        cache = ReportCache()
+
+        first = cache.get_report(self.company_id, 'trial_balance', build)
+        self.assertIs(cache.get_report(self.company_id, 'trial_balance', build), first)
+        cache.get_report(self.company_id, 'trial_balance', build, parameters={'detail': True})
+        self.assertEqual(len(builds), 2)
+
+        self._line()
+        self.assertEqual(cache.get_report(self.company_id, 'trial_balance', build), {'total': 3})
+        self.assertEqual(ReportCache.stats()['entries'], 1)
+
+    def test_lru_eviction_removes_rendered_files(self):
+        """Over the byte bound the least recently used file is evicted and deleted"""
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        directory = temporary.name
+
+        def renderer(name):
+            def render():
+                path = os.path.join(directory, name)
+                with open(path, 'wb') as handle:
+                    handle.write(b'x' * 100)
+                return path
+            return render
+
+        cache = ReportCache(max_entries=10, max_file_bytes=250)
+        first = cache.get_file(self.company_id, 'ledger', renderer('a.xlsx'), parameters={'format': 'excel'})
+        cache.get_file(self.company_id, 'journal', renderer('b.xlsx'), parameters={'format': 'excel'})
+        cache.get_file(self.company_id, 'ledger', renderer('unused.xlsx'), parameters={'format': 'excel'})
+        cache.get_file(self.company_id, 'cash_flow', renderer('c.xlsx'), parameters={'format': 'excel'})
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(os.path.join(directory, 'b.xlsx')))
+        self.assertFalse(os.path.exists(os.path.join(directory, 'unused.xlsx')))
+        self.assertEqual(ReportCache.stats()['file_bytes'], 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import unittest
+from datetime import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import text
+
+from app import app, db
+from models import AuditLog, Invoice, ManualJournalHeader, UploadedFile, JournalEntryStatus
+from services.ledger_balance_service import LedgerBalanceService
+from services.ledger_query_service import LedgerQueryService
+from services.schema_migration_service import SchemaMigrationService
+
+class TestReportQueryPlans(unittest.TestCase):
+    """Report and dashboard queries must be served by indexes, not full table scans"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        SchemaMigrationService().apply_pending()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        db.session.execute(text('DROP TABLE IF EXISTS schema_migrations'))
+        db.session.commit()
+        self.app_context.pop()
+
+    def _plan(self, query) -> str:
+        """EXPLAIN QUERY PLAN for an ORM query (bind values do not affect SQLite plans)"""
+        statement = query.statement if hasattr(query, 'statement') else query
+        compiled = statement.compile(dialect=db.engine.dialect)
+        parameters = tuple(None for _ in (compiled.positiontup or []))
+        rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), parameters).fetchall()
+        return '\n'.join(row[-1] for row in rows)
+
+    def assertIndexed(self, plan: str, table: str, index_name: str):
+        self.assertNotIn(f'SCAN {table}\n', plan + '\n', plan)
+        self.assertIn(index_name, plan, plan)
+
+    def test_account_balances_uses_composite_index(self):
+        query = LedgerBalanceService(1).account_balances_query(datetime(2024, 1, 10), datetime(2024, 3, 20))
+        plan = self._plan(query)
+        self.assertIndexed(plan, 'journal_entries', 'idx_journal_company_account_posted_date')
+        self.assertIndexed(plan, 'chart_of_accounts', 'idx_chart_company_code')
+
+    def test_ledger_lines_uses_composite_index(self):
+        plan = self._plan(LedgerQueryService(1).ledger_lines_query())
+        self.assertIndexed(plan, 'journal_entries', 'idx_journal_company_account_posted_date')
+
+    def test_dashboard_queries_use_indexes(self):
+        uploads = UploadedFile.query.filter_by(user_id=1, status='processed')
+        self.assertIndexed(self._plan(uploads), 'uploaded_files', 'idx_uploaded_files_user_status')
+
+        recent_uploads = UploadedFile.query.filter_by(user_id=1).order_by(UploadedFile.created_at.desc()).limit(5)
+        self.assertIndexed(self._plan(recent_uploads), 'uploaded_files', 'idx_uploaded_files_user_created')
+
+        activities = AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(10)
+        self.assertIndexed(self._plan(activities), 'audit_logs', 'idx_audit_logs_timestamp')
+
+        pending = ManualJournalHeader.query.filter_by(
+            company_id=1, status=JournalEntryStatus.PENDING_REVIEW
+        ).order_by(ManualJournalHeader.created_at.desc())
+        self.assertIndexed(self._plan(pending), 'manual_journal_headers', 'idx_manual_journal_company_status_created')
+
+        overdue = Invoice.query.filter(Invoice.status == 'sent', Invoice.due_date < datetime(2024, 1, 1))
+        self.assertIndexed(self._plan(overdue), 'invoices', 'idx_invoices_status_due')
+
+    def test_migration_adds_indexes_to_existing_database(self):
+        """Databases created before the indexes existed get them from the migration"""
+        db.session.execute(text('DROP INDEX idx_journal_company_account_posted_date'))
+        db.session.execute(text('DELETE FROM schema_migrations'))
+        db.session.commit()
+
+        service = SchemaMigrationService()
+        self.assertEqual(service.apply_pending(), ['0001', '0002', '0003'])
+        self.assertEqual(service.apply_pending(), [])
+
+        indexes = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'journal_entries'"
+        )).fetchall()
+        self.assertIn('idx_journal_company_account_posted_date', [row[0] for row in indexes])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import zipfile
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from openpyxl import load_workbook
+
+from services.excel_stream_writer import StreamingExcelWriter
+from services.financial_report_package_generator import FinancialReportPackageGenerator
+from services.parallel_export_service import ParallelExportService
+from services.report_export_service import ReportExportService
+
+class TestStreamingExcelExport(unittest.TestCase):
+    """Write-only export must keep the report layout while streaming rows"""
+
+    def setUp(self):
+        """Set up test environment"""
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = temporary.name
+
+    def test_rows_from_iterator_with_sampled_widths(self):
+        """Rows come from a generator; widths are measured on the sample and capped"""
+        consumed = []
+
+        def rows():
+            for number in range(1000):
+                consumed.append(number)
+                yield [number, f"line {number}", 'x' * (80 if number == 900 else 5)]
+
+        path = os.path.join(self.directory, 'journal.xlsx')
+        writer = StreamingExcelWriter(path, sample_rows=50)
+        self.assertEqual(writer.sheet('Journal').table(['No', 'Description', 'Note'], rows()), 1000)
+        writer.save()
+        self.assertEqual(len(consumed), 1000)
+
+        sheet = load_workbook(path)['Journal']
+        self.assertEqual(sheet.max_row, 1001)
+        self.assertEqual([cell.value for cell in sheet[1001]], [999, 'line 999', 'xxxxx'])
+        self.assertTrue(sheet['A1'].font.b)
+        self.assertEqual(sheet['A1'].style, 'report_header')
+        self.assertEqual(sheet['B2'].style, 'report_cell')
+        # Row 900's long note is past the sample, so it does not widen the column
+        self.assertEqual(sheet.column_dimensions['C'].width, 8)
+        self.assertEqual(sheet.column_dimensions['B'].width, len('Description') + 3)
+
+    def test_export_service_layout(self):
+        """Title block, section header and table land where the in-memory export put them"""
+        service = ReportExportService()
+        service.reports_dir = self.directory
+        report = {
+            'report_title': 'Journal Entries Report',
+            'entries': [
+                {'entry_id': 1, 'description': 'Cash sale', 'debit_amount': 100.0},
+                {'entry_id': 2, 'description': 'Cash sale', 'debit_amount': 0.0}
+            ],
+            'summary': {'total_entries': 2}
+        }
+        path = service.export_report(report, 'journal', 'excel', company_name='Test Co')
+
+        sheet = load_workbook(path)['journal']
+        self.assertEqual(sheet['A1'].value, 'Test Co')
+        self.assertEqual(sheet['A2'].value, 'Journal')
+        self.assertTrue(sheet['A3'].value.startswith('Generated on: '))
+        self.assertEqual(sheet['A5'].value, 'Entries')
+        self.assertEqual([cell.value for cell in sheet[6]], ['Entry Id', 'Description', 'Debit Amount'])
+        self.assertEqual([cell.value for cell in sheet[8]], [2, 'Cash sale', 0.0])
+        self.assertEqual(sheet['A6'].fill.fgColor.rgb, '001F4E79')
+        self.assertEqual(sheet['A7'].border.left.style, 'thin')
+        self.assertEqual(sheet.max_row, 8)
+
+class TestParallelExport(unittest.TestCase):
+    """Artifacts rendered in worker processes assemble into the same files as a sequential build"""
+
+    def setUp(self):
+        """Set up test environment"""
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = temporary.name
+
+    def test_package_is_built_in_process(self):
+        """The package's sheets are too small to be worth a worker process each"""
+        generator = FinancialReportPackageGenerator()
+        generator.report_dir = self.directory
+        company_info = {'company_name': 'Test Co', 'address': 'Street 1', 'phone': '1', 'email': 'a@b.c',
+                        'reporting_period': 'FY 2024-25', 'reporting_date': 'March 31, 2025'}
+        with mock.patch.object(ParallelExportService, '_shared_pool', side_effect=AssertionError('pool used')):
+            workbook = load_workbook(generator.generate_comprehensive_package(company_info))
+
+        self.assertEqual(len(workbook.sheetnames), len(FinancialReportPackageGenerator.SECTIONS))
+        self.assertTrue(workbook['Balance Sheet']['A1'].font.b)
+        self.assertEqual(set(generator.timings), set(FinancialReportPackageGenerator.SECTIONS) | {'assemble', 'total'})
+
+    def test_bundle_zips_every_format(self):
+        reports = {
+            'trial_balance': {'accounts': [{'account': 'Cash', 'debit': 10.0, 'credit': 0.0}]},
+            'journal': {'entries': [{'entry_id': 1, 'description': 'Receipt', 'debit_amount': 10.0}]}
+        }
+        archive_path = os.path.join(self.directory, 'bundle.zip')
+        result = ParallelExportService(workers=2).export_bundle(reports, archive_path, company_name='Test Co')
+
+        with zipfile.ZipFile(result.path) as archive:
+            extensions = sorted(os.path.splitext(name)[1] for name in archive.namelist())
+        self.assertEqual(extensions, ['.doc', '.doc', '.pdf', '.pdf', '.xlsx', '.xlsx'])
+        self.assertIn('journal.pdf', result.timings)
+        self.assertIn('assemble', result.timings)
+        # Only the archive is left behind
+        self.assertEqual(os.listdir(self.directory), ['bundle.zip'])
+
+if __name__ == '__main__':
+    unittest.main()
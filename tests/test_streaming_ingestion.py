@@ -0,0 +1,209 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import pandas as pd
+
+from app import app, db
+from models import JournalEntry
+from services.accounting_engine import AccountingEngine, UnbalancedJournalError
+from services.file_processor import FileProcessor
+from services.parsed_dataset_cache import ParsedDatasetCache
+from services.validation_engine import ValidationEngine, _ValidationTotals
+
+class TestStreamingIngestion(unittest.TestCase):
+    """Large CSV uploads are validated and posted chunk by chunk"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        handle, self.csv_path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+
+    def tearDown(self):
+        """Clean up test environment"""
+        os.remove(self.csv_path)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _write_csv(self, rows):
+        pd.DataFrame(rows).to_csv(self.csv_path, index=False)
+
+    def _journal_rows(self, pairs):
+        rows = []
+        for i in range(pairs):
+            rows.append({'date': '2024-01-05', 'description': f'Sale {i}', 'account': 'Cash',
+                         'debit': 100 + i, 'credit': None, 'reference': f'J-{i}'})
+            rows.append({'date': '2024-01-05', 'description': f'Sale {i}', 'account': 'Revenue',
+                         'debit': None, 'credit': 100 + i, 'reference': f'J-{i}'})
+        return rows
+
+    def test_chunks_keep_global_row_numbers(self):
+        self._write_csv(self._journal_rows(5))
+        chunks = list(FileProcessor().iter_csv_chunks(self.csv_path, chunk_size=3))
+
+        self.assertEqual([chunk['total_rows'] for chunk in chunks], [3, 3, 3, 1])
+        row_numbers = [entry['row_number'] for chunk in chunks for entry in chunk['entries']]
+        self.assertEqual(row_numbers, list(range(1, 11)))
+        self.assertEqual(chunks[-1]['bytes_read'], chunks[-1]['bytes_total'])
+
+    def test_journals_straddling_chunks_are_posted_once_balanced(self):
+        """Odd chunk sizes split every other journal; the open leg waits for the next chunk"""
+        rows = self._journal_rows(5)
+        rows.append({'date': '2024-01-06', 'description': 'Unmatched', 'account': 'Cash',
+                     'debit': 40, 'credit': None, 'reference': 'J-X'})
+        self._write_csv(rows)
+
+        updates = []
+        result = AccountingEngine().process_entry_chunks(
+            FileProcessor().iter_csv_chunks(self.csv_path, chunk_size=3),
+            progress_callback=updates.append
+        )
+
+        self.assertEqual(result['total_records'], 11)
+        self.assertEqual(result['processed_records'], 10)
+        self.assertEqual(result['error_records'], 1)
+        self.assertIn('row 11', result['errors'][0])
+        self.assertEqual(JournalEntry.query.count(), 10)
+
+        self.assertEqual([update['chunks_completed'] for update in updates], [1, 2, 3, 4])
+        self.assertEqual([update['rows_posted'] for update in updates], [2, 6, 8, 10])
+
+    def test_unbalanced_row_stops_the_import_once_too_many_rows_are_open(self):
+        """A bad row early on would otherwise keep every later row in memory"""
+        rows = self._journal_rows(1)
+        rows.append({'date': '2024-01-06', 'description': 'Unmatched', 'account': 'Cash',
+                     'debit': 40, 'credit': None, 'reference': 'J-X'})
+        rows += self._journal_rows(4)
+        self._write_csv(rows)
+
+        engine = AccountingEngine()
+        engine.MAX_OPEN_JOURNAL_ROWS = 4
+        with self.assertRaises(UnbalancedJournalError) as raised:
+            engine.process_entry_chunks(FileProcessor().iter_csv_chunks(self.csv_path, chunk_size=3))
+
+        self.assertIn('Rows 3 to 9', str(raised.exception))
+        self.assertIn('after posting 2 rows', str(raised.exception))
+        self.assertEqual(JournalEntry.query.count(), 2)
+
+    def test_chunked_validation_matches_whole_file(self):
+        rows = self._journal_rows(4)
+        rows[3]['debit'] = 'abc'
+        rows.append(dict(rows[0]))
+        rows.append({'date': 'not a date', 'description': None, 'account': 'A100',
+                     'debit': -5, 'credit': None, 'reference': 'J-9'})
+        self._write_csv(rows)
+
+        validator = ValidationEngine()
+        whole = validator.validate_file(self.csv_path)
+        chunked = validator.validate_file(self.csv_path, chunk_size=3)
+
+        self.assertFalse(chunked['is_valid'])
+        self.assertEqual(chunked['errors'], whole['errors'])
+        self.assertEqual(chunked['warnings'], whole['warnings'])
+        self.assertEqual(chunked['total_rows'], whole['total_rows'])
+
+    def test_chunked_duplicate_check_is_bounded(self):
+        rows = self._journal_rows(4)
+        rows.append(dict(rows[0]))
+        rows.append(dict(rows[3]))
+        self._write_csv(rows)
+
+        validator = ValidationEngine()
+        with mock.patch.object(_ValidationTotals, 'MAX_TRACKED_HASHES', 2):
+            chunked = validator.validate_file(self.csv_path, chunk_size=2)
+        self.assertEqual(chunked['total_rows'], len(rows))
+        self.assertIn("Duplicate check compared rows against the first 2 distinct rows only", chunked['warnings'])
+        # The first two rows are remembered; the repeat of the fourth is not seen
+        self.assertIn("Found 1 duplicate rows", chunked['warnings'])
+
+class TestParsedDatasetCache(unittest.TestCase):
+    """Every pipeline stage shares one parse of an upload"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app_context = app.app_context()
+        self.app_context.push()
+        self.work_dir = tempfile.mkdtemp()
+        self.cache = ParsedDatasetCache(cache_dir=os.path.join(self.work_dir, 'cache'))
+
+    def tearDown(self):
+        """Clean up test environment"""
+        shutil.rmtree(self.work_dir)
+        self.app_context.pop()
+
+    def _write_excel(self, name, frame):
+        path = os.path.join(self.work_dir, name)
+        frame.to_excel(path, index=False)
+        return path
+
+    def test_second_read_skips_parsing(self):
+        path = self._write_excel('upload.xlsx', pd.DataFrame({
+            'date': ['2024-01-05', '2024-01-06'],
+            'amount': [100, 'pending'],
+            'description': ['Rent', None]
+        }))
+
+        with mock.patch.object(ParsedDatasetCache, '_parse', wraps=ParsedDatasetCache._parse) as parse:
+            first = self.cache.read(path)
+            second = self.cache.read(path)
+
+        self.assertEqual(parse.call_count, 1)
+        pd.testing.assert_frame_equal(first, second)
+        # Mixed-type columns keep their values (Arrow cannot hold them, so the entry is pickled)
+        self.assertEqual(list(second['amount']), [100, 'pending'])
+        self.assertTrue(pd.isna(second['description'][1]))
+        self.assertTrue(os.listdir(self.cache.cache_dir)[0].endswith('.pkl'))
+
+    def test_uniform_columns_are_stored_as_arrow(self):
+        frame = pd.DataFrame({'date': ['2024-01-05', '2024-01-06'], 'amount': [100, 250],
+                              'description': ['Rent', None]})
+        path = self._write_excel('upload.xlsx', frame)
+        first = self.cache.read(path)
+        second = self.cache.read(path)
+
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(list(second['amount']), [100, 250])
+        self.assertTrue(os.listdir(self.cache.cache_dir)[0].endswith('.arrow'))
+
+    def test_identical_content_shares_an_entry(self):
+        frame = pd.DataFrame({'date': ['2024-01-05'], 'amount': [1.5], 'description': ['Fee']})
+        # Copy rather than rewrite: xlsx files carry their creation time
+        first = self._write_excel('a.xlsx', frame)
+        second = os.path.join(self.work_dir, 'b.xlsx')
+        shutil.copyfile(first, second)
+        self.cache.read(first)
+        self.cache.read(second)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 1)
+
+    def test_eviction_by_age_then_size(self):
+        paths = [self._write_excel(f'{i}.xlsx', pd.DataFrame({'amount': range(i * 100, i * 100 + 50)}))
+                 for i in range(3)]
+        for path in paths:
+            self.cache.read(path)
+        entries = sorted(os.listdir(self.cache.cache_dir))
+        self.assertEqual(len(entries), 3)
+
+        stale = os.path.join(self.cache.cache_dir, entries[0])
+        week_ago = time.time() - 8 * 24 * 3600
+        os.utime(stale, (week_ago, week_ago))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertFalse(os.path.exists(stale))
+
+        remaining = sorted(os.path.join(self.cache.cache_dir, name) for name in os.listdir(self.cache.cache_dir))
+        older = time.time() - 60
+        os.utime(remaining[0], (older, older))
+        self.cache.max_bytes = os.path.getsize(remaining[1])
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(os.listdir(self.cache.cache_dir), [os.path.basename(remaining[1])])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Pipeline Worker - F-AI Accountant
+Runs queued upload jobs (validate, process, report) and report renders outside the web processes
+
+Usage: python worker.py [--workers N] [--poll-interval SECONDS] [--once]
+"""
+
+import os
+import argparse
+import logging
+
+from services.job_queue_service import run_worker_pool
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+def main():
+    parser = argparse.ArgumentParser(description='F-AI Accountant pipeline worker')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('PIPELINE_WORKERS', 2)),
+                        help='number of worker processes')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='seconds to wait when the queue is empty')
+    parser.add_argument('--once', action='store_true',
+                        help='run every queued job in this process and exit')
+    args = parser.parse_args()
+
+    if args.once:
+        from app import app
+        import services.upload_pipeline_service  # noqa: F401 - registers the stage handlers
+        from services.job_queue_service import JobQueueService
+        from services.report_render_service import ReportRenderService
+
+        with app.app_context():
+            ran = JobQueueService().run_pending()
+            ran += ReportRenderService().run_pending()
+        logging.info(f"Ran {ran} queued jobs")
+        return
+
+    run_worker_pool(args.workers, args.poll_interval)
+
+if __name__ == '__main__':
+    main()